@@ -41,7 +41,6 @@ from beaker.util import parse_cache_config_options
 
 from .lib.config import getLinotpConfig
 from .lib.config.db_api import _retrieveAllConfigDB
-from .lib.config.global_api import getGlobalObject
 
 from .lib.context import request_context
 
@@ -52,7 +51,7 @@ from .lib.error import LinotpError
 from .lib.logs import init_logging_config
 from .lib.logs import log_request_timedelta
 
-from .lib.policy.util import parse_policies
+from .lib.policy.compiled import get_compiled_policies
 
 from .lib.resolver import initResolvers
 from .lib.resolver import setupResolvers
@@ -75,7 +74,9 @@ from .defaults import set_defaults
 from .settings import configs
 from .tokens import reload_classes as reload_token_classes
 from .lib.audit.base import getAudit
-from .lib.config.global_api import initGlobalObject
+from .lib.audit.SQLAudit import setup_audit_db
+from .lib.app_globals import RWLock
+from .lib.security.provider import SecurityProvider
 
 from sqlalchemy import create_engine
 from .model import init_model, meta         # FIXME: With Flask-SQLAlchemy
@@ -153,7 +154,7 @@ class LinOTPApp(Flask):
         """
         Return the security provider, which is an instance of SecurityProvider
         """
-        return flask_g.app_globals.security_provider
+        return flask_g.security_provider
 
     def check_license(self):
         """
@@ -273,7 +274,7 @@ class LinOTPApp(Flask):
         request_context['UserRealmLookup'] = {}
 
         request_context['Config'] = linotp_config
-        request_context['Policies'] = parse_policies(linotp_config)
+        request_context['Policies'] = get_compiled_policies(linotp_config)
         request_context['translate'] = translate
 
         request_context['CacheManager'] = self.cache
@@ -640,6 +641,11 @@ def setup_db(app, drop_data=False):
 
     meta.Session.commit()
 
+    # the audit tables are set up once here and not for every request
+
+    app.logger.info("Setting up audit database...")
+    setup_audit_db(app.config)
+
 
 def generate_secret_key_file(app):
     """Generate a secret-key file if it doesn't exist."""
@@ -670,7 +676,8 @@ def setup_security_provider(app):
     settings, but this is a huge bowl of spaghetti.
     """
     try:
-        flask_g.app_globals.security_provider.load_config(
+        flask_g.security_provider = SecurityProvider(RWLock())
+        flask_g.security_provider.load_config(
             flask_g.request_context['config'])
     except Exception as e:
         app.logger.error("Failed to load security provider definition: {}"
@@ -716,7 +723,6 @@ def create_app(config_name='default', config_extra=None):
         setup_cache(app)
         setup_db(app)
         set_config()       # ensure `request_context` exists
-        initGlobalObject()
         generate_secret_key_file(app)
         reload_token_classes()
         app.check_license()
@@ -737,7 +743,6 @@ def create_app(config_name='default', config_extra=None):
         # variables suck.
 
         set_config()
-        initGlobalObject()
         setup_audit(app)
         setup_security_provider(app)
 
@@ -29,6 +29,7 @@ admin controller - interfaces to administrate LinOTP
 """
 from binascii import hexlify
 from datetime import datetime
+import io
 import json
 from linotp.controllers.base import BaseController
 from linotp.flap import (
@@ -48,10 +49,12 @@ from linotp.lib.policy import PolicyException
 from linotp.lib.policy import checkPolicyPost
 from linotp.lib.policy import checkPolicyPre
 from linotp.lib.policy import getOTPPINEncrypt
+from linotp.lib.policy import get_random_pin_generator
 
 from linotp.lib.realm import getDefaultRealm
 from linotp.lib.realm import getRealms
 
+from linotp.lib.reply import sendCSVIterator
 from linotp.lib.reply import sendCSVResult
 from linotp.lib.reply import sendError
 from linotp.lib.reply import sendQRImageResult
@@ -76,6 +79,8 @@ from linotp.lib.token import setRealms, getTokenType
 
 from linotp.lib.tokeniterator import TokenIterator
 
+from linotp.lib.type_utils import boolean
+
 from linotp.lib.user import User
 from linotp.lib.user import getSearchFields
 from linotp.lib.user import getUserFromParam
@@ -97,11 +102,16 @@ import os
 from flask import Response, after_this_request
 from flask import stream_with_context
 from werkzeug.datastructures import FileStorage
+from werkzeug.datastructures import Headers
 
+from linotp.lib.ImportOTP.bulk_import import BulkTokenImport
+from linotp.lib.ImportOTP.bulk_import import get_init_param
 from linotp.lib.ImportOTP.oath import parseOATHcsv
+from linotp.lib.ImportOTP.oath import parse_oath_csv_lines
 from linotp.lib.ImportOTP.safenet import ImportException
 from linotp.lib.ImportOTP.safenet import parseSafeNetXML
 from linotp.lib.ImportOTP.yubico import parseYubicoCSV
+from linotp.lib.ImportOTP.yubico import parse_yubico_csv_lines
 
 
 # for loading XML file
@@ -377,6 +387,13 @@ class AdminController(BaseController):
             * tokeninfo_format - optional: if set to "json", this will be supplied in embedded JSON
                                  otherwise, string format is returned with dates in format
                                  DD/MM/YYYY TODO
+            * stream - optional: if set, the tokens are streamed chunk by
+                                 chunk instead of being collected in one
+                                 result. The result value is then the list
+                                 of tokens and the resultset is given in the
+                                 detail. The streamed tokens are ordered
+                                 by their id. Not supported in combination
+                                 with page and sortby.
 
         returns:
             a json result with:
@@ -389,6 +406,7 @@ class AdminController(BaseController):
         """
 
         param = self.request_params
+        streaming = False
         try:
             serial = param.get("serial")
             page = param.get("page")
@@ -400,6 +418,7 @@ class AdminController(BaseController):
             ufields = param.get("user_fields")
             output_format = param.get("outform")
             is_tokeninfo_json = param.get("tokeninfo_format") == "json"
+            stream = boolean(param.get("stream", False))
 
             user_fields = []
             if ufields:
@@ -433,6 +452,41 @@ class AdminController(BaseController):
             c.audit['success'] = True
             c.audit['info'] = "realm: %s, filter: %r" % (filterRealm, filter)
 
+            if stream and page is None:
+
+                # the tokens are read while the response is streamed, so
+                # the session is closed by the generator and not on return
+
+                def iterate_tokens():
+                    try:
+                        for tok in toks.iterate_chunked():
+
+                            if is_tokeninfo_json:
+                                self.parse_tokeninfo(tok)
+
+                            yield tok
+                    finally:
+                        Session.close()
+
+                info = {'resultset': toks.getResultSetInfo()}
+
+                Session.commit()
+                streaming = True
+
+                if output_format == "csv":
+                    headers = Headers()
+                    headers.add('Content-Disposition', 'attachment',
+                                filename='linotp-tokendata.csv')
+                    return Response(
+                        stream_with_context(
+                            sendCSVIterator(iterate_tokens())),
+                        mimetype='text/csv', headers=headers)
+
+                return Response(
+                    stream_with_context(
+                        sendResultIterator(iterate_tokens(), opt=info)),
+                    mimetype='application/json')
+
             # put in the result
             result = {}
 
@@ -466,7 +520,8 @@ class AdminController(BaseController):
             return sendError(response, e)
 
         finally:
-            Session.close()
+            if not streaming:
+                Session.close()
 
 
 ########################################################
@@ -2301,6 +2356,9 @@ class AdminController(BaseController):
             * file -  the file in a post request
             * type -  the file type.
             * realm - the target real of the tokens
+            * bulk - optional: import the tokens in committed chunks
+            * resume - optional: in the bulk mode, skip the already
+                       imported tokens of an interrupted import
 
         returns:
             a json result with a boolean
@@ -2355,6 +2413,9 @@ class AdminController(BaseController):
 
             hashlib = None
 
+            bulk = boolean(params.get('bulk', False))
+            resume = boolean(params.get('resume', False))
+
             if "pskc" == fileType:
                 pskc_type = params['pskc_type']
                 pskc_password = params['pskc_password']
@@ -2417,9 +2478,15 @@ class AdminController(BaseController):
                 if 'aladdin_hashlib' in params:
                     hashlib = params['aladdin_hashlib']
 
+            elif typeString == "oathcsv" and bulk:
+                TOKENS = parse_oath_csv_lines(io.StringIO(fileString))
+
             elif typeString == "oathcsv":
                 TOKENS = parseOATHcsv(fileString)
 
+            elif typeString == "yubikeycsv" and bulk:
+                TOKENS = parse_yubico_csv_lines(io.StringIO(fileString))
+
             elif typeString == "yubikeycsv":
                 TOKENS = parseYubicoCSV(fileString)
 
@@ -2504,6 +2571,48 @@ class AdminController(BaseController):
 
             # -------------------------------------------------------------- --
 
+            # in the bulk mode, the tokens are imported in chunks, where each
+            # chunk is committed after the check of the tokencount policy
+
+            if bulk:
+
+                def check_chunk():
+                    checkPolicyPost('admin', 'loadtokens',
+                                    {'tokenrealm': tokenrealm})
+
+                if isinstance(TOKENS, dict):
+                    TOKENS = TOKENS.items()
+
+                bulk_import = BulkTokenImport(
+                    tokenrealm=tokenrealm,
+                    resume=resume,
+                    random_pin=get_random_pin_generator(User('', '', '')),
+                    check_chunk=check_chunk)
+
+                stats = bulk_import.import_tokens(
+                    get_init_param(serial, token_data, hashlib=hashlib,
+                                   native=(typeString == "dat"))
+                    for serial, token_data in TOKENS)
+
+                imported = stats['imported'] + stats['updated']
+
+                log.info("[loadtokens] %i tokens imported, %i skipped.",
+                         imported, stats['skipped'])
+
+                res = {'value': True, 'imported': imported}
+                if resume:
+                    res['skipped'] = stats['skipped']
+
+                c.audit['info'] = "%s, %s (imported: %i, skipped: %i)" % (
+                    fileType, tokenFile, imported, stats['skipped'])
+                c.audit['success'] = True
+                c.audit['realm'] = tokenrealm
+
+                Session.commit()
+                return sendResultMethod(response, res)
+
+            # -------------------------------------------------------------- --
+
             # Now import the Tokens from the dictionary
 
             log.debug("[loadtokens] read %i tokens. starting import now"
@@ -2520,28 +2629,9 @@ class AdminController(BaseController):
                 # for the eToken dat we assume, that it brings all its
                 # init parameters in correct format
 
-                if typeString == "dat":
-                    init_param = TOKENS[serial]
-
-                else:
-                    init_param = {
-                        'serial': serial,
-                        'type': TOKENS[serial]['type'],
-                        'description': TOKENS[serial].get(
-                            "description", "imported"),
-                        'otpkey': TOKENS[serial]['hmac_key'],
-                        'otplen': TOKENS[serial].get('otplen'),
-                        'timeStep': TOKENS[serial].get('timeStep'),
-                        'hashlib': TOKENS[serial].get('hashlib')}
-
-                # add ocrasuite for ocra tokens, only if ocrasuite is not empty
-                if TOKENS[serial]['type'] in ['ocra2']:
-                    if TOKENS[serial].get('ocrasuite', "") != "":
-                        init_param['ocrasuite'] = TOKENS[serial].get(
-                            'ocrasuite')
-
-                if hashlib and hashlib != "auto":
-                    init_param['hashlib'] = hashlib
+                init_param = get_init_param(
+                    serial, TOKENS[serial], hashlib=hashlib,
+                    native=(typeString == "dat"))
 
                 (ret, _tokenObj) = th.initToken(
                     init_param,
@@ -37,6 +37,9 @@ from linotp.lib.reply import sendResult
 from linotp.lib.reply import sendError
 from linotp.controllers.base import BaseController
 from linotp.lib.logs import set_logging_level
+from linotp.lib.token_counter import reconcile_token_counters
+from linotp.lib.token_owner import refresh_owner_logins
+from linotp.lib.type_utils import boolean
 
 from linotp.model import Config
 import linotp.model.meta
@@ -145,4 +148,68 @@ class MaintenanceController(BaseController):
         finally:
             Session.close()
 
+    def refresh_token_owners(self):
+        """
+        fill in and update the indexed owner logins of the assigned tokens,
+        which are used for the wildcard owner search
+
+        this should be called periodically, e.g. by a cron job, to catch up
+        with renamed users and, after the database migration, to fill in the
+        logins of the existing owners
+
+        example call:
+
+            POST /maintenance/refresh_token_owners
+            pending_only=true
+
+        (only fill in the tokens, where the owner login is not yet known)
+        """
+
+        try:
+
+            pending_only = boolean(
+                self.request_params.get('pending_only', False))
+
+            stats = refresh_owner_logins(pending_only=pending_only)
+
+            Session.commit()
+            return sendResult(response, True, opt=stats)
+
+        except Exception as exx:
+            Session.rollback()
+            log.exception(exx)
+            return sendError(response, exx, 1)
+
+        finally:
+            Session.close()
+
+    def reconcile_token_counters(self):
+        """
+        recount the tokens per realm and status, which are maintained
+        incrementally for the reporting and the monitoring
+
+        this could be called periodically, e.g. by a cron job - otherwise
+        the counters are reconciled when they are read and the last
+        reconciliation is older than TOKEN_COUNTER_RECONCILE_INTERVAL
+
+        example call:
+
+            POST /maintenance/reconcile_token_counters
+        """
+
+        try:
+
+            stats = reconcile_token_counters()
+
+            Session.commit()
+            return sendResult(response, True, opt=stats)
+
+        except Exception as exx:
+            Session.rollback()
+            log.exception(exx)
+            return sendError(response, exx, 1)
+
+        finally:
+            Session.close()
+
 # eof #
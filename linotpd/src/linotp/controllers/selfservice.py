@@ -370,6 +370,8 @@ class SelfserviceController(BaseController):
             remove_auth_cookie(request.cookies.get('user_selfservice'))
             response.delete_cookie('user_selfservice')
 
+            Session.commit()
+
         return response
 
     def login(self):
@@ -415,6 +417,8 @@ class SelfserviceController(BaseController):
             remove_auth_cookie(request.cookies.get('user_selfservice'))
             response.delete_cookie('user_selfservice')
 
+            Session.commit()
+
         return response
 
     def load_form(self):
@@ -259,6 +259,10 @@ class ToolsController(BaseController):
                                                 'passwords_in_plaintext',
                                                 False))
 
+            # the bulk mode is intended for the import of many users
+
+            bulk = boolean(params.get('bulk', False))
+
             file_format = params.get('format', "csv")
 
             if file_format in ('password', 'passwd'):
@@ -341,7 +345,12 @@ class ToolsController(BaseController):
 
             # and run the data processing
 
-            result = user_import.import_csv_users(
+            if bulk:
+                import_csv_users = user_import.import_csv_users_bulk
+            else:
+                import_csv_users = user_import.import_csv_users
+
+            result = import_csv_users(
                                 data,
                                 dryrun=dryrun,
                                 format_reader=format_reader,
@@ -31,6 +31,8 @@ import hmac
 import logging
 import struct
 
+from contextlib import closing
+
 from hashlib import sha1
 
 
@@ -94,14 +96,50 @@ class HmacOtp():
             start = 0 if (start < 0) else start
             end = self.counter + (window)
 
-        for c in range(start , end):
-            otpval = self.generate(c)
+        # the hmac digests of the whole window are calculated with a
+        # secret, which is decrypted only once for the window
+
+        counters = range(start, end)
+        data_inputs = (struct.pack(">Q", c) for c in counters)
+
+        with closing(self.secretObj.hmac_digests(
+                data_inputs, hash_algo=self.hashfunc)) as digests:
 
-            if otpval == anOtpVal:
-                res = c
-                break
+            for c, digest in zip(counters, digests):
+                otp = str(self.truncate(digest))
+                otpval = (self.digits - len(otp)) * "0" + otp
+
+                self.counter = c + 1
+
+                if otpval == anOtpVal:
+                    res = c
+                    break
 
         #return -1 or the counter
         return res
 
+    def generate_window(self, start: int, window: int):
+        """
+        calculate the otp values of a counter window with a secret, which
+        is decrypted only once for the window
+
+        :param start: the first counter of the window
+        :param window: the number of otp values
+        :return: list of (counter, otp value) tuples
+        """
+
+        counters = range(start, start + window)
+        data_inputs = (struct.pack(">Q", c) for c in counters)
+
+        otp_values = []
+
+        with closing(self.secretObj.hmac_digests(
+                data_inputs, hash_algo=self.hashfunc)) as digests:
+
+            for c, digest in zip(counters, digests):
+                otp = str(self.truncate(digest))
+                otp_values.append((c, (self.digits - len(otp)) * "0" + otp))
+
+        return otp_values
+
 #eof##########################################################################
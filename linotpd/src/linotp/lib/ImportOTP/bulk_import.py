@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+bulk token import - import many tokens in chunks
+
+the tokens of an import file are processed in chunks of chunk_size tokens:
+
+* the existing serials of a chunk are looked up with one query
+* the new tokens are set up by their token class, which encrypts the seeds
+  by the security module, and are written with one bulk insert for the
+  tokens and one for their token realms
+* existing tokens are updated by the TokenHandler as before, or skipped
+  in the resume mode
+* the chunk is checked by the batch check, e.g. the tokencount policy,
+  and committed
+
+As every chunk is committed, an interrupted import could be resumed by
+importing the same file again in the resume mode, which skips all already
+imported tokens.
+"""
+
+import logging
+
+from linotp.lib.token import TokenHandler
+from linotp.lib.token import createTokenClassObject
+from linotp.lib.token import getRealms4Token
+from linotp.lib.token_counter import NO_REALM
+from linotp.lib.token_counter import count_new_tokens
+from linotp.lib.user import User
+
+from linotp.model import Token
+from linotp.model import token_table
+from linotp.model import tokenrealm_table
+from linotp.model.meta import Session
+
+from linotp.tokens import tokenclass_registry
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def get_init_param(serial, token_data, hashlib=None, native=False):
+    """
+    build the token init parameters from the parsed token data
+
+    :param serial: the token serial
+    :param token_data: the parsed token data dict
+    :param hashlib: optional hashlib, which overrules the parsed one
+    :param native: the token data are already the init parameters, as
+                   from the eToken dat files
+    :return: the init parameter dict
+    """
+
+    if native:
+        init_param = token_data
+
+    else:
+        init_param = {
+            'serial': serial,
+            'type': token_data['type'],
+            'description': token_data.get(
+                "description", "imported"),
+            'otpkey': token_data['hmac_key'],
+            'otplen': token_data.get('otplen'),
+            'timeStep': token_data.get('timeStep'),
+            'hashlib': token_data.get('hashlib')}
+
+    # add ocrasuite for ocra tokens, only if ocrasuite is not empty
+    if token_data['type'] in ['ocra2']:
+        if token_data.get('ocrasuite', "") != "":
+            init_param['ocrasuite'] = token_data.get(
+                'ocrasuite')
+
+    if hashlib and hashlib != "auto":
+        init_param['hashlib'] = hashlib
+
+    return init_param
+
+
+def _token_row(token):
+    """
+    get the column values of a new token for the bulk insert - unset
+    columns get their scalar default
+
+    :param token: the new token db object
+    :return: dict with the column values
+    """
+
+    row = {}
+
+    for column in token_table.columns:
+
+        if column.primary_key:
+            continue
+
+        value = getattr(token, column.key, None)
+
+        if (value is None and column.default is not None and
+                column.default.is_scalar):
+            value = column.default.arg
+
+        row[column.key] = value
+
+    return row
+
+
+class BulkTokenImport(object):
+    """
+    import tokens in chunks with bulk inserts
+    """
+
+    def __init__(self, tokenrealm='', chunk_size=DEFAULT_CHUNK_SIZE,
+                 resume=False, random_pin=None, check_chunk=None,
+                 progress=None):
+        """
+        :param tokenrealm: the realm of the imported tokens
+        :param chunk_size: the number of tokens imported at once
+        :param resume: skip the already existing tokens
+        :param random_pin: optional function to create random token pins
+        :param check_chunk: optional function, which is called before a
+                            chunk is committed, e.g. for a policy check
+        :param progress: optional callback, which is called with the
+                         number of imported, updated and skipped tokens
+        """
+
+        self.tokenrealm = tokenrealm
+        self.chunk_size = max(chunk_size, 1)
+        self.resume = resume
+        self.random_pin = random_pin
+        self.check_chunk = check_chunk
+        self.progress = progress
+
+        self.user = User('', '', '')
+        self.realms = getRealms4Token(self.user, [tokenrealm])
+
+        self.stats = {
+            'imported': 0,
+            'updated': 0,
+            'skipped': 0,
+        }
+
+    def import_tokens(self, init_params):
+        """
+        import the tokens chunk by chunk
+
+        :param init_params: iterable of the token init parameters
+        :return: dict with the number of imported, updated and skipped
+                 tokens
+        """
+
+        chunk = {}
+
+        for init_param in init_params:
+
+            # a serial, which is repeated in the import data, overrules
+            # the former one
+
+            chunk[init_param['serial']] = init_param
+
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(list(chunk.values()))
+                chunk = {}
+
+        if chunk:
+            self._import_chunk(list(chunk.values()))
+
+        return dict(self.stats)
+
+    def _import_chunk(self, init_params):
+        """
+        import one chunk of tokens and commit them
+
+        :param init_params: list of the token init parameters
+        """
+
+        serials = [init_param['serial'] for init_param in init_params]
+
+        existing_serials = set(
+            serial for (serial,) in Session.query(
+                Token.LinOtpTokenSerialnumber).filter(
+                    Token.LinOtpTokenSerialnumber.in_(serials)))
+
+        token_rows = []
+
+        for init_param in init_params:
+
+            serial = init_param['serial']
+
+            if serial in existing_serials:
+
+                if self.resume:
+                    self.stats['skipped'] += 1
+                    continue
+
+                self._update_token(init_param)
+                self.stats['updated'] += 1
+                continue
+
+            token_rows.append(self._create_token(init_param))
+
+        if token_rows:
+            self._insert_tokens(token_rows)
+            self.stats['imported'] += len(token_rows)
+
+        if self.check_chunk:
+            self.check_chunk()
+
+        Session.commit()
+
+        log.info("token import: %d imported, %d updated, %d skipped",
+                 self.stats['imported'], self.stats['updated'],
+                 self.stats['skipped'])
+
+        if self.progress:
+            self.progress(dict(self.stats))
+
+    def _create_token(self, init_param):
+        """
+        set up a new token by its token class
+
+        :param init_param: the token init parameters
+        :return: the column values of the new token
+        """
+
+        typ = (init_param.get('type') or 'hmac').lower()
+
+        if typ not in tokenclass_registry:
+            raise Exception("[BulkTokenImport] unknown token type %r" % typ)
+
+        token = Token(init_param['serial'])
+
+        token_obj = createTokenClassObject(token, typ)
+        token_obj.setDefaults()
+        token_obj.update(init_param)
+
+        if self.random_pin:
+            token_obj.setPin(self.random_pin())
+
+        return _token_row(token)
+
+    def _update_token(self, init_param):
+        """
+        update an existing token as the TokenHandler does
+
+        :param init_param: the token init parameters
+        """
+
+        TokenHandler().initToken(
+            init_param, self.user, tokenrealm=self.tokenrealm)
+
+        if self.random_pin:
+            token = Session.query(Token).filter(
+                Token.LinOtpTokenSerialnumber == init_param['serial']).one()
+            createTokenClassObject(token).setPin(self.random_pin())
+
+    def _insert_tokens(self, token_rows):
+        """
+        bulk insert of the new tokens and their token realms
+
+        :param token_rows: list of the token column values
+        """
+
+        Session.execute(token_table.insert(), token_rows)
+
+        # the tokens are not inserted by the orm, so they are counted here
+
+        realm_names = frozenset(
+            realm.name for realm in self.realms) or frozenset([NO_REALM])
+
+        count_new_tokens([
+            (realm_names, row['LinOtpIsactive'] is not False,
+             bool(row['LinOtpUserid'])) for row in token_rows])
+
+        if not self.realms:
+            return
+
+        serials = [row['LinOtpTokenSerialnumber'] for row in token_rows]
+
+        token_ids = [
+            token_id for (token_id,) in Session.query(
+                Token.LinOtpTokenId).filter(
+                    Token.LinOtpTokenSerialnumber.in_(serials))]
+
+        Session.execute(tokenrealm_table.insert(), [
+            {'token_id': token_id, 'realm_id': realm.id}
+            for token_id in token_ids for realm in self.realms])
+
+# eof
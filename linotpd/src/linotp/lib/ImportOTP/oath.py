@@ -74,7 +74,26 @@ def parseOATHcsv(csv):
     log.debug("[parseOATHcsv] starting to parse an oath csv file.")
     log.debug("[parseOATHcsv] the file contains %i lines.", len(csv_array))
 
-    for csv_line in csv_array:
+    for serial, token in parse_oath_csv_lines(csv_array):
+        TOKENS[serial] = token
+
+    log.debug("[parseOATHcsv] read the following values: %r", TOKENS)
+
+    return TOKENS
+
+
+def parse_oath_csv_lines(lines):
+    """
+    parse the lines of an oath csv file incrementally - the format is the
+    same as for parseOATHcsv
+
+    :param lines: iterable of the csv lines, e.g. a file
+    :return: generator of (serial, token) tuples
+    """
+
+    for csv_line in lines:
+
+        csv_line = csv_line.rstrip('\r\n')
 
         token = {}
 
@@ -183,8 +202,4 @@ def parseOATHcsv(csv):
         log.debug("[parseOATHcsv] read the line >%s< into token: >%r<",
                   csv_line, token)
 
-        TOKENS[serial] = token
-
-    log.debug("[parseOATHcsv] read the following values: %r", TOKENS)
-
-    return TOKENS
+        yield serial, token
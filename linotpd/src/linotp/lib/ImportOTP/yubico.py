@@ -99,7 +99,26 @@ def parseYubicoCSV(csv):
     csv_array = csv.split('\n')
 
     log.debug("[parseYubicoCSV] the file contains %i tokens." % len(csv_array))
-    for line in csv_array:
+
+    for serial, token in parse_yubico_csv_lines(csv_array):
+        TOKENS[serial] = token
+
+    log.debug("[parseOATHcsv] read the following values: %s" % str(TOKENS))
+
+    return TOKENS
+
+
+def parse_yubico_csv_lines(lines):
+    """
+    parse the lines of a yubico csv file incrementally - the format is the
+    same as for parseYubicoCSV
+
+    :param lines: iterable of the csv lines, e.g. a file
+    :return: generator of (serial, token) tuples
+    """
+
+    for line in lines:
+        line = line.rstrip('\r\n')
         l = line.split(',')
         serial = ""
         key = ""
@@ -126,11 +145,11 @@ def parseYubicoCSV(csv):
                     ttype = "yubikey"
                     otplen = 32 + len(public_id)
                     serial = "UBAM%08d_%s" % (serial_int, slot)
-                    TOKENS[serial] = {'type': ttype,
-                                      'hmac_key': key,
-                                      'otplen': otplen,
-                                      'description': public_id
-                                      }
+                    yield serial, {'type': ttype,
+                                   'hmac_key': key,
+                                   'otplen': otplen,
+                                   'description': public_id
+                                   }
                 elif typ.lower() == "oath-hotp":
                     '''
                     TODO: this does not work out at the moment, since the GUI either
@@ -143,11 +162,11 @@ def parseYubicoCSV(csv):
                         otplen = int(l[11])
 
                     serial = "UBOM%08d_%s" % (serial_int, slot)
-                    TOKENS[serial] = {'type': ttype,
-                                      'hmac_key': key,
-                                      'otplen': otplen,
-                                      'description': public_id
-                                      }
+                    yield serial, {'type': ttype,
+                                   'hmac_key': key,
+                                   'otplen': otplen,
+                                   'description': public_id
+                                   }
                 else:
                     log.warning(
                         "[parseYubicoCSV] at the moment we do only support Yubico OTP and HOTP: %r" % line)
@@ -179,16 +198,12 @@ def parseYubicoCSV(csv):
                     serial = "UBAM%s_%s" % (serial, slot)
                     public_id = l[1].strip()
                     otplen = 32 + len(public_id)
-                TOKENS[serial] = {'type': typ,
-                                  'hmac_key': key,
-                                  'otplen': otplen,
-                                  'description': public_id
-                                  }
+                yield serial, {'type': typ,
+                               'hmac_key': key,
+                               'otplen': otplen,
+                               'description': public_id
+                               }
         else:
             log.warning(
                 "[parseYubicoCSV] the line %r did not contain a enough values" % line)
             continue
-
-    log.debug("[parseOATHcsv] read the following values: %s" % str(TOKENS))
-
-    return TOKENS
@@ -36,14 +36,25 @@ uses a public/private key for signing the log entries
 """
 
 import datetime
+import hashlib
+
 from sqlalchemy import schema, types, orm, and_, or_, asc, desc
+from sqlalchemy import bindparam
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 
 from binascii import hexlify
 from binascii import unhexlify
 from sqlalchemy import create_engine
+from flask import current_app
+
 from linotp.flap import config
+from linotp.flap import set_config
 from linotp.lib.audit.base import AuditBase
+from linotp.lib.audit.writer import get_audit_writer
 from linotp.model import meta
 
 from linotp.lib.crypto.rsa import RSA_Signature
@@ -72,13 +83,13 @@ audit_table = schema.Table(audit_table_name, metadata,
     schema.Column('id', types.Integer, schema.Sequence('audit_seq_id',
                                                        optional=True),
                   primary_key=True),
-    schema.Column('timestamp', types.Unicode(30), default=now, index=True),
+    schema.Column('timestamp', types.Unicode(30), default=now),
     schema.Column('signature', types.Unicode(512), default=''),
     schema.Column('action', types.Unicode(30), index=True),
     schema.Column('success', types.Unicode(30), default="False"),
-    schema.Column('serial', types.Unicode(30), index=True),
+    schema.Column('serial', types.Unicode(30)),
     schema.Column('tokentype', types.Unicode(40)),
-    schema.Column('user', types.Unicode(255), index=True),
+    schema.Column('user', types.Unicode(255)),
     schema.Column('realm', types.Unicode(255), index=True),
     schema.Column('administrator', types.Unicode(255)),
     schema.Column('action_detail', types.Unicode(512), default=''),
@@ -89,6 +100,41 @@ audit_table = schema.Table(audit_table_name, metadata,
     schema.Column('clearance_level', types.Integer, default=0)
 )
 
+# the composite indexes of the common searches, which end with the id to
+# support the keyset pagination
+
+schema.Index('audit_user_realm_id_idx', audit_table.c.user,
+             audit_table.c.realm, audit_table.c.id)
+schema.Index('audit_serial_id_idx', audit_table.c.serial, audit_table.c.id)
+schema.Index('audit_timestamp_id_idx', audit_table.c.timestamp,
+             audit_table.c.id)
+
+# in the 'chain' integrity mode, each audit entry carries the sha256 hash of
+# the entry, chained to the hash of its predecessor. The chain is anchored
+# by checkpoints, which sign the chain hash every AUDIT_CHECKPOINT_INTERVAL
+# entries. The audit_chain table holds the head of the chain.
+
+CHAIN_PREFIX = 'chain:'
+CHAIN_GENESIS = '0' * 64
+
+audit_chain_table = schema.Table('%saudit_chain' % table_prefix, metadata,
+    schema.Column('id', types.Integer, primary_key=True, autoincrement=False),
+    schema.Column('audit_id', types.Integer, default=0),
+    schema.Column('chain_hash', types.Unicode(64), default=CHAIN_GENESIS),
+    schema.Column('unsigned', types.Integer, default=0)
+)
+
+audit_checkpoint_table = schema.Table(
+    '%saudit_checkpoint' % table_prefix, metadata,
+    schema.Column('id', types.Integer,
+                  schema.Sequence('audit_checkpoint_seq_id', optional=True),
+                  primary_key=True),
+    schema.Column('audit_id', types.Integer, index=True, unique=True),
+    schema.Column('chain_hash', types.Unicode(64)),
+    schema.Column('timestamp', types.Unicode(30), default=now),
+    schema.Column('signature', types.Unicode(1024), default='')
+)
+
 
 AUDIT_ENCODE = ["action", "serial", "success", "user", "realm", "tokentype",
                 "administrator", "action_detail", "info", "linotp_server",
@@ -234,6 +280,49 @@ class AuditTable(object):
 
 orm.mapper(AuditTable, audit_table)
 
+# the search parameters and their columns
+
+SEARCH_COLUMNS = {
+    'serial': AuditTable.serial,
+    'user': AuditTable.user,
+    'realm': AuditTable.realm,
+    'action': AuditTable.action,
+    'action_detail': AuditTable.action_detail,
+    'date': AuditTable.timestamp,
+    'success': AuditTable.success,
+    'tokentype': AuditTable.tokentype,
+    'administrator': AuditTable.administrator,
+    'info': AuditTable.info,
+    'linotp_server': AuditTable.linotp_server,
+    'client': AuditTable.client,
+}
+
+
+def match_condition(column, value):
+    """
+    create the match condition for a search value
+
+    values without the '%' wildcard are matched as a whole and values with
+    a trailing '%' only by prefix, so that the audit indexes can be used.
+    Other wildcard values require a full LIKE match.
+
+    unlike the former LIKE match, the whole value match is case sensitive,
+    unless the collation of the database is case insensitive (mysql).
+
+    :param column: the audit table column
+    :param value: the search value
+    :return: the sqlalchemy condition
+    """
+
+    if '%' not in value:
+        return column == value
+
+    prefix = value.rstrip('%')
+    if '%' not in prefix and '_' not in prefix:
+        return column.startswith(prefix)
+
+    return column.like(value)
+
 
 # replace sqlalchemy-migrate by the ability to ad a column
 def add_column(engine, table, column):
@@ -269,6 +358,92 @@ def add_column(engine, table, column):
     return result
 
 
+def create_audit_indexes(engine):
+    """
+    create the indexes, which are missing in an existing audit table -
+    on a large audit table this might take a while
+
+    :param engine: the engine of the audit database
+    """
+
+    existing = set(index['name'] for index in
+                   inspect(engine).get_indexes(audit_table.name))
+
+    for index in audit_table.indexes:
+        if index.name in existing:
+            continue
+
+        log.info("creating audit index %s", index.name)
+
+        try:
+            index.create(engine)
+
+        except Exception as exx:
+
+            # the index might have been created in parallel by another
+            # process - otherwise the failure is raised to the setup
+
+            created = set(idx['name'] for idx in
+                          inspect(engine).get_indexes(audit_table.name))
+
+            if index.name not in created:
+                log.error("failed to create audit index %s: %r",
+                          index.name, exx)
+                raise exx
+
+
+def create_chain_head(engine):
+    """
+    create the head row of the audit hash chain, if it does not exist
+
+    :param engine: the engine of the audit database
+    """
+
+    with engine.begin() as connection:
+        head = connection.execute(select([audit_chain_table.c.id]))
+        if head.first() is not None:
+            return
+
+        try:
+            connection.execute(audit_chain_table.insert(), {'id': 1})
+        except IntegrityError:
+            # created in parallel by another process
+            pass
+
+
+def setup_audit_db(config):
+    """
+    set up the audit database once at the setup of the app and not by the
+    audit object of every request: create the audit tables, the indexes,
+    which are missing in an existing audit table, and in the 'chain'
+    integrity mode the head of the hash chain
+
+    :param config: the app config
+    """
+
+    audit_url = config.get("AUDIT_DATABASE_URI")
+
+    if audit_url == 'OFF':
+        return
+
+    if audit_url is None or audit_url == 'SHARED':
+        engine = meta.engine
+    else:
+        engine = create_engine(audit_url)
+
+    try:
+        metadata.create_all(bind=engine)
+
+        create_audit_indexes(engine)
+
+        if config.get("AUDIT_INTEGRITY", 'rsa') == 'chain':
+            create_chain_head(engine)
+
+    finally:
+        if engine is not meta.engine:
+            engine.dispose()
+
+
 ###############################################################################
 class Audit(AuditBase):
     """
@@ -316,6 +491,38 @@ class Audit(AuditBase):
 
         self.rsa = RSA_Signature(private=self.private.encode('utf-8'))
 
+        # in the 'chain' integrity mode only the checkpoints of the hash
+        # chain are signed instead of every audit entry
+
+        self.integrity = self.config.get("AUDIT_INTEGRITY", 'rsa')
+
+        if self.integrity not in ['rsa', 'chain']:
+            raise ValueError("unsupported audit integrity %r" %
+                             self.integrity)
+
+        self.checkpoint_interval = max(
+            int(self.config.get("AUDIT_CHECKPOINT_INTERVAL", 100)), 1)
+
+        # in the 'async' durability mode the audit entries are written and
+        # signed by the background writer, which is shared by the audit
+        # objects of all requests of the app and audit database
+
+        self.writer = None
+
+        durability = self.config.get("AUDIT_DURABILITY", 'sync')
+
+        if durability == 'async':
+            self.app = current_app._get_current_object()
+            self.writer = get_audit_writer(
+                self.app, str(self.engine.url), self._write_batch,
+                version=(self.integrity, self.checkpoint_interval),
+                queue_size=self.config.get("AUDIT_QUEUE_SIZE", 10000),
+                batch_size=self.config.get("AUDIT_BATCH_SIZE", 100),
+                flush_interval=self.config.get("AUDIT_FLUSH_INTERVAL", 0.5),
+                put_timeout=self.config.get("AUDIT_QUEUE_TIMEOUT", 1.0))
+
+        elif durability != 'sync':
+            raise ValueError("unsupported audit durability %r" % durability)
 
     def _init_db(self):
         """
@@ -352,7 +559,6 @@ class Audit(AuditBase):
         metadata.bind = self.engine
         metadata.create_all()
 
-
     def _attr_to_dict(self, audit_line):
 
         line = {}
@@ -435,7 +641,30 @@ class Audit(AuditBase):
         It should hash the data and do a hash chain and sign the data
         '''
 
-        at = AuditTable(
+        at = self._audit_line(param)
+
+        if self.writer:
+            self.writer.put(at)
+            return
+
+        if self.integrity == 'chain':
+            with self.session.begin(subtransactions=True):
+                self._insert_batch(self.session, [at])
+            return
+
+        self.session.add(at)
+        self.session.flush()
+        # At this point "at" contains the primary key id
+        at.signature = self._sign(at)
+        self.session.merge(at)
+        self.session.flush()
+
+    def _audit_line(self, param):
+        '''
+        create the audit db entry from the audit parameters
+        '''
+
+        return AuditTable(
                     serial=param.get('serial'),
                     action=param.get('action').lstrip('/'),
                     success=1 if param.get('success') else 0,
@@ -452,13 +681,290 @@ class Audit(AuditBase):
                     config_param=self.config,
             )
 
-        self.session.add(at)
-        self.session.flush()
-        # At this point "at" contains the primary key id
-        at.signature = self._sign(at)
-        self.session.merge(at)
-        self.session.flush()
+    def _write_batch(self, audit_lines):
+        '''
+        write and sign a batch of audit entries - called by the
+        background writer
+        '''
+
+        # the encoding of the entries depends on the app config
+
+        with self.app.app_context():
+            set_config()
+
+            with self.engine.begin() as connection:
+                self._insert_batch(connection, audit_lines)
+
+    def _insert_batch(self, connection, audit_lines):
+        '''
+        insert and sign the audit entries within the transaction of the
+        connection
+
+        as the signature covers the id of the entry, the entries are
+        inserted one by one to get their ids, while the signatures of
+        the whole batch are updated at once (executemany)
+
+        in the 'chain' integrity mode, the head of the hash chain is locked
+        for the transaction, so that the chain follows the order of the ids
+        '''
+
+        head = None
+        if self.integrity == 'chain':
+            head = dict(connection.execute(
+                select([audit_chain_table])
+                .where(audit_chain_table.c.id == 1)
+                .with_for_update()).first())
+
+        signatures = []
+
+        for at in audit_lines:
+
+            values = {}
+            for column in audit_table.columns:
+                if column.primary_key:
+                    continue
+
+                # the raw, encoded value of the entry
+
+                value = object.__getattribute__(at, column.name)
+
+                # as with the orm, missing values are taken from the
+                # column defaults, so that the signature covers them
+
+                if value is None and column.default is not None:
+                    value = column.default.arg
+                    if callable(value):
+                        value = value(None)
+                    setattr(at, column.name, value)
+
+                if value is not None:
+                    values[column.name] = value
+
+            result = connection.execute(audit_table.insert(), values)
+            at.id = result.inserted_primary_key[0]
+
+            if head is None:
+                signature = self._sign(at)
 
+            else:
+                head['audit_id'] = at.id
+                head['chain_hash'] = chain_hash(head['chain_hash'],
+                                                self._attr_to_dict(at))
+                head['unsigned'] += 1
+
+                signature = CHAIN_PREFIX + head['chain_hash']
+
+                if head['unsigned'] >= self.checkpoint_interval:
+                    self._add_checkpoint(connection, head)
+
+            signatures.append({
+                'audit_id': at.id,
+                'audit_signature': signature})
+
+        connection.execute(
+            audit_table.update()
+            .where(audit_table.c.id == bindparam('audit_id'))
+            .values(signature=bindparam('audit_signature')),
+            signatures)
+
+        if head is not None:
+            connection.execute(
+                audit_chain_table.update()
+                .where(audit_chain_table.c.id == 1)
+                .values(audit_id=head['audit_id'],
+                        chain_hash=head['chain_hash'],
+                        unsigned=head['unsigned']))
+
+    def _add_checkpoint(self, connection, head):
+        '''
+        sign the current head of the hash chain
+
+        :param connection: the connection of the insert transaction
+        :param head: the chain head dict, which is reset
+        '''
+
+        signature = self.rsa.sign(
+            checkpoint_as_bytes(head['audit_id'], head['chain_hash']))
+
+        connection.execute(audit_checkpoint_table.insert(), {
+            'audit_id': head['audit_id'],
+            'chain_hash': head['chain_hash'],
+            'signature': signature.hex()})
+
+        head['unsigned'] = 0
+
+    def checkpoint(self):
+        '''
+        sign the pending audit entries of the hash chain, e.g. at shutdown
+        or by a periodic job, so that they do not wait for the next
+        checkpoint interval
+        '''
+
+        self.flush()
+
+        with self.engine.begin() as connection:
+            head = dict(connection.execute(
+                select([audit_chain_table])
+                .where(audit_chain_table.c.id == 1)
+                .with_for_update()).first())
+
+            if not head['unsigned']:
+                return
+
+            self._add_checkpoint(connection, head)
+
+            connection.execute(
+                audit_chain_table.update()
+                .where(audit_chain_table.c.id == 1)
+                .values(unsigned=0))
+
+    def _verify_segment(self, start_id, start_hash, checkpoint):
+        '''
+        verify the chained audit entries between two checkpoints
+
+        :param start_id: the audit id of the previous checkpoint
+        :param start_hash: the chain hash of the previous checkpoint
+        :param checkpoint: the checkpoint row, which ends the segment
+        :return: tuple of the number of verified entries and the id of
+                 the first failed entry or None
+        '''
+
+        entries = self.session.query(AuditTable).filter(and_(
+            AuditTable.id > start_id,
+            AuditTable.id <= checkpoint.audit_id,
+            AuditTable.signature.like(CHAIN_PREFIX + '%'))).order_by(
+                AuditTable.id).yield_per(1000)
+
+        current_hash = start_hash
+        count = 0
+        failed = None
+
+        for entry in entries:
+            current_hash = chain_hash(current_hash,
+                                      self._attr_to_dict(entry))
+            count += 1
+
+            if failed is None and entry.signature != (
+                    CHAIN_PREFIX + current_hash):
+                failed = entry.id
+
+        signature_ok = self.rsa.verify(
+            checkpoint_as_bytes(checkpoint.audit_id, checkpoint.chain_hash),
+            unhexlify(checkpoint.signature))
+
+        if current_hash != checkpoint.chain_hash or not signature_ok:
+            if failed is None:
+                failed = start_id + 1
+
+        return count, failed
+
+    def verify_chain(self, start_id=None, end_id=None):
+        '''
+        verify the hash chain of the audit entries in bulk - the range is
+        extended to the surrounding checkpoints, as only the checkpoints
+        are signed
+
+        :param start_id: the id of the first audit entry to verify
+        :param end_id: the id of the last audit entry to verify
+        :return: dict with the number of 'verified' entries, the id of
+                 the first 'failed' entry or None, and the number of the
+                 entries, which are still 'unsigned'
+        '''
+
+        start_id = start_id or 0
+
+        query = self.session.query(audit_checkpoint_table).order_by(
+            audit_checkpoint_table.c.audit_id)
+
+        previous = self.session.query(audit_checkpoint_table).filter(
+            audit_checkpoint_table.c.audit_id < start_id).order_by(
+                desc(audit_checkpoint_table.c.audit_id)).first()
+
+        segment_start, segment_hash = 0, CHAIN_GENESIS
+        if previous:
+            segment_start, segment_hash = (
+                previous.audit_id, previous.chain_hash)
+
+        result = {'verified': 0, 'failed': None, 'unsigned': 0}
+
+        for checkpoint in query.filter(
+                audit_checkpoint_table.c.audit_id >= start_id):
+
+            count, failed = self._verify_segment(
+                segment_start, segment_hash, checkpoint)
+
+            if failed is not None:
+                result['failed'] = failed
+                return result
+
+            result['verified'] += count
+
+            if end_id is not None and checkpoint.audit_id >= end_id:
+                return result
+
+            segment_start, segment_hash = (
+                checkpoint.audit_id, checkpoint.chain_hash)
+
+        result['unsigned'] = self.session.query(AuditTable).filter(and_(
+            AuditTable.id > segment_start,
+            AuditTable.signature.like(CHAIN_PREFIX + '%'))).count()
+
+        return result
+
+    def _check_chain(self, audit_id, segments):
+        '''
+        check the chained audit entry by verifying its segment
+
+        :param audit_id: the id of the audit entry
+        :param segments: list of the already verified segments as tuples
+                         of (start id, end id, result)
+        :return: 'OK', 'FAIL' or 'PENDING' for not yet signed entries
+        '''
+
+        for start_id, end_id, result in segments:
+            if start_id < audit_id <= end_id:
+                return result
+
+        checkpoint = self.session.query(audit_checkpoint_table).filter(
+            audit_checkpoint_table.c.audit_id >= audit_id).order_by(
+                audit_checkpoint_table.c.audit_id).first()
+
+        if not checkpoint:
+            return 'PENDING'
+
+        previous = self.session.query(audit_checkpoint_table).filter(
+            audit_checkpoint_table.c.audit_id < checkpoint.audit_id).order_by(
+                desc(audit_checkpoint_table.c.audit_id)).first()
+
+        start_id, start_hash = 0, CHAIN_GENESIS
+        if previous:
+            start_id, start_hash = previous.audit_id, previous.chain_hash
+
+        _count, failed = self._verify_segment(start_id, start_hash,
+                                              checkpoint)
+
+        result = 'OK' if failed is None else 'FAIL'
+        segments.append((start_id, checkpoint.audit_id, result))
+
+        return result
+
+    def flush(self):
+        '''
+        wait until all queued audit entries are written
+        '''
+        if self.writer:
+            self.writer.flush()
+
+    def get_writer_stats(self):
+        '''
+        get the statistics of the background writer
+
+        :return: dict with the writer statistics or None in sync mode
+        '''
+        if self.writer:
+            return self.writer.get_stats()
+
+        return None
 
     def initialize_log(self, param):
         '''
@@ -487,32 +993,13 @@ class Audit(AuditBase):
 
         for k, v in list(param.items()):
             if "" != v:
-                if "serial" == k:
-                    conditions.append(AuditTable.serial.like(v))
-                elif "user" == k:
-                    conditions.append(AuditTable.user.like(v))
-                elif "realm" == k:
-                    conditions.append(AuditTable.realm.like(v))
-                elif "action" == k:
-                    conditions.append(AuditTable.action.like(v))
-                elif "action_detail" == k:
-                    conditions.append(AuditTable.action_detail.like(v))
-                elif "date" == k:
-                    conditions.append(AuditTable.timestamp.like(v))
-                elif "number" == k:
-                    conditions.append(AuditTable.id.like(v))
-                elif "success" == k:
-                    conditions.append(AuditTable.success.like(v))
-                elif "tokentype" == k:
-                    conditions.append(AuditTable.tokentype.like(v))
-                elif "administrator" == k:
-                    conditions.append(AuditTable.administrator.like(v))
-                elif "info" == k:
-                    conditions.append(AuditTable.info.like(v))
-                elif "linotp_server" == k:
-                    conditions.append(AuditTable.linotp_server.like(v))
-                elif "client" == k:
-                    conditions.append(AuditTable.client.like(v))
+                if "number" == k:
+                    if str(v).isdigit():
+                        conditions.append(AuditTable.id == int(v))
+                    else:
+                        conditions.append(AuditTable.id.like(v))
+                elif k in SEARCH_COLUMNS:
+                    conditions.append(match_condition(SEARCH_COLUMNS[k], v))
 
         all_conditions = None
         if conditions:
@@ -520,11 +1007,13 @@ class Audit(AuditBase):
 
         return all_conditions
 
-    def row2dict(self, audit_line):
+    def row2dict(self, audit_line, segments=None):
         """
         convert an SQL audit db to a audit dict
 
         :param audit_line: audit db row
+        :param segments: list of the already verified chain segments, which
+                         is shared for the rows of a search result
         :return: audit entry dict
         """
 
@@ -541,7 +1030,15 @@ class Audit(AuditBase):
         # Signature check
         # TODO: use instead the verify_init
 
-        res = self._verify(line, audit_line.signature)
+        signature = audit_line.signature or ''
+
+        if signature.startswith(CHAIN_PREFIX):
+            if segments is None:
+                segments = []
+            line['sig_check'] = self._check_chain(audit_line.id, segments)
+            return line
+
+        res = self._verify(line, signature)
         if res == 1:
             line['sig_check'] = "OK"
         else:
@@ -608,24 +1105,44 @@ class Audit(AuditBase):
 
         # build the ordering
         order_dir = asc(order)
+        id_dir = asc(AuditTable.id)
 
+        descending = False
         if rp_dict.get("sortorder"):
             sorto = rp_dict.get('sortorder').lower()
             if "desc" == sorto:
+                descending = True
                 order_dir = desc(order)
+                id_dir = desc(AuditTable.id)
 
-        if type(condition).__name__ == 'NoneType':
-            audit_q = self.session.query(AuditTable)\
-                .order_by(order_dir)
-        else:
-            audit_q = self.session.query(AuditTable)\
-                .filter(condition)\
-                .order_by(order_dir)
+        # keyset pagination: instead of skipping the rows of the previous
+        # pages, we seek behind the last row of the previous page, which is
+        # possible for the sort orders, which are supported by an index
+
+        after = rp_dict.get('after')
+        keyset = after is not None and (
+            order is AuditTable.id or order is AuditTable.timestamp)
+
+        if keyset:
+            seek = self._seek_condition(order, int(after), descending)
+            if condition is None:
+                condition = seek
+            else:
+                condition = and_(condition, seek)
 
-        # FIXME? BUT THIS IS SO MUCH SLOWER!
-        # FIXME: Here desc() ordering also does not work! :/
+        audit_q = self.session.query(AuditTable)
 
-        if 'rp' in rp_dict or 'page' in rp_dict:
+        if condition is not None:
+            audit_q = audit_q.filter(condition)
+
+        # the id makes the order of equal timestamps definite
+
+        if order is AuditTable.id:
+            audit_q = audit_q.order_by(order_dir)
+        else:
+            audit_q = audit_q.order_by(order_dir, id_dir)
+
+        if 'rp' in rp_dict or 'page' in rp_dict or keyset:
             # build the LIMIT and OFFSET
             page = 1
             offset = 0
@@ -634,7 +1151,7 @@ class Audit(AuditBase):
             if 'rp' in rp_dict:
                 limit = int(rp_dict.get('rp'))
 
-            if 'page' in rp_dict:
+            if 'page' in rp_dict and not keyset:
                 page = int(rp_dict.get('page'))
 
             offset = limit * (page - 1)
@@ -650,12 +1167,52 @@ class Audit(AuditBase):
 
 
 
+    def _seek_condition(self, order, after, descending):
+        '''
+        create the condition to seek behind the audit entry with the id
+        'after' in the given sort order
+
+        :param order: the sort column - either the id or the timestamp
+        :param after: the id of the last entry of the previous page
+        :param descending: boolean, if the sort order is descending
+        :return: the sqlalchemy condition
+        '''
+
+        if order is AuditTable.id:
+            if descending:
+                return AuditTable.id < after
+            return AuditTable.id > after
+
+        timestamp = self.session.query(AuditTable.timestamp).filter(
+            AuditTable.id == after).scalar()
+
+        if timestamp is None:
+            # the entry is gone - continue after its id
+            timestamp = ''
+
+        if descending:
+            return or_(AuditTable.timestamp < timestamp,
+                       and_(AuditTable.timestamp == timestamp,
+                            AuditTable.id < after))
+
+        return or_(AuditTable.timestamp > timestamp,
+                   and_(AuditTable.timestamp == timestamp,
+                        AuditTable.id > after))
+
     def getTotal(self, param, AND=True, display_error=True):
         '''
         This method returns the total number of audit entries in
         the audit store
+
+        with AUDIT_COUNT_MODE 'estimate', the number of all entries is
+        estimated from the id range and the number of the matching entries
+        is counted only up to AUDIT_COUNT_LIMIT
         '''
         condition = self._buildCondition(param, AND)
+
+        if self.config.get("AUDIT_COUNT_MODE", 'exact') == 'estimate':
+            return self._estimate_total(condition)
+
         if type(condition).__name__ == 'NoneType':
             c = self.session.query(AuditTable).count()
         else:
@@ -663,6 +1220,30 @@ class Audit(AuditBase):
 
         return c
 
+    def _estimate_total(self, condition):
+        '''
+        estimate the number of audit entries without a full count
+
+        :param condition: the search condition or None
+        :return: the estimated number of entries
+        '''
+
+        if condition is None:
+            min_id, max_id = self.session.query(
+                func.min(AuditTable.id), func.max(AuditTable.id)).one()
+
+            if max_id is None:
+                return 0
+
+            return max_id - min_id + 1
+
+        limit = int(self.config.get("AUDIT_COUNT_LIMIT", 10000))
+
+        limited = self.session.query(AuditTable.id).filter(
+            condition).limit(limit).subquery()
+
+        return self.session.query(func.count()).select_from(limited).scalar()
+
 def getAsString(data):
     '''
     We need to distinguish, if this is an entry after the adding the
@@ -690,6 +1271,25 @@ def getAsBytes(data):
     """
     return bytes(getAsString(data), 'utf-8')
 
+def chain_hash(previous_hash, data):
+    """
+    calculate the chain hash of an audit record
+
+    :param previous_hash: the hex chain hash of the predecessor
+    :param data: the audit record as dict
+    :return: the hex chain hash of the audit record
+    """
+    return hashlib.sha256(
+        unhexlify(previous_hash) + getAsBytes(data)).hexdigest()
+
+def checkpoint_as_bytes(audit_id, chain_hash_value):
+    """
+    Return the checkpoint in a bytes format that can be used
+    for signing
+    """
+    return bytes("checkpoint=%d, chain=%s" % (
+        audit_id, chain_hash_value), 'utf-8')
+
 class AuditLinOTPDB(Audit):
     """
     SQL audit backend that uses LinOTP database
@@ -720,5 +1320,7 @@ class AuditLinOTPDB(Audit):
 
     def log_entry(self, param):
         super(AuditLinOTPDB, self).log_entry(param)
-        self.session.commit()
+
+        if not self.writer:
+            self.session.commit()
 ###eof#########################################################################
@@ -235,6 +235,11 @@ def search(param, user=None, columns=None):
         rp_dict['sortname'] = param.get('sortname')
     if 'sortorder' in param:
         rp_dict['sortorder'] = param.get('sortorder')
+    if param.get('after'):
+        try:
+            rp_dict['after'] = int(param.get('after'))
+        except ValueError:
+            log.warning("ignoring invalid keyset parameter 'after'")
 
     if user:
         search_dict['user'] = user.login
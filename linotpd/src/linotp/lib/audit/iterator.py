@@ -44,6 +44,9 @@ class AuditQuery(object):
         self._search_dict = {}
         self._rp_dict = {}
 
+        # the verified hash chain segments of the result rows
+        self._segments = []
+
         self.audit = audit
 
         if 'headers' in param:
@@ -121,6 +124,13 @@ class AuditQuery(object):
                 rp = 15
             self._rp_dict['rp'] = "%d" % rp
 
+        # keyset pagination: continue after the audit entry with this id
+        if param.get('after'):
+            try:
+                self._rp_dict['after'] = int(param.get('after'))
+            except ValueError:
+                log.warning("ignoring invalid keyset parameter 'after'")
+
         self._rp_dict['sortname'] = param.get('sortname')
 
         # verify sort order: could be one of ['asc', 'desc']
@@ -154,7 +164,7 @@ class AuditQuery(object):
         entry = {}
         if type(row) != dict:
             ## convert table data to dict!
-            row = self._audit.row2dict(row)
+            row = self._audit.row2dict(row, segments=self._segments)
         if 'number' in row:
             cell = []
             for col in self._columns:
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+audit writer - background writer for the audit entries
+
+the audit entries of the requests are put into a bounded in-process queue
+and written in batches by a background thread, so that neither the
+database round trips nor the signing of the entries are part of the
+request processing.
+
+When the queue is full, the request waits up to put_timeout seconds for a
+free slot - if there is still none, the entry is written synchronously by
+the request thread, so that no audit entry is dropped.
+
+The queue is flushed when the writer is closed, which is done at the exit
+of the process. Audit entries of a crashed process might get lost.
+
+There is one writer per process for each app and audit database, which is
+shared by the audit objects of all requests - see get_audit_writer().
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+
+log = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_PUT_TIMEOUT = 1.0
+
+# the end marker, which terminates the writer thread
+
+_STOP = object()
+
+# the process wide registry of the audit writers per owner, e.g. the app
+
+_audit_writers = weakref.WeakKeyDictionary()
+_audit_writers_lock = threading.Lock()
+
+
+class AuditWriter(object):
+    """
+    bounded queue of audit entries with a background writer thread
+    """
+
+    def __init__(self, write_batch,
+                 queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 put_timeout=DEFAULT_PUT_TIMEOUT):
+        """
+        :param write_batch: function to write a list of audit entries
+        :param queue_size: the max number of queued audit entries
+        :param batch_size: the max number of entries written at once
+        :param flush_interval: max seconds to wait for a batch to fill up
+        :param put_timeout: max seconds a request waits for a free slot
+        """
+
+        self.write_batch = write_batch
+
+        self.queue_size = queue_size
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'blocked': 0,
+            'sync_writes': 0,
+            'max_queued': 0,
+            'max_latency': 0.0,
+        }
+
+    def _start(self):
+        """
+        start the writer thread - the thread is started lazily and
+        restarted in a forked process, where it does not exist anymore
+        """
+
+        with self.lock:
+
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+
+            self.pid = os.getpid()
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.thread = threading.Thread(
+                target=self._run, name='AuditWriter', daemon=True)
+            self.thread.start()
+
+    def put(self, entry):
+        """
+        queue an audit entry for the writer thread
+
+        :param entry: the audit entry
+        """
+
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            self._start()
+
+        item = (time.time(), entry)
+
+        try:
+            self.queue.put_nowait(item)
+
+        except queue.Full:
+
+            self._count('blocked')
+            log.warning("audit queue is full - waiting for a free slot")
+
+            try:
+                self.queue.put(item, timeout=self.put_timeout)
+
+            except queue.Full:
+
+                self._count('sync_writes')
+                log.warning("audit queue is full - writing synchronously")
+
+                self._write([item])
+                return
+
+        with self.lock:
+            self.stats['enqueued'] += 1
+            self.stats['max_queued'] = max(
+                self.stats['max_queued'], self.queue.qsize())
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+    def _run(self):
+        """
+        the writer thread: collect the queued entries into batches of up
+        to batch_size entries, waiting at most flush_interval seconds for
+        the batch to fill up
+        """
+
+        entries_queue = self.queue
+
+        while True:
+
+            item = entries_queue.get()
+
+            if item is _STOP:
+                entries_queue.task_done()
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    timeout = max(deadline - time.time(), 0)
+                    item = entries_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stop = True
+                    break
+
+                batch.append(item)
+
+            try:
+                self._write(batch)
+            finally:
+                for _item in batch:
+                    entries_queue.task_done()
+
+            if stop:
+                entries_queue.task_done()
+                return
+
+    def _write(self, batch):
+        """
+        write a batch of queued items - a failed batch is retried entry by
+        entry, so that a single broken entry does not drop the whole batch
+
+        :param batch: list of (enqueue time, entry) tuples
+        """
+
+        entries = [entry for _queued, entry in batch]
+
+        try:
+            self.write_batch(entries)
+
+        except Exception as exx:
+            log.error("failed to write audit batch of %d entries: %r",
+                      len(entries), exx)
+
+            if len(entries) > 1:
+                for item in batch:
+                    self._write([item])
+                return
+
+            self._count('failed')
+            log.exception("audit entry could not be written: %r",
+                          entries[0])
+            return
+
+        latency = time.time() - min(queued for queued, _entry in batch)
+
+        with self.lock:
+            self.stats['written'] += len(entries)
+            self.stats['batches'] += 1
+            self.stats['max_latency'] = max(
+                self.stats['max_latency'], latency)
+
+    def flush(self):
+        """
+        wait until all queued entries are written
+        """
+
+        if self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        """
+        flush the queue and stop the writer thread
+        """
+
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            return
+
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def get_stats(self):
+        """
+        get the writer statistics - the backpressure is reported by
+
+        * queued: the number of currently queued entries
+        * max_queued: the max number of queued entries
+        * blocked: how often a request had to wait for a free slot
+        * sync_writes: how often a request had to write on its own
+        * max_latency: max seconds from queuing to writing an entry
+
+        :return: dict with the statistics
+        """
+
+        with self.lock:
+            stats = dict(self.stats)
+
+        stats['queued'] = self.queue.qsize() if self.queue else 0
+
+        return stats
+
+
+def get_audit_writer(owner, writer_id, write_batch, version=None,
+                     **settings):
+    """
+    get the process wide audit writer of the owner and writer_id
+
+    the writer is created on first access or if its version or settings
+    have been changed - the replaced writer is flushed and closed
+
+    :param owner: the owner of the writer, e.g. the app - the writer is
+                  dropped together with its owner
+    :param writer_id: the identifier of the writer, e.g. the database
+    :param write_batch: function to write a list of audit entries
+    :param version: additional version of the writer, e.g. the integrity
+                    settings, which are used by the write_batch function
+    :param settings: the settings of the AuditWriter
+    :return: AuditWriter
+    """
+
+    replaced = None
+    writer_version = (version, tuple(sorted(settings.items())))
+
+    with _audit_writers_lock:
+
+        writers = _audit_writers.setdefault(owner, {})
+
+        entry = writers.get(writer_id)
+        if entry is not None:
+            if entry[0] == writer_version:
+                return entry[1]
+            replaced = entry[1]
+
+        writer = AuditWriter(write_batch, **settings)
+        writers[writer_id] = (writer_version, writer)
+
+    if replaced is not None:
+        replaced.close()
+
+    return writer
+
+
+@atexit.register
+def close_audit_writers():
+    """
+    flush and close all audit writers at the exit of the process
+    """
+
+    with _audit_writers_lock:
+        writers = [writer for owner_writers in _audit_writers.values()
+                   for _version, writer in owner_writers.values()]
+
+    for writer in writers:
+        writer.close()
+
+# eof
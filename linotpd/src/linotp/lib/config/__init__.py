@@ -34,6 +34,7 @@ from linotp.flap import tmpl_context as c
 
 from linotp.lib.config.parsing import parse_config
 from linotp.lib.config.config_class import LinOtpConfig
+from linotp.lib.config.config_class import get_config_section
 from linotp.lib.config.util import expand_here
 from linotp.lib.config.db_api import _retrieveAllConfigDB
 from linotp.lib.crypto.encrypted_data import EncryptedData
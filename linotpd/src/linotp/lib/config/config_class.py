@@ -29,12 +29,17 @@
 """
 
 import logging
-import os
+import threading
 import time
 
+from collections.abc import MutableMapping
 from datetime import datetime
+from types import MappingProxyType
+
+import sqlalchemy as sa
 
 from flask import current_app
+from sqlalchemy import orm
 
 from linotp.lib.config.util import expand_here
 
@@ -43,12 +48,10 @@ from linotp.lib.config.db_api import _retrieveAllConfigDB
 from linotp.lib.config.db_api import _storeConfigDB
 from linotp.lib.config.db_api import _retrieveConfigDB
 
-from linotp.lib.config.global_api import getGlobalObject
-from linotp.lib.config.global_api import _getConfigReadLock
-from linotp.lib.config.global_api import _releaseConfigLock
-
 from linotp.lib.config.type_definition import Config_Types
 
+from linotp.model.meta import Session
+
 """
     LinOTP Config class
     - a dictionary to hold the config entries with a backend database
@@ -56,17 +59,283 @@ from linotp.lib.config.type_definition import Config_Types
 
 log = logging.getLogger(__name__)
 
+_shared_config_lock = threading.Lock()
+
+_empty_section = MappingProxyType({})
+
+
+def build_config_sections(entries):
+    """
+    index the config entries by their namespace section, which is the
+    second part of the dotted key: the section of 'linotp.Policy.a.scope'
+    and of 'linotp.Policy' is 'Policy'
+
+    :param entries: the config entries
+    :return: dict of section name to the read-only dict of its entries
+    """
+
+    sections = {}
+
+    for key, value in entries.items():
+
+        if not key.startswith('linotp.'):
+            continue
+
+        section = key.split('.', 2)[1]
+
+        if section not in sections:
+            sections[section] = {}
+
+        sections[section][key] = value
+
+    return {
+        section: MappingProxyType(section_entries)
+        for section, section_entries in sections.items()}
+
+
+def get_config_section(config, section):
+    """
+    get the config entries of a namespace section - these are the entries
+    'linotp.<section>' and 'linotp.<section>.*'
+
+    for the LinOtpConfig, the section is looked up in the section index,
+    other config dicts are scanned
+
+    :param config: the LinOtpConfig or a config dict
+    :param section: the name of the section like 'Policy'
+    :return: dict with the config entries of the section
+    """
+
+    if isinstance(config, LinOtpConfig):
+        return config.get_section(section)
 
-class LinOtpConfig(dict):
+    section_key = 'linotp.' + section
+    prefix = section_key + '.'
+
+    return {
+        key: value for key, value in config.items()
+        if key == section_key or key.startswith(prefix)}
+
+
+class SharedConfig(object):
+    """
+    process wide, versioned snapshot of the complete LinOTP config
+
+    the snapshot is an immutable mapping, which is shared by reference by the
+    config objects of all requests. A change of the config does not modify
+    the snapshot but replaces it with an updated copy (copy-on-write).
+
+    The config version is the 'linotp.Config' timestamp, which is updated
+    with every change. As the config might be changed by another process or
+    server, the version in the database is compared with the version of the
+    snapshot - but at most once per CONFIG_REPLICATION_CHECK_INTERVAL
+    seconds and not for every request.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = None
+        self.last_check = 0.0
+
+        # the section index of the latest snapshot: (snapshot, sections)
+        self.sections = None
+
+    def get_snapshot(self):
+        """
+        get the current config snapshot - (re)load it from the database if
+        there is none or if the config has been changed by another process
+
+        :return: immutable mapping with all config entries
+        """
+
+        with self.lock:
+
+            if self.entries is None or self._is_outdated():
+                self._load()
+
+            return self.entries
+
+    def reload(self):
+        """
+        unconditionally reload the config snapshot from the database
+
+        :return: immutable mapping with all config entries
+        """
+
+        with self.lock:
+            self._load()
+            return self.entries
+
+    def update(self, entries=None, removed=None):
+        """
+        replace the snapshot by a copy with the changed entries
+
+        :param entries: dict with the new or updated config entries
+        :param removed: list of the removed config keys
+        """
+
+        with self.lock:
+
+            if self.entries is None:
+                return
+
+            conf = dict(self.entries)
+
+            conf.update(entries or {})
+
+            for key in removed or []:
+                conf.pop(key, None)
+
+            self.entries = MappingProxyType(conf)
+
+    def _is_outdated(self):
+        """
+        check if the config version in the database differs from the
+        version of the snapshot
+
+        :return: boolean
+        """
+
+        # the database would show the not yet committed own changes
+
+        if Session().info.get('config_changes'):
+            return False
+
+        interval = current_app.config.get(
+            'CONFIG_REPLICATION_CHECK_INTERVAL', 0)
+
+        now = time.time()
+        if now - self.last_check < interval:
+            return False
+
+        self.last_check = now
+
+        # look for the timestamp when the config was changed
+        db_conf_date = _retrieveConfigDB('linotp.Config')
+
+        return str(db_conf_date) != str(self.entries.get('linotp.Config'))
+
+    def _load(self):
+        """
+        load all config entries from the database into a new snapshot
+        """
+
+        conf = {}
+
+        writeback = False
+        # get all conf entries from the config file
+        fileconf = current_app.config
+
+        # get all configs from the DB
+        (dbconf, _delay) = _retrieveAllConfigDB()
+
+        # we only merge the config file once as a removed entry
+        #  might reappear otherwise
+        if 'linotp.Config' not in dbconf:
+            conf.update(fileconf)
+            writeback = True
+
+        conf.update(dbconf)
+        # check, if there is a selfTest in the DB and delete it
+        if 'linotp.selfTest' in dbconf:
+            _removeConfigDB('linotp.selfTest')
+            now = datetime.now()
+            _storeConfigDB('linotp.Config', now)
+            conf['linotp.Config'] = str(now)
+
+        # the only thing we take from the fileconf is the selftest
+        if 'linotp.selfTest' in fileconf:
+            conf['linotp.selfTest'] = 'True'
+
+        if writeback is True:
+            for con in conf:
+                if con != 'linotp.selfTest':
+                    _storeConfigDB(con, conf.get(con))
+            now = datetime.now()
+            _storeConfigDB('linotp.Config', now)
+            conf['linotp.Config'] = str(now)
+
+        self.entries = MappingProxyType(conf)
+        self.last_check = time.time()
+
+
+    def get_sections(self, entries):
+        """
+        get the section index of a config snapshot - the index is built
+        once per snapshot, which is once per config version
+
+        :param entries: the config snapshot
+        :return: dict of section name to the entries of the section
+        """
+
+        sections = self.sections
+
+        if sections is not None and sections[0] is entries:
+            return sections[1]
+
+        index = build_config_sections(entries)
+        self.sections = (entries, index)
+
+        return index
+
+
+def _publish_config_changes(session):
+    """
+    update the shared config snapshots with the committed config changes
+    """
+
+    for shared_config, entries, removed in session.info.pop(
+            'config_changes', ()):
+        shared_config.update(entries, removed)
+
+
+def _discard_config_changes(session, _previous_transaction):
+    """
+    the config changes of a rolled back transaction are not published
+    """
+
+    session.info.pop('config_changes', None)
+
+
+sa.event.listen(orm.Session, 'after_commit', _publish_config_changes)
+sa.event.listen(orm.Session, 'after_soft_rollback', _discard_config_changes)
+
+
+def get_shared_config():
+    """
+    get the shared config snapshot holder of the application
+
+    :return: SharedConfig
+    """
+
+    app = current_app._get_current_object()
+
+    shared_config = getattr(app, 'shared_config', None)
+    if shared_config is None:
+        with _shared_config_lock:
+            shared_config = getattr(app, 'shared_config', None)
+            if shared_config is None:
+                shared_config = SharedConfig()
+                app.shared_config = shared_config
+
+    return shared_config
+
+
+class LinOtpConfig(MutableMapping):
     """
     LinOTP Config class - a dictionary to hold the config entries with a backend database
 
     This class should be a request singleton.
 
+    The config entries are not copied for every request: the config refers
+    to the shared, immutable config snapshot and only makes a private copy
+    of the entries on the first change (copy-on-write).
+
     In case of a change, it must cover the different aspects like
 
     - env config entry
-    - and app_globals
+    - and the shared config snapshot, which is updated when the change is
+      committed
     - and finally sync this to disc
 
     """
@@ -74,82 +343,76 @@ class LinOtpConfig(dict):
     def __init__(self, *args, **kw):
         self.delay = False
         self.realms = None
-        self.glo = getGlobalObject()
-        conf = self.glo.getConfig()
+        self.shared_config = get_shared_config()
+        self._entries = self.shared_config.get_snapshot()
+        self._sections = None
 
-        do_reload = False
+    def refreshConfig(self, do_reload=False):
 
-        # do the bootstrap if no entry in the app_globals
-        if len(list(conf.keys())) == 0:
-            do_reload = True
+        self._sections = None
 
-        if self.glo.isConfigComplet() is False:
-            do_reload = True
-            self.delay = True
+        if do_reload is True:
+            self._entries = self.shared_config.reload()
+        else:
+            self._entries = self.shared_config.get_snapshot()
 
-        if 'linotp.enableReplication' in conf:
-            val = conf.get('linotp.enableReplication')
-            if val.lower() == 'true':
+        return
 
-                # look for the timestamp when config was created
-                e_conf_date = conf.get('linotp.Config')
+    def _writable_entries(self):
+        """
+        make a private copy of the shared config entries on the first change
+        """
 
-                # in case of replication, we always have to look if the
-                # config data in the database changed
-                db_conf_date = _retrieveConfigDB('linotp.Config')
+        if isinstance(self._entries, MappingProxyType):
+            self._entries = dict(self._entries)
 
-                if str(db_conf_date) != str(e_conf_date):
-                    do_reload = True
+        # the section index of the private copy is rebuilt on demand
+        self._sections = None
 
-        self.refreshConfig(do_reload=do_reload)
+        return self._entries
 
-        return
+    def _publish(self, entries, removed=None):
+        """
+        update the shared config snapshot with the changes of this config,
+        once they are committed
 
-    def refreshConfig(self, do_reload=False):
+        :param entries: dict with the new or updated config entries
+        :param removed: list of the removed config keys
+        """
 
-        conf = self.glo.getConfig()
+        Session().info.setdefault('config_changes', []).append(
+            (self.shared_config, entries, removed))
 
-        if do_reload is True:
-            # in case there is no entry in the dbconf or
-            # the config file is newer, we write the config back to the db
-            entries = list(conf.keys())
-            for entry in entries:
-                del conf[entry]
-
-            writeback = False
-            # get all conf entries from the config file
-            fileconf = current_app.config
-
-            # get all configs from the DB
-            (dbconf, delay) = _retrieveAllConfigDB()
-            self.glo.setConfigIncomplete(not delay)
-
-            # we only merge the config file once as a removed entry
-            #  might reappear otherwise
-            if 'linotp.Config' not in dbconf:
-                conf.update(fileconf)
-                writeback = True
-
-            conf.update(dbconf)
-            # check, if there is a selfTest in the DB and delete it
-            if 'linotp.selfTest' in dbconf:
-                _removeConfigDB('linotp.selfTest')
-                _storeConfigDB('linotp.Config', datetime.now())
-
-            # the only thing we take from the fileconf is the selftest
-            if 'linotp.selfTest' in fileconf:
-                conf['linotp.selfTest'] = 'True'
-
-            if writeback is True:
-                for con in conf:
-                    if con != 'linotp.selfTest':
-                        _storeConfigDB(con, conf.get(con))
-                _storeConfigDB('linotp.Config', datetime.now())
-
-            self.glo.setConfig(conf, replace=True)
-
-        super().update(conf)
-        return
+    def get_section(self, section):
+        """
+        get the config entries of a namespace section from the section
+        index, e.g. all policy entries by the section 'Policy'
+
+        :param section: the name of the section
+        :return: read-only dict with the config entries of the section
+        """
+
+        if isinstance(self._entries, MappingProxyType):
+            sections = self.shared_config.get_sections(self._entries)
+
+        else:
+            if self._sections is None:
+                self._sections = build_config_sections(self._entries)
+            sections = self._sections
+
+        return sections.get(section, _empty_section)
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return repr(dict(self._entries))
 
     def setRealms(self, realmDict):
         self.realms = realmDict
@@ -195,24 +458,24 @@ class LinOtpConfig(dict):
 
         nVal = expand_here(val)
 
-        # update this config and sync with global dict and db
+        # update this config and sync with shared config and db
 
-        res = super().__setitem__(key, nVal)
-        self.glo.setConfig({key: nVal})
+        now = datetime.now()
+
+        entries = {key: nVal, 'linotp.Config': str(now)}
+
+        self._writable_entries().update(entries)
+        self._publish(entries)
 
         # ----------------------------------------------------------------- --
 
         # finally store the entry in the database and
         # syncronize as well the global timestamp
 
-        now = datetime.now()
-
-        self.glo.setConfig({'linotp.Config': str(now)})
-
         _storeConfigDB(key, val, typ, des)
         _storeConfigDB('linotp.Config', now)
 
-        return res
+        return
 
     def _check_type(self, key, value):
         """
@@ -263,7 +526,7 @@ class LinOtpConfig(dict):
             key = 'linotp.' + key
 
         # return default only if key does not exist
-        res = super().get(key, default)
+        res = self._entries.get(key, default)
         return res
 
     def has_key(self, key):
@@ -298,11 +561,15 @@ class LinOtpConfig(dict):
         elif key in self:
             Key = key
 
-        res = super().__delitem__(Key)
+        entries = self._writable_entries()
+        del entries[Key]
 
-        # sync with global dict
+        # sync with shared config
+
+        now = datetime.now()
 
-        self.glo.delConfig(Key)
+        entries['linotp.Config'] = str(now)
+        self._publish({'linotp.Config': str(now)}, removed=[Key])
 
         # sync with db
         if key.startswith('linotp.'):
@@ -311,16 +578,16 @@ class LinOtpConfig(dict):
             Key = 'linotp.' + key
 
         _removeConfigDB(Key)
-        _storeConfigDB('linotp.Config', datetime.now())
+        _storeConfigDB('linotp.Config', now)
 
-        return res
+        return
 
     def __contains__(self, key):
         """
         support for 'in' operator of the Config dict
         """
-        res = (super().__contains__(key) or
-               super().__contains__('linotp.' + key))
+        res = (key in self._entries or
+               'linotp.' + key in self._entries)
         return res
 
     def update(self, dic):
@@ -342,16 +609,21 @@ class LinOtpConfig(dict):
             self._check_type(key, val)
 
         #
-        # put the data in the parent dictionary
+        # put the data in the config entries
         #
 
-        res = super().update(dic)
+        now = datetime.now()
+
+        entries = dict(dic)
+        entries['linotp.Config'] = str(now)
+
+        self._writable_entries().update(entries)
 
         #
-        # and sync the data with the global config dict
+        # and sync the data with the shared config after the commit
         #
 
-        self.glo.setConfig(dic)
+        self._publish(entries)
 
         #
         # finally sync the entries to the database
@@ -361,7 +633,7 @@ class LinOtpConfig(dict):
             if key != 'linotp.Config':
                 _storeConfigDB(key, dic.get(key))
 
-        _storeConfigDB('linotp.Config', datetime.now())
-        return res
+        _storeConfigDB('linotp.Config', now)
+        return
 
 # eof #
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+connection pool - process wide pool of idle connections per resource
+
+the connection pool keeps the idle connections of a resolver, sorted by the
+resource (uri) they are connected to, so that the connection setup (tcp
+connect, tls handshake and bind) is not required for every request.
+
+The pool does not create connections on its own - the caller iterates
+through the resources by the ResourceScheduler, acquires a pooled
+connection for the resource or connects on its own, and releases the
+connection at the end of the request. Thus the failover and blocking of
+unavailable resources stays with the ResourceScheduler.
+
+The connections are dropped from the pool
+
+* when they have been idle for longer than max_idle seconds
+* when they are older than max_lifetime seconds
+* when the health check fails, which is run on connections, that have been
+  idle for longer than check_interval seconds
+* when the resource is discarded, e.g. as it has been blocked
+* when the pool is replaced or dropped, e.g. as the resolver definition
+  has been changed or deleted
+"""
+
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_IDLE = 300
+DEFAULT_MAX_LIFETIME = 3600
+DEFAULT_CHECK_INTERVAL = 30
+
+# the process wide registry of the connection pools
+
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+class PooledConnection(object):
+    """
+    a connection to a resource along with its creation and usage time
+    """
+
+    def __init__(self, resource, connection):
+        self.resource = resource
+        self.connection = connection
+        self.created = time.time()
+        self.last_used = self.created
+
+
+class ConnectionPool(object):
+    """
+    process wide pool of idle connections, which are sorted by resource
+    """
+
+    def __init__(self, close=None, check=None,
+                 size=DEFAULT_POOL_SIZE,
+                 max_idle=DEFAULT_MAX_IDLE,
+                 max_lifetime=DEFAULT_MAX_LIFETIME,
+                 check_interval=DEFAULT_CHECK_INTERVAL):
+        '''
+        :param close: function to close a connection
+        :param check: function to check the health of a connection, which
+                      should raise an exception or return False if the
+                      connection is not usable anymore
+        :param size: max number of idle connections per resource
+        :param max_idle: max seconds a connection might be idle
+        :param max_lifetime: max seconds a connection might be in use
+        :param check_interval: idle seconds after which a connection is
+                               checked, before it is handed out again
+        '''
+
+        self.close = close
+        self.check = check
+
+        self.size = size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _is_expired(self, pooled, now):
+        """ check if the connection has been idle or alive too long """
+
+        return (now - pooled.last_used > self.max_idle or
+                now - pooled.created > self.max_lifetime)
+
+    def acquire(self, resource):
+        '''
+        get an idle connection to the resource from the pool
+
+        :param resource: the resource identifier, e.g. the uri
+        :return: PooledConnection or None, if there is no usable connection
+        '''
+
+        while True:
+
+            with self._lock:
+                idle = self._idle.get(resource)
+                if not idle:
+                    return None
+
+                # the most recently used connection is the one most likely
+                # to be still alive
+                pooled = idle.pop()
+
+            now = time.time()
+
+            if self._is_expired(pooled, now):
+                self._close(pooled)
+                continue
+
+            if (self.check and
+                    now - pooled.last_used > self.check_interval and
+                    not self._check(pooled)):
+                self._close(pooled)
+                continue
+
+            return pooled
+
+    def release(self, pooled):
+        '''
+        put the connection back into the pool or close it, if the pool
+        is full or the connection is expired
+
+        :param pooled: the PooledConnection
+        '''
+
+        now = time.time()
+
+        if not self._is_expired(pooled, now):
+
+            pooled.last_used = now
+
+            with self._lock:
+                idle = self._idle.setdefault(pooled.resource, [])
+                if len(idle) < self.size:
+                    idle.append(pooled)
+                    return
+
+        self._close(pooled)
+
+    def discard(self, resource=None):
+        '''
+        close all idle connections of the resource or of all resources
+
+        :param resource: the resource identifier or None for all resources
+        '''
+
+        with self._lock:
+            if resource is None:
+                discarded = [pooled for idle in self._idle.values()
+                             for pooled in idle]
+                self._idle = {}
+            else:
+                discarded = self._idle.pop(resource, [])
+
+        for pooled in discarded:
+            self._close(pooled)
+
+    def close_pool(self):
+        '''
+        close all idle connections of a pool, which is not used anymore -
+        the connections, which are in use, are closed on their release
+        '''
+
+        with self._lock:
+            self.size = 0
+
+        self.discard()
+
+    def _check(self, pooled):
+        """ run the health check - any exception marks the connection bad """
+
+        try:
+            return self.check(pooled.connection) is not False
+
+        except Exception as exx:
+            log.info('pooled connection to %r failed the health check: %r',
+                     pooled.resource, exx)
+            return False
+
+    def _close(self, pooled):
+        """ close the connection and ignore errors """
+
+        if not self.close:
+            return
+
+        try:
+            self.close(pooled.connection)
+
+        except Exception as exx:
+            log.debug('failed to close pooled connection to %r: %r',
+                      pooled.resource, exx)
+
+
+def get_connection_pool(pool_id, close=None, check=None, params=None,
+                        **settings):
+    '''
+    get the process wide connection pool of the pool_id
+
+    the pool is created on first access or if the connection parameters or
+    the settings of the pool have been changed - a replaced pool is closed
+
+    :param pool_id: the identifier of the pool, e.g. the resolver name
+    :param close: function to close a connection
+    :param check: function to check the health of a connection
+    :param params: a digest of the connection parameters, e.g. of the uris,
+                   bind user and timeouts, which must not contain secrets
+    :param settings: the pool settings: size, max_idle, max_lifetime and
+                     check_interval
+    :return: ConnectionPool
+    '''
+
+    replaced = None
+    version = (params, tuple(sorted(settings.items())))
+
+    with _connection_pools_lock:
+
+        entry = _connection_pools.get(pool_id)
+        if entry is not None:
+            if entry[0] == version:
+                return entry[1]
+            replaced = entry[1]
+
+        pool = ConnectionPool(close=close, check=check, **settings)
+        _connection_pools[pool_id] = (version, pool)
+
+    if replaced is not None:
+        replaced.close_pool()
+
+    return pool
+
+
+def drop_connection_pool(pool_id):
+    '''
+    remove the connection pool of the pool_id and close its connections,
+    e.g. when the resolver definition has been changed or deleted
+
+    :param pool_id: the identifier of the pool
+    '''
+
+    with _connection_pools_lock:
+        entry = _connection_pools.pop(pool_id, None)
+
+    if entry is not None:
+        entry[1].close_pool()
+
+# eof #
@@ -163,6 +163,34 @@ class SecretObj(object):
 
         return h_digest
 
+    def hmac_digests(self, data_inputs, hash_algo=None):
+        '''
+        generator for the hmac digests of a sequence of data inputs like
+        the counters of an otp window
+
+        the secret is decrypted only once for all data inputs and cleared,
+        when the generator is exhausted or closed - thus the caller, who
+        stops early, should close the generator, e.g. by contextlib.closing
+
+        :param data_inputs: iterable of the data inputs
+        :param hash_algo: the hashing algorithm - default is sha1
+        :return: generator of the hmac digests
+        '''
+
+        if not hash_algo:
+            hash_algo = utils.get_hashalgo_from_description('sha1')
+
+        b_key = self._setupKey_()
+
+        try:
+            for h_digest in utils.hmac_digests(
+                    bkey=b_key, data_inputs=data_inputs,
+                    hsm=self.hsm, hash_algo=hash_algo):
+                yield h_digest
+
+        finally:
+            self._clearKey_(preserve=self.preserve)
+
     def aes_decrypt(self, data_input):
         '''
         support inplace aes decryption for the yubikey
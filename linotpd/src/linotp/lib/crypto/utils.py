@@ -308,6 +308,24 @@ def hmac_digest(bkey, data_input, hsm=None, hash_algo=None):
     return h
 
 
+def hmac_digests(bkey, data_inputs, hsm=None, hash_algo=None):
+    """
+    generator for the hmac digests of a sequence of data inputs
+
+    :param bkey: the binary key
+    :param data_inputs: iterable of the data inputs
+    :param hsm: hsm security object instance
+    :param hash_algo: the hashing algorithm - default is sha1
+    """
+
+    hsm_obj = _get_hsm_obj_from_context(hsm)
+
+    if hash_algo is None:
+        hash_algo = get_hashalgo_from_description('sha1')
+
+    return hsm_obj.hmac_digests(bkey, data_inputs, hash_algo)
+
+
 def encryptPassword(password):
     """Encrypt password (i.e. ldap password)
 
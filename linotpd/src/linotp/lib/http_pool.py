@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+http pool - process wide http sessions with keep-alive connections
+
+the user resolvers, which query a user store via http, share one http
+session per resolver configuration, so that the tcp connect and tls
+handshake is not required for every user lookup. The session is thread
+safe and keeps up to pool_size idle connections per host for
+pool_connections hosts - additional connections, which are required by
+concurrent requests, are closed after use.
+
+The failover between several uris and the blocking of unavailable uris is
+done by the ResourceScheduler - the sessions themselves do not retry.
+"""
+
+import logging
+import threading
+
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from linotp.lib.resources import ResourceScheduler
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_SIZE = 10
+DEFAULT_BLOCK_DELAY = 30
+
+# the process wide registry of the http sessions
+
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def create_http_session(pool_connections=DEFAULT_POOL_CONNECTIONS,
+                        pool_size=DEFAULT_POOL_SIZE):
+    '''
+    create a http session with a keep-alive connection pool
+
+    the session does not keep any cookies, as it is shared by the requests
+    of all users
+
+    :param pool_connections: the number of hosts, for which connections
+                             are kept
+    :param pool_size: max number of idle connections per host
+    :return: requests.Session
+    '''
+
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_size, max_retries=0)
+
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def get_http_session(pool_id, **settings):
+    '''
+    get the process wide http session of the pool_id
+
+    the session is created on first access or if the settings of the pool
+    have been changed - the connections of a replaced session are closed
+
+    :param pool_id: the identifier of the pool, which should contain all
+                    connection parameters, e.g. uris and user
+    :param settings: the pool settings: pool_connections and pool_size
+    :return: requests.Session
+    '''
+
+    replaced = None
+    version = tuple(sorted(settings.items()))
+
+    with _http_sessions_lock:
+
+        entry = _http_sessions.get(pool_id)
+        if entry is not None:
+            if entry[0] == version:
+                return entry[1]
+            replaced = entry[1]
+
+        session = create_http_session(**settings)
+        _http_sessions[pool_id] = (version, session)
+
+    if replaced is not None:
+        replaced.close()
+
+    return session
+
+
+def http_request(session, uris, path='', params=None, method='POST',
+                 auth=None, timeout=10.0, tries=1,
+                 block_delay=DEFAULT_BLOCK_DELAY, query=None,
+                 check_status=True, **kwargs):
+    '''
+    send a request to the first available uri
+
+    if the connection to an uri fails or times out, the uri is blocked by
+    the ResourceScheduler and the next uri is tried
+
+    :param session: the http session
+    :param uris: list of the base uris
+    :param path: the request path, which is appended to the uri
+    :param params: the request parameters - sent in the url for GET and in
+                   the body for all other methods
+    :param method: the http method
+    :param auth: the authentication, e.g. a (user, password) tuple
+    :param timeout: timeout for the connect and the response
+    :param tries: number of tries per uri
+    :param block_delay: seconds an unavailable uri is blocked
+    :param query: the parameters, which are always sent in the url
+    :param check_status: raise an HTTPError for an error status - otherwise
+                         the caller has to check the response
+    :param kwargs: further arguments of requests, e.g. verify or proxies
+    :return: the response
+    '''
+
+    if method == 'GET':
+        kwargs['params'] = dict(query or {}, **(params or {}))
+    else:
+        kwargs['params'] = query
+        kwargs['data'] = params
+
+    resource_scheduler = ResourceScheduler(tries=tries, uri_list=uris)
+
+    for uri in next(resource_scheduler):
+
+        url = uri
+        if path:
+            url = "%s/%s" % (uri.rstrip('/'), path.lstrip('/'))
+
+        try:
+            response = session.request(
+                method, url, auth=auth, timeout=timeout, **kwargs)
+
+        except (requests.ConnectionError, requests.Timeout) as exx:
+            log.warning('request to %r failed: %r', uri, exx)
+            resource_scheduler.block(uri, delay=block_delay)
+            continue
+
+        if check_status:
+            response.raise_for_status()
+
+        return response
+
+    raise requests.ConnectionError('no uri of %r is available' % (uris,))
+
+# eof #
@@ -47,6 +47,9 @@ from linotp.lib.user import getUserFromParam
 
 from linotp.lib.context import request_context as context
 
+from linotp.lib.token_counter import NO_REALM
+from linotp.lib.token_counter import count_tokens
+
 from sqlalchemy import (and_, or_, not_)
 
 
@@ -78,6 +81,24 @@ class MonitorHandler(object):
             realms = ['/:no realm:/']
 
         result = {}
+
+        # the token numbers are taken from the token counters if possible -
+        # only the number of distinct token users has to be queried
+
+        counter_realms = [
+            NO_REALM if NO_REALM in realm or not realm.strip()
+            else realm.strip() for realm in realms]
+
+        counts = count_tokens(
+            counter_realms, [stat for stat in status if stat != 'total users'])
+
+        if counts is not None:
+            result.update(counts)
+            status = [stat for stat in status if stat == 'total users']
+
+            if not status:
+                return result
+
         cond = tuple()
 
         for realm in realms:
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+otp lookahead index - find the not assigned tokens by an otp value
+
+For the auto assignment and the getSerialByOtp, the token, which generated
+an otp value has to be found among all not assigned tokens of a realm.
+Without an index, the otp values of the whole lookahead window have to be
+calculated for every token.
+
+The otp lookahead index holds a keyed hash of the otp values of the next
+window of each not assigned HMAC token, so that the search becomes an
+index probe, followed by the authoritative otp check of the candidates.
+As the otp values are hashed with a key, which is derived from the server
+secret, the index does not reveal the otp values.
+
+The index entries of a token are created for the window, which starts at
+the current token counter (the base). Before each lookup, the tokens,
+whose counter has moved or which are not yet indexed, are (re)indexed in
+bulk - usually there are none, so that the index is maintained
+incrementally as the counters move.
+
+The index is enabled by the config entry 'OtpLookaheadIndex' and the
+minimal window of the indexed otp values by 'OtpLookaheadWindow'.
+"""
+
+import hmac
+import logging
+
+from hashlib import sha256
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import exists
+
+from linotp.lib.config import getFromConfig
+from linotp.lib.context import request_context as context
+from linotp.lib.type_utils import boolean
+
+from linotp.model import OtpIndex, Realm, Token, TokenRealm
+from linotp.model import otp_index_table
+from linotp.model.meta import Session
+
+log = logging.getLogger(__name__)
+
+# the token types, whose otp values are indexed
+
+INDEXED_TOKEN_TYPES = ['hmac']
+
+DEFAULT_WINDOW = 10
+
+# the otp lengths, which are considered to split the otp from a password
+
+OTP_LENGTHS = [6, 8]
+
+
+def is_otp_index_enabled():
+    """
+    check if the otp lookahead index is enabled by the config
+    """
+    return boolean(getFromConfig('OtpLookaheadIndex', False))
+
+
+def get_otp_index_window():
+    """
+    get the minimal number of indexed otp values per token
+    """
+    return int(getFromConfig('OtpLookaheadWindow', DEFAULT_WINDOW))
+
+
+def _get_index_key():
+    """
+    derive the key of the otp index hashes from the server secret
+    """
+    hsm = context['hsm']['obj']
+    return hsm.signMessage('otp_lookahead_index').encode('utf-8')
+
+
+def _otp_key(index_key, otp):
+    """
+    the truncated keyed hash of an otp value
+    """
+    return hmac.new(index_key, otp.encode('utf-8'), sha256).hexdigest()[:16]
+
+
+def split_otp_values(passw):
+    """
+    get the possible otp values of a password, which might contain a pin
+
+    :param passw: the password - pin and otp
+    :return: list of the possible otp values
+    """
+
+    prepend_pin = boolean(getFromConfig("PrependPin", True))
+
+    otps = []
+    for otplen in OTP_LENGTHS:
+        if len(passw) < otplen:
+            continue
+        otps.append(passw[-otplen:] if prepend_pin else passw[:otplen])
+
+    return otps
+
+
+def _filter_not_assigned(query, realm=None):
+    """
+    restrict the token query to the not assigned and indexed tokens
+    """
+
+    query = query.filter(
+        Token.LinOtpTokenTypeLower.in_(INDEXED_TOKEN_TYPES),
+        or_(Token.LinOtpUserid == None, Token.LinOtpUserid == ""))
+
+    if realm is not None:
+        query = query.filter(and_(
+            Realm.name == realm.lower(),
+            TokenRealm.realm_id == Realm.id,
+            TokenRealm.token_id == Token.LinOtpTokenId))
+
+    return query
+
+
+def _index_token(token, index_key):
+    """
+    (re)create the index entries of a token for the window, which starts
+    at the current counter
+
+    :param token: the token class object
+    :param index_key: the key of the index hashes
+    """
+
+    serial = token.getSerial()
+    base = int(token.getOtpCount())
+
+    window = max(int(token.getOtpCountWindow() or 0),
+                 get_otp_index_window())
+
+    Session.query(OtpIndex).filter(
+        OtpIndex.serial == serial).delete(synchronize_session=False)
+
+    entries = [{'serial': serial,
+                'base': base,
+                'counter': counter,
+                'otp_key': _otp_key(index_key, otp)}
+               for counter, otp in token.get_otp_window(window)]
+
+    if entries:
+        Session.execute(otp_index_table.insert(), entries)
+
+
+def refresh_otp_index(realm=None):
+    """
+    index the not assigned tokens, which are not yet indexed or whose
+    counter has moved since they were indexed
+
+    :param realm: restrict the refresh to the tokens of the realm
+    :return: the number of (re)indexed tokens
+    """
+
+    # the token classes depend on the token module, which uses the index
+    from linotp.lib.token import createTokenClassObject
+
+    current = exists().where(and_(
+        OtpIndex.serial == Token.LinOtpTokenSerialnumber,
+        OtpIndex.base == Token.LinOtpCount))
+
+    stale = _filter_not_assigned(
+        Session.query(Token), realm).filter(~current).distinct()
+
+    index_key = None
+    count = 0
+
+    for token in stale.all():
+
+        if index_key is None:
+            index_key = _get_index_key()
+
+        _index_token(createTokenClassObject(token), index_key)
+        count += 1
+
+    if count:
+        log.info("otp lookahead index: indexed %d tokens", count)
+
+    return count
+
+
+def drop_otp_index(serial):
+    """
+    remove the index entries of a token, e.g. when it is assigned or when
+    its seed, otp length, hash algorithm or counter window is changed - the
+    token is then reindexed on the next lookup
+
+    :param serial: the token serial
+    """
+    Session.query(OtpIndex).filter(
+        OtpIndex.serial == serial).delete(synchronize_session=False)
+
+
+def lookup_otp_index(otps, realm=None):
+    """
+    get the not assigned tokens, which might have generated one of the otp
+    values - the candidates require an authoritative otp check
+
+    :param otps: list of otp values
+    :param realm: only search the tokens of the realm
+    :return: list of the token db objects
+    """
+
+    refresh_otp_index(realm)
+
+    index_key = _get_index_key()
+    otp_keys = [_otp_key(index_key, otp) for otp in otps]
+
+    query = _filter_not_assigned(Session.query(Token), realm).filter(
+        OtpIndex.serial == Token.LinOtpTokenSerialnumber,
+        OtpIndex.base == Token.LinOtpCount,
+        OtpIndex.otp_key.in_(otp_keys)).distinct()
+
+    return query.all()
+
+# eof
@@ -2132,10 +2132,24 @@ def createRandomPin(user, min_pin_length):
     :param user: user defines the realm/user policy selection
     :return: the new pin
     """
-    character_pool = letters + digits
-
     pin_length = max(min_pin_length, _getRandomOTPPINLength(user))
 
+    character_pool = _get_random_pin_character_pool(user)
+
+    return generate_password(size=pin_length, characters=character_pool)
+
+
+def _get_random_pin_character_pool(user):
+    """
+    get the characters of the random pins as defined by the
+    otp_pin_random_content policy
+
+    :param user: user defines the realm/user policy selection
+    :return: string with the pin characters
+    """
+
+    character_pool = letters + digits
+
     contents = _getRandomOTPPINContent(user)
 
     if contents:
@@ -2149,7 +2163,31 @@ def createRandomPin(user, min_pin_length):
         if "s" in contents:
             character_pool += special_characters
 
-    return generate_password(size=pin_length, characters=character_pool)
+    return character_pool
+
+
+def get_random_pin_generator(user):
+    """
+    get a function, which creates the random pins of the tokens as defined
+    by the otp_pin_random policies - the policies are evaluated only once,
+    so that the random pins of many tokens could be set
+
+    :param user: user defines the realm/user policy selection
+    :return: function, which returns a new random pin or None, if no
+             random pin is required
+    """
+
+    pin_length = int(_getRandomOTPPINLength(user))
+
+    if pin_length <= 0:
+        return None
+
+    character_pool = _get_random_pin_character_pool(user)
+
+    def random_pin():
+        return generate_password(size=pin_length, characters=character_pool)
+
+    return random_pin
 
 def checkToolsAuthorisation(method, param=None):
     # TODO: fix the semantic of the realm in the policy!
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+compiled policy set
+
+the policy definitions are parsed from the config once per config version
+and shared read-only by all requests of the process. The compiled set is
+indexed by scope and action and holds the pre-tokenised conditions and
+the pre-compiled condition matchers, so that the PolicyEvaluator does not
+have to touch every policy and parse every condition string for each
+evaluation.
+"""
+
+import logging
+import threading
+
+from linotp.lib.policy.util import parse_policies
+
+log = logging.getLogger(__name__)
+
+# the policy attributes which are lists of conditions and the separator
+# of the conditions - time conditions are separated by ';' as the ',' is
+# part of the cron expression
+
+CONDITION_SEPARATORS = {
+    'user': ',',
+    'realm': ',',
+    'client': ',',
+    'action': ',',
+    'time': ';',
+}
+
+# process wide cache of the compiled policies of the latest config version
+
+_compiled_policies = {}
+_compiled_policies_lock = threading.Lock()
+
+
+def tokenise_condition(value, separator=','):
+    """
+    split a policy condition string into a tuple of stripped conditions
+
+    :param value: the policy condition string
+    :param separator: the condition separator
+    :return: tuple of conditions
+    """
+    return tuple(x.strip() for x in value.split(separator))
+
+
+class CompiledPolicies(dict):
+    """
+    read-only dict of all policies, indexed by scope and action
+
+    the compiled policies are shared between requests - the policy
+    definitions must not be modified. Callers, who want to change a policy
+    definition have to work on a copy.
+    """
+
+    def __init__(self, policies):
+
+        # the matchers are defined together with the comparing functions
+        from linotp.lib.policy.evaluate import compile_matchers
+
+        super().__init__(policies)
+
+        self.names = sorted(self.keys())
+
+        # the condition view of each policy, where the list attributes
+        # are replaced by the tuple of their conditions
+
+        self.conditions = {}
+        self.matchers = {}
+
+        self.scope_index = {}
+        self.action_index = {}
+
+        for name in self.names:
+            policy = self[name]
+
+            # the name is part of the policy description so that the
+            # evaluator can filter by name - we add it up front as the
+            # policies are shared and must not be modified later
+
+            policy['name'] = name
+
+            conditions = dict(policy)
+            for key, separator in CONDITION_SEPARATORS.items():
+                value = policy.get(key)
+                if isinstance(value, str):
+                    conditions[key] = tokenise_condition(value, separator)
+
+            self.conditions[name] = conditions
+            self.matchers[name] = compile_matchers(conditions)
+
+            self.scope_index.setdefault(policy.get('scope'), set()).add(name)
+
+            for action in conditions.get('action', ()):
+                action_name, _sep, _value = action.partition('=')
+                self.action_index.setdefault(action, set()).add(name)
+                self.action_index.setdefault(
+                    action_name.strip(), set()).add(name)
+
+    def candidates(self, filters):
+        """
+        determin the sorted list of policy names which might match the
+        filters by looking up the scope, action and name filters in the
+        policy index
+
+        :param filters: list of filter tuples (key, value, compare function)
+        :return: sorted list of policy names
+        """
+
+        names = None
+
+        for key, value, _compare in filters:
+
+            if key == 'scope':
+                found = self.scope_index.get(value, set())
+
+            elif key == 'name':
+                found = {value} if value in self else set()
+
+            elif key == 'action' and isinstance(value, str):
+                found = (self.action_index.get(value, set()) |
+                         self.action_index.get('*', set()))
+
+            else:
+                continue
+
+            names = found if names is None else names & found
+
+        if names is None:
+            return self.names
+
+        return [name for name in self.names if name in names]
+
+
+def compile_policies(config):
+    """
+    parse and compile all policy definitions of the config
+
+    :param config: the linotp config dict
+    :return: CompiledPolicies
+    """
+    return CompiledPolicies(parse_policies(config))
+
+
+def get_compiled_policies(config):
+    """
+    get the compiled policies for the config version
+
+    the config version is defined by the 'linotp.Config' timestamp, which
+    is updated on every config change. As an additional safety measure
+    the number of config entries is part of the version as well.
+
+    :param config: the linotp config dict
+    :return: CompiledPolicies
+    """
+
+    config_timestamp = config.get('linotp.Config')
+
+    if config_timestamp is None:
+        return compile_policies(config)
+
+    version = (str(config_timestamp), len(config))
+
+    with _compiled_policies_lock:
+        if _compiled_policies.get('version') == version:
+            return _compiled_policies['policies']
+
+    policies = compile_policies(config)
+
+    with _compiled_policies_lock:
+        _compiled_policies['version'] = version
+        _compiled_policies['policies'] = policies
+
+    log.debug("compiled %d policies for config version %r",
+              len(policies), version)
+
+    return policies
+
+# eof
@@ -26,16 +26,22 @@
 
 """ policy evaluation """
 
+import logging
+
 from datetime import datetime
+from functools import lru_cache
 
 from netaddr import IPAddress
 from netaddr import IPNetwork
 
+from linotp.lib.policy.compiled import CompiledPolicies
 from linotp.lib.policy.filter import UserDomainCompare
 from linotp.lib.policy.filter import AttributeCompare
 from linotp.lib.user import User
 from linotp.lib.realm import getRealms
 
+log = logging.getLogger(__name__)
+
 
 class PolicyEvaluator(object):
     """
@@ -140,11 +146,6 @@ class PolicyEvaluator(object):
 
         matching_policies = {}
 
-        #
-        # provide information about the policy evaluation - for debugging :)
-
-        matching_details = {}
-
         all_policies = self.all_policies
 
         if policy_set:
@@ -153,7 +154,22 @@ class PolicyEvaluator(object):
         if not self.filters:
             return all_policies
 
-        for p_name, p_dict in sorted(list(all_policies.items())):
+        #
+        # with compiled policies we can preselect the policies by the
+        # index and compare against the pre-tokenised conditions
+
+        compiled = None
+        if isinstance(self.all_policies, CompiledPolicies):
+            compiled = self.all_policies
+
+        if isinstance(all_policies, CompiledPolicies):
+            policy_names = all_policies.candidates(self.filters)
+        else:
+            policy_names = sorted(all_policies.keys())
+
+        for p_name in policy_names:
+
+            p_dict = all_policies[p_name]
 
             #
             # special case: for filtering of policies by name:
@@ -163,14 +179,27 @@ class PolicyEvaluator(object):
             if 'name' not in p_dict:
                 p_dict['name'] = p_name
 
+            p_conditions = p_dict
+            p_matchers = {}
+
+            if compiled and compiled.get(p_name) is p_dict:
+                p_conditions = compiled.conditions[p_name]
+                p_matchers = compiled.matchers[p_name]
+
             #
             # evaluate each filter against the policy. if one filter fails
-            # we can skip the evaluation the given policy
+            # we can skip the evaluation the given policy. If there is a
+            # pre-compiled matcher for the comparison, we use this one
 
             for (f_key, f_value, f_compare) in self.filters:
 
-                policy_condition = p_dict.get(f_key)
-                matching = f_compare(policy_condition, f_value)
+                matcher = p_matchers.get(f_key)
+
+                if matcher and matcher.compare is f_compare:
+                    matching = matcher.match(f_value)
+                else:
+                    policy_condition = p_conditions.get(f_key)
+                    matching = f_compare(policy_condition, f_value)
 
                 if not matching:
                     break
@@ -197,7 +226,7 @@ class PolicyEvaluator(object):
         for key in ['user', 'client', 'realm']:
             entry = []
             for name, policy in sorted(list(matching_policies.items())):
-                conditions = [x.strip() for x in policy[key].split(',')]
+                conditions = _get_conditions(policy[key])
                 if '*' not in conditions:
                     entry.append(name)
 
@@ -359,6 +388,22 @@ class PolicyEvaluator(object):
 #
 
 
+def _get_conditions(policy_conditions, separator=','):
+    """
+    get the list of conditions from the policy condition string
+
+    :param policy_conditions: the condition string or the already
+                              tokenised conditions of a compiled policy
+    :param separator: the condition separator
+    :return: list or tuple of conditions
+    """
+
+    if isinstance(policy_conditions, tuple):
+        return policy_conditions
+
+    return [x.strip() for x in policy_conditions.split(separator)]
+
+
 def value_list_compare(policy_conditions, action_name):
     """
     check if given action_name matches the conditions
@@ -368,7 +413,7 @@ def value_list_compare(policy_conditions, action_name):
     :return: booleans
     """
 
-    conditions = [x.strip() for x in policy_conditions.split(',')]
+    conditions = _get_conditions(policy_conditions)
 
     if '*' in conditions:
         return True
@@ -410,7 +455,7 @@ def wildcard_icase_list_compare(policy_conditions, value, ignore_case=True):
     :return: booleans
     """
 
-    conditions = [x.strip() for x in policy_conditions.split(',')]
+    conditions = _get_conditions(policy_conditions)
 
     if '*' in conditions:
         return True
@@ -486,7 +531,7 @@ def ip_list_compare(policy_conditions, client):
     :return: booleans
     """
 
-    conditions = [x.strip() for x in policy_conditions.split(',')]
+    conditions = _get_conditions(policy_conditions)
 
     if '*' in conditions:
         return True
@@ -526,7 +571,7 @@ def user_list_compare(policy_conditions, login):
     :param login: the to be compared user - either User obj or string
     :return: booleans
     """
-    conditions = [x.strip() for x in policy_conditions.split(',')]
+    conditions = _get_conditions(policy_conditions)
 
     if isinstance(login, User):
         user = login
@@ -749,7 +794,7 @@ def time_list_compare(policy_conditions, now):
             the cron expression
 
     """
-    conditions = [x.strip() for x in policy_conditions.split(';')]
+    conditions = _get_conditions(policy_conditions, separator=';')
 
     matched = False
 
@@ -789,4 +834,321 @@ def time_list_compare(policy_conditions, now):
 
     return matched
 
+
+#
+# below: the pre-compiled condition matchers
+#
+# the matchers are built once for the compiled policies and provide the same
+# result as the corresponding comparing function above, which is referred
+# to by the 'compare' attribute
+#
+
+# the value ranges of the cron fields minute, hour, day of month, month,
+# day of week and year - values beyond the ranges are compared literally
+
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6), (1900, 3000))
+
+
+class ValueListMatcher(object):
+    """
+    matcher for the action conditions, based on the frozenset of the action
+    conditions and action names
+    """
+
+    compare = staticmethod(value_list_compare)
+
+    def __init__(self, conditions):
+
+        self.wildcard = '*' in conditions
+
+        actions = set(conditions)
+        for condition in conditions:
+            cond_name, _sep, _cond_value = condition.partition('=')
+            actions.add(cond_name.strip())
+
+        self.actions = frozenset(actions)
+
+    def match(self, action_name):
+        return self.wildcard or action_name in self.actions
+
+
+class WildcardListMatcher(object):
+    """
+    matcher for the case insensitive realm conditions, based on the
+    frozensets of the matching and the excluding conditions
+    """
+
+    compare = staticmethod(wildcard_icase_list_compare)
+
+    def __init__(self, conditions):
+
+        self.wildcard = '*' in conditions
+
+        values = set()
+        not_values = set()
+
+        for condition in conditions:
+
+            if not condition:
+                continue
+
+            if condition[0] in ['-', '!']:
+                not_values.add(condition[1:].lower())
+            else:
+                values.add(condition.lower())
+
+        self.values = frozenset(values)
+        self.not_values = frozenset(not_values)
+
+    def match(self, value):
+
+        if self.wildcard:
+            return True
+
+        value = value.lower()
+
+        if value in self.not_values:
+            return False
+
+        return value in self.values
+
+
+class NetworkPrefixSet(object):
+    """
+    set of ip networks, grouped by ip version and network mask, so that an
+    address lookup only requires one set lookup per distinct prefix length
+    """
+
+    def __init__(self):
+        self.prefixes = {}
+
+    def add(self, network):
+
+        width = 32 if network.version == 4 else 128
+        host_bits = width - network.prefixlen
+        mask = ((1 << width) - 1) ^ ((1 << host_bits) - 1)
+
+        networks = self.prefixes.setdefault((network.version, mask), set())
+        networks.add(network.first)
+
+    def __contains__(self, address):
+
+        value = int(address)
+
+        for (version, mask), networks in self.prefixes.items():
+            if version == address.version and value & mask in networks:
+                return True
+
+        return False
+
+    def __len__(self):
+        return sum(len(networks) for networks in self.prefixes.values())
+
+
+class IPListMatcher(object):
+    """
+    matcher for the client conditions, based on the prefix sets of the
+    matching and the excluding networks
+    """
+
+    compare = staticmethod(ip_list_compare)
+
+    def __init__(self, conditions):
+
+        self.wildcard = '*' in conditions
+        self.not_wildcard = False
+
+        self.networks = NetworkPrefixSet()
+        self.not_networks = NetworkPrefixSet()
+
+        for condition in conditions:
+
+            if not condition:
+                continue
+
+            its_a_not_condition = False
+
+            if condition[0] in ['-', '!']:
+                condition = condition[1:]
+                its_a_not_condition = True
+
+            if condition == '*':
+                self.not_wildcard = self.not_wildcard or its_a_not_condition
+                continue
+
+            if its_a_not_condition:
+                self.not_networks.add(IPNetwork(condition))
+            else:
+                self.networks.add(IPNetwork(condition))
+
+    def match(self, client):
+
+        if self.wildcard:
+            return True
+
+        if self.not_wildcard:
+            return False
+
+        # without matching networks the client address is not parsed
+
+        if not self.networks:
+            return False
+
+        address = IPAddress(client)
+
+        if address in self.not_networks:
+            return False
+
+        return address in self.networks
+
+
+class CronMatcher(object):
+    """
+    matcher for one cron condition, where each cron field is compiled into
+    a bitmask of the matching values
+    """
+
+    def __init__(self, condition):
+
+        parts = [part for part in condition.split(' ') if part.strip()]
+
+        if len(parts) != 6:
+            raise Exception("Error in Time Condition format")
+
+        self.fields = []
+
+        for part, (low, high) in zip(parts, CRON_FIELD_RANGES):
+
+            if part.strip() == '*':
+                self.fields.append(None)
+                continue
+
+            mask = 0
+            for target in range(low, high + 1):
+                if _compare_cron_value(part, target):
+                    mask |= 1 << (target - low)
+
+            self.fields.append((part, low, high, mask))
+
+    def match(self, now):
+
+        weekday = now.isoweekday()
+
+        targets = (now.minute, now.hour, now.day, now.month,
+                   0 if weekday == 7 else weekday, now.year)
+
+        for field, target in zip(self.fields, targets):
+
+            if field is None:
+                continue
+
+            part, low, high, mask = field
+
+            if low <= target <= high:
+                if not (mask >> (target - low)) & 1:
+                    return False
+
+            elif not _compare_cron_value(part, target):
+                return False
+
+        return True
+
+
+@lru_cache(maxsize=1024)
+def get_cron_matcher(condition):
+    """
+    get the cron matcher for a cron condition - the cron matchers are
+    immutable, so that policies with the same time condition can share them
+    """
+    return CronMatcher(condition)
+
+
+class TimeListMatcher(object):
+    """
+    matcher for the time conditions, based on the pre-compiled cron matchers
+    """
+
+    compare = staticmethod(time_list_compare)
+
+    def __init__(self, conditions):
+
+        # the order of the conditions is preserved, as the evaluation
+        # exits on the first wildcard or matching excluding condition
+
+        self.conditions = []
+
+        for condition in conditions:
+
+            if not condition:
+                continue
+
+            if condition == '*':
+                self.conditions.append((False, None))
+                continue
+
+            its_a_not_condition = False
+
+            if condition[0] in ['-', '!']:
+                its_a_not_condition = True
+                condition = condition[1:]
+
+            self.conditions.append(
+                (its_a_not_condition, get_cron_matcher(condition)))
+
+    def match(self, now):
+
+        if now is None:
+            now = datetime.now()
+
+        matched = False
+
+        for its_a_not_condition, cron in self.conditions:
+
+            if cron is None:
+                return True
+
+            if cron.match(now):
+                if its_a_not_condition:
+                    return False
+                matched = True
+
+        return matched
+
+
+POLICY_MATCHERS = {
+    'action': ValueListMatcher,
+    'realm': WildcardListMatcher,
+    'client': IPListMatcher,
+    'time': TimeListMatcher,
+}
+
+
+def compile_matchers(conditions):
+    """
+    compile the tokenised conditions of a policy into condition matchers
+
+    if a condition could not be compiled, there will be no matcher for this
+    condition and the evaluation falls back to the comparing function
+
+    :param conditions: the policy dict with the tokenised conditions
+    :return: dict with the matchers per policy attribute
+    """
+
+    matchers = {}
+
+    for key, matcher_class in POLICY_MATCHERS.items():
+
+        policy_conditions = conditions.get(key)
+
+        if not isinstance(policy_conditions, tuple):
+            continue
+
+        try:
+            matchers[key] = matcher_class(policy_conditions)
+        except Exception as exx:
+            log.warning("failed to compile policy %r condition %r: %r",
+                        conditions.get('name'), key, exx)
+
+    return matchers
+
 # eof
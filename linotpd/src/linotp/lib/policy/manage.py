@@ -169,6 +169,8 @@ def deletePolicy(name, enforce=False):
     param = policies.get(name)
     # delete is same as inactive ;-)
     if param:
+        # the policies are shared, so we have to work on a copy
+        param = dict(param)
         param['active'] = "False"
         param['name'] = name
         param['enforce'] = enforce
@@ -275,15 +277,16 @@ def create_policy_export_file(policy, filename):
         f.write('')
         f.close()
     else:
-        for value in list(policy.values()):
-            for k in list(value.keys()):
-                value[k] = value[k] or ""
-
         policy_file = ConfigObj(encoding="UTF-8")
         policy_file.filename = file_name
 
         for name in list(policy.keys()):
-            policy_file[name] = policy[name]
+            # the policies are shared, so we have to work on a copy
+            value = dict(policy[name])
+            for k in list(value.keys()):
+                value[k] = value[k] or ""
+
+            policy_file[name] = value
             policy_file.write()
 
     return file_name
@@ -28,6 +28,7 @@
 import logging
 from copy import deepcopy
 
+from linotp.lib.config import get_config_section
 from linotp.lib.context import request_context as context
 from linotp.lib.user import getUserRealms
 
@@ -77,7 +78,7 @@ def get_policies():
 
 
 def get_copy_of_policies():
-    lPolicies = deepcopy(context['Policies'])
+    lPolicies = deepcopy(dict(context['Policies']))
     return lPolicies
 
 
@@ -409,14 +410,15 @@ def parse_policies(lConfig):
     :return: dict with all policies of the config
     """
     Policies = {}
-    for entry in lConfig:
+    policy_entries = get_config_section(lConfig, 'Policy')
+
+    for entry, value in policy_entries.items():
         if entry.startswith("linotp.Policy."):
             # log.debug("[getPolicy] entry: %s" % entry )
             policy = entry.split(".", 4)
             if len(policy) == 4:
                 name = policy[2]
                 key = policy[3]
-                value = lConfig.get(entry)
 
                 # prepare the value to be at least an empty string
                 if (key in ('user', 'client', 'realm', 'time') and
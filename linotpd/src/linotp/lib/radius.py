@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+radius client - radius requests to a list of servers with failover
+
+the radius token and the radius forwarding send their requests by the
+RadiusClient, which
+
+* uses the radius dictionary, that is parsed only once per process
+* tries the servers by the ResourceScheduler, which blocks a server, that
+  did not reply, so that the next server is tried
+* takes the udp sockets from the process wide connection pool, so that a
+  socket is not opened for every request - a socket is used by only one
+  request at a time, as the replies are read from the socket
+* supports sending the request in a background thread
+
+The timeout and the number of retries per server are taken from the
+RADIUS_TIMEOUT and RADIUS_RETRIES settings.
+"""
+
+import logging
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from flask import has_app_context
+
+from pyrad.client import Client
+from pyrad.client import Timeout
+from pyrad.dictionary import Dictionary
+from pyrad.host import Host
+
+from linotp.lib.connection_pool import PooledConnection
+from linotp.lib.connection_pool import get_connection_pool
+from linotp.lib.resources import ResourceScheduler
+
+log = logging.getLogger(__name__)
+
+DEFAULT_AUTH_PORT = 1812
+DEFAULT_TIMEOUT = 5
+DEFAULT_RETRIES = 3
+DEFAULT_BLOCK_DELAY = 30
+DEFAULT_ASYNC_WORKERS = 10
+
+# the parsed radius dictionaries per path
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+# the executor of the asynchronous requests, which is created lazily and
+# recreated in a forked process
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_radius_dictionary(dict_path=None):
+    '''
+    get the parsed radius dictionary - the dictionary is parsed only once
+    per process
+
+    :param dict_path: the path of the dictionary file - if not given the
+                      dictionary of the app is used
+    :return: pyrad Dictionary
+    '''
+
+    if dict_path is None:
+        dict_path = current_app.getRadiusDictionaryPath()
+
+    dictionary = _dictionaries.get(dict_path)
+    if dictionary is not None:
+        return dictionary
+
+    with _dictionaries_lock:
+
+        dictionary = _dictionaries.get(dict_path)
+        if dictionary is None:
+            dictionary = Dictionary(dict_path)
+            _dictionaries[dict_path] = dictionary
+
+    return dictionary
+
+
+def parse_radius_servers(servers, default_port=DEFAULT_AUTH_PORT):
+    '''
+    parse the comma separated list of radius servers
+
+    :param servers: the radius servers like 'host1:1812, host2'
+    :param default_port: the port of the servers without port
+    :return: list of (host, port) tuples
+    '''
+
+    server_list = []
+
+    for server in servers.split(','):
+
+        server = server.strip()
+        if not server:
+            continue
+
+        host, _sep, port = server.partition(':')
+        server_list.append((host, int(port) if port else default_port))
+
+    return server_list
+
+
+def _close_client(client):
+    """ close the socket of a pooled radius client """
+
+    client._CloseSocket()
+
+
+def _get_setting(name, default):
+
+    if has_app_context():
+        return current_app.config.get(name, default)
+
+    return default
+
+
+def _get_executor():
+    """
+    get the executor of the asynchronous requests of this process
+    """
+
+    global _executor, _executor_pid
+
+    with _executor_lock:
+
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_ASYNC_WORKERS,
+                thread_name_prefix='RadiusClient')
+            _executor_pid = os.getpid()
+
+    return _executor
+
+
+class RadiusClient(object):
+    """
+    radius client for a list of servers with failover
+    """
+
+    def __init__(self, servers, secret, dictionary=None,
+                 timeout=None, retries=None,
+                 block_delay=DEFAULT_BLOCK_DELAY):
+        '''
+        :param servers: comma separated list of servers like 'host:port'
+        :param secret: the radius secret as bytes
+        :param dictionary: the radius dictionary - if not given the
+                           dictionary of the app is used
+        :param timeout: seconds to wait for the reply of a server
+        :param retries: number of tries per server
+        :param block_delay: seconds a server, that did not reply, is blocked
+        '''
+
+        self.servers = parse_radius_servers(servers)
+        self.secret = secret
+        self.dictionary = dictionary or get_radius_dictionary()
+
+        if timeout is None:
+            timeout = _get_setting('RADIUS_TIMEOUT', DEFAULT_TIMEOUT)
+        if retries is None:
+            retries = _get_setting('RADIUS_RETRIES', DEFAULT_RETRIES)
+
+        self.timeout = float(timeout)
+        self.retries = int(retries)
+        self.block_delay = block_delay
+
+        self.pool = get_connection_pool('radius', close=_close_client)
+
+    def create_auth_packet(self, **attributes):
+        '''
+        create an access request packet
+
+        :param attributes: the radius attributes of the packet
+        :return: pyrad AuthPacket
+        '''
+
+        host = Host(dict=self.dictionary)
+        return host.CreateAuthPacket(secret=self.secret, **attributes)
+
+    def send_packet(self, packet):
+        '''
+        send the packet to the first server, which replies
+
+        :param packet: the radius packet
+        :return: the reply packet
+        :raise Timeout: if no server replied
+        '''
+
+        resources = dict(
+            ('radius://%s:%d' % server, server) for server in self.servers)
+
+        resource_scheduler = ResourceScheduler(
+            tries=1, uri_list=list(resources.keys()))
+
+        for uri in next(resource_scheduler):
+
+            pooled = self.pool.acquire(uri)
+
+            if pooled is None:
+                host, port = resources[uri]
+                pooled = PooledConnection(uri, Client(
+                    server=host, authport=port, secret=self.secret,
+                    dict=self.dictionary))
+
+            client = pooled.connection
+            client.timeout = self.timeout
+            client.retries = self.retries
+
+            try:
+                reply = client.SendPacket(packet)
+
+            except (Timeout, OSError) as exx:
+                log.warning('radius server %r did not reply: %r', uri, exx)
+
+                _close_client(client)
+                self.pool.discard(uri)
+
+                resource_scheduler.block(uri, delay=self.block_delay)
+                continue
+
+            except Exception:
+                _close_client(client)
+                raise
+
+            self.pool.release(pooled)
+
+            return reply
+
+        raise Timeout('no radius server of %r replied' % (self.servers,))
+
+    def send_packet_async(self, packet):
+        '''
+        send the packet in a background thread
+
+        :param packet: the radius packet
+        :return: concurrent.futures.Future of the reply packet
+        '''
+
+        return _get_executor().submit(self.send_packet, packet)
+
+# eof #
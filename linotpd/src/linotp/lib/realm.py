@@ -36,12 +36,13 @@ from linotp.model.meta import Session
 from linotp.lib.config import getLinotpConfig
 from linotp.lib.config import storeConfig
 from linotp.lib.config import getFromConfig
+from linotp.lib.config import get_config_section
 from linotp.lib.config.parsing import ConfigTree
 from linotp.lib.config.parsing import ConfigNotRecognized
 from linotp.lib.context import request_context as context
 from linotp.lib.cache import get_cache
+from linotp.lib.token_counter import invalidate_token_counters
 
-from sqlalchemy import func
 
 
 import logging
@@ -150,7 +151,7 @@ def getRealmObject(name="", id=0):
 
     name = '' + str(name)
     if (0 == id):
-        realmObjects = Session.query(Realm).filter(func.lower(Realm.name) == name.lower())
+        realmObjects = Session.query(Realm).filter(Realm.name == name.lower())
         if realmObjects.count() > 0:
             realmObj = realmObjects[0]
 
@@ -344,7 +345,10 @@ def _initalGetRealms():
     defaultRealm = None
 
     dc = getLinotpConfig()
-    for entry in dc:
+
+    # the realm definitions are in the config section 'useridresolver'
+
+    for entry in get_config_section(dc, 'useridresolver'):
 
         if entry.startswith(realmConf):
 
@@ -382,8 +386,8 @@ def _initalGetRealms():
             defaultRealm = "_default_"
             Realms[theRealm] = r
 
-        if entry == defaultRealmDef:
-            defaultRealm = getFromConfig(defaultRealmDef)
+    if defaultRealmDef in dc:
+        defaultRealm = getFromConfig(defaultRealmDef)
 
     if defaultRealm is not None:
         _setDefaultRealm(Realms, defaultRealm)
@@ -505,6 +509,9 @@ def deleteRealm(realmname):
         if realmId != 0:
             log.debug("Deleting token relations for realm with id %i" % realmId)
             Session.query(TokenRealm).filter(TokenRealm.realm_id == realmId).delete()
+
+            # the token counters do not follow the deleted relations
+            invalidate_token_counters()
         Session.delete(r)
 
     else:
@@ -41,6 +41,8 @@ from linotp.flap import request
 from linotp.flap import tmpl_context as c
 from linotp.lib.context import request_context, request_context_safety
 from linotp.lib.error import LinotpError
+from linotp.lib.reply_encoder import get_json_encoder
+from linotp.lib.type_utils import boolean
 from linotp.lib.util import get_api_version, get_version
 
 optional = True
@@ -48,6 +50,10 @@ required = False
 
 LINOTP_ERRORS = [707]
 
+# the min size of the chunks of a streamed response
+
+STREAM_BUFFER_SIZE = 16384
+
 httpErr = {
         '400': 'Bad Request',
         '401': 'Unauthorized',
@@ -121,6 +127,23 @@ def _get_httperror_from_params(request):
     return httperror
 
 
+def _get_pretty_from_params():
+    """
+    check if the client asks for a pretty printed response by the request
+    parameter 'pretty'
+
+    :return: boolean
+    """
+
+    try:
+        request_params = current_app.getRequestParams()
+        return boolean(request_params.get('pretty', False))
+
+    except Exception as exx:
+        log.debug("Could not extract 'pretty' from params: %r", exx)
+        return False
+
+
 def sendError(_response, exception, id=1, context=None):
     '''
     sendError - return a HTML or JSON error result document
@@ -255,7 +278,7 @@ def sendError(_response, exception, id=1, context=None):
                  "version": get_version(),
                  "id": id
             }
-        data = json.dumps(res, indent=3)
+        data = get_json_encoder().dumps(res, pretty=_get_pretty_from_params())
         response = Response(response=data, status=200, mimetype= 'application/json')
 
         if context in ['before', 'after']:
@@ -292,7 +315,7 @@ def sendResult(response, obj, id=1, opt=None, status=True):
     if opt is not None and len(opt) > 0:
         res["detail"] = opt
 
-    data = json.dumps(res, indent=3)
+    data = get_json_encoder().dumps(res, pretty=_get_pretty_from_params())
 
     return Response(response=data, status=200, mimetype= 'application/json')
 
@@ -303,6 +326,11 @@ def sendResultIterator(obj, id=1, opt=None, rp=None, page=None,
         sendResultIterator - return an json result document in a streamed mode
                              which requires a request context to be avaliable
 
+        the entries of the iterator are either already encoded json strings
+        or objects, which are encoded one by one, while the result is
+        streamed. The encoded entries are collected into chunks of at least
+        STREAM_BUFFER_SIZE characters.
+
         :param obj: iterator of generator object like dict, string or list
         :param  id: id value, for future versions
         :param opt: optional parameter, which allows to provide more detail
@@ -318,6 +346,8 @@ def sendResultIterator(obj, id=1, opt=None, rp=None, page=None,
     api_version = get_api_version()
     linotp_version = get_version()
 
+    encoder = get_json_encoder()
+
     res = {"jsonrpc": api_version,
             "result": {"status": True,
                        "value": "[DATA]",
@@ -350,7 +380,7 @@ def sendResultIterator(obj, id=1, opt=None, rp=None, page=None,
                             }
             log.exception("failed to convert paging request parameters: %r"
                           % exx)
-            yield json.dumps(err)
+            yield encoder.dumps(err)
             # finally we signal end of error result
             return
 
@@ -371,7 +401,7 @@ def sendResultIterator(obj, id=1, opt=None, rp=None, page=None,
         res["detail"] = opt
 
 
-    surrounding = json.dumps(res)
+    surrounding = encoder.dumps(res)
     prefix, postfix = surrounding.split('"[DATA]"')
 
     # first return the opening
@@ -380,30 +410,40 @@ def sendResultIterator(obj, id=1, opt=None, rp=None, page=None,
 
     sep = ""
     counter = 0
+
+    chunk = []
+    chunk_size = 0
+
     for next_one in obj:
-        # next_one = json.dumps(next_entry)
         counter = counter + 1
+
         # are we running in paging mode?
-        if page:
-            if counter >= start_at and counter < stop_at:
-                res = "%s%s\n" % (sep, next_one)
-                sep = ','
-                yield res
+        if page and not start_at <= counter < stop_at:
             if counter >= stop_at:
                 # stop iterating if we reached the last one of the page
                 break
-        else:
-            # no paging - no limit
-            res = "%s%s\n" % (sep, next_one)
-            sep = ','
-            yield res
+            continue
+
+        if not isinstance(next_one, str):
+            next_one = encoder.dumps(next_one)
+
+        res = "%s%s\n" % (sep, next_one)
+        sep = ','
+
+        chunk.append(res)
+        chunk_size += len(res)
+
+        if chunk_size >= STREAM_BUFFER_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            chunk_size = 0
 
     # we add the amount of queried objects
     total = '"queried" : %d' % counter
     postfix = ', %s %s' % (total, postfix)
 
     # last return the closing
-    yield "] " + postfix
+    yield ''.join(chunk) + "] " + postfix
 
 
 def sendCSVResult(response, obj, flat_lines=False,
@@ -698,7 +738,8 @@ def sendCSVIterator(obj, headers=True):
 
     try:
         for row in obj:
-            row = json.loads(row)
+            if isinstance(row, str):
+                row = json.loads(row)
             # do the header
             if headers:
                 for key in row:
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+json encoders for the responses
+
+The responses are encoded compact by default - the items are separated by
+', ' and ': ' as before, but without the line breaks and the indentation,
+which only inflate the responses. Clients can ask for a pretty printed
+response by the request parameter 'pretty'.
+
+The encoding backend is selected by the setting JSON_ENCODER:
+
+* 'json' - the json module of the standard library
+* 'orjson' - the much faster orjson module, if it is installed - otherwise
+  the standard library is used. As orjson does not support the item
+  separators with spaces, the responses of this backend are even more
+  compact, which might break clients, which parse the responses as text.
+"""
+
+import json
+import logging
+
+from flask import current_app
+from flask import has_app_context
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'json'
+
+PRETTY_INDENT = 3
+
+
+class StdlibEncoder(object):
+    """
+    json encoder based on the json module of the standard library
+    """
+
+    name = 'json'
+
+    def dumps(self, obj, pretty=False):
+        """
+        encode an object into a json string
+
+        :param obj: the object to encode
+        :param pretty: if True, the result is indented
+        :return: the json string
+        """
+
+        if pretty:
+            return json.dumps(obj, indent=PRETTY_INDENT)
+
+        return json.dumps(obj)
+
+
+class OrjsonEncoder(StdlibEncoder):
+    """
+    json encoder based on the orjson module - objects, which orjson could
+    not encode, are encoded by the standard library
+    """
+
+    name = 'orjson'
+
+    def dumps(self, obj, pretty=False):
+
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, option=option).decode('utf-8')
+
+        except TypeError as exx:
+            log.debug('orjson failed to encode the response: %r', exx)
+            return StdlibEncoder.dumps(self, obj, pretty=pretty)
+
+
+ENCODERS = {
+    'json': StdlibEncoder(),
+}
+
+if orjson:
+    ENCODERS['orjson'] = OrjsonEncoder()
+
+
+def get_json_encoder(backend=None):
+    """
+    get the json encoder of the configured backend
+
+    :param backend: the name of the backend - if not given, the setting
+                    JSON_ENCODER is used
+    :return: the json encoder
+    """
+
+    if backend is None:
+        backend = DEFAULT_BACKEND
+        if has_app_context():
+            backend = current_app.config.get('JSON_ENCODER', DEFAULT_BACKEND)
+
+    encoder = ENCODERS.get(backend)
+
+    if encoder is None:
+
+        if backend != 'orjson':
+            raise ValueError('unknown json encoder %r' % backend)
+
+        log.warning('orjson is not installed - using the standard library')
+        encoder = ENCODERS['orjson'] = ENCODERS[DEFAULT_BACKEND]
+
+    return encoder
+
+# eof
@@ -38,8 +38,8 @@ from flask import current_app
 
 # this is needed for the radius request
 import pyrad.packet
-from pyrad.client import Client
-from pyrad.dictionary import Dictionary
+
+from linotp.lib.radius import RadiusClient
 
 log = logging.getLogger(__name__)
 
@@ -240,29 +240,15 @@ class RadiusRequest(RemoteRequest):
                   "(user: %s)", len(password), radiusServer, radiusUser)
 
         try:
-            # pyrad does not allow to set timeout and retries.
-            # it defaults to retries=3, timeout=5
-
-            if ':' in radiusServer:
-                r_server, _sep, r_authport = radiusServer.partition(':')
-                r_authport = int(r_authport)
-            else:
-                r_server = radiusServer
-                r_authport = 1812
-
             nas_identifier = current_app.config['RADIUS_NAS_IDENTIFIER']
-            r_dict = current_app.getRadiusDictionaryPath()
 
             log.debug("Radius: constructing client object with server: %r, "
-                      "port: %r, secret: %r", r_server, r_authport,
-                      radiusSecret)
+                      "secret: %r", radiusServer, radiusSecret)
 
-            srv = Client(server=r_server,
-                         authport=r_authport,
-                         secret=radiusSecret.encode('utf-8'),
-                         dict=Dictionary(r_dict))
+            srv = RadiusClient(radiusServer,
+                               secret=radiusSecret.encode('utf-8'))
 
-            req = srv.CreateAuthPacket(code=pyrad.packet.AccessRequest,
+            req = srv.create_auth_packet(code=pyrad.packet.AccessRequest,
                                 User_Name=radiusUser.encode('utf-8'),
                                 NAS_Identifier=nas_identifier.encode('utf-8'))
 
@@ -271,7 +257,7 @@ class RadiusRequest(RemoteRequest):
                 req["State"] = str(options.get('transactionid',
                                                options.get('state')))
 
-            response = srv.SendPacket(req)
+            response = srv.send_packet(req)
 
             if response.code == pyrad.packet.AccessChallenge:
                 opt = {}
@@ -288,12 +274,12 @@ class RadiusRequest(RemoteRequest):
 
             elif response.code == pyrad.packet.AccessAccept:
                 log.info("Radius: Server %s granted "
-                         "access to user %s.", r_server, radiusUser)
+                         "access to user %s.", radiusServer, radiusUser)
                 res = True
             else:
                 log.warning("Radius: Server %s"
                             "rejected access to user %s.",
-                            r_server, radiusUser)
+                            radiusServer, radiusUser)
                 res = False
 
         except Exception as ex:
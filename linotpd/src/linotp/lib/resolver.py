@@ -39,6 +39,7 @@ from linotp.lib.cache import get_cache
 from linotp.lib.config import storeConfig
 from linotp.lib.config import removeFromConfig
 from linotp.lib.config import getLinotpConfig
+from linotp.lib.config import get_config_section
 from linotp.lib.config.parsing import ConfigTree
 from linotp.lib.config.parsing import ConfigNotRecognized
 
@@ -212,6 +213,8 @@ def defineResolver(params):
     save_resolver_config(resolver, p_config,
                          prefix='linotp.' + typ, name=conf)
 
+    resolver.flush_cache()
+
     resolver_spec = "%s.%s.%s" % (resolver.__module__,
                                   resolver.__class__.__name__,
                                   conf)
@@ -284,54 +287,53 @@ def getResolverList(filter_resolver_type=None, config=None):
     else:
         conf = config
 
-    for entry in conf:
+    for typ in resolvertypes:
 
-        for typ in resolvertypes:
-            if entry.startswith("linotp." + typ):
-                # the realm might contain dots "."
-                # so take all after the 3rd dot for realm
-                r = {}
-                resolver = entry.split(".", 3)
-
-                # An old entry without resolver name
-                if len(resolver) <= 3:
-                    break
-                r["resolvername"] = resolver[3]
-                r["entry"] = entry
-                r["type"] = typ
-
-                readonly_entry = '.'.join([resolver[0], resolver[1],
-                                           'readonly', resolver[3]])
-
-                if readonly_entry in conf:
-                    readonly = False
-                    try:
-                        readonly = boolean(conf[readonly_entry])
-                    except Exception as _exx:
-                        log.info("Failed to convert 'readonly' attribute"
-                                 " %r:%r",
-                                 readonly_entry, conf[readonly_entry])
-
-                    if readonly:
-                        r["readonly"] = True
-                #
-                # this is a patch for a hack:
-                #
-                # as entry, the first found resolver is shown
-                # as the PasswdResolver only has one entry, this always
-                # has been 'fileName', which now as could be 'readonly'
-                # thus we skip the readonly entry:
-
-                key = resolver[2]
-                if key == "readonly":
-                    continue
+        if filter_resolver_type and filter_resolver_type != typ:
+            continue
 
-                if ((filter_resolver_type is None) or
-                        (filter_resolver_type and
-                         filter_resolver_type == typ)):
-                    Resolvers[resolver[3]] = r
-                # Dont check the other resolver types
-                break
+        # the entries of a resolver type are in the config section of the type
+
+        for entry in get_config_section(conf, typ):
+            # the realm might contain dots "."
+            # so take all after the 3rd dot for realm
+            r = {}
+            resolver = entry.split(".", 3)
+
+            # An old entry without resolver name
+            if len(resolver) <= 3:
+                continue
+            r["resolvername"] = resolver[3]
+            r["entry"] = entry
+            r["type"] = typ
+
+            readonly_entry = '.'.join([resolver[0], resolver[1],
+                                       'readonly', resolver[3]])
+
+            if readonly_entry in conf:
+                readonly = False
+                try:
+                    readonly = boolean(conf[readonly_entry])
+                except Exception as _exx:
+                    log.info("Failed to convert 'readonly' attribute"
+                             " %r:%r",
+                             readonly_entry, conf[readonly_entry])
+
+                if readonly:
+                    r["readonly"] = True
+            #
+            # this is a patch for a hack:
+            #
+            # as entry, the first found resolver is shown
+            # as the PasswdResolver only has one entry, this always
+            # has been 'fileName', which now as could be 'readonly'
+            # thus we skip the readonly entry:
+
+            key = resolver[2]
+            if key == "readonly":
+                continue
+
+            Resolvers[resolver[3]] = r
 
     return Resolvers
 
@@ -454,6 +456,7 @@ def deleteResolver(resolvername):
 
     delEntries = []
     resolver_specs = set()
+    resolver_classes = set()
 
     for entry in conf:
         rest = entry.split(".", 3)
@@ -469,6 +472,7 @@ def deleteResolver(resolvername):
                         resolver_class = resolver_conf.get(typ, {}).get('clazz')
                         fqn = ".".join([resolver_class, resolvername])
                         resolver_specs.add(fqn)
+                        resolver_classes.add(get_resolver_class(typ))
 
     if len(delEntries) > 0:
         try:
@@ -486,6 +490,9 @@ def deleteResolver(resolvername):
             _flush_user_resolver_cache(resolver_spec)
             _delete_from_resolver_config_cache(resolver_spec)
 
+        for resolver_cls in resolver_classes:
+            resolver_cls.drop_cache(resolvername)
+
     return res
 
 
@@ -90,6 +90,23 @@ class SecurityModule(object):
         raise NotImplementedError("Should have been implemented %s"
                                   % fname)
 
+    def hmac_digests(self, bkey, data_inputs, hash_algo):
+        """
+        generator for the hmac digests of a sequence of data inputs, all
+        calculated with the same key
+
+        the default implementation calls the hmac_digest of the security
+        module for every data input - security modules might provide a more
+        efficient implementation
+
+        :param bkey: the private shared secret
+        :param data_inputs: iterable of the data inputs
+        :param hash_algo: one of the hashing algorithms
+        """
+
+        for data_input in data_inputs:
+            yield self.hmac_digest(bkey, data_input, hash_algo)
+
     def signMessage(self, message, method=None, slot_id=3):
         fname = 'signMessage'
         raise NotImplementedError("Should have been implemented %s"
@@ -30,13 +30,12 @@ import logging
 import binascii
 import os
 
-from Cryptodome.Cipher import AES
-
 import hmac
 from hashlib import sha256
 
 from linotp.lib.crypto.utils import zerome
 from linotp.lib.security import SecurityModule
+from linotp.lib.security.key_slots import get_key_slots
 
 
 TOKEN_KEY = 0
@@ -83,7 +82,7 @@ class DefaultSecurityModule(SecurityModule):
             raise Exception("no secret file defined: linotpSecretFile!")
 
         self.secFile = config.get('file')
-        self.secrets = {}
+        self.key_slots = None
 
         return
 
@@ -98,6 +97,22 @@ class DefaultSecurityModule(SecurityModule):
         '''
         return self.is_ready
 
+    def _get_key_slots(self):
+        '''
+        internal function, which provides the key slots of the secret file,
+        which are loaded once per process into locked memory
+
+        :return: KeySlots
+        '''
+
+        if self.key_slots is None:
+            try:
+                self.key_slots = get_key_slots(self.secFile)
+            except Exception as exx:
+                raise Exception("Exception: %r" % exx)
+
+        return self.key_slots
+
     def getSecret(self, id=0):
         '''
         internal function, which acceses the key in the defined slot
@@ -105,34 +120,16 @@ class DefaultSecurityModule(SecurityModule):
         :param id: slot id of the key array
         :type  id: int - slotId
 
-        :return: key or secret
+        :return: key or secret - a copy, which should be zeroed by the caller
         :rtype:  binary string
 
         '''
-        id = int(id)
-
-        if self.crypted:
-            if id in self.secrets:
-                return self.secrets.get(id)
 
-        secret = ''
         try:
-            with open(self.secFile, 'rb') as f:
-                for _i in range(0, id + 1):
-                    secret = f.read(32)
-            if not secret:
-                # secret = setupKeyFile(secFile, id+1)
-                raise Exception("No secret key defined for index: %r !\n"
-                                "Please extend your %s"" !",
-                                id, self.secFile)
+            return bytes(self._get_key_slots().key(id))
         except Exception as exx:
             raise Exception("Exception: %r" % exx)
 
-        if self.crypted:
-            self.secrets[id] = secret
-
-        return secret
-
     def setup_module(self, params):
         '''
         callback, which is called during the runtime to
@@ -150,13 +147,15 @@ class DefaultSecurityModule(SecurityModule):
             raise Exception("missing password")
 
         # if we have a crypted file and a password, we take all keys
-        # from the file and put them in a hash
+        # from the file into the key slots
         # #
         # After this we do not require the password anymore
 
+        key_slots = self._get_key_slots()
+
         handles = ['pinHandle', 'passHandle', 'valueHandle', 'defaultHandle']
         for handle in handles:
-            self.getSecret(self.config.get(handle, '0'))
+            key_slots.key(self.config.get(handle, '0'))
 
         self.is_ready = True
         return
@@ -202,18 +201,14 @@ class DefaultSecurityModule(SecurityModule):
         if self.is_ready is False:
             raise Exception('setup of security module incomplete')
 
-        key = self.getSecret(id)
         input_data = binascii.b2a_hex(data)
         input_data += b'\x01\x02'
         padding = (16 - len(input_data) % 16) % 16
         input_data += padding * b'\0'
-        aes = AES.new(key, AES.MODE_CBC, iv)
+        aes = self._get_key_slots().cipher(id, iv)
 
         res = aes.encrypt(input_data)
 
-        if self.crypted is False:
-            zerome(key)
-            del key
         return res
 
     def decrypt(self, value: bytes, iv: bytes, id: int = 0) -> bytes:
@@ -236,8 +231,7 @@ class DefaultSecurityModule(SecurityModule):
         if self.is_ready is False:
             raise Exception('setup of security module incomplete')
 
-        key = self.getSecret(id)
-        aes = AES.new(key, AES.MODE_CBC, iv)
+        aes = self._get_key_slots().cipher(id, iv)
         output = aes.decrypt(value)
 
         eof = len(output) - 1
@@ -252,10 +246,6 @@ class DefaultSecurityModule(SecurityModule):
 
         data = output[:eof-1]
 
-        if self.crypted is False:
-            zerome(key)
-            del key
-
         return binascii.a2b_hex(data)
 
     def decryptPassword(self, cryptPass):
@@ -457,6 +447,25 @@ class DefaultSecurityModule(SecurityModule):
 
         return digest
 
+    def hmac_digests(self, bkey, data_inputs, hash_algo):
+        """
+        generator for the hmac digests of a sequence of data inputs
+
+        the key dependend inner and outer hash states are set up only once
+        and copied for every data input
+
+        :param bkey: the private shared secret
+        :param data_inputs: iterable of the data inputs
+        :param hash_algo: one of the hashing algorithms
+        """
+
+        keyed_hmac = hmac.new(bkey, digestmod=hash_algo)
+
+        for data_input in data_inputs:
+            hmac_obj = keyed_hmac.copy()
+            hmac_obj.update(data_input)
+            yield hmac_obj.digest()
+
     def hash_digest(self, val, seed, hash_algo=None):
         """
         simple hash with implicit digest
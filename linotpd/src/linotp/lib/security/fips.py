@@ -38,6 +38,7 @@ from linotp.lib.security.libfips import FipsModule
 from linotp.lib.security.libfips import SSLError
 from linotp.lib.security.default import DefaultSecurityModule
 from linotp.lib.security import FatalHSMException
+from linotp.lib.security import SecurityModule
 
 log = logging.getLogger(__name__)
 
@@ -106,4 +107,17 @@ class FipsSecurityModule(DefaultSecurityModule):
 
         return digest
 
+    def hmac_digests(self, bkey, data_inputs, hash_algo):
+        """
+        call the fips hmac function for each of the data inputs
+
+        :param bkey: the secret key of the hmac token
+        :param data_inputs: iterable of the input data like counter or time
+        :param: the hashing algorithm
+
+        :return: generator of the hmac digests
+        """
+
+        return SecurityModule.hmac_digests(self, bkey, data_inputs, hash_algo)
+
 # eof #########################################################################
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+key slots of the secret file, held in locked memory
+
+the secret file is read once into a buffer, which is locked into memory
+(mlock) - if permitted - so that the keys are not written to the swap. The
+keys are provided as memoryviews on this buffer, so that no copies of the
+keys are created for the encryption and decryption. On clear the buffer is
+zeroed and unlocked.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import threading
+
+from Cryptodome.Cipher import AES
+
+KEY_SIZE = 32
+
+log = logging.getLogger(__name__)
+
+# the process wide key slots, indexed by the secret file
+
+_key_slots = {}
+_key_slots_lock = threading.Lock()
+
+
+def _get_libc():
+    """
+    load the c library for mlock and munlock
+
+    :return: the libc or None if not available
+    """
+
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+
+    try:
+        return ctypes.CDLL(libc_name, use_errno=True)
+    except OSError as exx:
+        log.warning('failed to load libc: %r', exx)
+        return None
+
+
+_libc = _get_libc()
+
+
+class KeySlots(object):
+    """
+    the keys of a secret file, each of KEY_SIZE bytes, in locked memory
+    """
+
+    def __init__(self, sec_file, key_size=KEY_SIZE):
+        '''
+        read the secret file into a locked buffer
+
+        :param sec_file: the file name of the secret file
+        :param key_size: the size of one key slot
+        '''
+
+        self.sec_file = sec_file
+        self.key_size = key_size
+        self.locked = False
+
+        size = os.path.getsize(sec_file)
+
+        self._buffer = bytearray(size)
+        self._c_buffer = (ctypes.c_char * size).from_buffer(self._buffer)
+
+        self._lock_memory()
+
+        # read unbuffered into the locked memory, so that there is no copy
+        # of the keys in a file buffer
+
+        with open(sec_file, 'rb', buffering=0) as f:
+            view = memoryview(self._buffer)
+            read = 0
+            while read < size:
+                chunk = f.readinto(view[read:])
+                if not chunk:
+                    break
+                read += chunk
+
+        self.slots = read // key_size
+
+    def _lock_memory(self):
+        """
+        lock the buffer into memory, which might fail due to missing
+        privileges or resource limits (RLIMIT_MEMLOCK)
+        """
+
+        if _libc is None or not self._buffer:
+            return
+
+        address = ctypes.addressof(self._c_buffer)
+        if _libc.mlock(ctypes.c_void_p(address),
+                       ctypes.c_size_t(len(self._buffer))) == 0:
+            self.locked = True
+            return
+
+        log.warning('failed to lock the key slots into memory: %s',
+                    os.strerror(ctypes.get_errno()))
+
+    def __len__(self):
+        return self.slots
+
+    def key(self, slot):
+        '''
+        get the key of the slot
+
+        :param slot: slot id of the key array
+        :return: memoryview of the key - it must not be stored by the caller
+        '''
+
+        slot = int(slot)
+
+        if slot < 0 or slot >= self.slots:
+            raise Exception("No secret key defined for index: %r !\n"
+                            "Please extend your %s !" % (slot, self.sec_file))
+
+        start = slot * self.key_size
+        return memoryview(self._buffer)[start:start + self.key_size]
+
+    def cipher(self, slot, iv):
+        '''
+        create an aes cbc cipher context with the key of the slot
+
+        :param slot: slot id of the key array
+        :param iv: initialisation vector
+        :return: aes cipher object
+        '''
+
+        return AES.new(self.key(slot), AES.MODE_CBC, iv)
+
+    def clear(self):
+        """
+        zero the keys and unlock the memory
+        """
+
+        if not self._buffer:
+            return
+
+        ctypes.memset(ctypes.addressof(self._c_buffer), 0, len(self._buffer))
+
+        if self.locked and _libc is not None:
+            _libc.munlock(ctypes.c_void_p(ctypes.addressof(self._c_buffer)),
+                          ctypes.c_size_t(len(self._buffer)))
+            self.locked = False
+
+        self.slots = 0
+
+    def __del__(self):
+        self.clear()
+
+
+def get_key_slots(sec_file):
+    '''
+    get the process wide key slots of the secret file
+
+    the key slots are loaded once per secret file - a changed secret file
+    (modification time or size) is loaded again for new security modules
+
+    :param sec_file: the file name of the secret file
+    :return: KeySlots
+    '''
+
+    stat = os.stat(sec_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _key_slots_lock:
+
+        entry = _key_slots.get(sec_file)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        # the key slots of a former version are still in use by the
+        # security modules, which have loaded them - they are cleared when
+        # they are not referenced anymore
+
+        key_slots = KeySlots(sec_file)
+        _key_slots[sec_file] = (version, key_slots)
+
+    log.debug('loaded %d key slots from %r', len(key_slots), sec_file)
+
+    return key_slots
+
+# eof #
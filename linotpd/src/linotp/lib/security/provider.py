@@ -61,8 +61,7 @@ class SecurityProvider(object):
 
     def __init__(self, secLock):
         '''
-        setup the security provider, which is called on server startup
-        from the app_globals init
+        setup the security provider, which is called on the request setup
 
         :param secLock: RWLock() to support server wide locking
         :type  secLock: RWLock
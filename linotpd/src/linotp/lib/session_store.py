@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+session store - the store of the selfservice sessions
+
+the sessions of the selfservice are looked up by their authentication
+cookie. There are two session stores available:
+
+* the 'memory' store keeps the sessions of the process in a dict. The
+  store is limited to max_size sessions: expired sessions are evicted via
+  a heap of the expiration times and, if the store is full, the sessions
+  which would expire next are evicted.
+
+* the 'database' store keeps the sessions in the selfservice_session
+  table of the LinOTP database, so that the sessions are shared by all
+  worker processes. Expired sessions and the sessions beyond max_size are
+  removed every cleanup_interval writes of a process.
+
+The store is selected by the SELFSERVICE_SESSION_STORE setting.
+"""
+
+import heapq
+import json
+import logging
+import threading
+
+from datetime import datetime
+
+from flask import current_app, has_app_context
+
+from sqlalchemy import func
+
+from linotp.model import SelfserviceSession
+from linotp.model.meta import Session
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_CLEANUP_INTERVAL = 100
+
+# process wide session stores, one per store setting
+
+_session_stores = {}
+_session_stores_lock = threading.Lock()
+
+
+class MemorySessionStore(object):
+    """
+    bounded in-process session store with expiration
+    """
+
+    # the sessions are kept as they are and must not be serialized
+
+    shared = False
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param max_size: the max number of sessions
+        """
+
+        self.max_size = max(max_size, 1)
+
+        self.lock = threading.Lock()
+
+        # the sessions by cookie: cookie -> (expires, data)
+        self.entries = {}
+
+        # heap of (expires, cookie) - entries, which don't match the
+        # expiration of the session anymore, are skipped
+        self.expiry = []
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+        }
+
+    def get(self, cookie):
+        """
+        lookup the session data of the cookie
+
+        :param cookie: the session cookie
+        :return: the session data or None if there is no valid session
+        """
+
+        now = datetime.utcnow()
+
+        with self.lock:
+
+            entry = self.entries.get(cookie)
+
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            expires, data = entry
+
+            if expires <= now:
+                del self.entries[cookie]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self.stats['hits'] += 1
+            return data
+
+    def set(self, cookie, data, expires):
+        """
+        store the session data of the cookie
+
+        :param cookie: the session cookie
+        :param data: the session data
+        :param expires: the expiration time of the session as utc datetime
+        """
+
+        with self.lock:
+            self.entries[cookie] = (expires, data)
+            heapq.heappush(self.expiry, (expires, cookie))
+
+            self._evict(datetime.utcnow())
+
+    def delete(self, cookie):
+        """
+        remove the session of the cookie
+
+        :param cookie: the session cookie
+        """
+
+        with self.lock:
+            self.entries.pop(cookie, None)
+
+    def _evict(self, now):
+        """
+        evict the expired sessions and, if the store is full, the sessions
+        which would expire next - the lock must be held by the caller
+
+        :param now: the current time as utc datetime
+        """
+
+        entries = self.entries
+        expiry = self.expiry
+
+        while expiry:
+
+            expires, cookie = expiry[0]
+            entry = entries.get(cookie)
+
+            # skip the outdated entries of removed or replaced sessions
+
+            if entry is None or entry[0] != expires:
+                heapq.heappop(expiry)
+                continue
+
+            if expires > now and len(entries) <= self.max_size:
+                break
+
+            heapq.heappop(expiry)
+            del entries[cookie]
+
+            if expires > now:
+                self.stats['evictions'] += 1
+            else:
+                self.stats['expired'] += 1
+
+        # rebuild the heap, if it is mostly made of outdated entries
+
+        if len(expiry) > 2 * len(entries) + 64:
+            self.expiry = [
+                (expires, cookie)
+                for cookie, (expires, _data) in entries.items()]
+            heapq.heapify(self.expiry)
+
+    def get_stats(self):
+        """
+        get the session store statistics
+
+        :return: dict with the hits, misses, expired and evicted sessions
+                 and the current number of sessions
+        """
+
+        with self.lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self.entries)
+
+        return stats
+
+
+class DatabaseSessionStore(object):
+    """
+    session store in the LinOTP database, shared by all processes
+    """
+
+    # the sessions are stored as json and must be serialized by the caller
+
+    shared = True
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE,
+                 cleanup_interval=DEFAULT_CLEANUP_INTERVAL):
+        """
+        :param max_size: the max number of sessions
+        :param cleanup_interval: number of writes between two cleanups
+        """
+
+        self.max_size = max(max_size, 1)
+        self.cleanup_interval = max(cleanup_interval, 1)
+
+        self.lock = threading.Lock()
+        self.writes = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+        }
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+
+    def get(self, cookie):
+        """
+        lookup the session data of the cookie
+
+        :param cookie: the session cookie
+        :return: the session data or None if there is no valid session
+        """
+
+        session = Session.query(SelfserviceSession).get(cookie)
+
+        if session is None:
+            self._count('misses')
+            return None
+
+        if session.expires <= datetime.utcnow():
+            Session.delete(session)
+            self._count('expired')
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return json.loads(session.data)
+
+    def set(self, cookie, data, expires):
+        """
+        store the session data of the cookie - the session is written
+        with the transaction of the request
+
+        :param cookie: the session cookie
+        :param data: the json serializable session data
+        :param expires: the expiration time of the session as utc datetime
+        """
+
+        Session.merge(SelfserviceSession(cookie, json.dumps(data), expires))
+
+        with self.lock:
+            self.writes += 1
+            cleanup = self.writes % self.cleanup_interval == 0
+
+        if cleanup:
+            Session.flush()
+            self._evict(datetime.utcnow())
+
+    def delete(self, cookie):
+        """
+        remove the session of the cookie
+
+        :param cookie: the session cookie
+        """
+
+        Session.query(SelfserviceSession).filter(
+            SelfserviceSession.cookie == cookie).delete(
+                synchronize_session='fetch')
+
+    def _evict(self, now):
+        """
+        remove the expired sessions and the sessions beyond max_size,
+        which would expire next
+
+        :param now: the current time as utc datetime
+        """
+
+        expired = Session.query(SelfserviceSession).filter(
+            SelfserviceSession.expires <= now).delete(
+                synchronize_session=False)
+
+        self._count('expired', expired)
+
+        total = Session.query(func.count(SelfserviceSession.cookie)).scalar()
+        surplus = total - self.max_size
+
+        if surplus <= 0:
+            return
+
+        cookies = [
+            cookie for (cookie,) in Session.query(
+                SelfserviceSession.cookie).order_by(
+                    SelfserviceSession.expires).limit(surplus)]
+
+        evicted = Session.query(SelfserviceSession).filter(
+            SelfserviceSession.cookie.in_(cookies)).delete(
+                synchronize_session=False)
+
+        self._count('evictions', evicted)
+
+    def get_stats(self):
+        """
+        get the session store statistics
+
+        :return: dict with the hits, misses, expired and evicted sessions
+                 of this process and the current number of stored sessions
+        """
+
+        with self.lock:
+            stats = dict(self.stats)
+
+        stats['size'] = Session.query(
+            func.count(SelfserviceSession.cookie)).scalar()
+
+        return stats
+
+
+SESSION_STORES = {
+    'memory': MemorySessionStore,
+    'database': DatabaseSessionStore,
+}
+
+
+def get_session_store():
+    """
+    get the process wide session store as defined by the settings
+    SELFSERVICE_SESSION_STORE and SELFSERVICE_SESSION_LIMIT - outside of
+    an application the default memory store is used
+
+    :return: the session store
+    """
+
+    backend = 'memory'
+    max_size = DEFAULT_MAX_SIZE
+
+    if has_app_context():
+        backend = current_app.config.get(
+            'SELFSERVICE_SESSION_STORE', backend)
+        max_size = current_app.config.get(
+            'SELFSERVICE_SESSION_LIMIT', max_size)
+
+    if backend not in SESSION_STORES:
+        raise ValueError('unknown selfservice session store %r' % backend)
+
+    key = (backend, max_size)
+
+    store = _session_stores.get(key)
+    if store is not None:
+        return store
+
+    with _session_stores_lock:
+
+        if key not in _session_stores:
+            _session_stores[key] = SESSION_STORES[backend](max_size=max_size)
+
+        return _session_stores[key]
+
+# eof
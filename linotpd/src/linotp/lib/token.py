@@ -59,6 +59,7 @@ import linotp.lib.policy
 
 from linotp import model
 from linotp.model import Token, createToken, Realm, TokenRealm
+from linotp.model import get_canonical_resolver_class
 
 from linotp.lib.config import getFromConfig
 
@@ -66,6 +67,17 @@ from linotp.lib.realm import createDBRealm, getRealmObject
 
 from linotp.lib.type_utils import parse_duration
 
+from linotp.lib.otp_index import INDEXED_TOKEN_TYPES
+from linotp.lib.otp_index import drop_otp_index
+from linotp.lib.otp_index import get_otp_index_window
+from linotp.lib.otp_index import is_otp_index_enabled
+from linotp.lib.otp_index import lookup_otp_index
+from linotp.lib.otp_index import split_otp_values
+
+from linotp.lib.token_counter import count_tokens
+from linotp.lib.token_counter import get_counted_state
+from linotp.lib.token_counter import remember_counted_state
+
 from linotp.lib.context import request_context as context
 from linotp.tokens import tokenclass_registry
 
@@ -187,6 +199,10 @@ class TokenHandler(object):
 
         tokenObj.update(param)
 
+        # the otp lookahead index entries of an updated token are outdated
+        if tokenNum == 1:
+            drop_otp_index(serial)
+
         if user is not None and user.login != "":
             tokenObj.setUser(user, report=True)
 
@@ -660,9 +676,8 @@ class TokenHandler(object):
         # List of (token, pin) pairs
         matching_tokens = []
 
-        tokens = self.getTokensOfType(typ=token_type,
-                                      realm=token_src_realm,
-                                      assigned="0")
+        tokens = self.get_otp_candidates([otp], typ=token_type,
+                                         realm=token_src_realm)
         for token in tokens:
 
             token_exists = token.check_otp_exist(
@@ -727,7 +742,8 @@ class TokenHandler(object):
 
         # get all tokens of the users realm, which are not assigned
 
-        tokens = self.getTokensOfType(typ=None, realm=user.realm, assigned="0")
+        tokens = self.get_otp_candidates(split_otp_values(passw),
+                                         realm=user.realm)
         for token in tokens:
 
             token_exists = -1
@@ -819,6 +835,11 @@ class TokenHandler(object):
             raise TokenAdminError("Token assign failed for %s/%s : %r"
                                   % (user.login, serial, exx), id=1105)
 
+        # the otp lookahead index holds only not assigned tokens
+
+        if report:
+            drop_otp_index(serial)
+
         log.debug("[assignToken] successfully assigned token with serial "
                   "%r to user %r" % (serial, user.login))
         return True
@@ -905,7 +926,11 @@ class TokenHandler(object):
         log.debug("Searching appropriate token for otp %r" % otp)
 
         if token_list is None:
-            token_list = self.getTokensOfType(typ, realm, assigned)
+            if assigned is not None and str(assigned) == "0":
+                token_list = self.get_otp_candidates([otp], typ, realm,
+                                                     window=window)
+            else:
+                token_list = self.getTokensOfType(typ, realm, assigned)
 
         for token in token_list:
             r = token.check_otp_exist(otp=otp, window=window)
@@ -920,8 +945,44 @@ class TokenHandler(object):
 
         return result_token
 
+    def get_otp_candidates(self, otps, typ=None, realm=None, window=None):
+        '''
+        get the not assigned tokens, which might have generated one of the
+        otp values.
+
+        With the otp lookahead index, only the indexed candidates and the
+        tokens of the types, which are not indexed, are returned - the
+        candidates still require the authoritative otp check.
+
+        :param otps: list of the possible otp values
+        :param typ: only tokens of this type
+        :param realm: only tokens of this realm
+        :param window: the lookahead window of the otp check - if not
+                       given, the token count window is used
+        :return: list of token objects
+        '''
+
+        use_index = (
+            is_otp_index_enabled() and
+            (typ is None or typ.lower() in INDEXED_TOKEN_TYPES) and
+            (window is None or int(window) <= get_otp_index_window()))
+
+        if not use_index:
+            return self.getTokensOfType(typ, realm, assigned="0")
+
+        tokens = [createTokenClassObject(token)
+                  for token in lookup_otp_index(otps, realm)]
+
+        if typ is None:
+            tokens.extend(self.getTokensOfType(
+                None, realm, assigned="0",
+                exclude_types=INDEXED_TOKEN_TYPES))
+
+        return tokens
+
     # local method
-    def getTokensOfType(self, typ=None, realm=None, assigned=None):
+    def getTokensOfType(self, typ=None, realm=None, assigned=None,
+                        exclude_types=None):
         '''
         This function returns a list of token objects of the following type.
 
@@ -936,7 +997,11 @@ class TokenHandler(object):
         if typ is not None:
             # filter for type
             sqlQuery = sqlQuery.\
-                filter(func.lower(Token.LinOtpTokenType) == typ.lower())
+                filter(Token.LinOtpTokenTypeLower == typ.lower())
+        if exclude_types:
+            sqlQuery = sqlQuery.filter(
+                ~Token.LinOtpTokenTypeLower.in_(
+                    [exclude_type.lower() for exclude_type in exclude_types]))
         if assigned is not None:
             # filter if assigned or not
             if "0" == str(assigned):
@@ -951,7 +1016,7 @@ class TokenHandler(object):
         if realm is not None:
             # filter for the realm
             sqlQuery = sqlQuery\
-                .filter(and_(func.lower(Realm.name) == realm.lower(),
+                .filter(and_(Realm.name == realm.lower(),
                              TokenRealm.realm_id == Realm.id,
                              TokenRealm.token_id == Token.LinOtpTokenId)).distinct()
 
@@ -1002,13 +1067,23 @@ class TokenHandler(object):
             #  foreign key relation could not be deleted
             #  so we do this manualy
 
+            counted_states = [get_counted_state(token) for token in tokens]
+
             for t_id in token_ids:
                 Session.query(TokenRealm).filter(
                     TokenRealm.token_id == t_id).delete()
 
+            # and the otp lookahead index entries
+
+            for serial in serials:
+                drop_otp_index(serial)
+
             Session.commit()
 
-            for token in tokens:
+            # the counted states are forgotten by the commit
+
+            for token, counted_state in zip(tokens, counted_states):
+                remember_counted_state(token, counted_state)
                 Session.delete(token)
 
         except Exception as exx:
@@ -1029,6 +1104,7 @@ class TokenHandler(object):
         for token in tokenList:
             token.addToSession(Session)
             token.setCounterWindow(countWindow)
+            drop_otp_index(token.getSerial())
 
         return len(tokenList)
 
@@ -1058,6 +1134,7 @@ class TokenHandler(object):
         for token in tokenList:
             token.addToSession(Session)
             token.setHashLib(hashlib)
+            drop_otp_index(token.getSerial())
 
         return len(tokenList)
 
@@ -1100,6 +1177,7 @@ class TokenHandler(object):
         for token in tokenList:
             token.addToSession(Session)
             token.setOtpLen(otplen)
+            drop_otp_index(token.getSerial())
 
         return len(tokenList)
 
@@ -1172,7 +1250,8 @@ class TokenHandler(object):
             log.error("[copyTokenUser] not a unique token to copy to found")
             return -2
         uid, ures, resclass = tokens_from[0].getUser()
-        tokens_to[0].setUid(uid, ures, resclass)
+        tokens_to[0].setUid(uid, ures, resclass,
+                            login=tokens_from[0].token.LinOtpOwnerLogin)
 
         self.copyTokenRealms(serial_from, serial_to)
         return 1
@@ -1405,23 +1484,16 @@ def getRolloutToken4User(user=None, serial=None, tok_type='ocra2'):
 
         # in the database could be tokens of ResolverClass:
         #    useridresolver. or useridresolveree.
-        # so we have to make sure
-        # - there is no 'useridresolveree' in the searchterm and
-        # - there is a wildcard search: second replace
-        # Remark: when the token is loaded the response to the
-        # resolver class is adjusted
+        # so we search for the canonical resolver class
 
-        user_resolver = k.replace('useridresolveree.', 'useridresolver.')
-        user_resolver = user_resolver.replace(
-            'useridresolver.', 'useridresolver%.')
+        user_resolver = get_canonical_resolver_class(k)
 
         ''' coout tokens: 0 1 or more '''
         tokens = Session.query(
             Token).filter(
                 Token.LinOtpTokenType == str(tok_type)).filter(
-                    Token.LinOtpIdResClass.like(
-                        str(user_resolver))).filter(
-                            Token.LinOtpUserid == str(user_id))
+                    Token.LinOtpIdResClassNorm == str(user_resolver)).filter(
+                        Token.LinOtpUserid == str(user_id))
 
     elif serial is not None:
         tokens = Session.query(Token).filter(
@@ -1504,16 +1576,22 @@ def getTokenInRealm(realm, active=True):
 
     You can either query only active token or also disabled tokens.
     '''
+    status = 'active' if active else 'total'
+
+    counts = count_tokens([realm.lower()], [status])
+    if counts is not None:
+        return counts[status]
+
     if active:
         sqlQuery = Session.query(TokenRealm, Realm, Token).filter(and_(
             TokenRealm.realm_id == Realm.id,
-            func.lower(Realm.name) == realm.lower(),
+            Realm.name == realm.lower(),
             Token.LinOtpIsactive == True,
             TokenRealm.token_id == Token.LinOtpTokenId)).count()
     else:
         sqlQuery = Session.query(TokenRealm, Realm).filter(and_(
             TokenRealm.realm_id == Realm.id,
-            func.lower(Realm.name) == realm.lower())).count()
+            Realm.name == realm.lower())).count()
     return sqlQuery
 
 
@@ -1548,16 +1626,15 @@ def getNumTokenUsers(resolver=None, active=True, realm=None):
 
     if realm:
         conditions += (and_(TokenRealm.realm_id == Realm.id,
-                            func.lower(Realm.name) == realm.lower(),
+                            Realm.name == realm.lower(),
                             TokenRealm.token_id == Token.LinOtpTokenId),)
         session = Session.query(TokenRealm, Realm, Token)
 
     elif resolver:
 
-        resolver = resolver.resplace('useridresolveree.', 'useridresolver.')
-        resolver = resolver.resplace('useridresolver.', 'useridresolver%.')
+        resolver = get_canonical_resolver_class(resolver)
 
-        conditions += (and_(Token.LinOtpIdResClass.like(resolver)),)
+        conditions += (and_(Token.LinOtpIdResClassNorm == resolver),)
 
     if active:
 
@@ -1577,25 +1654,25 @@ def getTokenNumResolver(resolver=None, active=True):
 
      in the database could be tokens of ResolverClass:
         useridresolver. or useridresolveree.
-     so we have to make sure
-     - there is no 'useridresolveree' in the searchterm and
-     - there is a wildcard search: second replace
-     Remark: when the token is loaded the response to the
-     resolver class is adjusted
+     so we search for the canonical resolver class
 
     :param resolver: count only the token users per resolver
     :param active: boolean - count base only on active tokens
     :return: the number of token
     '''
 
+    if not resolver:
+
+        status = 'active' if active else 'total'
+        return count_tokens(None, [status])[status]
+
     conditions = ()
 
     if resolver:
 
-        resolver = resolver.resplace('useridresolveree.', 'useridresolver.')
-        resolver = resolver.resplace('useridresolver.', 'useridresolver%.')
+        resolver = get_canonical_resolver_class(resolver)
 
-        conditions += (and_(Token.LinOtpIdResClass.like(resolver)),)
+        conditions += (and_(Token.LinOtpIdResClassNorm == resolver),)
 
     if active:
 
@@ -1606,13 +1683,19 @@ def getTokenNumResolver(resolver=None, active=True):
     return Session.query(Token).filter(condition).count()
 
 
-def token_owner_iterator():
+def token_owner_iterator(pending_only=False):
     '''
         iterate all tokens for serial and users
+
+        :param pending_only: only iterate the tokens, where the login of the
+                             owner is not yet known
     '''
 
     sqlQuery = Session.query(Token).filter(
-        model.Token.LinOtpUserid != '').all()
+        model.Token.LinOtpUserid != '')
+
+    if pending_only:
+        sqlQuery = sqlQuery.filter(model.Token.LinOtpOwnerLogin == None)
 
     for token in sqlQuery:
         userInfo = {}
@@ -1648,7 +1731,7 @@ def getTokens4UserOrSerial(user=None, serial=None, token_type=None,
         sconditions += ((Token.LinOtpIsactive == active),)
 
     if token_type:
-        sconditions += ((func.lower(Token.LinOtpTokenType) ==
+        sconditions += ((Token.LinOtpTokenTypeLower ==
                          token_type.lower()),)
 
     if serial:
@@ -1693,25 +1776,20 @@ def getTokens4UserOrSerial(user=None, serial=None, token_type=None,
                 uid, resolverClass = user_definition
                 # in the database could be tokens of ResolverClass:
                 #    useridresolver. or useridresolveree.
-                # so we have to make sure
-                # - there is no 'useridresolveree' in the searchterm and
-                # - there is a wildcard search: second replace
-                # Remark: when the token is loaded the response to the
-                # resolver class is adjusted
+                # so we search for the canonical resolver class, which
+                # together with the uid is covered by an index
 
                 uconditions = (sconditions)
 
-                resolverClass = resolverClass.replace('useridresolveree.',
-                                                      'useridresolver.')
-                resolverClass = resolverClass.replace('useridresolver.',
-                                                      'useridresolver%.')
+                resolverClass = get_canonical_resolver_class(resolverClass)
 
                 if isinstance(uid, int):
                     uconditions += ((model.Token.LinOtpUserid == "%d" % uid),)
                 else:
                     uconditions += ((model.Token.LinOtpUserid == uid),)
 
-                uconditions += ((model.Token.LinOtpIdResClass.like(resolverClass)),)
+                uconditions += ((model.Token.LinOtpIdResClassNorm ==
+                                 resolverClass),)
 
                 condition = and_(*uconditions)
                 sqlQuery = Session.query(Token).filter(condition)
@@ -2221,16 +2299,21 @@ def remove_token(token):
         Session.delete(chall)
 
     # cleanup of the realm references
+    counted_state = get_counted_state(token)
+
     token_id = token.LinOtpTokenId
     Session.query(TokenRealm).filter(
         TokenRealm.token_id == token_id).delete()
 
+    drop_otp_index(serial)
+
     # as these references seems not to be marked in the cache, we have to
     # update the cache manaualy
 
     Session.commit()
 
-    # finally remove the token
+    # finally remove the token - with its counted state before the commit
+    remember_counted_state(token, counted_state)
     Session.delete(token)
 
 # eof #########################################################################
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+token counters - the number of tokens per realm and status
+
+The token reporting, the monitoring and the license checks require the
+number of tokens per realm and status. Instead of counting the tokens for
+every event, the counters are maintained incrementally:
+
+* the counted state of a token - its realms, whether it is active and
+  whether it is assigned - is remembered, before it is changed
+* when the tokens are flushed, the differences between the remembered and
+  the new states are applied as deltas to the counters within the same
+  transaction
+
+The counters are kept for the four combinations of active / inactive and
+assigned / unassigned per realm, for the tokens without realm and for all
+tokens. The counters are reconciled with the token table by
+reconcile_token_counters(), which is run, when the counters are read and
+the last reconciliation is older than TOKEN_COUNTER_RECONCILE_INTERVAL,
+or by the maintenance interface.
+
+The number of distinct token users can not be maintained by deltas and is
+still counted by query.
+"""
+
+import logging
+import time
+
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+from flask import current_app
+from flask import has_app_context
+
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import orm
+
+from linotp.model import Realm
+from linotp.model import Token
+from linotp.model import TokenRealm
+from linotp.model import token_counter_table
+from linotp.model.meta import Session
+
+log = logging.getLogger(__name__)
+
+NO_REALM = '/:no realm:/'
+ALL_REALMS = '/:all realms:/'
+
+# the status of the marker entry, which holds the time of the last
+# reconciliation
+
+RECONCILED = '/:reconciled:/'
+
+DEFAULT_RECONCILE_INTERVAL = 86400
+
+COUNTED_STATI = ['active&assigned', 'active&unassigned',
+                 'inactive&assigned', 'inactive&unassigned']
+
+
+def _get_status(active, assigned):
+    """
+    get the counter status of an active / assigned combination
+    """
+
+    return '%s&%s' % ('active' if active else 'inactive',
+                      'assigned' if assigned else 'unassigned')
+
+
+def get_counted_state(token):
+    """
+    get the counted state of a token
+
+    :param token: the token db object
+    :return: tuple of the frozenset of realm names, active and assigned
+    """
+
+    realms = frozenset(token.getRealmNames()) or frozenset([NO_REALM])
+
+    return (realms, token.LinOtpIsactive is not False,
+            bool(token.LinOtpUserid))
+
+
+def remember_counted_state(token, counted_state=None):
+    """
+    remember the counted state of a persistent token before it is changed -
+    this must be called explicitly, before the realm references of a token
+    are removed by a query
+
+    :param token: the token db object
+    :param counted_state: the counted state, which was taken before a
+                          commit, as a commit forgets the counted states
+    """
+
+    if token._counted_state is not None:
+        return
+
+    state = sa.inspect(token)
+    if not state.persistent:
+        return
+
+    if counted_state is None:
+        with state.session.no_autoflush:
+            counted_state = get_counted_state(token)
+
+    token._counted_state = counted_state
+
+    state.session.info.setdefault('counted_tokens', set()).add(token)
+
+
+def _remember_counted_state(token, *_args):
+    remember_counted_state(token)
+
+
+def _add_deltas(deltas, counted_state, value):
+    """
+    add the deltas of a counted state to the dict of deltas
+    """
+
+    realms, active, assigned = counted_state
+    status = _get_status(active, assigned)
+
+    for realm in realms:
+        deltas[(realm, status)] += value
+
+    deltas[(ALL_REALMS, status)] += value
+
+
+def update_token_counters(deltas):
+    """
+    apply the deltas to the token counters - a counter, which does not
+    exist yet, is created
+
+    :param deltas: dict of (realm, status) and the delta
+    """
+
+    table = token_counter_table
+
+    for (realm, status), delta in deltas.items():
+
+        if not delta:
+            continue
+
+        result = Session.execute(
+            table.update().where(and_(
+                table.c.realm == realm, table.c.status == status)).values(
+                    counter=table.c.counter + delta))
+
+        if result.rowcount == 0:
+            Session.execute(table.insert().values(
+                realm=realm, status=status, counter=delta))
+
+
+def count_new_tokens(counted_states):
+    """
+    count the tokens, which are inserted without the orm, e.g. by the bulk
+    token import
+
+    :param counted_states: list of the counted states of the new tokens
+    """
+
+    deltas = defaultdict(int)
+
+    for counted_state in counted_states:
+        _add_deltas(deltas, counted_state, 1)
+
+    update_token_counters(deltas)
+
+
+def _count_token_changes(session, _flush_context, _instances):
+    """
+    apply the changes of the counted token states to the token counters
+    """
+
+    deltas = defaultdict(int)
+    counted_tokens = session.info.setdefault('counted_tokens', set())
+
+    for token in session.new:
+        if isinstance(token, Token):
+            counted_state = get_counted_state(token)
+            _add_deltas(deltas, counted_state, 1)
+
+            token._counted_state = counted_state
+            counted_tokens.add(token)
+
+    for token in session.dirty:
+        if isinstance(token, Token) and token._counted_state is not None:
+
+            counted_state = get_counted_state(token)
+            if counted_state == token._counted_state:
+                continue
+
+            _add_deltas(deltas, token._counted_state, -1)
+            _add_deltas(deltas, counted_state, 1)
+
+            token._counted_state = counted_state
+
+    for token in session.deleted:
+        if isinstance(token, Token):
+            counted_state = token._counted_state or get_counted_state(token)
+            _add_deltas(deltas, counted_state, -1)
+
+            token._counted_state = None
+
+    if deltas:
+        update_token_counters(deltas)
+
+
+def _forget_counted_states(session, _previous_transaction):
+    """
+    on rollback the remembered states are not valid anymore
+    """
+
+    for token in session.info.pop('counted_tokens', ()):
+        token._counted_state = None
+
+
+def _clear_counted_tokens(session):
+    """
+    after the commit the counted states are remembered again on the next
+    change, as the tokens might be changed meanwhile by other sessions
+    """
+
+    for token in session.info.pop('counted_tokens', ()):
+        token._counted_state = None
+
+
+sa.event.listen(Token.LinOtpIsactive, 'set', _remember_counted_state)
+sa.event.listen(Token.LinOtpUserid, 'set', _remember_counted_state)
+sa.event.listen(Token.realms, 'append', _remember_counted_state)
+sa.event.listen(Token.realms, 'remove', _remember_counted_state)
+sa.event.listen(Token.realms, 'bulk_replace', _remember_counted_state)
+
+sa.event.listen(orm.Session, 'before_flush', _count_token_changes)
+sa.event.listen(orm.Session, 'after_soft_rollback', _forget_counted_states)
+sa.event.listen(orm.Session, 'after_commit', _clear_counted_tokens)
+
+
+def reconcile_token_counters():
+    """
+    recount the tokens per realm and status and replace the token counters
+
+    :return: dict with the number of counted tokens
+    """
+
+    assigned = sa.case(
+        [(func.coalesce(Token.LinOtpUserid, '') == '', 0)], else_=1)
+
+    deltas = defaultdict(int)
+
+    # the tokens per realm
+
+    query = Session.query(
+        Realm.name, Token.LinOtpIsactive, assigned,
+        func.count(sa.distinct(Token.LinOtpTokenId))).filter(
+            TokenRealm.realm_id == Realm.id,
+            TokenRealm.token_id == Token.LinOtpTokenId).group_by(
+                Realm.name, Token.LinOtpIsactive, assigned)
+
+    for realm, active, is_assigned, count in query:
+        deltas[(realm, _get_status(active, is_assigned))] += count
+
+    # the tokens without realm
+
+    query = Session.query(
+        Token.LinOtpIsactive, assigned, func.count(Token.LinOtpTokenId)).filter(
+            ~sa.exists().where(
+                TokenRealm.token_id == Token.LinOtpTokenId)).group_by(
+                    Token.LinOtpIsactive, assigned)
+
+    for active, is_assigned, count in query:
+        deltas[(NO_REALM, _get_status(active, is_assigned))] += count
+
+    # all tokens
+
+    query = Session.query(
+        Token.LinOtpIsactive, assigned, func.count(Token.LinOtpTokenId)
+        ).group_by(Token.LinOtpIsactive, assigned)
+
+    total = 0
+    for active, is_assigned, count in query:
+        deltas[(ALL_REALMS, _get_status(active, is_assigned))] += count
+        total += count
+
+    Session.execute(token_counter_table.delete())
+
+    rows = [{'realm': realm, 'status': status, 'counter': count}
+            for (realm, status), count in deltas.items()]
+
+    rows.append({'realm': ALL_REALMS, 'status': RECONCILED,
+                 'counter': int(time.time())})
+
+    Session.execute(token_counter_table.insert(), rows)
+
+    log.info("token counters reconciled: %d tokens", total)
+
+    return {'tokens': total, 'counters': len(deltas)}
+
+
+def invalidate_token_counters():
+    """
+    invalidate the token counters, which are reconciled, when they are
+    read the next time
+    """
+
+    Session.execute(token_counter_table.delete().where(
+        token_counter_table.c.status == RECONCILED))
+
+
+def _get_reconcile_interval():
+
+    if has_app_context():
+        return current_app.config.get(
+            'TOKEN_COUNTER_RECONCILE_INTERVAL', DEFAULT_RECONCILE_INTERVAL)
+
+    return DEFAULT_RECONCILE_INTERVAL
+
+
+def _read_counters(realms):
+    """
+    read the token counters of the realms
+
+    :return: tuple of the time of the last reconciliation and the dict of
+             realm and status with the counter
+    """
+
+    table = token_counter_table
+
+    query = sa.select([
+        table.c.realm, table.c.status, func.sum(table.c.counter)]).where(
+            table.c.realm.in_(set(realms) | set([ALL_REALMS]))).group_by(
+                table.c.realm, table.c.status)
+
+    counters = defaultdict(int)
+    reconciled = None
+
+    for realm, status, count in Session.execute(query):
+        if status == RECONCILED:
+            reconciled = count
+        else:
+            counters[(realm, status)] = int(count or 0)
+
+    return reconciled, counters
+
+
+def _match_status(stat, active, assigned):
+    """
+    check if the counter status matches the requested status like
+    'active', 'unassigned' or 'active&unassigned' - as by the monitoring
+    token count, an unknown status matches all tokens
+    """
+
+    if '&' in stat:
+        stati = stat.split('&')
+        return ('assigned' in stati) == assigned and (
+            'active' in stati) == active
+
+    if stat == 'assigned':
+        return assigned
+    if stat == 'unassigned':
+        return not assigned
+    if stat == 'active':
+        return active
+    if stat == 'inactive':
+        return not active
+
+    return True
+
+
+def count_tokens(realms=None, stati=('total',)):
+    """
+    get the number of tokens per status from the token counters
+
+    :param realms: list of realm names, which might contain NO_REALM - the
+                   tokens which are in several of the realms are counted
+                   once. If None, all tokens are counted.
+    :param stati: list of the requested stati like 'total', 'active',
+                  'unassigned' or 'active&unassigned' - the number of
+                  'total users' is not counted
+    :return: dict with the number of tokens per status or None, if the
+             tokens of the realms could not be counted by the counters
+    """
+
+    # the tokens of several realms could only be counted by the counters,
+    # if all realms are requested
+
+    if realms is None:
+        add_realms, sub_realms = [ALL_REALMS], []
+
+    elif len(realms) == 1:
+        add_realms, sub_realms = [realms[0]], []
+
+    else:
+        realm_names = set(name for (name,) in Session.query(Realm.name))
+
+        if not realm_names.issubset(realms):
+            return None
+
+        if NO_REALM in realms:
+            add_realms, sub_realms = [ALL_REALMS], []
+        else:
+            add_realms, sub_realms = [ALL_REALMS], [NO_REALM]
+
+    counter_realms = add_realms + sub_realms
+
+    reconciled, counters = _read_counters(counter_realms)
+
+    if (reconciled is None or
+            time.time() - reconciled > _get_reconcile_interval()):
+        reconcile_token_counters()
+        reconciled, counters = _read_counters(counter_realms)
+
+    result = {}
+
+    for stat in stati:
+
+        if stat == 'total users':
+            continue
+
+        count = 0
+
+        for active in (True, False):
+            for assigned in (True, False):
+
+                if not _match_status(stat, active, assigned):
+                    continue
+
+                status = _get_status(active, assigned)
+
+                for realm in add_realms:
+                    count += counters[(realm, status)]
+                for realm in sub_realms:
+                    count -= counters[(realm, status)]
+
+        result[stat] = count
+
+    return result
+
+# eof #
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+token owner login - the indexed login of the token owners
+
+The wildcard search for the tokens of users like 'max*' can not be done by
+the user id, which is stored in the token, but requires the login name of
+the owner. To not look up the owner of every assigned token in its
+resolver on every search, the lower case login of the owner is stored in
+the indexed token column LinOtpOwnerLogin, so that the search becomes a
+LIKE query.
+
+The login is set, when a user is assigned to the token and cleared, when
+the token is unassigned. If the login is not known when the owner is set,
+e.g. after the database migration, the column is None. These pending
+tokens are still matched by looking up their owners, until the login is
+filled in by refresh_owner_logins(), which is run by the maintenance
+interface. The refresh as well catches up with renamed users.
+"""
+
+import logging
+
+from collections import defaultdict
+
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+
+from linotp.lib.user import NoResolverFound
+from linotp.lib.user import getUserInfos
+
+from linotp.model import Token
+from linotp.model import token_table
+from linotp.model.meta import Session
+
+log = logging.getLogger(__name__)
+
+# the login of owners, which could not be found in their resolver
+
+NO_USER_INFO = '/:no user info:/'
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def get_owner_login(user_id, login):
+    """
+    get the owner login to be stored with the token
+
+    :param user_id: the user id of the owner
+    :param login: the login of the owner or None if not known
+    :return: the lower case login, '' for no owner or None if the login is
+             not known
+    """
+
+    if not user_id:
+        return ''
+
+    if not login:
+        return None
+
+    return login.lower()
+
+
+def owner_login_condition(search_expression):
+    """
+    create the condition for the tokens, whose owner login matches a
+    wildcard search expression
+
+    :param search_expression: the lower case login with '*' as wildcard
+    :return: sql condition on the owner login column
+    """
+
+    pattern = search_expression.replace('\\', '\\\\')
+    pattern = pattern.replace('%', '\\%').replace('_', '\\_')
+    pattern = pattern.replace('*', '%')
+
+    return Token.LinOtpOwnerLogin.like(pattern, escape='\\')
+
+
+def refresh_owner_logins(pending_only=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    fill in and update the owner login of the assigned tokens
+
+    the tokens are processed in chunks, where the owners of a chunk are
+    looked up with one request per resolver. An already known login is only
+    replaced, if the owner is found with a different login, so that a not
+    reachable resolver does not drop the logins.
+
+    :param pending_only: only fill in the tokens with not yet known login
+    :param chunk_size: the number of tokens, which are processed at once
+    :return: dict with the number of checked and updated tokens
+    """
+
+    stats = {'checked': 0, 'updated': 0}
+
+    update = token_table.update().where(
+        token_table.c.LinOtpTokenId == bindparam('b_token_id')).values(
+            LinOtpOwnerLogin=bindparam('b_owner_login'))
+
+    last_id = 0
+
+    while True:
+
+        query = Session.query(
+            Token.LinOtpTokenId, Token.LinOtpUserid,
+            Token.LinOtpIdResClass, Token.LinOtpOwnerLogin).filter(
+                and_(Token.LinOtpUserid != '',
+                     Token.LinOtpTokenId > last_id))
+
+        if pending_only:
+            query = query.filter(Token.LinOtpOwnerLogin == None)
+
+        tokens = query.order_by(Token.LinOtpTokenId).limit(chunk_size).all()
+
+        if not tokens:
+            break
+
+        last_id = tokens[-1].LinOtpTokenId
+
+        owners = defaultdict(set)
+        for token in tokens:
+            owners[token.LinOtpIdResClass].add(token.LinOtpUserid)
+
+        user_infos = {}
+        for resolver_spec, user_ids in owners.items():
+
+            try:
+                resolver_infos = getUserInfos(list(user_ids), resolver_spec)
+            except NoResolverFound:
+                log.warning('no resolver %r found for the token owners',
+                            resolver_spec)
+                resolver_infos = {}
+
+            for user_id, user_info in resolver_infos.items():
+                user_infos[(resolver_spec, user_id)] = user_info
+
+        changes = []
+
+        for token in tokens:
+
+            user_info = user_infos.get(
+                (token.LinOtpIdResClass, token.LinOtpUserid))
+
+            if user_info and user_info.get('username'):
+                owner_login = user_info['username'].lower()
+
+            elif token.LinOtpOwnerLogin is None:
+                owner_login = NO_USER_INFO
+
+            else:
+                continue
+
+            if owner_login != token.LinOtpOwnerLogin:
+                changes.append({'b_token_id': token.LinOtpTokenId,
+                                'b_owner_login': owner_login})
+
+        if changes:
+            Session.execute(update, changes)
+
+        stats['checked'] += len(tokens)
+        stats['updated'] += len(changes)
+
+    log.info('owner logins refreshed: %r', stats)
+
+    return stats
+
+# eof
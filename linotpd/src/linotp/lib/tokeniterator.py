@@ -33,7 +33,10 @@ import fnmatch
 
 import json
 
+from collections import defaultdict
+
 from sqlalchemy import or_, and_, not_
+from sqlalchemy.orm.attributes import set_committed_value
 
 import linotp
 from linotp.lib.error import UserError
@@ -42,9 +45,10 @@ from linotp.lib.token import (getTokenRealms,
                               getTokens4UserOrSerial,
                               token_owner_iterator
                               )
-from linotp.lib.user import getUserId, getUserInfo
+from linotp.lib.user import getUserId, getUserInfo, getUserInfos
 from linotp.lib.user import User
 from linotp.lib.realm import getRealms
+from linotp.lib.token_owner import owner_login_condition
 
 from linotp.lib.user import NoResolverFound
 
@@ -57,6 +61,9 @@ from linotp.lib.config  import getFromConfig
 
 log = logging.getLogger(__name__)
 
+# number of tokens, which are fetched at once in the streaming mode
+
+STREAM_CHUNK_SIZE = 500
 
 def _compile_regex(search_text):
     """
@@ -252,7 +259,14 @@ class TokenIterator(object):
         ## handle case, when nothing found in former cases
         if searchType == "wildcard":
 
-            serials = _user_expression_match(loginUser, token_owner_iterator())
+            # the owners are matched by the indexed owner login - only the
+            # owners of the tokens, whose login is not yet known, have to
+            # be looked up
+
+            ucondition = owner_login_condition(loginUser)
+
+            serials = _user_expression_match(
+                loginUser, token_owner_iterator(pending_only=True))
 
             # to prevent warning, we check is serials are found
             # SAWarning: The IN-predicate on
@@ -262,9 +276,9 @@ class TokenIterator(object):
             # alternative strategies for improved performance.
 
             if len(serials) > 0:
-                ucondition = and_(Token.LinOtpTokenSerialnumber.in_(serials))
-            else:
-                ucondition = and_(Token.LinOtpTokenSerialnumber == '')
+                ucondition = or_(
+                    ucondition, Token.LinOtpTokenSerialnumber.in_(serials))
+
         return ucondition
 
     def _get_filter_confition(self, filter):
@@ -453,6 +467,7 @@ class TokenIterator(object):
                 condTuple += (conn,)
 
         condition = and_(*condTuple)
+        self.condition = condition
 
         order = Token.LinOtpTokenDesc
 
@@ -504,7 +519,7 @@ class TokenIterator(object):
 
             log.debug("[TokenIterator] DB-Query returned # of objects: %i" % self.tokens)
             self.pagesize = self.tokens
-            self.it = iter(self.toks)
+            self.it = None
             return
 
         try:
@@ -536,7 +551,7 @@ class TokenIterator(object):
         self.pagesize = pagesize
         self.toks = self.toks.slice(start, stop)
 
-        self.it = iter(self.toks)
+        self.it = None
 
         return
 
@@ -547,7 +562,7 @@ class TokenIterator(object):
                   "page"    : self.page}
         return resSet
 
-    def getUserDetail(self, tok):
+    def getUserDetail(self, tok, user_infos=None):
         userInfo = {}
         uInfo = {}
 
@@ -564,15 +579,21 @@ class TokenIterator(object):
 
             uInfo = None
 
-            try:
+            owner = (tok.LinOtpIdResClass, tok.LinOtpUserid)
 
-                uInfo = getUserInfo(
-                                tok.LinOtpUserid,
-                                tok.LinOtpIdResolver,
-                                tok.LinOtpIdResClass)
+            if user_infos is not None and owner in user_infos:
+                uInfo = user_infos[owner]
 
-            except NoResolverFound:
-                log.error("no user info found!")
+            else:
+                try:
+
+                    uInfo = getUserInfo(
+                                    tok.LinOtpUserid,
+                                    tok.LinOtpIdResolver,
+                                    tok.LinOtpIdResClass)
+
+                except NoResolverFound:
+                    log.error("no user info found!")
 
             if uInfo is not None and len(uInfo) > 0:
                 if "description" in uInfo:
@@ -593,15 +614,143 @@ class TokenIterator(object):
 
         return (userInfo, uInfo)
 
+    def _get_user_infos(self, tokens):
+        """
+        get the owner info of a chunk of tokens - the owners are grouped by
+        their resolver, so that every resolver is asked only once for all
+        of its users
+
+        :param tokens: list of token db objects
+        :return: dict with the user info per (resolver spec, user id)
+        """
+
+        owners = defaultdict(set)
+
+        for tok in tokens:
+            if tok.LinOtpUserid:
+                owners[tok.LinOtpIdResClass].add(tok.LinOtpUserid)
+
+        user_infos = {}
+
+        for resolver_spec, user_ids in owners.items():
+
+            try:
+                resolver_infos = getUserInfos(list(user_ids), resolver_spec)
+
+            except NoResolverFound:
+                log.error("no user info found!")
+                resolver_infos = {}
+
+            for user_id in user_ids:
+                user_infos[(resolver_spec, user_id)] = resolver_infos.get(
+                    user_id)
+
+        return user_infos
+
+    @staticmethod
+    def _prefetch_realms(tokens):
+        """
+        load the realms of a chunk of tokens with one query instead of one
+        query per token
+
+        :param tokens: list of token db objects
+        """
+
+        token_realms = defaultdict(list)
+
+        token_ids = [tok.LinOtpTokenId for tok in tokens]
+
+        realm_query = Session.query(TokenRealm.token_id, Realm).join(
+            Realm, Realm.id == TokenRealm.realm_id).filter(
+                TokenRealm.token_id.in_(token_ids))
+
+        for token_id, realm in realm_query:
+            token_realms[token_id].append(realm)
+
+        for tok in tokens:
+            set_committed_value(
+                tok, 'realms', token_realms[tok.LinOtpTokenId])
+
+    def iterate_chunked(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        iterate through the token descriptions, which are fetched chunk by
+        chunk, ordered by the token id
+
+        every chunk is loaded by its own query, which continues after the
+        last token id of the previous chunk, so that no cursor stays open
+        while the realms and the owner info are looked up and the memory
+        footprint does not depend on the number of tokens
+
+        :param chunk_size: the number of tokens, which are fetched at once
+        :return: generator of the token description dicts
+        """
+
+        query = Session.query(Token).filter(self.condition).order_by(
+            Token.LinOtpTokenId).distinct()
+
+        last_id = None
+
+        while True:
+
+            chunk_query = query
+            if last_id is not None:
+                chunk_query = query.filter(Token.LinOtpTokenId > last_id)
+
+            chunk = chunk_query.limit(chunk_size).all()
+            if not chunk:
+                return
+
+            last_id = chunk[-1].LinOtpTokenId
+
+            for desc in self._describe_tokens(chunk):
+                yield desc
+
+    def _describe_tokens(self, tokens):
+        """
+        get the token descriptions of a chunk of tokens - the realms and the
+        owner info are looked up once for the whole chunk
+
+        :param tokens: list of token db objects
+        :return: generator of the token description dicts
+        """
+
+        self._prefetch_realms(tokens)
+        user_infos = self._get_user_infos(tokens)
+
+        for tok in tokens:
+            desc = tok.get_vars(save=True)
+            (userInfo, _uInfo) = self.getUserDetail(tok, user_infos)
+            desc.update(userInfo)
+
+            yield desc
+
+    def _iterate_page(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        iterate through the token descriptions of the sorted page
+
+        the tokens of the page are loaded at once, so that no cursor stays
+        open while the owner info is looked up chunk by chunk
+
+        :param chunk_size: the number of tokens, whose owners are looked up
+                           at once
+        :return: generator of the token description dicts
+        """
+
+        tokens = self.toks.all()
+
+        for start in range(0, len(tokens), chunk_size):
+            for desc in self._describe_tokens(tokens[start:start + chunk_size]):
+                yield desc
+
     def __next__(self):
 
-        tok = next(self.it)
-        desc = tok.get_vars(save=True)
-        ''' add userinfo to token description '''
-        (userInfo, ret) = self.getUserDetail(tok)
-        desc.update(userInfo)
+        # the tokens are fetched chunk wise, so that the owner info of a
+        # page is looked up with one request per resolver
+
+        if self.it is None:
+            self.it = self._iterate_page()
 
-        return desc
+        return next(self.it)
 
     def __iter__(self):
         return self
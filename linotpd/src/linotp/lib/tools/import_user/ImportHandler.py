@@ -79,6 +79,26 @@ class ImportHandler(object):
 
     # ---------------------------------------------------------------------- --
 
+    # bulk interface, used by the bulk user import
+
+    def prepare_bulk(self):
+        """
+        external steps called from the bulk UserImport
+        - return all former users of the import as dict by userid
+        """
+        raise NotImplementedError
+
+    def add_users(self, users):
+        raise NotImplementedError
+
+    def update_users(self, users):
+        raise NotImplementedError
+
+    def delete_users(self, user_ids):
+        raise NotImplementedError
+
+    # ---------------------------------------------------------------------- --
+
     # inner class to process the orm user object
 
     class User(object):
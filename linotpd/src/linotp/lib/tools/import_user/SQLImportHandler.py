@@ -35,7 +35,7 @@
 import logging
 import json
 
-from sqlalchemy import schema, types
+from sqlalchemy import and_, bindparam, schema, types
 from sqlalchemy.engine import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
@@ -347,6 +347,89 @@ class SQLImportHandler(ImportHandler):
 
         if del_user:
             session.delete(del_user[0])
+
+    # ---------------------------------------------------------------------- --
+
+    # bulk user functions, which work on dicts of the user entries
+
+    def prepare_bulk(self):
+        """
+        external steps called from the bulk UserImport
+
+        - create the table for the users
+        - load all already available users of this groupid in one query
+
+        :return: dict of the user entries by userid
+        """
+        self._create_table()
+
+        session = self.db_context.get_session()
+
+        user_entries = self.User.user_entries
+        columns = [getattr(self.User, entry) for entry in user_entries]
+
+        former_users = {}
+
+        for row in session.query(*columns).filter(
+                self.User.groupid == self.groupid):
+
+            former_user = dict(zip(user_entries, row))
+            former_users[former_user['userid']] = former_user
+
+        return former_users
+
+    def add_users(self, users):
+        """
+        bulk insert of users
+
+        :param users: list of dicts with all user entries
+        """
+
+        session = self.db_context.get_session()
+
+        rows = [dict(user, groupid=self.groupid) for user in users]
+
+        session.execute(self.User.__table__.insert(), rows)
+
+    def update_users(self, users):
+        """
+        bulk update of users
+
+        :param users: list of dicts with all user entries
+        """
+
+        session = self.db_context.get_session()
+
+        table = self.User.__table__
+
+        statement = table.update().where(and_(
+            table.c.groupid == bindparam('b_groupid'),
+            table.c.userid == bindparam('b_userid')))
+
+        rows = []
+        for user in users:
+            row = dict(user, b_groupid=self.groupid, b_userid=user['userid'])
+            del row['userid']
+            row.pop('groupid', None)
+            rows.append(row)
+
+        session.execute(statement, rows)
+
+    def delete_users(self, user_ids):
+        """
+        bulk delete of users
+
+        :param user_ids: list of the uniqe identifiers of the users
+        """
+
+        session = self.db_context.get_session()
+
+        table = self.User.__table__
+
+        session.execute(table.delete().where(and_(
+            table.c.groupid == self.groupid,
+            table.c.userid.in_(user_ids))))
+
     # ---------------------------------------------------------------------- --
 
     # inner class to process the orm user object
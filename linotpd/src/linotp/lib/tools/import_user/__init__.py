@@ -36,14 +36,51 @@ Engine = meta.engine
 
 """
 import csv
+import io
 import json
+import os
 
 import logging
+
+from concurrent.futures import ProcessPoolExecutor
+
+from linotp.lib.crypto import utils
 from linotp.lib.tools.import_user.ImportHandler import ImportHandler
 
 
 log = logging.getLogger(__name__)
 
+# the number of users, which are written at once by the bulk import
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# below this number of passwords, the passwords are hashed without a pool
+
+MIN_POOL_PASSWORDS = 100
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    hash the plaintext passwords - as the hashing is cpu bound, the
+    passwords are hashed in a process pool
+
+    :param passwords: list of plaintext passwords
+    :param processes: the number of processes - default is the cpu count
+    :return: list of the password hashes
+    """
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes <= 1 or len(passwords) < MIN_POOL_PASSWORDS:
+        return [utils.crypt_password(password) for password in passwords]
+
+    chunksize = max(len(passwords) // (processes * 4), 1)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(utils.crypt_password, passwords,
+                             chunksize=chunksize))
+
 
 class FormatReader(object):
     """
@@ -172,6 +209,7 @@ class UserImport(object):
         users_modified = {}
 
         processed_users = {}
+        processed_usernames = set()
 
         former_user_by_id = self.import_handler.prepare()
 
@@ -192,12 +230,13 @@ class UserImport(object):
                     continue
 
                 # prevent processing user multiple times
-                if (user.userid in list(processed_users.keys()) or
-                    user.username in list(processed_users.values())):
+                if (user.userid in processed_users or
+                    user.username in processed_usernames):
                     raise Exception("Violation of unique constraint - "
                                     "duplicate user in data: %r" % user)
                 else:
                     processed_users[user.userid] = user.username
+                    processed_usernames.add(user.username)
 
                 # search for the user
 
@@ -252,6 +291,205 @@ class UserImport(object):
         finally:
             self.import_handler.close()
 
+    def get_user_entries_from_data(self, csv_data, format_reader):
+        """
+        stream the rows of the csv data as dicts of the mapped user entries
+
+        :param csv_data: the csv data as string or as iterable of lines
+        :param format_reader: the reader for the csv format
+        :return: generator of dicts with the user entries
+        """
+
+        if isinstance(csv_data, str):
+            csv_data = io.StringIO(csv_data)
+
+        reader = csv.reader(csv_data,
+                            delimiter=format_reader.delimiter,
+                            quotechar=format_reader.quotechar)
+
+        user_columns = [
+            (entry, self.user_column_mapping[entry])
+            for entry in self.import_handler.User.user_entries
+            if self.user_column_mapping.get(entry, -1) != -1]
+
+        for row in reader:
+
+            if not row:
+                continue
+
+            row = format_reader.prepare_row(row)
+
+            user = {}
+
+            for entry, column_id in user_columns:
+                if column_id < len(row):
+                    user[entry] = row[column_id]
+
+            yield user
+
+    def import_csv_users_bulk(self, csv_data, dryrun=False,
+                              format_reader=DefaultFormatReader,
+                              passwords_in_plaintext=False,
+                              chunk_size=DEFAULT_CHUNK_SIZE,
+                              processes=None, progress=None):
+        """
+        insert, update and delete users in bulk
+
+        other than the import_csv_users, the former users of the group are
+        loaded at once and compared with the streamed csv users by their
+        userid. The plaintext passwords of the created and modified users are
+        hashed in a process pool and the changes are written in chunks.
+
+        :param csv_data: the csv data as string or as iterable of lines
+        :param dryrun: only determine the changes
+        :param format_reader: the reader for the csv format
+        :param passwords_in_plaintext: hash the passwords of the csv data
+        :param chunk_size: the number of users written at once
+        :param processes: the number of password hashing processes
+        :param progress: optional callback, which is called with the
+                         stage, the number of done and of all users
+        :return: the dict with the created, updated, modified and deleted
+                 users - the same as from the import_csv_users
+        """
+
+        users_deleted = {}
+        users_created = {}
+        users_not_modified = {}
+        users_modified = {}
+
+        processed_usernames = set()
+
+        user_entries = [
+            entry for entry in self.import_handler.User.user_entries
+            if entry != 'groupid']
+
+        # the plaintext passwords are hashed with a new salt on every
+        # import, so they cannot be compared
+
+        compared_entries = [
+            entry for entry in user_entries
+            if not (entry == 'password' and passwords_in_plaintext)]
+
+        def report(stage, done, total):
+            log.info("user import %s: %d of %d users", stage, done, total)
+            if progress:
+                progress(stage, done, total)
+
+        former_users = self.import_handler.prepare_bulk()
+
+        try:
+
+            created = []
+            modified = []
+
+            # -------------------------------------------------------------- --
+
+            # determine the created and modified users from the csv data
+
+            for user in self.get_user_entries_from_data(
+                                                csv_data, format_reader):
+
+                # only store valid users that have a userid and a username
+
+                userid = user.get('userid')
+                username = user.get('username')
+
+                if not userid or not username:
+                    continue
+
+                # prevent processing user multiple times
+
+                if (userid in users_created or
+                        userid in users_modified or
+                        userid in users_not_modified or
+                        username in processed_usernames):
+                    raise Exception("Violation of unique constraint - "
+                                    "duplicate user in data: %r" % user)
+
+                processed_usernames.add(username)
+
+                # not mapped user entries are stored with the column default
+
+                for entry in user_entries:
+                    if entry not in user:
+                        user[entry] = ''
+
+                former_user = former_users.pop(userid, None)
+
+                if former_user is None:
+                    users_created[userid] = username
+                    created.append(user)
+
+                elif any(former_user[entry] != user[entry]
+                         for entry in compared_entries):
+                    users_modified[userid] = username
+                    modified.append(user)
+
+                else:
+                    users_not_modified[userid] = username
+
+            # all former users, which are not in the csv data, are deleted
+
+            for del_userid, del_user in former_users.items():
+                users_deleted[del_userid] = del_user['username']
+
+            result = {
+                'created': users_created,
+                'updated': users_not_modified,
+                'modified': users_modified,
+                'deleted': users_deleted,
+                }
+
+            if dryrun:
+                return result
+
+            # -------------------------------------------------------------- --
+
+            # hash the plaintext passwords of the created and modified users
+
+            changed = created + modified
+
+            if passwords_in_plaintext and changed:
+
+                report('hashing', 0, len(changed))
+
+                password_hashes = hash_passwords(
+                    [user['password'] for user in changed],
+                    processes=processes)
+
+                for user, password_hash in zip(changed, password_hashes):
+                    user['password'] = password_hash
+
+                report('hashing', len(changed), len(changed))
+
+            # -------------------------------------------------------------- --
+
+            # write the changes in chunks
+
+            for stage, users, write in [
+                    ('create', created, self.import_handler.add_users),
+                    ('update', modified, self.import_handler.update_users),
+                    ('delete', list(users_deleted.keys()),
+                     self.import_handler.delete_users)]:
+
+                for start in range(0, len(users), chunk_size):
+                    write(users[start:start + chunk_size])
+                    report(stage, min(start + chunk_size, len(users)),
+                           len(users))
+
+            self.import_handler.commit()
+
+            return result
+
+        except Exception as exx:
+
+            self.import_handler.rollback()
+            log.exception(exx)
+            raise exx
+
+        finally:
+            self.import_handler.close()
+
 # ------------------------------------------------------------------------- --
 
 
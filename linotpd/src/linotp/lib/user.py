@@ -1641,6 +1641,77 @@ def getUserInfo(userid, resolver, resolver_spec):
     return userInfo
 
 
+def getUserInfos(userids, resolver_spec):
+    """
+    get the user info of several users of one resolver - the users, which
+    are not already cached, are looked up at once by the resolver
+
+    :param userids: list of the unique user identifiers
+    :param resolver_spec: the resolver identifier + name
+    :return: dictionary with the user info per user id, which is empty, if
+             no user info could be retreived
+    """
+
+    log.debug("[getUserInfos] uids:%r class:%r", userids, resolver_spec)
+
+    user_infos = {}
+    missing = []
+
+    user_lookup_cache = _get_user_lookup_cache(resolver_spec)
+
+    for userid in set(userids):
+
+        if not userid:
+            continue
+
+        key = {'login': None,
+               'user_id': userid,
+               'resolver_spec': resolver_spec}
+
+        p_key = json.dumps(key)
+
+        if (p_key in request_context['UserLookup'] or
+                (user_lookup_cache and user_lookup_cache.has_key(p_key))):
+
+            _login, _user_id, user_info = lookup_user_in_resolver(
+                                                None, userid, resolver_spec)
+
+            user_infos[userid] = user_info or {}
+            continue
+
+        missing.append(userid)
+
+    if not missing:
+        return user_infos
+
+    resolver = getResolverObject(resolver_spec)
+
+    if not resolver:
+        log.error('[resolver with spec %r not found!]', resolver_spec)
+        raise NoResolverFound("Failed to access Resolver:"
+                              " %r" % resolver_spec)
+
+    try:
+        resolver_infos = resolver.getUserInfos(missing)
+
+    except ResolverNotAvailable:
+        log.error('unable to connect to %r', resolver_spec)
+        resolver_infos = {}
+
+    for userid in missing:
+
+        user_info = resolver_infos.get(userid) or {}
+        user_infos[userid] = user_info
+
+        # feed the user lookup caches with the fetched user info
+
+        if 'username' in user_info and 'userid' in user_info:
+            lookup_user_in_resolver(
+                None, userid, resolver_spec, user_info=user_info)
+
+    return user_infos
+
+
 def getUserDetail(user):
     '''
     Returns userinfo of an user
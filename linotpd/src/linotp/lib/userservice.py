@@ -68,6 +68,7 @@ from linotp.lib.user import (getUserInfo,
                              getUserId)
 
 from linotp.lib.realm import getDefaultRealm
+from linotp.lib.session_store import get_session_store
 from linotp.lib.context import request_context
 
 from linotp.lib.type_utils import DEFAULT_TIMEFORMAT as TIMEFORMAT
@@ -81,7 +82,6 @@ SECRET_LEN = 32
 
 
 Cookie_Secret = binascii.hexlify(os.urandom(SECRET_LEN))
-Cookie_Cache = {}
 
 
 def get_userinfo(user):
@@ -182,7 +182,12 @@ def create_auth_cookie(user, client, state='authenticated', state_data=None):
     digest = hmac.new(key, hash_data, digestmod=hashlib.sha256).digest()
     auth_cookie = base64.urlsafe_b64encode(digest).decode().strip("=")
 
-    Cookie_Cache[auth_cookie] = data
+    session_store = get_session_store()
+
+    if session_store.shared:
+        data = _serialize_session(data)
+
+    session_store.set(auth_cookie, data, expires)
 
     return auth_cookie, expires, expiration
 
@@ -196,7 +201,7 @@ def get_cookie_authinfo(cookie):
     :return: triple of user, state and state_data
     """
 
-    data = Cookie_Cache.get(cookie)
+    data = _get_session(cookie)
 
     if not data:
         return None, None, None, None
@@ -225,8 +230,7 @@ def remove_auth_cookie(cookie):
     :return: boolean
     """
 
-    if cookie in Cookie_Cache:
-        del Cookie_Cache[cookie]
+    get_session_store().delete(cookie)
 
 
 def check_auth_cookie(cookie, user, client):
@@ -240,7 +244,7 @@ def check_auth_cookie(cookie, user, client):
     :return: boolean
     """
 
-    data = Cookie_Cache.get(cookie)
+    data = _get_session(cookie)
 
     if not data:
         return False
@@ -262,6 +266,45 @@ def check_auth_cookie(cookie, user, client):
     return (user == cookie_user and cookie_client == client)
 
 
+def _serialize_session(data):
+    """
+    convert the session data into a json serializable list for the shared
+    session stores - the user is stored by its login, realm and resolver
+
+    :param data: the session data list
+    :return: the json serializable session data list
+    """
+
+    user, client, expiration, state, state_data = data
+
+    if isinstance(user, User):
+        user = {
+            'login': user.login,
+            'realm': user.realm,
+            'resolver_config_identifier': user.resolver_config_identifier,
+            }
+
+    return [user, client, expiration, state, state_data]
+
+
+def _get_session(cookie):
+    """
+    lookup the session data of the cookie in the session store
+
+    :param cookie: the session cookie
+    :return: the session data list or None
+    """
+
+    session_store = get_session_store()
+
+    data = session_store.get(cookie)
+
+    if data and session_store.shared and isinstance(data[0], dict):
+        data = [User(**data[0])] + data[1:]
+
+    return data
+
+
 def get_cookie_secret():
     """
     get the cookie encryption secret from the config
@@ -116,6 +116,10 @@ token_table = sa.Table(
 
     sa.Column(
         'LinOtpTokenType', sa.types.Unicode(30), default='HMAC', index=True),
+    # the lower case token type for the exact, indexed type lookup
+    sa.Column(
+        'LinOtpTokenTypeLower', sa.types.Unicode(30), default='hmac',
+        index=True),
     sa.Column(
         'LinOtpTokenInfo', sa.types.Unicode(2000), default=''),
     # # encrypt
@@ -135,9 +139,17 @@ token_table = sa.Table(
         'LinOtpIdResolver', sa.types.Unicode(120), default='', index=True),
     sa.Column(
         'LinOtpIdResClass', sa.types.Unicode(120), default=''),
+    # the canonical resolver class, where the legacy 'useridresolveree.'
+    # prefix is replaced by 'useridresolver.', for the exact, indexed
+    # owner lookup
+    sa.Column(
+        'LinOtpIdResClassNorm', sa.types.Unicode(120), default=''),
     sa.Column(
         'LinOtpUserid', sa.types.Unicode(320), default='', index=True),
-
+    # the lower case login of the owner for the wildcard owner search -
+    # None, if the login of the owner is not yet known
+    sa.Column(
+        'LinOtpOwnerLogin', sa.types.Unicode(320), default='', index=True),
 
     sa.Column(
         'LinOtpSeed', sa.types.Unicode(32), default=''),
@@ -169,6 +181,8 @@ token_table = sa.Table(
               default=None),
     sa.Column('LinOtpLastAuthMatch', sa.types.DateTime, index=True,
               default=None),
+    sa.Index('token_userid_resclass_idx',
+             'LinOtpUserid', 'LinOtpIdResClassNorm'),
     implicit_returning=implicit_returning,
 )
 
@@ -179,6 +193,16 @@ TOKEN_ENCODE = ["LinOtpTokenDesc", "LinOtpTokenSerialnumber",
 
 class Token(object):
 
+    # the parsed token info, which is shared by the token class objects of
+    # the token - see linotp.tokens.base.tokeninfo_mixin
+
+    info_cache = None
+
+    # the counted state of the token before it was changed - see
+    # linotp.lib.token_counter
+
+    _counted_state = None
+
     def __init__(self, serial):
 
         # # self.LinOtpTokenId - will be generated DBType serial
@@ -198,6 +222,7 @@ class Token(object):
         self.LinOtpIdResolver = None
         self.LinOtpIdResClass = None
         self.LinOtpUserid = None
+        self.LinOtpOwnerLogin = ''
 
         # when the token is created all time stamps are set to utc now
 
@@ -378,7 +403,7 @@ class Token(object):
         ret['LinOtp.TokenSerialnumber'] = self.LinOtpTokenSerialnumber or ''
 
         ret['LinOtp.TokenType'] = self.LinOtpTokenType or 'hmac'
-        ret['LinOtp.TokenInfo'] = self._fix_spaces(self.LinOtpTokenInfo or '')
+        ret['LinOtp.TokenInfo'] = self.getInfo()
         # ret['LinOtpTokenPinUser']   = self.LinOtpTokenPinUser
         # ret['LinOtpTokenPinSO']     = self.LinOtpTokenPinSO
 
@@ -436,7 +461,7 @@ class Token(object):
         ldict = {}
         for attr in self.__dict__:
             key = "%r" % attr
-            val = "%r" % getattr(self, attr)
+            val = repr(getattr(self, attr))
             ldict[key] = val
         res = "<%r %r>" % (self.__class__, ldict)
         return res
@@ -454,10 +479,14 @@ class Token(object):
         # Fix for working with MS SQL servers
         # MS SQL servers sometimes return a '<space>' when the column is empty:
         # ''
+        if self.info_cache is not None:
+            self.info_cache.flush(self)
         return self._fix_spaces(self.LinOtpTokenInfo or '')
 
     def setInfo(self, info):
         self.LinOtpTokenInfo = info
+        if self.info_cache is not None:
+            self.info_cache.reset()
 
     def storeToken(self):
         if self.LinOtpUserid is None:
@@ -512,6 +541,21 @@ class Token(object):
             log.error("assigning empty realm!")
 
 
+def get_canonical_resolver_class(resolver_class):
+    '''
+    get the canonical resolver class - the tokens might refer to the legacy
+    resolver class 'useridresolveree.' or to 'useridresolver.'
+
+    :param resolver_class: the resolver class of the token owner
+    :return: the resolver class with the 'useridresolver.' prefix
+    '''
+
+    if not resolver_class:
+        return ''
+
+    return resolver_class.replace('useridresolveree.', 'useridresolver.')
+
+
 def createToken(serial):
     log.debug('createToken(%s)' % serial)
     serial = '' + serial
@@ -1027,6 +1071,79 @@ orm.mapper(Reporting,
 
 #############################################################################
 
+# otp lookahead index - the keyed hashes of the next otp values of the not
+# assigned tokens, which allows to find a token by its otp value without
+# calculating the otp values of all tokens
+
+otp_index_table =\
+    sa.Table('otp_index', meta.metadata,
+             sa.Column('id', sa.types.Integer(),
+                       sa.Sequence('otp_index_seq_id', optional=True),
+                       primary_key=True, nullable=False),
+             sa.Column('serial', sa.types.Unicode(40), nullable=False),
+             sa.Column('base', sa.types.Integer(), nullable=False),
+             sa.Column('counter', sa.types.Integer(), nullable=False),
+             sa.Column('otp_key', sa.types.Unicode(16), index=True,
+                       nullable=False),
+             sa.Index('otp_index_serial_base_idx', 'serial', 'base'),
+             implicit_returning=implicit_returning,)
+
+
+class OtpIndex(object):
+
+    def __init__(self, serial, base, counter, otp_key):
+        self.serial = serial
+        self.base = base
+        self.counter = counter
+        self.otp_key = otp_key
+
+
+orm.mapper(OtpIndex, otp_index_table)
+
+#############################################################################
+
+# token counters - the number of tokens per realm and status, which are
+# maintained incrementally, see linotp.lib.token_counter
+
+token_counter_table =\
+    sa.Table('token_counter', meta.metadata,
+             sa.Column('id', sa.types.Integer(),
+                       sa.Sequence('token_counter_seq_id', optional=True),
+                       primary_key=True, nullable=False),
+             sa.Column('realm', sa.types.Unicode(255), nullable=False),
+             sa.Column('status', sa.types.Unicode(40), nullable=False),
+             sa.Column('counter', sa.types.Integer(), nullable=False,
+                       default=0),
+             sa.Index('token_counter_realm_status_idx', 'realm', 'status'),
+             implicit_returning=implicit_returning,)
+
+#############################################################################
+
+# selfservice sessions - the authentication cookies of the selfservice,
+# which are shared by all processes in case of the database session store
+
+selfservice_session_table =\
+    sa.Table('selfservice_session', meta.metadata,
+             sa.Column('cookie', sa.types.Unicode(64),
+                       primary_key=True, nullable=False),
+             sa.Column('data', sa.types.UnicodeText(), nullable=False),
+             sa.Column('expires', sa.types.DateTime, index=True,
+                       nullable=False),
+             implicit_returning=implicit_returning,)
+
+
+class SelfserviceSession(object):
+
+    def __init__(self, cookie, data, expires):
+        self.cookie = cookie
+        self.data = data
+        self.expires = expires
+
+
+orm.mapper(SelfserviceSession, selfservice_session_table)
+
+#############################################################################
+
 # logging configuration
 
 logging_config_table =\
@@ -1074,4 +1191,18 @@ orm.mapper(Realm, realm_table)
 orm.mapper(TokenRealm, tokenrealm_table)
 orm.mapper(Config, config_table)
 
+
+# the normalized token columns follow every change of their source column
+
+def _set_token_type_lower(token, value, _oldvalue, _initiator):
+    token.LinOtpTokenTypeLower = (value or '').lower()
+
+
+def _set_resolver_class_norm(token, value, _oldvalue, _initiator):
+    token.LinOtpIdResClassNorm = get_canonical_resolver_class(value)
+
+
+sa.event.listen(Token.LinOtpTokenType, 'set', _set_token_type_lower)
+sa.event.listen(Token.LinOtpIdResClass, 'set', _set_resolver_class_norm)
+
 ##eof#########################################################################
@@ -137,6 +137,28 @@ def add_index(engine, table_name, index, column):
                    (c_index_name, c_table_name, c_column_name))
 
 
+def has_index(meta, table_name, index_name):
+    """
+    check the index is already defined for the table
+
+    :param meta: the meta context with engine++
+    :param table_name: the name of the table with the index
+    :param index_name: the name of the index
+
+    :return: boolean
+    """
+
+    insp = inspect(meta.engine)
+    if table_name not in insp.get_table_names():
+        return False
+
+    for index in insp.get_indexes(table_name):
+        if index.get('name') == index_name:
+            return True
+
+    return False
+
+
 def drop_column(engine, table_name, column):
     """
 
@@ -166,7 +188,7 @@ def run_data_model_migration(meta):
     """
 
     # define the most recent target version
-    target_version = "2.12.0.0"
+    target_version = "3.0.0.1"
 
     migration = Migration(meta)
 
@@ -202,6 +224,8 @@ class Migration():
         "2.9.1.0",
         "2.10.1.0",
         "2.12.0.0",
+        "3.0.0.0",
+        "3.0.0.1",
         ]
 
     def __init__(self, meta):
@@ -390,4 +414,95 @@ class Migration():
             add_column(self.meta.engine, token_table, accessed)
             add_index(self.meta.engine, token_table, 'LinOtpLastAuthMatch', accessed)
 
+    # migration towards 3.0
+
+    def migrate_3_0_0_0(self):
+        """
+        run the migration for token to add the owner login column - the
+        logins of the existing owners are not known and are filled in by
+        the owner refresh
+        """
+
+        token_table = "Token"
+
+        owner_login = sa.Column('LinOtpOwnerLogin', sa.types.Unicode(320),
+                                index=True)
+
+        if not has_column(self.meta, token_table, owner_login):
+            add_column(self.meta.engine, token_table, owner_login)
+            add_index(self.meta.engine, token_table, 'LinOtpOwnerLogin',
+                      owner_login)
+
+            # the not assigned tokens have no owner login
+
+            self.meta.engine.execute(
+                linotp.model.token_table.update().where(
+                    linotp.model.token_table.c.LinOtpUserid == '').values(
+                        LinOtpOwnerLogin=''))
+
+    def migrate_3_0_0_1(self):
+        """
+        run the migration for the index friendly token lookup:
+
+        - add the lower case token type column
+        - add the canonical resolver class column with the composite
+          (userid, resolver class) index for the owner lookup
+        - lower case the legacy realm names, so that the realms could be
+          looked up without the lower() function
+        """
+
+        token_table = linotp.model.token_table
+        realm_table = linotp.model.realm_table
+
+        type_lower = sa.Column('LinOtpTokenTypeLower', sa.types.Unicode(30),
+                               index=True)
+
+        if not has_column(self.meta, "Token", type_lower):
+            add_column(self.meta.engine, "Token", type_lower)
+            add_index(self.meta.engine, "Token", 'LinOtpTokenTypeLower',
+                      type_lower)
+
+            self.meta.engine.execute(
+                token_table.update().values(
+                    LinOtpTokenTypeLower=sa.func.lower(
+                        sa.func.coalesce(token_table.c.LinOtpTokenType, ''))))
+
+        resclass_norm = sa.Column('LinOtpIdResClassNorm',
+                                  sa.types.Unicode(120))
+
+        if not has_column(self.meta, "Token", resclass_norm):
+            add_column(self.meta.engine, "Token", resclass_norm)
+
+            self.meta.engine.execute(
+                token_table.update().values(
+                    LinOtpIdResClassNorm=sa.func.replace(
+                        sa.func.coalesce(token_table.c.LinOtpIdResClass, ''),
+                        'useridresolveree.', 'useridresolver.')))
+
+        if not has_index(self.meta, "Token", 'token_userid_resclass_idx'):
+            for index in token_table.indexes:
+                if index.name == 'token_userid_resclass_idx':
+                    index.create(bind=self.meta.engine)
+
+        # the realm names are stored in lower case since long, but there
+        # might be some legacy ones
+
+        realm_names = [
+            name for (name,) in self.meta.engine.execute(
+                sa.select([realm_table.c.name]))]
+
+        for name in realm_names:
+
+            if not name or name == name.lower():
+                continue
+
+            if name.lower() in realm_names:
+                log.warning("realm %r could not be migrated to lower case, "
+                            "as the realm %r exists", name, name.lower())
+                continue
+
+            self.meta.engine.execute(
+                realm_table.update().where(
+                    realm_table.c.name == name).values(name=name.lower()))
+
 # eof
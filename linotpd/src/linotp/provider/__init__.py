@@ -36,6 +36,7 @@ from linotp.flap import _
 
 from linotp.lib.config import storeConfig
 from linotp.lib.config import getLinotpConfig
+from linotp.lib.config import get_config_section
 from linotp.lib.config import removeFromConfig
 from linotp.lib.config.parsing import ConfigTree
 from linotp.lib.config.parsing import ConfigNotRecognized
@@ -340,12 +341,21 @@ def get_all_new_providers(provider_type, show_managed_config=False):
     # find out, which providers we have
     config = getLinotpConfig()
 
-    # first identify all providers by its name
-    for key, value in list(config.items()):
+    # all provider entries are in the config section of the provider type
+    section = get_config_section(config, prefix[len('linotp.'):-1])
+
+    # first identify all providers by its name and collect their entries
+
+    provider_entries = {}
+
+    for key, value in section.items():
         if key[:len(prefix)] == prefix:
             parts = key.split('.')
             if len(parts) == 3:
                 provider_names[key] = value
+            elif len(parts) > 3:
+                provider = '.'.join(parts[:3])
+                provider_entries.setdefault(provider, []).append(key)
 
     for provider, provider_class in list(provider_names.items()):
 
@@ -353,14 +363,15 @@ def get_all_new_providers(provider_type, show_managed_config=False):
         defintion['Class'] = provider_class
         prefix = provider + '.'
 
-        for key, value in list(config.items()):
-            if key[:len(prefix)] == prefix:
+        for key in provider_entries.get(provider, []):
+
+            value = section[key]
 
-                if 'enc' + key in config:
-                    value = config.get('enc' + key)
+            if 'enc' + key in config:
+                value = config.get('enc' + key)
 
-                entry = key.replace(prefix, '')
-                defintion[entry] = value
+            entry = key.replace(prefix, '')
+            defintion[entry] = value
 
         defintion['Default'] = False
 
@@ -93,6 +93,94 @@ class Config:
 
     # AUDIT_POOL_RECYCLE = 3600
 
+    # AUDIT_DURABILITY determines when the audit entries are written:
+    #
+    # AUDIT_DURABILITY='sync'
+    #  Each audit entry is written and signed within its request.
+    #
+    # AUDIT_DURABILITY='async'
+    #  The audit entries are queued and written and signed in batches by
+    #  a background writer. The queue is flushed at shutdown, but the
+    #  queued entries of a crashed process are lost.
+    #
+    AUDIT_DURABILITY = 'sync'
+
+    # In the 'async' mode, at most AUDIT_QUEUE_SIZE entries are queued and
+    # written in batches of up to AUDIT_BATCH_SIZE entries, waiting at most
+    # AUDIT_FLUSH_INTERVAL seconds for a batch to fill up. If the queue is
+    # full, a request waits AUDIT_QUEUE_TIMEOUT seconds for a free slot
+    # before it writes its audit entry on its own.
+    AUDIT_QUEUE_SIZE = 10000
+    AUDIT_BATCH_SIZE = 100
+    AUDIT_FLUSH_INTERVAL = 0.5
+    AUDIT_QUEUE_TIMEOUT = 1.0
+
+    # AUDIT_INTEGRITY determines how the audit entries are protected:
+    #
+    # AUDIT_INTEGRITY='rsa'
+    #  Each audit entry is signed with the audit private key.
+    #
+    # AUDIT_INTEGRITY='chain'
+    #  Each audit entry carries a sha256 hash, which is chained to the hash
+    #  of its predecessor. Only every AUDIT_CHECKPOINT_INTERVAL entries a
+    #  checkpoint of the chain is signed. The entries are verified in bulk
+    #  up to the next checkpoint - entries after the last checkpoint are
+    #  reported as 'PENDING'. The head of the chain is created at the setup
+    #  of the app, so switching to 'chain' requires a restart or `init-db`.
+    #
+    AUDIT_INTEGRITY = 'rsa'
+    AUDIT_CHECKPOINT_INTERVAL = 100
+
+    # AUDIT_COUNT_MODE determines how the total of an audit search is
+    # determined:
+    #
+    # AUDIT_COUNT_MODE='exact'
+    #  The matching audit entries are counted.
+    #
+    # AUDIT_COUNT_MODE='estimate'
+    #  The total of all audit entries is estimated from the id range and
+    #  the matching entries are counted only up to AUDIT_COUNT_LIMIT.
+    #
+    AUDIT_COUNT_MODE = 'exact'
+    AUDIT_COUNT_LIMIT = 10000
+
+    # SELFSERVICE_SESSION_STORE determines where the sessions of the
+    # selfservice are kept:
+    #
+    # SELFSERVICE_SESSION_STORE='memory'
+    #  The sessions are kept in the memory of each process. This requires
+    #  that all requests of a session are served by the same process.
+    #
+    # SELFSERVICE_SESSION_STORE='database'
+    #  The sessions are kept in the LinOTP database and are shared by all
+    #  processes.
+    #
+    # At most SELFSERVICE_SESSION_LIMIT sessions are kept - if there are
+    # more, the sessions which would expire next are dropped.
+    SELFSERVICE_SESSION_STORE = 'memory'
+    SELFSERVICE_SESSION_LIMIT = 10000
+
+    # JSON_ENCODER determines how the json responses are encoded:
+    #
+    # JSON_ENCODER='json'
+    #  The responses are encoded by the json module of the standard library.
+    #
+    # JSON_ENCODER='orjson'
+    #  The responses are encoded by the much faster orjson module, if it is
+    #  installed. The responses contain no spaces between the items, which
+    #  might break clients, which parse the responses as text.
+    #
+    # The responses are not indented, unless the client asks for it by the
+    # request parameter 'pretty'.
+    JSON_ENCODER = 'json'
+
+    # The number of tokens per realm and status, which is used by the token
+    # reporting, the monitoring and the license checks, is maintained
+    # incrementally. The counters are reconciled with the token table at
+    # most every TOKEN_COUNTER_RECONCILE_INTERVAL seconds, when they are
+    # read, or by the maintenance interface.
+    TOKEN_COUNTER_RECONCILE_INTERVAL = 86400
+
     # MAKO_TRANSLATE_EXCEPTIONS = False
 
     # Enable html escaping in mako templates
@@ -116,6 +204,19 @@ class Config:
     # or with policy forwarding server to radius server
     RADIUS_NAS_IDENTIFIER = "LinOTP"
 
+    # The outgoing radius requests wait RADIUS_TIMEOUT seconds for the reply
+    # and are sent up to RADIUS_RETRIES times to each server, before the next
+    # server of the comma separated server list is tried.
+    RADIUS_TIMEOUT = 5
+    RADIUS_RETRIES = 3
+
+    # The LinOTP configuration is loaded once from the database and shared
+    # by all requests of the process. To pick up the changes made by other
+    # processes or servers, the database is checked for a changed
+    # configuration at most every CONFIG_REPLICATION_CHECK_INTERVAL seconds.
+    # A value of 0 checks on every request.
+    CONFIG_REPLICATION_CHECK_INTERVAL = 5
+
     @staticmethod
     def init_app(app):
         pass
@@ -134,6 +235,7 @@ class TestingConfig(Config):
     TESTING = True
     SESSION_COOKIE_SECURE = False
     GETOTP_ENABLED = True
+    CONFIG_REPLICATION_CHECK_INTERVAL = 0
     LOGGING_LEVEL = logging.DEBUG
     SQLALCHEMY_DATABASE_URI = os.getenv("LINOTP_TEST_DATABASE_URL") or \
         "sqlite:///" + os.path.join(basedir, "linotp-test.sqlite")
@@ -31,6 +31,10 @@
 import json
 import logging
 import pytest
+
+from mock import patch
+
+from linotp.lib.tokeniterator import TokenIterator
 from linotp.tests import TestController
 
 log = logging.getLogger(__name__)
@@ -225,6 +229,66 @@ class TestAdminController(TestController):
             counter += 1
 
 
+    def test_show_stream(self):
+        """ test the streamed admin show for json and csv response """
+
+        self.createToken()
+
+        response = self.make_admin_request('show')
+        tokens = response.json['result']['value']['data']
+
+        # ------------------------------------------------------------------ --
+
+        # verify that the streamed json response contains the same tokens
+
+        params = {
+            'stream': True,
+            }
+
+        response = self.make_admin_request('show', params=params)
+
+        jresp = response.json
+
+        streamed_tokens = jresp['result']['value']
+        assert streamed_tokens == tokens
+
+        assert jresp['detail']['resultset']['tokens'] == 3
+        assert jresp['result']['queried'] == 3
+
+        for token in streamed_tokens:
+            assert token['User.username'] == 'root'
+            assert token['LinOtp.RealmNames'] == ['mydefrealm']
+
+        # ------------------------------------------------------------------ --
+
+        # verify the streamed csv response: one header and three data lines
+
+        params = {
+            'stream': True,
+            'outform': 'csv',
+            }
+
+        response = self.make_admin_request('show', params=params)
+
+        lines = [line for line in response.body.split('\n') if line]
+        assert len(lines) == 4
+
+        assert '"LinOtp.TokenSerialnumber"' in lines[0]
+        for serial in ['F722362', 'F722363', 'F722364']:
+            assert '"%s"' % serial in response.body
+
+        # ------------------------------------------------------------------ --
+
+        # verify that the tokens of all chunks are streamed in id order
+
+        with patch.object(TokenIterator.iterate_chunked, '__defaults__', (2,)):
+            response = self.make_admin_request('show', params={'stream': True})
+
+        streamed_tokens = response.json['result']['value']
+
+        token_ids = [token['LinOtp.TokenId'] for token in streamed_tokens]
+        assert token_ids == sorted(token['LinOtp.TokenId'] for token in tokens)
+
     def test_set(self):
         self.createToken()
 
@@ -382,6 +382,75 @@ class TestImportOTP(TestController):
 
         return
 
+    def test_bulk_import_OATH_256(self):
+        '''
+        test the bulk import of token data with sha256 seeds
+        '''
+
+        params = {'type': 'oathcsv', 'bulk': True}
+
+        response = self.upload_tokens("oath_tokens_sha256.csv", params=params)
+        assert '<imported>8</imported>' in response, response
+
+        # the seeds of the bulk imported tokens are usable
+
+        params = {
+            'serial': 'htok_sha256_3',
+            'pass': '46119246'}
+
+        response = self.make_validate_request('check_s', params)
+        assert '"value": true' in response, response
+
+        # an already imported token is updated again
+
+        params = {'type': 'oathcsv', 'bulk': True}
+
+        response = self.upload_tokens("oath_tokens_sha256.csv", params=params)
+        assert '<imported>8</imported>' in response, response
+
+        return
+
+    def test_bulk_import_resume(self):
+        '''
+        test the resumed bulk import of tokens into a target realm
+        '''
+
+        self.create_common_resolvers()
+        self.create_common_realms()
+
+        target_realm = 'mymixrealm'
+
+        params = {
+            'type': 'oathcsv',
+            'targetrealm': target_realm,
+            'bulk': True}
+
+        response = self.upload_tokens("oath_tokens.csv", params=params)
+        assert '<imported>4</imported>' in response, response
+
+        # the resumed import skips the already imported tokens
+
+        params['resume'] = True
+
+        response = self.upload_tokens("oath_tokens.csv", params=params)
+        assert '<imported>0</imported>' in response, response
+        assert '<skipped>4</skipped>' in response, response
+
+        # the bulk imported tokens are in the target realm
+
+        response = self.make_admin_request('show', params={})
+
+        jresp = json.loads(response.body)
+        tokens = jresp.get('result', {}).get('value', {}).get('data', [])
+
+        assert len(tokens) == 4, jresp
+
+        for token in tokens:
+            token_realms = token.get('LinOtp.RealmNames', [])
+            assert target_realm in token_realms, token
+
+        return
+
     def test_import_PSKC(self):
         '''
         Test to import PSKC data
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+    test for the otp lookahead index of getSerialByOtp and autoassignment
+"""
+
+import os
+
+from mock import patch
+
+from linotp.tests import TestController
+from linotp.tokens.hmactoken import HmacTokenClass
+
+# the otp values of the rfc 4226 test seed
+
+SEED = "3132333435363738393031323334353637383930"
+
+OTPS = ['755224', '287082', '359152', '969429', '338314', '254676',
+        '287922', '162583', '399871', '520489']
+
+
+class TestOtpIndexController(TestController):
+    """
+    getSerialByOtp and autoassignment with the otp lookahead index
+    """
+
+    def setUp(self):
+        TestController.setUp(self)
+        self.create_common_resolvers()
+        self.create_common_realms()
+
+        params = {'OtpLookaheadIndex': 'True'}
+        response = self.make_system_request('setConfig', params=params)
+        assert '"status": true' in response, response
+
+        # one token with the test seed and some other tokens
+
+        self.create_hmac_token('index_token', SEED)
+
+        for i in range(4):
+            self.create_hmac_token('other_token_%d' % i,
+                                   '%040x' % (i + 1))
+
+    def tearDown(self):
+        self.delete_all_token()
+        self.delete_all_realms()
+        self.delete_all_resolvers()
+
+        params = {'key': 'OtpLookaheadIndex'}
+        self.make_system_request('delConfig', params=params)
+
+        TestController.tearDown(self)
+
+    def create_hmac_token(self, serial, otpkey):
+
+        params = {"serial": serial,
+                  "type": "HMAC",
+                  "otpkey": otpkey,
+                  "otplen": 6}
+
+        response = self.make_admin_request('init', params=params)
+        assert '"value": true' in response, response
+
+        params = {"serial": serial,
+                  "realms": "mydefrealm"}
+
+        response = self.make_admin_request('tokenrealm', params=params)
+        assert '"value": 1' in response, response
+
+    def get_serial(self, otp):
+
+        params = {'otp': otp,
+                  'realm': 'mydefrealm',
+                  'assigned': '0'}
+
+        response = self.make_admin_request('getSerialByOtp', params=params)
+        assert '"status": true' in response, response
+
+        return response.json['result']['value']['serial']
+
+    def test_get_serial_by_otp(self):
+        """
+        verify that the token is found by the index as the counter moves
+        """
+
+        with patch.object(HmacTokenClass, 'check_otp_exist',
+                          autospec=True,
+                          side_effect=HmacTokenClass.check_otp_exist
+                          ) as mock_check:
+
+            assert self.get_serial(OTPS[2]) == 'index_token'
+
+            # only the indexed candidate is checked
+
+            assert mock_check.call_count == 1
+
+        # the counter has moved - the window is advanced
+
+        assert self.get_serial(OTPS[2]) == ''
+        assert self.get_serial(OTPS[5]) == 'index_token'
+        assert self.get_serial(OTPS[9]) == 'index_token'
+
+        # unknown otp
+
+        assert self.get_serial('123456') == ''
+
+    def test_assigned_token_is_not_found(self):
+        """
+        verify that the assigned token is removed from the index
+        """
+
+        params = {'serial': 'index_token',
+                  'user': 'passthru_user1@mydefrealm'}
+        response = self.make_admin_request('assign', params=params)
+        assert '"value": true' in response, response
+
+        assert self.get_serial(OTPS[0]) == ''
+
+        params = {'serial': 'index_token'}
+        response = self.make_admin_request('unassign', params=params)
+        assert '"value": true' in response, response
+
+        assert self.get_serial(OTPS[0]) == 'index_token'
+
+    def test_reinitialized_token(self):
+        """
+        verify that the index entries of a reinitialized token are dropped
+        """
+
+        assert self.get_serial(OTPS[0]) == 'index_token'
+
+        # the token gets a new seed - the old otp values must not be found
+
+        self.create_hmac_token('index_token', '%040x' % 42)
+
+        assert self.get_serial(OTPS[1]) == ''
+
+        # an indexed token gets the test seed
+
+        self.create_hmac_token('other_token_0', SEED)
+
+        assert self.get_serial(OTPS[1]) == 'other_token_0'
+
+    def test_changed_otplen(self):
+        """
+        verify that the token is reindexed when the otp length is changed
+        """
+
+        assert self.get_serial(OTPS[0]) == 'index_token'
+
+        params = {'serial': 'index_token',
+                  'OtpLen': 8}
+        response = self.make_admin_request('set', params=params)
+        assert '"status": true' in response, response
+
+        assert self.get_serial(OTPS[1]) == ''
+        assert self.get_serial('37359152') == 'index_token'
+
+# eof ########################################################################
@@ -28,6 +28,11 @@
 """
 """
 import json
+
+from sqlalchemy.engine import create_engine
+
+from linotp.flap import config
+from linotp.model import token_table
 from linotp.tests import TestController
 
 
@@ -40,6 +45,7 @@ class TestTokensearch(TestController):
     def setUp(self):
         ''' setup the Test Controller'''
         TestController.setUp(self)
+        self.serials = []
         self.create_common_resolvers()
         self.create_common_realms()
 
@@ -125,4 +131,54 @@ class TestTokensearch(TestController):
         # ----------------------------------------------------------------- --
         return
 
+    def test_wildcard_owner_search(self):
+        """ wildcard owner search by the owner login of the tokens """
+
+        serials = {}
+
+        for user in ['passthru_user1', 'passthru_user2', None]:
+
+            params = {'type': 'spass'}
+            if user:
+                params['user'] = user
+
+            response = self.make_admin_request('init', params=params)
+            assert 'serial' in response
+
+            serial = response.json['detail']['serial']
+            self.serials.append(serial)
+            serials[user] = serial
+
+        def search(user_expression):
+            params = {'user': user_expression}
+            response = self.make_admin_request('show', params=params)
+
+            tokens = response.json['result']['value']['data']
+            return set(token['LinOtp.TokenSerialnumber'] for token in tokens)
+
+        assert search('passthru*') == set(
+            [serials['passthru_user1'], serials['passthru_user2']])
+
+        assert search('PASS*1') == set([serials['passthru_user1']])
+
+        # the '_' is no wildcard
+
+        assert search('passthru*_user1') == set([serials['passthru_user1']])
+        assert search('passthru_user_') == set()
+
+        # tokens, whose owner login is not yet known, as after the db
+        # migration, are still found by looking up their owner
+
+        engine = create_engine(config.get('SQLALCHEMY_DATABASE_URI'))
+        engine.execute(token_table.update().where(
+            token_table.c.LinOtpTokenSerialnumber == serials['passthru_user2']
+            ).values(LinOtpOwnerLogin=None))
+
+        assert search('passthru*') == set(
+            [serials['passthru_user1'], serials['passthru_user2']])
+
+        assert search('*2') == set([serials['passthru_user2']])
+
+        return
+
 # eof #
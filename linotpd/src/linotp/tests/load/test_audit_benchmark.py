@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+audit writer micro benchmark
+
+compares the audit entries, which could be written per second by the
+requests in the 'sync' and in the 'async' durability mode and with the
+'rsa' and the 'chain' integrity mode. Run with:
+
+    pytest -s linotp/tests/load/test_audit_benchmark.py
+"""
+
+import time
+
+import pytest
+
+from linotp.lib.audit.base import getAudit
+from linotp.lib.audit.SQLAudit import setup_audit_db
+
+
+def run_requests(audit, number_of_requests):
+    """ write the audit entries of the requests and return the duration """
+
+    start = time.time()
+
+    for i in range(number_of_requests):
+        audit.log({'action': '/validate/check', 'serial': 'token_%d' % i,
+                   'success': i % 2, 'user': 'user_%d' % i,
+                   'realm': 'realm', 'client': '192.168.0.1',
+                   'linotp_server': 'localhost', 'log_level': 'INFO',
+                   'clearance_level': 0})
+
+    return time.time() - start
+
+
+@pytest.mark.usefixtures("app")
+def test_audit_writer_benchmark(app):
+    """
+    compare the requests per second of the sync and async audit modes
+    """
+
+    number_of_requests = 500
+
+    results = {}
+
+    for durability in ['sync', 'async']:
+
+        app.config['AUDIT_DURABILITY'] = durability
+        audit = getAudit(app.config)
+
+        start = time.time()
+
+        request_duration = run_requests(audit, number_of_requests)
+
+        # the duration until all entries are written to the database
+
+        audit.flush()
+        total_duration = time.time() - start
+
+        results[durability] = request_duration
+
+        print("\n%s: %d requests in %.4fs - %.1f requests/s "
+              "(all written after %.4fs)" % (
+                  durability, number_of_requests, request_duration,
+                  number_of_requests / max(request_duration, 1e-9),
+                  total_duration))
+
+        if audit.writer:
+            print("async writer stats: %r" % audit.get_writer_stats())
+            audit.writer.close()
+
+    assert results['async'] < results['sync']
+
+
+@pytest.mark.usefixtures("app")
+def test_audit_integrity_benchmark(app):
+    """
+    compare the requests per second and the verification of the rsa
+    signed and the hash chained audit entries
+    """
+
+    number_of_requests = 500
+
+    results = {}
+
+    for integrity in ['rsa', 'chain']:
+
+        app.config['AUDIT_INTEGRITY'] = integrity
+        setup_audit_db(app.config)
+        audit = getAudit(app.config)
+
+        request_duration = run_requests(audit, number_of_requests)
+
+        start = time.time()
+        rows = audit.searchQuery({'action': 'validate/check'})
+        segments = []
+        for row in rows:
+            audit.row2dict(row, segments=segments)
+        verify_duration = time.time() - start
+
+        results[integrity] = request_duration
+
+        print("\n%s: %d requests in %.4fs - %.1f requests/s, "
+              "search verified in %.4fs" % (
+                  integrity, number_of_requests, request_duration,
+                  number_of_requests / max(request_duration, 1e-9),
+                  verify_duration))
+
+    assert results['chain'] < results['rsa']
+
+# eof #
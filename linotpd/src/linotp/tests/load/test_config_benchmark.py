@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+config namespace lookup micro benchmark
+
+compares the lookup of the provider, resolver, realm and policy entries
+by a scan of a config with 10000 entries with the lookup in the section
+index of the LinOtpConfig. Run with:
+
+    pytest -s linotp/tests/load/test_config_benchmark.py
+"""
+
+import time
+
+from types import MappingProxyType
+
+import pytest
+
+from linotp.lib.config.config_class import LinOtpConfig
+from linotp.lib.config.config_class import build_config_sections
+from linotp.lib.config.config_class import get_config_section
+from linotp.lib.config.config_class import get_shared_config
+from linotp.lib.policy.util import parse_policies
+
+SECTIONS = ['SMSProvider', 'EmailProvider', 'PushProvider', 'VoiceProvider',
+            'passwdresolver', 'sqlresolver', 'useridresolver', 'Policy']
+
+
+def large_config(number_of_entries):
+    """
+    create a config with providers, resolvers, realms and policies, which is
+    filled up with unrelated entries to number_of_entries entries
+    """
+
+    config = {'linotp.Config': '2020-01-01 00:00:00.000000'}
+
+    for i in range(20):
+        config['linotp.SMSProvider.sms_%d' % i] = 'smsprovider.HttpSMSProvider'
+        config['linotp.SMSProvider.sms_%d.Config' % i] = '{}'
+        config['linotp.SMSProvider.sms_%d.Timeout' % i] = '10'
+
+        config['linotp.passwdresolver.fileName.res_%d' % i] = '/etc/passwd'
+        config['linotp.useridresolver.group.realm_%d' % i] = (
+            'useridresolver.PasswdIdResolver.IdResolver.res_%d' % i)
+
+    for i in range(200):
+        for key, value in [('scope', 'authentication'), ('action', 'otppin=1'),
+                           ('realm', '*'), ('user', '*'), ('client', '*'),
+                           ('time', ''), ('active', 'True')]:
+            config['linotp.Policy.policy_%d.%s' % (i, key)] = value
+
+    i = 0
+    while len(config) < number_of_entries:
+        config['linotp.Other_%d.entry_%d' % (i % 100, i)] = 'value %d' % i
+        i += 1
+
+    return config
+
+
+def run_lookups(config, rounds):
+    """ lookup all sections and parse the policies; return the duration """
+
+    start = time.time()
+
+    for _i in range(rounds):
+        for section in SECTIONS:
+            get_config_section(config, section)
+
+        parse_policies(config)
+
+    return time.time() - start
+
+
+@pytest.mark.usefixtures("app")
+def test_config_section_benchmark():
+    """
+    compare the section lookup by scanning with the section index for a
+    config with 10000 entries
+    """
+
+    rounds = 20
+
+    config = large_config(10000)
+
+    start = time.time()
+    build_config_sections(config)
+    index_duration = time.time() - start
+
+    shared_config = get_shared_config()
+    shared_config.entries = MappingProxyType(config)
+
+    try:
+        linotp_config = LinOtpConfig()
+
+        # verify that both provide the same results
+
+        for section in SECTIONS:
+            assert (dict(get_config_section(linotp_config, section)) ==
+                    get_config_section(config, section))
+
+        scan_duration = run_lookups(config, rounds)
+        index_duration += run_lookups(linotp_config, rounds)
+
+    finally:
+        shared_config.entries = None
+
+    print("\n%d config entries, %d rounds: scan %.4fs, "
+          "index (incl. build) %.4fs (speedup %.1fx)" % (
+              len(config), rounds, scan_duration, index_duration,
+              scan_duration / max(index_duration, 1e-9)))
+
+    assert index_duration < scan_duration
+
+# eof #
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+security module crypto micro benchmark
+
+compares the encryption and decryption throughput of the default security
+module, which holds the keys in the key slots, with reading the key from
+the secret file for every operation, as it has been done before. Run with:
+
+    pytest -s linotp/tests/load/test_crypto_benchmark.py
+"""
+
+import os
+import time
+
+from Cryptodome.Cipher import AES
+
+import pytest
+
+from linotp.lib.crypto.utils import zerome
+from linotp.lib.security.default import DefaultSecurityModule
+
+
+@pytest.fixture
+def sec_file(tmp_path):
+    """
+    Fixture to create a secret file with three keys
+    """
+
+    secret_file = tmp_path / 'encKey'
+    secret_file.write_bytes(os.urandom(3 * 32))
+
+    return str(secret_file)
+
+
+def read_secret(sec_file, slot):
+    """ the former per operation access to the key in the secret file """
+
+    with open(sec_file, 'rb') as f:
+        for _i in range(0, slot + 1):
+            secret = f.read(32)
+    return secret
+
+
+def test_crypto_benchmark(sec_file):
+    """
+    measure the throughput of the encryption and decryption
+    """
+
+    rounds = 10000
+
+    hsm = DefaultSecurityModule({'file': sec_file})
+
+    data = os.urandom(32)
+    iv = os.urandom(16)
+
+    encrypted = hsm.encrypt(data, iv, 1)
+
+    # the former implementation: read the key per operation
+
+    start = time.time()
+
+    for _i in range(rounds):
+        key = read_secret(sec_file, 1)
+        output = AES.new(key, AES.MODE_CBC, iv).decrypt(encrypted)
+        zerome(key)
+
+    file_duration = time.time() - start
+
+    # the key slots
+
+    start = time.time()
+
+    for _i in range(rounds):
+        output = hsm.decrypt(encrypted, iv, 1)
+
+    slot_duration = time.time() - start
+
+    assert output == data
+
+    start = time.time()
+
+    for _i in range(rounds):
+        hsm.encrypt(data, iv, 1)
+
+    encrypt_duration = time.time() - start
+
+    print("\n%d operations: key file decrypt %.4fs (%d ops/s), key slots "
+          "decrypt %.4fs (%d ops/s), encrypt %.4fs (%d ops/s)" % (
+              rounds, file_duration, rounds / file_duration,
+              slot_duration, rounds / slot_duration,
+              encrypt_duration, rounds / encrypt_duration))
+
+# eof #
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+http resolver latency benchmark
+
+measures the latency of the user lookups of the HTTPIdResolver against a
+local stub user service and compares the shared keep-alive http session
+with a new connection per lookup. Run with:
+
+    pytest -s linotp/tests/load/test_http_resolver_benchmark.py
+"""
+
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from mock import patch
+
+import pytest
+
+from linotp.lib import http_pool
+from linotp.useridresolver import HTTPIdResolver
+
+
+class UserHandler(BaseHTTPRequestHandler):
+    """ stub user service """
+
+    protocol_version = 'HTTP/1.1'
+
+    # as a real server, the stub sends the response without waiting for
+    # the ack of the headers
+
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        body = json.dumps({'result': {'value': [
+            {'userid': '1000', 'username': 'hans'}]}}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def get_resolver(uri):
+
+    config = {}
+    for key, value in {
+            'uri': uri, 'timeout': '5',
+            'authuser': 'admin', 'password': 'Test123!',
+            'certificate': '',
+            'userid_request_path': '/admin/userlist',
+            'userid_request_mapping': '{"username": "{USERNAME}"}',
+            'userid_result_path': '/result/value',
+            'userid_result_mapping': '{}'}.items():
+        config['linotp.httpresolver.%s.bench' % key] = value
+
+    return HTTPIdResolver.IdResolver().loadConfig(config, 'bench')
+
+
+def run_lookups(uri, rounds):
+    """
+    run the user lookups - return the sorted latencies
+    """
+
+    latencies = []
+
+    for _i in range(rounds):
+
+        start = time.time()
+        assert get_resolver(uri).getUserId('hans') == '1000'
+        latencies.append(time.time() - start)
+
+    return sorted(latencies)
+
+
+def new_session(_pool_id, **settings):
+    return http_pool.create_http_session(**settings)
+
+
+@pytest.mark.parametrize('rounds', [500])
+def test_http_resolver_benchmark(rounds):
+    """
+    compare the user lookups with and without the shared http session
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UserHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    uri = 'http://127.0.0.1:%d' % server.server_address[1]
+
+    try:
+        pooled = run_lookups(uri, rounds)
+
+        with patch.object(HTTPIdResolver, 'get_http_session', new_session):
+            unpooled = run_lookups(uri, rounds)
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    def median(latencies):
+        return latencies[len(latencies) // 2] * 1000
+
+    def p99(latencies):
+        return latencies[int(len(latencies) * 0.99)] * 1000
+
+    print("\n%d lookups: new connection median %.3fms p99 %.3fms, "
+          "keep-alive median %.3fms p99 %.3fms (speedup %.1fx)" % (
+              rounds, median(unpooled), p99(unpooled),
+              median(pooled), p99(pooled),
+              sum(unpooled) / max(sum(pooled), 1e-9)))
+
+# eof #
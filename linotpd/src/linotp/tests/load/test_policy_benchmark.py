@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+policy evaluation micro benchmark
+
+compares the evaluation of the plain policy dict, as it is returned by
+parse_policies(), with the evaluation of the compiled policies for a set
+of some hundred policies. Run with:
+
+    pytest -s linotp/tests/load/test_policy_benchmark.py
+"""
+
+import time
+
+from datetime import datetime
+
+import pytest
+
+from linotp.lib.policy.compiled import CompiledPolicies
+from linotp.lib.policy.evaluate import PolicyEvaluator
+from linotp.lib.policy.util import parse_policies
+
+SCOPES = ['authentication', 'authorization', 'enrollment', 'selfservice',
+          'admin', 'system']
+
+ACTIONS = ['otppin=1', 'passthru', 'maxtoken=3', 'tokencount=100',
+           'enrollHMAC', 'webprovisionGOOGLE', 'show', 'challenge_response=*',
+           'qrtoken_pairing_callback_url=http://localhost', 'read, write']
+
+REQUESTS = [
+    {'scope': 'authentication', 'action': 'otppin',
+     'realm': 'realm_3', 'client': '192.168.3.17'},
+    {'scope': 'authorization', 'action': 'tokentype',
+     'realm': 'realm_7', 'client': '10.3.1.1'},
+    {'scope': 'enrollment', 'action': 'maxtoken',
+     'realm': 'realm_1', 'client': '172.16.1.1'},
+    {'scope': 'admin', 'action': 'show', 'client': '192.168.0.1'},
+]
+
+
+def policy_config(number_of_policies):
+    """
+    create a config with some hundred policies of different scopes,
+    actions, realms, clients and time conditions
+    """
+
+    config = {}
+
+    for i in range(number_of_policies):
+        name = 'policy_%d' % i
+
+        policy = {
+            'scope': SCOPES[i % len(SCOPES)],
+            'action': ', '.join(ACTIONS[i % len(ACTIONS):][:3]),
+            'realm': 'realm_%d, realm_%d' % (i % 10, (i + 3) % 10),
+            'user': '*',
+            'client': '192.168.%d.0/24, 10.%d.0.0/16, !10.%d.1.0/24' % (
+                i % 256, i % 256, i % 256),
+            'time': '* 0-23 * * * *; !* * 24 12 * *',
+            'active': 'True',
+        }
+
+        if i % 7 == 0:
+            policy['client'] = '*'
+            policy['realm'] = '*'
+
+        for key, value in policy.items():
+            config['linotp.Policy.%s.%s' % (name, key)] = value
+
+    return config
+
+
+def run_evaluation(policies, rounds):
+    """ run the evaluation of all requests and return the duration """
+
+    now = datetime.now()
+
+    start = time.time()
+
+    for _i in range(rounds):
+        for request in REQUESTS:
+
+            policy_eval = PolicyEvaluator(policies)
+            policy_eval.set_filters(request)
+            policy_eval.filter_for_active(state=True)
+            policy_eval.filter_for_time(now)
+            policy_eval.evaluate()
+
+    return time.time() - start
+
+
+@pytest.mark.parametrize('number_of_policies', [100, 500])
+def test_policy_evaluation_benchmark(number_of_policies):
+    """
+    compare the evaluation duration of plain and compiled policies
+    """
+
+    rounds = 20
+
+    config = policy_config(number_of_policies)
+
+    plain_policies = parse_policies(config)
+    compiled_policies = CompiledPolicies(parse_policies(config))
+
+    # verify that both provide the same results
+
+    for request in REQUESTS:
+        plain = PolicyEvaluator(plain_policies).set_filters(request).evaluate()
+        compiled = PolicyEvaluator(
+            compiled_policies).set_filters(request).evaluate()
+
+        assert list(plain.keys()) == list(compiled.keys())
+
+    plain_duration = run_evaluation(plain_policies, rounds)
+    compiled_duration = run_evaluation(compiled_policies, rounds)
+
+    print("\n%d policies, %d evaluations: plain %.4fs, compiled %.4fs "
+          "(speedup %.1fx)" % (
+              number_of_policies, rounds * len(REQUESTS),
+              plain_duration, compiled_duration,
+              plain_duration / max(compiled_duration, 1e-9)))
+
+    assert compiled_duration < plain_duration
+
+
+def test_policy_compile_benchmark():
+    """
+    measure the per config version costs of parsing and compiling the
+    policies
+    """
+
+    config = policy_config(500)
+
+    start = time.time()
+    plain_policies = parse_policies(config)
+    parse_duration = time.time() - start
+
+    start = time.time()
+    CompiledPolicies(plain_policies)
+    compile_duration = time.time() - start
+
+    print("\n500 policies: parse %.4fs, compile %.4fs" % (
+        parse_duration, compile_duration))
+
+# eof #
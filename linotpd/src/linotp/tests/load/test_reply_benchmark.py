@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+json response encoding micro benchmark
+
+compares the size and the encoding duration of the indented responses, as
+they were sent before, with the compact responses of the available json
+encoders for a typical admin/show result. Run with:
+
+    pytest -s linotp/tests/load/test_reply_benchmark.py
+"""
+
+import json
+import time
+
+import pytest
+
+from linotp.lib.reply_encoder import ENCODERS
+
+
+def admin_show_result(number_of_tokens):
+    """
+    create an admin/show like result with the given number of tokens
+    """
+
+    tokens = []
+
+    for i in range(number_of_tokens):
+        tokens.append({
+            'LinOtp.TokenId': i,
+            'LinOtp.TokenSerial': 'oath%08d' % i,
+            'LinOtp.TokenType': 'HMAC',
+            'LinOtp.TokenDesc': 'benchmark token',
+            'LinOtp.Isactive': True,
+            'LinOtp.FailCount': 0,
+            'LinOtp.MaxFail': 10,
+            'LinOtp.Count': i * 3,
+            'LinOtp.CountWindow': 10,
+            'LinOtp.OtpLen': 6,
+            'LinOtp.SyncWindow': 1000,
+            'LinOtp.Userid': str(1000 + i),
+            'LinOtp.IdResClass': 'useridresolver.PasswdIdResolver.'
+                                 'IdResolver.myDefRes',
+            'LinOtp.IdResolver': '/etc/passwd',
+            'LinOtp.RealmNames': ['myrealm'],
+            'LinOtp.TokenInfo': '{"hashlib": "sha1"}',
+            'User.username': 'user_%d' % i,
+            'User.userid': str(1000 + i),
+            'User.description': 'user %d,,,' % i,
+        })
+
+    return {
+        'jsonrpc': '2.0',
+        'result': {
+            'status': True,
+            'value': {
+                'resultset': {'tokens': number_of_tokens, 'pages': 1},
+                'data': tokens,
+            },
+        },
+        'version': 'LinOTP 3.0',
+        'id': 1,
+    }
+
+
+def run_encoding(encode, result, rounds):
+    """ encode the result several times and return the duration """
+
+    start = time.time()
+
+    for _i in range(rounds):
+        encode(result)
+
+    return time.time() - start
+
+
+@pytest.mark.parametrize('number_of_tokens', [100, 1000])
+def test_reply_encoding_benchmark(number_of_tokens):
+    """
+    compare the size and duration of the indented and compact encoding
+    """
+
+    rounds = 10
+
+    result = admin_show_result(number_of_tokens)
+
+    indented = json.dumps(result, indent=3)
+    indented_duration = run_encoding(
+        lambda obj: json.dumps(obj, indent=3), result, rounds)
+
+    print("\n%d tokens: indented %d bytes, %.4fs" % (
+        number_of_tokens, len(indented), indented_duration))
+
+    for name, encoder in sorted(ENCODERS.items()):
+
+        compact = encoder.dumps(result)
+        duration = run_encoding(encoder.dumps, result, rounds)
+
+        print("%d tokens: %s compact %d bytes (%.0f%%), %.4fs "
+              "(speedup %.1fx)" % (
+                  number_of_tokens, name, len(compact),
+                  100.0 * len(compact) / len(indented), duration,
+                  indented_duration / max(duration, 1e-9)))
+
+        # both encodings provide the same result
+
+        assert json.loads(compact) == json.loads(indented)
+        assert len(compact) < len(indented)
+
+# eof #
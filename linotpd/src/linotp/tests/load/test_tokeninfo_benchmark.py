@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+token info micro benchmark
+
+measures checkTokenList for a user with many tokens, where every token
+carries validity and counter settings in its token info, and compares the
+parsed token info cache with parsing the token info on every access.
+Run with:
+
+    pytest -s linotp/tests/load/test_tokeninfo_benchmark.py
+"""
+
+import time
+
+from datetime import datetime
+from datetime import timedelta
+
+from mock import patch
+
+import pytest
+
+from linotp.lib.auth.validate import ValidationHandler
+from linotp.lib.token import createTokenClassObject
+from linotp.lib.user import User
+from linotp.model import Token
+from linotp.model.meta import Session
+from linotp.tokens.base import tokeninfo_mixin
+from linotp.tokens.base.tokeninfo_mixin import TokenInfoCache
+
+
+def create_tokens(number_of_tokens):
+    """
+    create hmac tokens with validity period and counter limits
+    """
+
+    now = datetime.now()
+
+    serials = []
+
+    for i in range(number_of_tokens):
+
+        serial = 'bench_%04d' % i
+
+        token = Token(serial)
+        token_obj = createTokenClassObject(token, 'hmac')
+        token_obj.update({
+            'serial': serial,
+            'otpkey': '3132333435363738393031323334353637383930',
+            'pin': 'pin_%d' % i,
+        })
+
+        token_obj.validity_period_start = (
+            now - timedelta(days=1)).strftime('%d/%m/%y %H:%M')
+        token_obj.validity_period_end = (
+            now + timedelta(days=1)).strftime('%d/%m/%y %H:%M')
+        token_obj.count_auth_max = 1000000
+        token_obj.count_auth_success_max = 1000000
+
+        token.storeToken()
+        serials.append(serial)
+
+    Session.commit()
+
+    return serials
+
+
+def run_check(serials, rounds):
+    """
+    run checkTokenList with a wrong password - return the duration
+    """
+
+    duration = 0.0
+
+    for _i in range(rounds):
+
+        tokens = [
+            createTokenClassObject(token) for token in Session.query(
+                Token).filter(Token.LinOtpTokenSerialnumber.in_(serials))]
+
+        start = time.time()
+        ValidationHandler().checkTokenList(tokens, 'wrong_pass', User())
+        duration += time.time() - start
+
+        Session.rollback()
+
+    return duration
+
+
+@pytest.mark.parametrize('number_of_tokens', [20, 100])
+def test_check_token_list_benchmark(app, number_of_tokens):
+    """
+    compare checkTokenList with and without the parsed token info cache
+    """
+
+    rounds = 10
+
+    with app.test_request_context('/validate/check'):
+
+        # set up the request context with the hsm, config and policies
+
+        app.preprocess_request()
+
+        serials = create_tokens(number_of_tokens)
+
+        cached_duration = run_check(serials, rounds)
+
+        # without the cache, every access parses the token info again
+
+        with patch.object(tokeninfo_mixin, '_get_info_cache',
+                          lambda token: TokenInfoCache()):
+            uncached_duration = run_check(serials, rounds)
+
+    print("\n%d tokens, %d checks: uncached %.4fs, cached %.4fs "
+          "(speedup %.1fx)" % (
+              number_of_tokens, rounds, uncached_duration, cached_duration,
+              uncached_duration / max(cached_duration, 1e-9)))
+
+# eof #
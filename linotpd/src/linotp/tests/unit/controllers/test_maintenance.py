@@ -33,6 +33,7 @@ from sqlalchemy.exc import OperationalError
 from linotp.controllers.maintenance import MaintenanceController
 from linotp.flap import config, HTTPUnauthorized
 from linotp.model import LoggingConfig
+from linotp.model import Token
 from linotp.model.meta import Session
 
 @pytest.mark.usefixtures("app")
@@ -82,6 +83,65 @@ class TestMaintenance(object):
         config_entry = Session.query(LoggingConfig).get(name)
         assert config_entry.level == 10
 
+    @patch('linotp.lib.token_owner.getUserInfos')
+    def test_refresh_token_owners(self, mock_get_user_infos, app, client):
+        """
+        Test that 'refresh_token_owners' fills in the owner logins
+        """
+        resolver_spec = 'useridresolver.PasswdIdResolver.IdResolver.my'
+
+        owners = {
+            'owner_1': ('1', None),
+            'owner_2': ('2', 'old_login'),
+            'owner_3': ('3', None),
+            'no_owner': ('', ''),
+        }
+
+        for serial, (user_id, owner_login) in owners.items():
+            token = Token(serial)
+            token.LinOtpUserid = user_id
+            token.LinOtpIdResClass = resolver_spec if user_id else ''
+            token.storeToken()
+            token.LinOtpOwnerLogin = owner_login
+
+        Session.commit()
+
+        mock_get_user_infos.return_value = {
+            '1': {'userid': '1', 'username': 'Hans'},
+            '2': {'userid': '2', 'username': 'Susi'},
+        }
+
+        response = client.post('/maintenance/refresh_token_owners')
+
+        assert response.json['detail'] == {'checked': 3, 'updated': 3}
+        mock_get_user_infos.assert_called_once()
+
+        owner_logins = dict(
+            Session.query(Token.LinOtpTokenSerialnumber,
+                          Token.LinOtpOwnerLogin))
+
+        assert owner_logins == {
+            'owner_1': 'hans',
+            'owner_2': 'susi',
+            'owner_3': '/:no user info:/',
+            'no_owner': '',
+        }
+
+    def test_reconcile_token_counters(self, app, client):
+        """
+        Test that 'reconcile_token_counters' recounts the tokens
+        """
+
+        for serial in ['counter_1', 'counter_2']:
+            Token(serial).storeToken()
+
+        Session.commit()
+
+        response = client.post('/maintenance/reconcile_token_counters')
+
+        assert response.json['result']['status']
+        assert response.json['detail'] == {'tokens': 2, 'counters': 2}
+
 
 class TestMaintCertificateHandling(object):
 
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+unit tests for the hash chained audit entries
+"""
+
+import pytest
+
+from linotp.lib.audit.base import getAudit
+from linotp.lib.audit.SQLAudit import audit_chain_table
+from linotp.lib.audit.SQLAudit import audit_table
+from linotp.lib.audit.SQLAudit import setup_audit_db
+
+
+def log_entries(audit, number):
+    for i in range(number):
+        audit.log({'action': '/validate/check', 'serial': 'tok%d' % i,
+                   'success': True, 'user': 'user%d' % i, 'realm': 'realm'})
+
+
+def sig_checks(audit):
+    rows = audit.searchQuery({}, rp_dict={'sortname': 'number'})
+    segments = []
+    return [audit.row2dict(row, segments=segments)['sig_check']
+            for row in rows]
+
+
+@pytest.fixture
+def chain_audit(app):
+    app.config['AUDIT_INTEGRITY'] = 'chain'
+    app.config['AUDIT_CHECKPOINT_INTERVAL'] = 3
+    setup_audit_db(app.config)
+    return getAudit(app.config)
+
+
+class TestAuditChain(object):
+
+    def test_chain(self, chain_audit):
+        """ verify that the entries are covered by the checkpoints """
+
+        log_entries(chain_audit, 7)
+
+        assert sig_checks(chain_audit) == ['OK'] * 6 + ['PENDING']
+
+        result = chain_audit.verify_chain()
+        assert result == {'verified': 6, 'failed': None, 'unsigned': 1}
+
+        # verify a range within the second segment
+
+        result = chain_audit.verify_chain(start_id=5, end_id=5)
+        assert result == {'verified': 3, 'failed': None, 'unsigned': 0}
+
+        # sign the pending entry
+
+        chain_audit.checkpoint()
+
+        assert sig_checks(chain_audit) == ['OK'] * 7
+        assert chain_audit.verify_chain()['unsigned'] == 0
+
+    def test_tampered_entry(self, chain_audit):
+        """ verify that a modified entry breaks its segment """
+
+        log_entries(chain_audit, 6)
+
+        chain_audit.session.execute(
+            audit_table.update().where(audit_table.c.id == 5).values(
+                user='hacker'))
+
+        assert sig_checks(chain_audit) == ['OK'] * 3 + ['FAIL'] * 3
+
+        assert chain_audit.verify_chain()['failed'] == 5
+
+    def test_deleted_entry(self, chain_audit):
+        """ verify that a deleted entry breaks its segment """
+
+        log_entries(chain_audit, 6)
+
+        chain_audit.session.execute(
+            audit_table.delete().where(audit_table.c.id == 2))
+
+        assert sig_checks(chain_audit) == ['FAIL'] * 2 + ['OK'] * 3
+        assert chain_audit.verify_chain()['failed'] is not None
+
+    def test_async_chain(self, app):
+        """ verify the hash chain written by the background writer """
+
+        app.config['AUDIT_DURABILITY'] = 'async'
+        app.config['AUDIT_INTEGRITY'] = 'chain'
+        app.config['AUDIT_CHECKPOINT_INTERVAL'] = 4
+        setup_audit_db(app.config)
+
+        audit = getAudit(app.config)
+
+        log_entries(audit, 10)
+        audit.flush()
+
+        assert audit.verify_chain() == {
+            'verified': 8, 'failed': None, 'unsigned': 2}
+
+        audit.writer.close()
+
+    def test_chain_head_setup(self, app):
+        """ verify that the chain head is only created in the chain mode """
+
+        audit = getAudit(app.config)
+        log_entries(audit, 2)
+
+        assert audit.session.query(audit_chain_table).count() == 0
+
+        app.config['AUDIT_INTEGRITY'] = 'chain'
+        setup_audit_db(app.config)
+        setup_audit_db(app.config)
+
+        assert audit.session.query(audit_chain_table).count() == 1
+
+# eof
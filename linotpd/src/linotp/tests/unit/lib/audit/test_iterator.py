@@ -203,7 +203,7 @@ class AuditIteratorTestCase(unittest.TestCase):
                 'sortorder': 'asc'
                 }
             )
-        audit.row2dict.assert_called_once_with(None)
+        audit.row2dict.assert_called_once_with(None, segments=[])
         return
 
     def test_user_search(self):
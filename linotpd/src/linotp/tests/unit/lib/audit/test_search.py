@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+unit tests for the audit search: exact and prefix matches, keyset
+pagination and the estimated count
+"""
+
+import pytest
+
+from sqlalchemy import inspect
+
+from linotp.lib.audit.base import getAudit
+from linotp.lib.audit.SQLAudit import AuditTable
+from linotp.lib.audit.SQLAudit import audit_table
+from linotp.lib.audit.SQLAudit import match_condition
+from linotp.lib.audit.SQLAudit import setup_audit_db
+
+
+@pytest.fixture
+def audit(app):
+    audit = getAudit(app.config)
+
+    for i in range(30):
+        audit.log({'action': '/validate/check', 'serial': 'tok_%d' % i,
+                   'success': True, 'user': 'user%d' % (i % 3),
+                   'realm': 'realm'})
+
+    return audit
+
+
+def search_ids(audit, param, rp_dict):
+    return [row['id'] for row in audit.searchQuery(param, rp_dict=rp_dict)]
+
+
+class TestAuditSearch(object):
+
+    def test_match_condition(self):
+
+        column = AuditTable.user
+
+        assert str(match_condition(column, 'hans')) == (
+            'audit."user" = :user_1')
+        assert 'LIKE' in str(match_condition(column, 'ha%'))
+        assert str(match_condition(column, 'h_ns%')) == (
+            'audit."user" LIKE :user_1')
+        assert str(match_condition(column, '%ns')) == (
+            'audit."user" LIKE :user_1')
+
+    def test_exact_and_prefix_match(self, audit):
+
+        assert len(search_ids(audit, {'serial': 'tok_1'}, {})) == 1
+        assert len(search_ids(audit, {'serial': 'TOK_1'}, {})) == 0
+        assert len(search_ids(audit, {'serial': 'tok_1%'}, {})) == 11
+        assert len(search_ids(audit, {'serial': '%_1'}, {})) == 3
+        assert search_ids(audit, {'number': '7'}, {}) == [7]
+
+    @pytest.mark.parametrize('sortname', ['number', 'date'])
+    @pytest.mark.parametrize('sortorder', ['asc', 'desc'])
+    def test_keyset_pagination(self, audit, sortname, sortorder):
+        """
+        verify that the keyset pagination returns the same pages as the
+        offset pagination
+        """
+
+        param = {'user': 'user1'}
+
+        for page in range(1, 5):
+
+            rp_dict = {'rp': 3, 'page': page,
+                       'sortname': sortname, 'sortorder': sortorder}
+
+            ids = search_ids(audit, param, rp_dict)
+
+            if page > 1:
+                rp_dict['after'] = last_id
+                assert search_ids(audit, param, rp_dict) == ids
+
+            if ids:
+                last_id = ids[-1]
+
+    def test_estimated_count(self, app, audit):
+
+        assert audit.getTotal({}) == 30
+        assert audit.getTotal({'user': 'user1'}) == 10
+
+        app.config['AUDIT_COUNT_MODE'] = 'estimate'
+        app.config['AUDIT_COUNT_LIMIT'] = 5
+
+        assert audit.getTotal({}) == 30
+        assert audit.getTotal({'user': 'user1'}) == 5
+
+    def test_indexes(self, app, audit):
+
+        indexes = set(index['name'] for index in
+                      inspect(audit.engine).get_indexes(audit_table.name))
+
+        assert 'audit_user_realm_id_idx' in indexes
+
+        # missing indexes are created for an existing table at setup
+        # and not by the audit object of a request
+
+        audit.engine.execute('DROP INDEX audit_serial_id_idx')
+
+        getAudit(app.config)
+
+        indexes = set(index['name'] for index in
+                      inspect(audit.engine).get_indexes(audit_table.name))
+
+        assert 'audit_serial_id_idx' not in indexes
+
+        setup_audit_db(app.config)
+
+        indexes = set(index['name'] for index in
+                      inspect(audit.engine).get_indexes(audit_table.name))
+
+        assert 'audit_serial_id_idx' in indexes
+
+# eof
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+unit tests for the background audit writer
+"""
+
+import threading
+import unittest
+
+import pytest
+
+from linotp.lib.audit.base import getAudit
+from linotp.lib.audit.writer import AuditWriter
+
+
+class TestAuditWriter(unittest.TestCase):
+
+    def test_batches(self):
+        """ verify that the queued entries are written in batches """
+
+        batches = []
+
+        writer = AuditWriter(batches.append, batch_size=10,
+                             flush_interval=0.2)
+
+        for i in range(25):
+            writer.put(i)
+
+        writer.flush()
+
+        written = [entry for batch in batches for entry in batch]
+        assert written == list(range(25))
+        assert max(len(batch) for batch in batches) <= 10
+
+        stats = writer.get_stats()
+        assert stats['enqueued'] == 25
+        assert stats['written'] == 25
+        assert stats['queued'] == 0
+        assert stats['batches'] == len(batches)
+
+        writer.close()
+        assert not writer.thread.is_alive()
+
+    def test_close_flushes_the_queue(self):
+        """ verify that closing the writer writes all queued entries """
+
+        written = []
+
+        writer = AuditWriter(written.extend, flush_interval=10)
+
+        for i in range(5):
+            writer.put(i)
+
+        writer.close()
+
+        assert written == list(range(5))
+
+    def test_backpressure(self):
+        """
+        verify that with a full queue, the request writes on its own
+        """
+
+        written = []
+        blocking = threading.Event()
+
+        def write_batch(entries):
+            blocking.wait()
+            written.extend(entries)
+
+        writer = AuditWriter(write_batch, queue_size=2, batch_size=1,
+                             flush_interval=0, put_timeout=0.01)
+
+        # the first entry is taken by the blocked writer thread, the next
+        # two fill the queue, so that the last one is written directly
+
+        writer.put(1)
+        while writer.queue.qsize():
+            pass
+
+        writer.put(2)
+        writer.put(3)
+
+        blocking.set()
+        writer.put(4)
+
+        writer.flush()
+
+        assert sorted(written) == [1, 2, 3, 4]
+
+        stats = writer.get_stats()
+        assert stats['blocked'] >= 1
+        assert stats['sync_writes'] + stats['enqueued'] == 4
+        assert stats['max_queued'] == 2
+
+        writer.close()
+
+    def test_failed_batch(self):
+        """
+        verify that a failed batch is retried entry by entry and only the
+        broken entry gets lost
+        """
+
+        written = []
+
+        def write_batch(entries):
+            if 'broken' in entries:
+                raise Exception('write failed')
+            written.extend(entries)
+
+        writer = AuditWriter(write_batch, flush_interval=0.2)
+
+        for entry in ['a', 'broken', 'b']:
+            writer.put(entry)
+
+        writer.close()
+
+        assert written == ['a', 'b']
+        assert writer.get_stats()['failed'] == 1
+
+
+@pytest.mark.usefixtures("app")
+class TestAsyncSQLAudit(object):
+
+    def test_async_audit(self, app):
+        """
+        verify that the entries of the background writer are signed the
+        same way as in sync mode
+        """
+
+        app.config['AUDIT_DURABILITY'] = 'async'
+
+        audit = getAudit(app.config)
+        assert audit.writer
+
+        for i in range(5):
+            audit.log({'action': '/admin/init', 'serial': 'tok%d' % i,
+                       'success': True, 'user': 'hans', 'realm': 'realm'})
+
+        audit.flush()
+
+        rows = list(audit.searchQuery({'action': 'admin/init'}))
+        assert len(rows) == 5
+
+        for row in rows:
+            line = audit.row2dict(row)
+            assert line['sig_check'] == 'OK'
+            assert line['clearance_level'] == 0
+
+        assert audit.get_writer_stats()['written'] == 5
+
+        audit.writer.close()
+
+    def test_shared_writer(self, app):
+        """
+        verify that the audit objects of the requests share one writer
+        """
+
+        app.config['AUDIT_DURABILITY'] = 'async'
+
+        threads = threading.active_count()
+
+        audits = [getAudit(app.config) for _i in range(5)]
+
+        for audit in audits:
+            audit.log({'action': '/admin/show', 'success': True})
+
+        assert len(set(id(audit.writer) for audit in audits)) == 1
+        assert threading.active_count() == threads + 1
+
+        # a changed setting replaces the writer
+
+        app.config['AUDIT_BATCH_SIZE'] = 10
+
+        audit = getAudit(app.config)
+        assert audit.writer is not audits[0].writer
+        assert not audits[0].writer.thread.is_alive()
+
+        audit.writer.close()
+
+    def test_unsupported_durability(self, app):
+
+        app.config['AUDIT_DURABILITY'] = 'sometimes'
+
+        with pytest.raises(ValueError):
+            getAudit(app.config)
+
+# eof
@@ -0,0 +1,114 @@
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+Tests for the hmac otp window, which is calculated with a once decrypted
+secret
+"""
+
+from hashlib import sha1
+
+from mock import patch
+
+import pytest
+
+from linotp.lib.crypto import SecretObj
+from linotp.lib.HMAC import HmacOtp
+
+# the hotp test values of rfc 4226 - appendix D
+SEED = '3132333435363738393031323334353637383930'
+
+RFC_OTPS = ['755224', '287082', '359152', '969429', '338314',
+            '254676', '287922', '162583', '399871', '520489']
+
+
+# pylint:disable=redefined-outer-name, unused-argument
+@pytest.fixture
+def secret_object(app, hsm_obj):
+    """
+    Fixture to return a SecretObj with the encrypted rfc 4226 seed
+    """
+
+    with app.test_request_context():
+
+        iv, enc_seed = SecretObj.encrypt(SEED)
+
+        yield SecretObj(enc_seed, iv)
+
+
+def test_hmac_digests(secret_object):
+    """
+    the window digests are the same as the single digests
+    """
+
+    data_inputs = [b'%d' % i for i in range(10)]
+
+    digests = list(secret_object.hmac_digests(data_inputs, hash_algo=sha1))
+
+    assert digests == [
+        secret_object.hmac_digest(data_input, hash_algo=sha1)
+        for data_input in data_inputs]
+
+
+def test_check_otp_window(secret_object):
+    """
+    the otp window check finds the rfc test values
+    """
+
+    for counter, otp in enumerate(RFC_OTPS):
+
+        hmac_otp = HmacOtp(secret_object, counter=0, digits=6)
+        assert hmac_otp.checkOtp(otp, 10) == counter
+        assert hmac_otp.counter == counter + 1
+
+    hmac_otp = HmacOtp(secret_object, counter=3, digits=6)
+    assert hmac_otp.checkOtp(RFC_OTPS[1], 5) == -1
+    assert hmac_otp.checkOtp(RFC_OTPS[1], 5, symetric=True) == -1
+
+    hmac_otp = HmacOtp(secret_object, counter=3, digits=6)
+    assert hmac_otp.checkOtp(RFC_OTPS[1], 5, symetric=True) == 1
+
+
+def test_check_otp_decrypts_once(secret_object):
+    """
+    the secret is decrypted once for the whole window and - if it should
+    not be preserved - cleared afterwards
+    """
+
+    secret_object.preserve = False
+
+    with patch.object(SecretObj, 'decrypt',
+                      wraps=SecretObj.decrypt) as mock_decrypt:
+
+        hmac_otp = HmacOtp(secret_object, counter=0, digits=6)
+
+        assert hmac_otp.checkOtp(RFC_OTPS[7], 1000) == 7
+        assert mock_decrypt.call_count == 1
+        assert getattr(secret_object, 'bkey', None) is None
+
+        assert hmac_otp.checkOtp('000000', 1000) == -1
+        assert mock_decrypt.call_count == 2
+        assert getattr(secret_object, 'bkey', None) is None
+
+# eof #
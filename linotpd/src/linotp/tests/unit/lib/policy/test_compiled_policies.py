@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+""" unit test for the compiled and indexed policy set """
+
+import unittest
+
+from linotp.lib.policy.compiled import CompiledPolicies
+from linotp.lib.policy.compiled import compile_policies
+from linotp.lib.policy.compiled import get_compiled_policies
+from linotp.lib.policy.evaluate import PolicyEvaluator
+
+
+def policy_config(version='2019-01-01 00:00:00.000000'):
+    """ a config dict with some policy definitions """
+
+    config = {'linotp.Config': version}
+
+    policies = {
+        'auth_otppin': {
+            'scope': 'authentication',
+            'action': 'otppin=1, passthru',
+            'realm': 'myRealm',
+            'user': '*',
+            'client': '',
+            'time': '',
+        },
+        'auth_all': {
+            'scope': 'authentication',
+            'action': '*',
+            'realm': '*',
+            'user': '*',
+            'client': '192.168.0.0/16',
+            'time': '',
+        },
+        'admin_all': {
+            'scope': 'admin',
+            'action': '*',
+            'realm': '*',
+            'user': 'admin',
+            'client': '',
+            'time': '',
+        },
+    }
+
+    for name, policy in policies.items():
+        for key, value in policy.items():
+            config['linotp.Policy.%s.%s' % (name, key)] = value
+
+    return config
+
+
+class TestCompiledPolicies(unittest.TestCase):
+
+    def test_index(self):
+        """ verify that the policies are indexed by scope and action """
+
+        policies = compile_policies(policy_config())
+
+        assert isinstance(policies, CompiledPolicies)
+        assert policies.names == ['admin_all', 'auth_all', 'auth_otppin']
+
+        assert policies.scope_index['authentication'] == {
+            'auth_all', 'auth_otppin'}
+
+        assert policies.action_index['otppin'] == {'auth_otppin'}
+        assert policies.action_index['otppin=1'] == {'auth_otppin'}
+        assert policies.action_index['*'] == {'auth_all', 'admin_all'}
+
+        conditions = policies.conditions['auth_otppin']
+        assert conditions['action'] == ('otppin=1', 'passthru')
+        assert conditions['realm'] == ('myrealm',)
+        assert conditions['time'] == ('* * * * * *', '')
+
+        assert policies['auth_otppin']['name'] == 'auth_otppin'
+
+    def test_candidates(self):
+        """ verify the preselection of the policies by the index """
+
+        policies = compile_policies(policy_config())
+
+        pe = PolicyEvaluator(policies)
+        pe.set_filters({'scope': 'authentication', 'action': 'otppin'})
+
+        assert policies.candidates(pe.filters) == [
+            'auth_all', 'auth_otppin']
+
+        pe.reset_filters()
+        pe.set_filters({'scope': 'admin', 'action': 'passthru'})
+
+        assert policies.candidates(pe.filters) == ['admin_all']
+
+        pe.reset_filters()
+        pe.set_filters({'scope': 'system'})
+
+        assert policies.candidates(pe.filters) == []
+
+    def test_evaluate(self):
+        """
+        verify that the evaluation of the compiled policies is the same
+        as the evaluation of the plain policy dict
+        """
+
+        compiled = compile_policies(policy_config())
+        plain = {name: dict(policy) for name, policy in compiled.items()}
+
+        params = [
+            {'scope': 'authentication', 'action': 'otppin',
+             'realm': 'myrealm', 'client': '192.168.1.1'},
+            {'scope': 'authentication', 'action': 'passthru',
+             'realm': 'otherrealm', 'client': '10.0.0.1'},
+            {'scope': 'authentication', 'realm': 'myRealm',
+             'client': '10.0.0.1'},
+            {'scope': 'admin', 'action': 'show'},
+            {'scope': 'admin', 'action': 'show', 'name': 'auth_all'},
+        ]
+
+        for param in params:
+
+            res_compiled = PolicyEvaluator(
+                compiled).set_filters(param).evaluate()
+
+            res_plain = PolicyEvaluator(
+                plain).set_filters(param).evaluate()
+
+            assert list(res_compiled.keys()) == list(res_plain.keys())
+
+    def test_cached_by_config_version(self):
+        """ verify that the compiled policies are shared per config version """
+
+        config = policy_config(version='2019-01-01 00:00:00.000001')
+
+        policies = get_compiled_policies(config)
+        assert get_compiled_policies(dict(config)) is policies
+
+        new_config = dict(config)
+        new_config['linotp.Config'] = '2019-01-01 00:00:00.000002'
+
+        new_policies = get_compiled_policies(new_config)
+        assert new_policies is not policies
+        assert get_compiled_policies(new_config) is new_policies
+
+        # without config timestamp we always compile
+
+        del new_config['linotp.Config']
+        assert get_compiled_policies(new_config) is not new_policies
+
+# eof #
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+unit test for the pre-compiled condition matchers, which must provide the
+same results as the condition comparing functions
+"""
+
+import unittest
+
+from datetime import datetime
+
+from linotp.lib.policy.compiled import tokenise_condition
+from linotp.lib.policy.evaluate import IPListMatcher
+from linotp.lib.policy.evaluate import TimeListMatcher
+from linotp.lib.policy.evaluate import ValueListMatcher
+from linotp.lib.policy.evaluate import WildcardListMatcher
+from linotp.lib.policy.evaluate import compile_matchers
+
+
+class TestConditionMatchers(unittest.TestCase):
+
+    def check(self, matcher_class, condition, values, separator=','):
+        """
+        helper to compare the matcher result with the comparing function
+        """
+        conditions = tokenise_condition(condition, separator)
+        matcher = matcher_class(conditions)
+
+        for value in values:
+            expected = matcher.compare(condition, value)
+            assert matcher.match(value) == expected, (condition, value)
+
+    def test_value_list_matcher(self):
+
+        values = ['a', 'b', 'c', 'd', 'b=a', 'otppin', '']
+
+        for condition in [", , ,, ", ", a , b ,,, c", ", a , b=x ,,, c",
+                          ", a , b=x ,,, c=x", "*", "otppin=1, !b",
+                          "a, *, b"]:
+            self.check(ValueListMatcher, condition, values)
+
+    def test_wildcard_list_matcher(self):
+
+        values = ['realm1', 'Realm1', 'REALM2', 'realm3', '']
+
+        for condition in ["realm1, realm2", "realm1, -realm1",
+                          "!realm2, realm1, realm2", "*", "-realm1, *",
+                          "REALM1", " , ,"]:
+            self.check(WildcardListMatcher, condition, values)
+
+    def test_ip_list_matcher(self):
+
+        values = ['192.168.13.14', '192.168.12.1', '172.16.1.1',
+                  '10.0.0.1', '::1', '2001:db8::1']
+
+        for condition in ["192.168.0.0/16", "192.168.0.0/16, -192.168.12.0/24",
+                          "10.0.0.1, 172.16.0.0/12", "*", "-*",
+                          "!10.0.0.1, *", "::1, 2001:db8::/32",
+                          "192.168.13.14/24", ""]:
+            self.check(IPListMatcher, condition, values)
+
+        # without matching networks, the client is not parsed at all
+
+        for condition in ["", " , ", "-192.168.0.0/16"]:
+            matcher = IPListMatcher(tokenise_condition(condition, ','))
+            assert matcher.match('no ip address') is False
+
+    def test_time_list_matcher(self):
+
+        values = [datetime(2019, 1, 1, 12, 0),
+                  datetime(2019, 1, 5, 6, 15),
+                  datetime(2019, 3, 31, 23, 59),
+                  datetime(2020, 2, 29, 18, 30),
+                  datetime(3100, 6, 6, 6, 6)]
+
+        for condition in ["* * * * * *;", "* 6-18 * * 1-5 *;",
+                          "*/15 */6 1,15,31 * 1-5 *;",
+                          "* * * * * *; !* 12 * * * *",
+                          "!* 0-12 * * * *; * * * * * *",
+                          "0 12 * * 1-5 *; * * * 2 * */4",
+                          "* * * * * 3100", "*; !* * * * * *"]:
+            self.check(TimeListMatcher, condition, values, separator=';')
+
+    def test_compile_matchers(self):
+        """
+        verify that conditions which could not be compiled are evaluated by
+        the comparing functions
+        """
+
+        conditions = {
+            'name': 'pol',
+            'action': ('otppin=1',),
+            'realm': ('*',),
+            'client': ('no network',),
+            'time': ('* * *',),
+            'user': ('*',),
+        }
+
+        matchers = compile_matchers(conditions)
+
+        assert set(matchers.keys()) == {'action', 'realm'}
+
+# eof #
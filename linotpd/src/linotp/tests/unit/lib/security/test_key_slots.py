@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+"""
+unit test for the key slots of the default security module
+"""
+
+import os
+
+import pytest
+
+from linotp.lib.security.default import DefaultSecurityModule
+from linotp.lib.security.key_slots import KeySlots
+from linotp.lib.security.key_slots import get_key_slots
+
+
+@pytest.fixture
+def sec_file(tmp_path):
+    """
+    Fixture to create a secret file with three keys
+    """
+
+    secret_file = tmp_path / 'encKey'
+    secret_file.write_bytes(os.urandom(3 * 32))
+
+    return str(secret_file)
+
+
+def test_key_slots(sec_file):
+    """
+    the key slots provide the keys of the secret file
+    """
+
+    with open(sec_file, 'rb') as f:
+        secrets = f.read()
+
+    key_slots = KeySlots(sec_file)
+
+    assert len(key_slots) == 3
+
+    for slot in range(3):
+        assert bytes(key_slots.key(slot)) == secrets[slot * 32:][:32]
+
+    with pytest.raises(Exception):
+        key_slots.key(3)
+
+    key_slots.clear()
+
+    assert len(key_slots) == 0
+    assert key_slots._buffer == bytearray(3 * 32)
+
+
+def test_key_slots_are_shared(sec_file):
+    """
+    the key slots are loaded once for a secret file
+    """
+
+    key_slots = get_key_slots(sec_file)
+
+    assert get_key_slots(sec_file) is key_slots
+
+    # a changed secret file is loaded again
+
+    with open(sec_file, 'ab') as f:
+        f.write(os.urandom(32))
+
+    new_key_slots = get_key_slots(sec_file)
+
+    assert new_key_slots is not key_slots
+    assert len(new_key_slots) == 4
+    assert len(key_slots) == 3
+
+
+def test_default_security_module(sec_file):
+    """
+    the security module encrypts and decrypts with the key slots
+    """
+
+    hsm = DefaultSecurityModule({'file': sec_file})
+
+    iv = os.urandom(16)
+
+    for slot in range(3):
+        encrypted = hsm.encrypt(b'secret data', iv, slot)
+        assert hsm.decrypt(encrypted, iv, slot) == b'secret data'
+
+    assert hsm.decryptPin(hsm.encryptPin(b'1234')) == b'1234'
+
+    with pytest.raises(Exception):
+        hsm.encrypt(b'secret data', iv, 4)
+
+# eof #
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+unit test for the process wide connection pool
+"""
+
+from freezegun import freeze_time
+
+from linotp.lib.connection_pool import ConnectionPool
+from linotp.lib.connection_pool import PooledConnection
+from linotp.lib.connection_pool import drop_connection_pool
+from linotp.lib.connection_pool import get_connection_pool
+
+
+class Connection(object):
+    """ helper connection, which tracks its closing and health """
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+
+def close(connection):
+    connection.closed = True
+
+
+def check(connection):
+    return connection.healthy
+
+
+def test_acquire_and_release():
+    """ released connections are reused per resource """
+
+    pool = ConnectionPool(close=close, check=check, size=1)
+
+    assert pool.acquire('ldap://1') is None
+
+    pooled_1 = PooledConnection('ldap://1', Connection())
+    pooled_2 = PooledConnection('ldap://1', Connection())
+
+    pool.release(pooled_1)
+
+    # the pool size is exceeded - the connection is closed
+
+    pool.release(pooled_2)
+    assert pooled_2.connection.closed
+
+    assert pool.acquire('ldap://2') is None
+    assert pool.acquire('ldap://1') is pooled_1
+    assert pool.acquire('ldap://1') is None
+
+    pool.release(pooled_1)
+    pool.discard('ldap://1')
+
+    assert pooled_1.connection.closed
+    assert pool.acquire('ldap://1') is None
+
+
+def test_expiration_and_health_check():
+    """ idle, old or unhealthy connections are closed """
+
+    pool = ConnectionPool(close=close, check=check, max_idle=60,
+                          max_lifetime=300, check_interval=10)
+
+    with freeze_time("2020-01-01 12:00:00") as frozen_time:
+
+        idle = PooledConnection('ldap://1', Connection())
+        pool.release(idle)
+
+        frozen_time.tick(61)
+        assert pool.acquire('ldap://1') is None
+        assert idle.connection.closed
+
+        # the health check is only made after the check interval
+
+        unhealthy = PooledConnection('ldap://1', Connection(healthy=False))
+        pool.release(unhealthy)
+
+        frozen_time.tick(5)
+        assert pool.acquire('ldap://1') is unhealthy
+
+        pool.release(unhealthy)
+
+        frozen_time.tick(11)
+        assert pool.acquire('ldap://1') is None
+        assert unhealthy.connection.closed
+
+        # the max lifetime is independent from the usage
+
+        old = PooledConnection('ldap://1', Connection())
+
+        for _i in range(9):
+            pool.release(old)
+            frozen_time.tick(31)
+            assert pool.acquire('ldap://1') is old
+
+        pool.release(old)
+        frozen_time.tick(31)
+
+        assert pool.acquire('ldap://1') is None
+        assert old.connection.closed
+
+
+def test_get_connection_pool():
+    """ the pools are shared and replaced on changed settings """
+
+    pool = get_connection_pool('test_pool', close=close, size=2)
+    assert get_connection_pool('test_pool', close=close, size=2) is pool
+
+    pooled = PooledConnection('ldap://1', Connection())
+    pool.release(pooled)
+
+    new_pool = get_connection_pool('test_pool', close=close, size=3)
+
+    assert new_pool is not pool
+    assert pooled.connection.closed
+
+    # changed connection parameters replace the pool as well
+
+    assert get_connection_pool(
+        'test_pool', close=close, params='other', size=3) is not new_pool
+
+
+def test_drop_connection_pool():
+    """ a dropped pool closes its idle and its released connections """
+
+    pool = get_connection_pool('drop_pool', close=close)
+
+    idle = PooledConnection('ldap://1', Connection())
+    pool.release(idle)
+
+    in_use = pool.acquire('ldap://1')
+    assert in_use is idle
+
+    other = PooledConnection('ldap://1', Connection())
+    pool.release(other)
+
+    drop_connection_pool('drop_pool')
+
+    assert other.connection.closed
+    assert not in_use.connection.closed
+
+    pool.release(in_use)
+    assert in_use.connection.closed
+
+    assert get_connection_pool('drop_pool', close=close) is not pool
+
+# eof #
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+unit test for the process wide http sessions
+"""
+
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from linotp.lib.http_pool import get_http_session
+from linotp.lib.http_pool import http_request
+from linotp.useridresolver.HTTPIdResolver import IdResolver
+
+
+class UserHandler(BaseHTTPRequestHandler):
+    """ stub user service, which tracks the client connections """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length)
+
+        self.server.client_ports.add(self.client_address[1])
+        self.server.requests.append((self.path, data))
+
+        if self.path.startswith('/oauth/token'):
+            status = 401
+            body = json.dumps({'error': 'unauthorized'}).encode('utf-8')
+        else:
+            status = 200
+            body = json.dumps({'result': {'value': [
+                {'userid': '1000', 'username': 'hans'}]}}).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def user_service():
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UserHandler)
+    server.client_ports = set()
+    server.requests = []
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def get_uri(server):
+    return 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+def test_get_http_session():
+    """ the session is shared and replaced on changed settings """
+
+    session = get_http_session(('test', 'http://1'), pool_size=2)
+
+    assert get_http_session(('test', 'http://1'), pool_size=2) is session
+    assert get_http_session(('test', 'http://2'), pool_size=2) is not session
+    assert get_http_session(('test', 'http://1'), pool_size=3) is not session
+
+
+def test_keep_alive_and_failover(user_service):
+    """ the connection is reused and an unavailable uri is skipped """
+
+    session = get_http_session(('test', 'failover'))
+    uris = ['http://127.0.0.1:1', get_uri(user_service)]
+
+    for _i in range(3):
+        response = http_request(session, uris, '/userlist', {'user': 'hans'})
+        assert response.json()['result']['value'][0]['userid'] == '1000'
+
+    assert len(user_service.client_ports) == 1
+
+
+def test_query_and_status(user_service):
+    """ the query is sent in the url and the status check is optional """
+
+    session = get_http_session(('test', 'query'))
+    uris = [get_uri(user_service)]
+
+    with pytest.raises(requests.HTTPError):
+        http_request(session, uris, '/oauth/token')
+
+    response = http_request(session, uris, '/oauth/token',
+                            query={'grant_type': 'client_credentials'},
+                            check_status=False)
+
+    assert response.status_code == 401
+    assert response.json()['error'] == 'unauthorized'
+
+    assert user_service.requests[-1] == (
+        '/oauth/token?grant_type=client_credentials', b'')
+
+
+def test_http_resolver(user_service):
+    """ the http resolver looks up the users by the shared session """
+
+    mapping = '{"username": "{USERNAME}"}'
+
+    config = {}
+    for key, value in {
+            'uri': get_uri(user_service), 'timeout': '5',
+            'authuser': 'admin', 'password': 'Test123!',
+            'certificate': '',
+            'userid_request_path': '/admin/userlist',
+            'userid_request_mapping': mapping,
+            'userid_result_path': '/result/value',
+            'userid_result_mapping': '{}'}.items():
+        config['linotp.httpresolver.%s.my' % key] = value
+
+    for _i in range(3):
+        resolver = IdResolver().loadConfig(config, 'my')
+        assert resolver.getUserId('hans') == '1000'
+
+    assert len(user_service.client_ports) == 1
+
+# eof #
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+unit test for the radius client
+"""
+
+import os
+import socket
+import threading
+
+import pyrad.packet
+import pytest
+
+from pyrad.client import Timeout
+
+from linotp.lib.radius import RadiusClient
+from linotp.lib.radius import get_radius_dictionary
+from linotp.lib.radius import parse_radius_servers
+
+SECRET = b'testing123'
+
+DICTIONARY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__)))))), 'dictionary')
+
+
+class RadiusServer(object):
+    """ stub radius server, which accepts every access request """
+
+    def __init__(self):
+
+        self.dictionary = get_radius_dictionary(DICTIONARY_PATH)
+        self.client_ports = set()
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.port = self.socket.getsockname()[1]
+
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+
+        while True:
+            try:
+                data, address = self.socket.recvfrom(4096)
+            except OSError:
+                return
+
+            self.client_ports.add(address[1])
+
+            request = pyrad.packet.AuthPacket(
+                packet=data, secret=SECRET, dict=self.dictionary)
+
+            reply = request.CreateReply()
+            reply.code = pyrad.packet.AccessAccept
+
+            self.socket.sendto(reply.ReplyPacket(), address)
+
+    def close(self):
+        self.socket.close()
+
+
+@pytest.fixture
+def radius_server():
+
+    server = RadiusServer()
+    yield server
+    server.close()
+
+
+def create_request(client):
+
+    request = client.create_auth_packet(
+        code=pyrad.packet.AccessRequest, User_Name=b'hans',
+        NAS_Identifier=b'LinOTP')
+    request['User-Password'] = request.PwCrypt('pin123456')
+
+    return request
+
+
+def test_parse_radius_servers():
+    """ the servers are parsed with the default port """
+
+    assert parse_radius_servers('host1:1813, host2,') == [
+        ('host1', 1813), ('host2', 1812)]
+
+
+def test_dictionary_is_cached():
+    """ the dictionary is parsed once """
+
+    assert (get_radius_dictionary(DICTIONARY_PATH) is
+            get_radius_dictionary(DICTIONARY_PATH))
+
+
+def test_failover_and_socket_reuse(radius_server):
+    """ a server without reply is skipped and the socket is reused """
+
+    # the stub server of the first entry does not reply
+
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+
+    servers = '127.0.0.1:%d, 127.0.0.1:%d' % (
+        silent.getsockname()[1], radius_server.port)
+
+    try:
+        client = RadiusClient(
+            servers, SECRET, get_radius_dictionary(DICTIONARY_PATH),
+            timeout=0.2, retries=1)
+
+        for _i in range(3):
+            reply = client.send_packet(create_request(client))
+            assert reply.code == pyrad.packet.AccessAccept
+
+        assert len(radius_server.client_ports) == 1
+
+        future = client.send_packet_async(create_request(client))
+        assert future.result(timeout=5).code == pyrad.packet.AccessAccept
+
+    finally:
+        silent.close()
+
+
+def test_no_server_replies():
+    """ if no server replies, the Timeout is raised """
+
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+
+    try:
+        client = RadiusClient(
+            '127.0.0.1:%d' % silent.getsockname()[1], SECRET,
+            get_radius_dictionary(DICTIONARY_PATH), timeout=0.1, retries=1)
+
+        with pytest.raises(Timeout):
+            client.send_packet(create_request(client))
+
+    finally:
+        silent.close()
+
+# eof #
@@ -32,6 +32,7 @@ import flask
 import pytest
 
 from linotp.lib import reply
+from linotp.lib import reply_encoder
 from linotp.lib.context import request_context
 from linotp.lib.error import ProgrammingError
 from linotp.lib.reply import _get_httperror_from_params, sendResultIterator
@@ -121,3 +122,70 @@ class TestReplyTestCase(object):
         value = result_dict.get('result', {}).get('value')
 
         assert 'bar' in value
+
+    @pytest.mark.parametrize('querystring,pretty', [
+        ('/', False),
+        ('/?pretty=true', True),
+    ])
+    def test_send_result_encoding(self, app, querystring, pretty):
+        """ the result is compact, unless pretty printing is requested """
+
+        with app.test_request_context(querystring):
+            response = reply.sendResult(None, {'serial': 'T1'})
+
+        data = response.get_data(as_text=True)
+
+        assert ('\n' in data) == pretty
+        assert '"value": {"serial": "T1"}' in data or pretty
+        assert json.loads(data)['result']['value'] == {'serial': 'T1'}
+
+    def test_response_iterator_encoding(self, app, monkeypatch):
+        """ the entries are encoded incrementally and sent in chunks """
+
+        monkeypatch.setattr(reply, 'STREAM_BUFFER_SIZE', 100)
+
+        entries = ({'serial': 'T%d' % i} for i in range(50))
+
+        with app.test_request_context('/'):
+            chunks = list(sendResultIterator(entries, opt={'info': 1}))
+
+        # the opening, the chunks of at least 100 chars and the closing
+
+        assert len(chunks) < 50
+        for chunk in chunks[1:-1]:
+            assert len(chunk) >= 100
+
+        result = json.loads(''.join(chunks))
+
+        assert result['result']['value'] == [
+            {'serial': 'T%d' % i} for i in range(50)]
+        assert result['result']['queried'] == 50
+        assert result['detail'] == {'info': 1}
+
+    def test_response_iterator_paging(self, app):
+        """ only the entries of the requested page are sent """
+
+        entries = ('"T%d"' % i for i in range(50))
+
+        with app.test_request_context('/'):
+            result = json.loads(''.join(
+                sendResultIterator(entries, rp=10, page=2)))
+
+        values = result['result']['value']
+        assert len(values) == 10
+        assert values == ['T%d' % i for i in range(int(values[0][1:]),
+                                                   int(values[0][1:]) + 10)]
+
+    def test_json_encoder_fallback(self, app, monkeypatch):
+        """ without orjson the standard library is used """
+
+        monkeypatch.setattr(reply_encoder, 'ENCODERS',
+                            {'json': reply_encoder.StdlibEncoder()})
+
+        encoder = reply_encoder.get_json_encoder('orjson')
+        assert encoder.name == 'json'
+
+        with pytest.raises(ValueError):
+            reply_encoder.get_json_encoder('unknown')
+
+# eof #
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+verify that the LinOTP config is shared between the requests by reference
+and copied only on change
+"""
+
+from datetime import datetime
+
+from mock import patch
+
+import pytest
+
+from linotp.lib.config.config_class import LinOtpConfig
+from linotp.lib.config.config_class import get_shared_config
+from linotp.lib.config.db_api import _storeConfigDB
+from linotp.model import meta
+
+
+@pytest.mark.usefixtures("app")
+class TestSharedConfig(object):
+
+    def test_config_is_shared(self):
+        """ verify that the configs refer to the same snapshot """
+
+        config_1 = LinOtpConfig()
+        config_2 = LinOtpConfig()
+
+        assert config_1._entries is config_2._entries
+        assert get_shared_config() is get_shared_config()
+
+    def test_copy_on_write(self):
+        """ verify that a change does not modify the snapshot in use """
+
+        config_1 = LinOtpConfig()
+        snapshot = config_1._entries
+
+        config_1['linotp.shared_config_test'] = 'value'
+        meta.Session.commit()
+
+        assert 'linotp.shared_config_test' in config_1
+        assert 'linotp.shared_config_test' not in snapshot
+
+        # a new config refers to the new snapshot
+
+        config_2 = LinOtpConfig()
+        assert config_2.get('shared_config_test') == 'value'
+        assert config_2._entries is not snapshot
+
+        del config_2['shared_config_test']
+        meta.Session.commit()
+
+        assert 'shared_config_test' not in config_2
+        assert 'shared_config_test' in config_1
+        assert 'shared_config_test' not in LinOtpConfig()
+
+    def test_publish_on_commit(self):
+        """
+        verify that a change is shared only after the commit and not at all
+        after a rollback
+        """
+
+        config = LinOtpConfig()
+        config['linotp.publish_test'] = 'value'
+
+        assert 'linotp.publish_test' not in LinOtpConfig()
+
+        meta.Session.rollback()
+
+        assert 'linotp.publish_test' not in LinOtpConfig()
+
+        config = LinOtpConfig()
+        config['linotp.publish_test'] = 'value'
+        meta.Session.commit()
+
+        assert LinOtpConfig().get('publish_test') == 'value'
+
+    def test_config_sections(self):
+        """
+        verify that the section index is shared and follows the changes
+        """
+
+        config_1 = LinOtpConfig()
+        config_2 = LinOtpConfig()
+
+        section = config_1.get_section('SectionTest')
+        assert 'linotp.SectionTest.entry' not in section
+        assert config_2.get_section('SectionTest') is section
+
+        config_1['linotp.SectionTest.entry'] = 'value'
+        meta.Session.commit()
+
+        assert config_1.get_section('SectionTest') == {
+            'linotp.SectionTest.entry': 'value'}
+        assert 'linotp.SectionTest.entry' not in config_2.get_section(
+            'SectionTest')
+
+        config_3 = LinOtpConfig()
+        assert 'linotp.SectionTest.entry' in config_3.get_section(
+            'SectionTest')
+
+        del config_3['SectionTest.entry']
+        meta.Session.commit()
+
+        assert 'linotp.SectionTest.entry' not in config_3.get_section(
+            'SectionTest')
+
+    def test_replication_check_interval(self, app):
+        """
+        verify that the database is not queried for a changed config on
+        every request
+        """
+
+        LinOtpConfig()
+
+        app.config['CONFIG_REPLICATION_CHECK_INTERVAL'] = 3600
+
+        with patch('linotp.lib.config.config_class._retrieveConfigDB') \
+                as mock_retrieve:
+
+            get_shared_config().last_check = 0.0
+
+            LinOtpConfig()
+            LinOtpConfig()
+            LinOtpConfig()
+
+            assert mock_retrieve.call_count == 1
+
+    def test_change_by_other_process(self, app):
+        """
+        verify that a config change of another process is picked up -
+        with or without replication
+        """
+
+        snapshot = LinOtpConfig()._entries
+        assert 'linotp.other_process_test' not in snapshot
+
+        # the change of another process is only written to the database
+
+        _storeConfigDB('linotp.other_process_test', 'value')
+        _storeConfigDB('linotp.Config', datetime.now())
+        meta.Session.commit()
+
+        assert LinOtpConfig().get('other_process_test') == 'value'
+
+        # the own changes do not cause a reload
+
+        config = LinOtpConfig()
+        config['linotp.other_process_test'] = 'new value'
+        meta.Session.commit()
+
+        snapshot = LinOtpConfig()._entries
+        assert snapshot['linotp.other_process_test'] == 'new value'
+        assert LinOtpConfig()._entries is snapshot
+
+# eof #
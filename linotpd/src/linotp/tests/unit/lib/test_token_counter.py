@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+verify that the incrementally maintained token counters match the counted
+tokens
+"""
+
+from mock import patch
+
+import pytest
+
+from linotp.lib.ImportOTP.bulk_import import BulkTokenImport
+from linotp.lib.monitoring import MonitorHandler
+from linotp.lib.token import getTokenInRealm
+from linotp.lib.token import getTokenNumResolver
+from linotp.lib.token import remove_token
+from linotp.lib.token_counter import NO_REALM
+from linotp.lib.token_counter import count_tokens
+from linotp.lib.token_counter import reconcile_token_counters
+from linotp.model import Realm
+from linotp.model import Token
+from linotp.model import token_counter_table
+from linotp.model.meta import Session
+
+STATI = ['total', 'active', 'inactive', 'assigned', 'unassigned',
+         'active&assigned', 'inactive&unassigned']
+
+
+@pytest.mark.usefixtures("app")
+class TestTokenCounter(object):
+
+    def create_realm(self, name):
+
+        realm = Realm(name)
+        realm.storeRealm()
+
+        return realm
+
+    def create_token(self, serial, realms=(), uid=None, active=True):
+
+        token = Token(serial)
+        token.setType('HMAC')
+        token.LinOtpIsactive = active
+        token.setRealms(list(realms))
+
+        if uid:
+            token.LinOtpIdResClass = 'useridresolver.PasswdIdResolver.myDefRes'
+            token.LinOtpUserid = uid
+
+        token.storeToken()
+        Session.commit()
+
+        return token
+
+    def query_counts(self, realms):
+        """ count the tokens by query """
+
+        with patch('linotp.lib.monitoring.count_tokens') as mocked_count:
+            mocked_count.return_value = None
+            return MonitorHandler().token_count(realms, STATI[:])
+
+    def verify_counters(self, realm_names):
+
+        for realm in realm_names:
+            assert count_tokens([realm], STATI) == self.query_counts([realm])
+
+        assert count_tokens(None, ['total', 'active']) == {
+            'total': Session.query(Token).count(),
+            'active': Session.query(Token).filter(
+                Token.LinOtpIsactive == True).count()}
+
+    def test_counters_follow_the_changes(self):
+        """ the counters follow the creation, changes and removal """
+
+        realm_1 = self.create_realm('count_realm_1')
+        realm_2 = self.create_realm('count_realm_2')
+        Session.commit()
+
+        reconcile_token_counters()
+        Session.commit()
+
+        realm_names = ['count_realm_1', 'count_realm_2']
+
+        token_1 = self.create_token('count_1', [realm_1])
+        token_2 = self.create_token('count_2', [realm_1, realm_2], '1000')
+        token_3 = self.create_token('count_3', [], active=False)
+        self.create_token('count_4', [realm_2], '1001', active=False)
+
+        self.verify_counters(realm_names)
+
+        assert count_tokens([NO_REALM], ['total']) == {'total': 1}
+
+        # change the counted state
+
+        token_1.LinOtpIsactive = False
+        token_1.LinOtpUserid = '1002'
+        token_2.setRealms([realm_2])
+        token_3.addRealm(realm_1)
+        Session.commit()
+
+        self.verify_counters(realm_names)
+
+        assert count_tokens([NO_REALM], ['total']) == {'total': 0}
+        assert getTokenInRealm('count_realm_1', active=False) == 2
+        assert getTokenNumResolver(active=True) == 1
+
+        # a rollback does not change the counters
+
+        token_1.LinOtpIsactive = True
+        Session.flush()
+        Session.rollback()
+
+        self.verify_counters(realm_names)
+
+        # remove the tokens
+
+        remove_token(token_2)
+        Session.delete(token_3)
+        Session.commit()
+
+        self.verify_counters(realm_names)
+
+    def test_change_by_other_session(self):
+        """ a token change of another session is not counted twice """
+
+        realm = self.create_realm('count_realm_6')
+        Session.commit()
+
+        token = self.create_token('count_6', [realm])
+        assert token._counted_state is None
+
+        # the token is changed by another token object, as if it would be
+        # changed by another process
+
+        Session.expunge(token)
+
+        other_token = Session.query(Token).filter(
+            Token.LinOtpTokenSerialnumber == 'count_6').one()
+        other_token.LinOtpIsactive = False
+        Session.commit()
+
+        self.verify_counters(['count_realm_6'])
+
+        Session.expunge(other_token)
+        Session.add(token)
+
+        token.LinOtpIsactive = True
+        Session.commit()
+
+        self.verify_counters(['count_realm_6'])
+
+    def test_bulk_import(self, app):
+        """ the tokens of the bulk import are counted """
+
+        self.create_realm('count_realm_3')
+        Session.commit()
+
+        with app.test_request_context('/admin/loadtokens'):
+            app.preprocess_request()
+
+            importer = BulkTokenImport(
+                tokenrealm='count_realm_3', chunk_size=2)
+            importer.import_tokens([
+                {'serial': 'count_import_%d' % num, 'type': 'hmac',
+                 'otpkey': '3132333435363738393031323334353637383930'}
+                for num in range(5)])
+
+        self.verify_counters(['count_realm_3'])
+        assert count_tokens(['count_realm_3'], ['total']) == {'total': 5}
+
+    def test_reconcile(self):
+        """ the counters are reconciled, when they are outdated """
+
+        realm = self.create_realm('count_realm_4')
+        self.create_realm('count_realm_5')
+        self.create_token('count_5', [realm])
+
+        # the counters are lost
+
+        Session.execute(token_counter_table.delete())
+        Session.commit()
+
+        assert count_tokens(['count_realm_4'], ['total']) == {'total': 1}
+
+        # multiple realms are counted, if they are all realms
+
+        all_realms = [name for (name,) in Session.query(Realm.name)]
+
+        assert count_tokens(all_realms + ['unknown'], ['total']) == {
+            'total': 1}
+        assert count_tokens(all_realms[:1] + ['unknown'], ['total']) is None
+
+# eof #
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+verify the token lookup by the normalized token type and resolver class
+"""
+
+from mock import patch
+
+import pytest
+
+from linotp.lib.token import TokenHandler
+from linotp.lib.token import getTokens4UserOrSerial
+from linotp.lib.user import User
+from linotp.model import Token
+from linotp.model import get_canonical_resolver_class
+from linotp.model.meta import Session
+
+RESOLVER_CLASS = 'useridresolver.PasswdIdResolver.IdResolver.myDefRes'
+LEGACY_RESOLVER_CLASS = 'useridresolveree.PasswdIdResolver.IdResolver.myDefRes'
+
+
+@pytest.mark.usefixtures("app")
+class TestTokenLookup(object):
+
+    def create_token(self, serial, typ, resolver_class=None, uid=None):
+
+        token = Token(serial)
+        token.setType(typ)
+
+        if resolver_class:
+            token.LinOtpIdResClass = resolver_class
+            token.LinOtpIdResolver = '/etc/passwd'
+            token.LinOtpUserid = uid
+
+        token.storeToken()
+        Session.commit()
+
+        return token
+
+    def test_normalized_columns(self):
+        """ the normalized columns follow the changes of the token """
+
+        token = self.create_token('lookup_1', 'HMAC', LEGACY_RESOLVER_CLASS,
+                                  '1000')
+
+        assert token.LinOtpTokenTypeLower == 'hmac'
+        assert token.LinOtpIdResClassNorm == RESOLVER_CLASS
+
+        token.updateType('TOTP')
+        token.LinOtpIdResClass = ''
+
+        assert token.LinOtpTokenTypeLower == 'totp'
+        assert token.LinOtpIdResClassNorm == ''
+
+        assert get_canonical_resolver_class(None) == ''
+        assert get_canonical_resolver_class(RESOLVER_CLASS) == RESOLVER_CLASS
+
+    def test_lookup_by_type(self):
+        """ the token type is looked up case insensitive """
+
+        self.create_token('lookup_2', 'HMAC')
+        self.create_token('lookup_3', 'hmac')
+        self.create_token('lookup_4', 'TOTP')
+
+        tokens = TokenHandler().getTokensOfType(typ='Hmac')
+
+        assert {token.getSerial() for token in tokens} == {
+            'lookup_2', 'lookup_3'}
+
+        tokens = TokenHandler().getTokensOfType(exclude_types=['HMAC'])
+
+        assert {token.getSerial() for token in tokens} == {'lookup_4'}
+
+    def test_lookup_by_owner(self):
+        """ the tokens of the legacy resolver class belong to the user """
+
+        self.create_token('lookup_5', 'HMAC', LEGACY_RESOLVER_CLASS, '1000')
+        self.create_token('lookup_6', 'TOTP', RESOLVER_CLASS, '1000')
+        self.create_token('lookup_7', 'HMAC', RESOLVER_CLASS, '1001')
+
+        user = User(login='hans', realm='myrealm')
+
+        with patch.object(User, 'get_uid_resolver') as mocked_uid_resolver:
+            mocked_uid_resolver.return_value = [('1000', RESOLVER_CLASS)]
+
+            tokens = getTokens4UserOrSerial(user=user, _class=False)
+            assert {token.LinOtpTokenSerialnumber for token in tokens} == {
+                'lookup_5', 'lookup_6'}
+
+            tokens = getTokens4UserOrSerial(
+                user=user, token_type='hmac', _class=False)
+            assert {token.LinOtpTokenSerialnumber for token in tokens} == {
+                'lookup_5'}
+
+# eof #
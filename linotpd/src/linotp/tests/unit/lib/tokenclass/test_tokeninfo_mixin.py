@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+verify that the token info is parsed once and serialized on flush
+"""
+
+import json
+
+from mock import patch
+
+import pytest
+
+from linotp.model import Token
+from linotp.model.meta import Session
+from linotp.tokens.base.tokeninfo_mixin import TokenInfoMixin
+
+
+class FakeTokenClass(TokenInfoMixin):
+
+    def __init__(self, token):
+        self.token = token
+
+
+@pytest.mark.usefixtures("app")
+class TestTokenInfoMixin(object):
+
+    def create_token(self, serial, info):
+
+        token = Token(serial)
+        token.setInfo(json.dumps(info))
+        token.storeToken()
+        Session.commit()
+
+        return token
+
+    def test_parse_once(self):
+        """ the token info is parsed only once per token """
+
+        token = self.create_token('info_1', {'count_auth': 3})
+
+        with patch('linotp.tokens.base.tokeninfo_mixin.json.loads',
+                   wraps=json.loads) as mocked_loads:
+
+            token_class = FakeTokenClass(token)
+
+            assert token_class.getFromTokenInfo('count_auth') == 3
+            assert token_class.getFromTokenInfo('count_auth_max', 0) == 0
+
+            token_class.addToTokenInfo('count_auth', 4)
+
+            # the token info is shared by the token class objects
+
+            assert FakeTokenClass(token).getFromTokenInfo('count_auth') == 4
+
+            assert mocked_loads.call_count == 1
+
+        # a direct change of the token info is recognized
+
+        token.setInfo(json.dumps({'count_auth': 7}))
+        assert token_class.getTokenInfo() == {'count_auth': 7}
+
+    def test_serialize_on_flush(self):
+        """ the changed token info is serialized with the flush """
+
+        token = self.create_token('info_2', {'count_auth': 3})
+
+        token_class = FakeTokenClass(token)
+
+        with patch('linotp.tokens.base.tokeninfo_mixin.json.dumps',
+                   wraps=json.dumps) as mocked_dumps:
+
+            token_class.addToTokenInfo('count_auth', 4)
+            token_class.addToTokenInfo('count_auth_max', 10)
+            token_class.removeFromTokenInfo('count_auth_max')
+
+            assert json.loads(token.LinOtpTokenInfo) == {'count_auth': 3}
+
+            Session.commit()
+
+            assert mocked_dumps.call_count == 1
+
+        Session.expunge_all()
+
+        token = Session.query(Token).filter(
+            Token.LinOtpTokenSerialnumber == 'info_2').one()
+        assert json.loads(token.getInfo()) == {'count_auth': 4}
+
+    def test_reset_on_rollback(self):
+        """ the not serialized changes are dropped on rollback """
+
+        token = self.create_token('info_3', {'count_auth': 3})
+
+        token_class = FakeTokenClass(token)
+        token_class.addToTokenInfo('count_auth', 4)
+
+        Session.rollback()
+
+        assert token_class.getFromTokenInfo('count_auth') == 3
+
+    def test_raw_token_info(self):
+        """ the raw token info contains the not yet flushed changes """
+
+        token = self.create_token('info_4', {})
+
+        FakeTokenClass(token).setTokenInfo({'hashlib': 'sha256'})
+
+        assert json.loads(token.getInfo()) == {'hashlib': 'sha256'}
+        assert json.loads(token.get_vars()['LinOtp.TokenInfo']) == {
+            'hashlib': 'sha256'}
+
+    def test_nested_values_are_copied(self):
+        """ a nested token info value can only be changed by the setters """
+
+        token = self.create_token('info_5', {'challenge': {'count': 1}})
+
+        token_class = FakeTokenClass(token)
+
+        token_class.getTokenInfo()['challenge']['count'] = 2
+        token_class.getFromTokenInfo('challenge')['count'] = 3
+
+        value = {'count': 4}
+        token_class.addToTokenInfo('value', value)
+        value['count'] = 5
+
+        assert token_class.getTokenInfo() == {
+            'challenge': {'count': 1}, 'value': {'count': 4}}
+
+        challenge = token_class.getFromTokenInfo('challenge')
+        challenge['count'] = 6
+        token_class.addToTokenInfo('challenge', challenge)
+
+        Session.commit()
+
+        assert json.loads(token.getInfo())['challenge'] == {'count': 6}
+
+# eof #
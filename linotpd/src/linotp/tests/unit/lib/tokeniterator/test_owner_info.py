@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+"""
+Tests the batched lookup of the token owner info in the token iterator
+"""
+
+import unittest
+
+from mock import Mock
+from mock import patch
+
+from linotp.lib.tokeniterator import TokenIterator
+
+SQL_SPEC = 'useridresolver.SQLIdResolver.IdResolver.mysql'
+LDAP_SPEC = 'useridresolver.LDAPIdResolver.IdResolver.myldap'
+
+
+def _token(user_id, resolver_spec):
+    """ create a token db object mock with an owner """
+
+    token = Mock()
+    token.LinOtpUserid = user_id
+    token.LinOtpIdResolver = resolver_spec.rpartition('.')[2]
+    token.LinOtpIdResClass = resolver_spec
+
+    return token
+
+
+class TestOwnerInfo(unittest.TestCase):
+    """
+    check that the owner info is looked up once per resolver
+    """
+
+    def setUp(self):
+
+        self.token_iterator = TokenIterator.__new__(TokenIterator)
+        self.token_iterator.user_fields = ['email']
+
+    @patch('linotp.lib.tokeniterator.getUserInfos')
+    def test_grouped_by_resolver(self, mock_get_user_infos):
+        """ the users of one resolver are looked up at once """
+
+        def get_user_infos(user_ids, resolver_spec):
+            return dict((user_id, {'userid': user_id,
+                                   'username': 'user_%s' % user_id,
+                                   'email': '%s@example.net' % user_id})
+                        for user_id in user_ids if user_id != 'unknown')
+
+        mock_get_user_infos.side_effect = get_user_infos
+
+        tokens = [
+            _token('1', SQL_SPEC),
+            _token('2', SQL_SPEC),
+            _token('1', SQL_SPEC),
+            _token('cn=1', LDAP_SPEC),
+            _token('unknown', LDAP_SPEC),
+            _token('', ''),
+        ]
+
+        user_infos = self.token_iterator._get_user_infos(tokens)
+
+        assert mock_get_user_infos.call_count == 2
+
+        lookups = dict((resolver_spec, sorted(user_ids)) for
+                       (user_ids, resolver_spec), _kwargs in
+                       mock_get_user_infos.call_args_list)
+
+        assert lookups == {SQL_SPEC: ['1', '2'],
+                           LDAP_SPEC: ['cn=1', 'unknown']}
+
+        # the prefetched user info is used for the user details
+
+        user_detail, _user_info = self.token_iterator.getUserDetail(
+            tokens[1], user_infos)
+
+        assert user_detail['User.username'] == 'user_2'
+        assert user_detail['User.email'] == '2@example.net'
+
+        # not found users are not looked up again
+
+        user_detail, _user_info = self.token_iterator.getUserDetail(
+            tokens[4], user_infos)
+
+        assert user_detail['User.username'] == '/:no user info:/'
+        assert mock_get_user_infos.call_count == 2
+
+# eof #
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+"""
+verify the bulk user import, which compares the csv users with the
+former users in one pass and writes the changes in chunks
+"""
+
+import unittest
+
+import pytest
+
+from mock import patch
+
+from linotp.lib.crypto import utils
+from linotp.lib.tools.import_user import UserImport
+from linotp.lib.tools.import_user import hash_passwords
+from linotp.lib.tools.import_user.SQLImportHandler import SQLImportHandler
+from linotp.lib.tools.import_user.SQLImportHandler import \
+    Shell_DatabaseContext
+
+COLUMN_MAPPING = {
+    "username": 0,
+    "userid": 1,
+    "surname": 2,
+    "givenname": 3,
+    "email": 4,
+    "phone": 5,
+    "mobile": 6,
+    "password": 7}
+
+
+def csv_users(number_of_users, modified=(), skipped=()):
+    """ create the csv data with some modified and skipped users """
+
+    lines = []
+
+    for i in range(number_of_users):
+
+        if i in skipped:
+            continue
+
+        surname = 'Modified' if i in modified else 'Surname'
+
+        lines.append(
+            'user_%d,%d,%s,Given,user_%d@example.com,,,Test123!' % (
+                i, i, surname, i))
+
+    return '\n'.join(lines)
+
+
+class TestBulkUserImport(unittest.TestCase):
+
+    def setUp(self):
+
+        unittest.TestCase.setUp(self)
+
+        self.db_context = Shell_DatabaseContext('sqlite://')
+        self.db_context.engine.echo = False
+
+        # the definition of the resolver is not part of these tests
+
+        patcher = patch.object(SQLImportHandler, '_create_resolver')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_import(self, csv_data, bulk=True, **kwargs):
+
+        import_handler = SQLImportHandler(
+            groupid='group', resolver_name='resolver',
+            database_context=self.db_context)
+
+        user_import = UserImport(import_handler)
+        user_import.set_mapping(COLUMN_MAPPING)
+
+        if bulk:
+            return user_import.import_csv_users_bulk(csv_data, **kwargs)
+
+        return user_import.import_csv_users(csv_data, **kwargs)
+
+    def get_users(self):
+
+        session = self.db_context.get_session()
+        User = SQLImportHandler.User
+
+        return {
+            user.userid: user for user in session.query(User).filter(
+                User.groupid == 'group')}
+
+    def test_bulk_import(self):
+        """ verify the created, modified, unchanged and deleted users """
+
+        result = self.run_import(csv_users(50), chunk_size=7)
+
+        assert len(result['created']) == 50
+        assert len(self.get_users()) == 50
+
+        csv_data = csv_users(60, modified=[1, 2, 3], skipped=[4, 5])
+
+        # the dryrun determines the same changes as the import
+
+        dryrun_result = self.run_import(csv_data, dryrun=True)
+        result = self.run_import(csv_data, chunk_size=7)
+
+        assert dryrun_result == result
+
+        assert sorted(result['created']) == [str(i) for i in range(50, 60)]
+        assert sorted(result['modified']) == ['1', '2', '3']
+        assert sorted(result['deleted']) == ['4', '5']
+        assert len(result['updated']) == 45
+
+        users = self.get_users()
+
+        assert len(users) == 58
+        assert users['1'].surname == 'Modified'
+        assert users['6'].surname == 'Surname'
+        assert '4' not in users
+
+    def test_same_result_as_import(self):
+        """ verify that the bulk import reports the same as the import """
+
+        self.run_import(csv_users(20), bulk=False)
+
+        csv_data = csv_users(30, modified=[1], skipped=[2])
+
+        result = self.run_import(csv_data, bulk=False, dryrun=True)
+        bulk_result = self.run_import(csv_data, dryrun=True)
+
+        assert result == bulk_result
+
+    def test_duplicate_user(self):
+        """ verify that a duplicate user in the csv data is rejected """
+
+        csv_data = csv_users(5) + '\n' + csv_users(1)
+
+        with pytest.raises(Exception, match='duplicate user'):
+            self.run_import(csv_data)
+
+        assert self.get_users() == {}
+
+    def test_plaintext_passwords(self):
+        """ verify that the plaintext passwords are hashed """
+
+        self.run_import(csv_users(5), passwords_in_plaintext=True,
+                        processes=1)
+
+        users = self.get_users()
+        assert utils.compare_password('Test123!', users['1'].password)
+
+        # the hashes of the plaintext passwords are not compared
+
+        result = self.run_import(csv_users(5), passwords_in_plaintext=True)
+        assert len(result['updated']) == 5
+
+    def test_hash_passwords_in_pool(self):
+        """ verify that the passwords hashed in the pool are valid """
+
+        passwords = ['password_%d' % i for i in range(4)]
+
+        with patch('linotp.lib.tools.import_user.MIN_POOL_PASSWORDS', 2):
+            password_hashes = hash_passwords(passwords, processes=2)
+
+        assert len(password_hashes) == len(passwords)
+        assert utils.compare_password(passwords[-1], password_hashes[-1])
+
+# eof #
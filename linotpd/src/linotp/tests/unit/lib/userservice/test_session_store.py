@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+#    LinOTP - the open source solution for two factor authentication
+#    Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#    This file is part of LinOTP server.
+#
+#    This program is free software: you can redistribute it and/or
+#    modify it under the terms of the GNU Affero General Public
+#    License, version 3, as published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the
+#               GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#    E-mail: linotp@keyidentity.com
+#    Contact: www.linotp.org
+#    Support: www.keyidentity.com
+#
+
+
+"""
+verify the expiration and eviction of the selfservice session stores
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from mock import patch
+
+from linotp.lib.session_store import DatabaseSessionStore
+from linotp.lib.session_store import MemorySessionStore
+from linotp.lib.session_store import get_session_store
+from linotp.lib.user import User
+from linotp.lib.userservice import check_auth_cookie
+from linotp.lib.userservice import create_auth_cookie
+from linotp.lib.userservice import get_cookie_authinfo
+from linotp.lib.userservice import remove_auth_cookie
+from linotp.model import meta
+
+
+def in_seconds(seconds):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+class TestMemorySessionStore(object):
+
+    def test_lookup(self):
+        """ verify the lookup and removal of a session """
+
+        store = MemorySessionStore(max_size=10)
+
+        store.set('cookie', ['data'], in_seconds(60))
+
+        assert store.get('cookie') == ['data']
+        assert store.get('unknown') is None
+
+        store.delete('cookie')
+        assert store.get('cookie') is None
+
+        stats = store.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['size'] == 0
+
+    def test_expiration(self):
+        """ verify that expired sessions are not returned and evicted """
+
+        store = MemorySessionStore(max_size=10)
+
+        store.set('expired', ['old'], in_seconds(-1))
+        assert store.get('expired') is None
+
+        store.set('expired_1', ['old'], in_seconds(-1))
+        store.set('expired_2', ['old'], in_seconds(-1))
+        store.set('valid', ['new'], in_seconds(60))
+
+        stats = store.get_stats()
+        assert stats['size'] == 1
+        assert stats['expired'] == 3
+        assert store.get('valid') == ['new']
+
+    def test_size_limit(self):
+        """ verify that the sessions which would expire next are evicted """
+
+        store = MemorySessionStore(max_size=3)
+
+        for i in range(5):
+            store.set('cookie_%d' % i, [i], in_seconds(60 + i))
+
+        stats = store.get_stats()
+        assert stats['size'] == 3
+        assert stats['evictions'] == 2
+
+        assert store.get('cookie_0') is None
+        assert store.get('cookie_1') is None
+        assert store.get('cookie_4') == [4]
+
+    def test_outdated_heap_entries(self):
+        """ verify that replaced sessions don't let the heap grow """
+
+        store = MemorySessionStore(max_size=10)
+
+        for i in range(1000):
+            store.set('cookie', [i], in_seconds(60 + i))
+
+        assert store.get('cookie') == [999]
+        assert len(store.expiry) < 100
+        assert store.get_stats()['evictions'] == 0
+
+
+@pytest.mark.usefixtures("app")
+class TestDatabaseSessionStore(object):
+
+    def test_shared_session(self, app):
+        """
+        verify that a session of the database store is found by a new store
+        instance, as it would be by another process
+        """
+
+        store = DatabaseSessionStore(max_size=10)
+        store.set('cookie', ['hans', '127.0.0.1'], in_seconds(60))
+        meta.Session.commit()
+
+        other_store = DatabaseSessionStore(max_size=10)
+        assert other_store.get('cookie') == ['hans', '127.0.0.1']
+
+        other_store.delete('cookie')
+        meta.Session.commit()
+
+        assert store.get('cookie') is None
+
+    def test_eviction(self):
+        """ verify the cleanup of expired sessions and the size limit """
+
+        store = DatabaseSessionStore(max_size=3, cleanup_interval=6)
+
+        store.set('expired', ['old'], in_seconds(-1))
+        assert store.get('expired') is None
+        assert store.get_stats()['expired'] == 1
+
+        for i in range(5):
+            store.set('cookie_%d' % i, [i], in_seconds(60 + i))
+        meta.Session.commit()
+
+        stats = store.get_stats()
+        assert stats['size'] == 3
+        assert stats['expired'] == 1
+        assert stats['evictions'] == 2
+
+        assert store.get('cookie_0') is None
+        assert store.get('cookie_4') == [4]
+
+    @patch('linotp.lib.userservice.get_cookie_expiry')
+    def test_auth_cookie(self, mock_get_cookie_expiry, app):
+        """ verify the selfservice session handling with the database """
+
+        mock_get_cookie_expiry.return_value = False
+        app.config['SELFSERVICE_SESSION_STORE'] = 'database'
+
+        assert get_session_store().shared
+
+        user = User('hans', 'myrealm')
+        cookie, _expires, _expiration = create_auth_cookie(
+            user, '127.0.0.1', state_data={'transactionid': '1234'})
+        meta.Session.commit()
+
+        cookie_user, client, state, state_data = get_cookie_authinfo(cookie)
+
+        assert cookie_user.login == 'hans'
+        assert cookie_user.realm == 'myrealm'
+        assert client == '127.0.0.1'
+        assert state == 'authenticated'
+        assert state_data == {'transactionid': '1234'}
+
+        remove_auth_cookie(cookie)
+        meta.Session.commit()
+
+        assert not check_auth_cookie(cookie, user, '127.0.0.1')
+
+# eof
@@ -66,6 +66,17 @@ def test_getUserId(passwd_resolver):
     assert y.getUserInfo(res).get("surname") == "Zwei"
 
 
+def test_getUserInfos(passwd_resolver):
+    '''test getting the user info of several users at once'''
+    y = passwd_resolver
+
+    user_infos = y.getUserInfos(["10", "11", "9"])
+
+    assert sorted(user_infos.keys()) == ["10", "11"]
+    assert user_infos["10"] == y.getUserInfo("10")
+    assert user_infos["11"].get("surname") == "Zwei"
+
+
 def test_resolver_fail():
     '''
     Test to use a file, that does not exist
@@ -114,4 +125,36 @@ def test_getUsername(passwd_resolver):
     assert y.getUsername("11")
     assert not y.getUsername("9")
 
+
+def test_shared_index(passwd_resolver):
+    '''
+    the parsed file is shared by the resolvers and parsed again on change
+    '''
+    y = passwd_resolver
+    file_name = y.fileName
+
+    x = PasswdResolver()
+    x.loadConfig({'linotp.passwdresolver.fileName.my': file_name}, 'my')
+
+    assert x.index is y.index
+
+    with open(file_name, 'a') as f:
+        f.write('\n# comment\n'
+                'user3::12:12:User Drei,,+49 1,+49 2,drei@example.com:x:y\n')
+
+    x = PasswdResolver()
+    x.loadConfig({'linotp.passwdresolver.fileName.my': file_name}, 'my')
+
+    assert x.index is not y.index
+    assert x.getUserId("user3") == "12"
+    assert x.getUserInfo("12") == {
+        'username': 'user3', 'cryptpass': '', 'userid': '12',
+        'description': 'User Drei,,+49 1,+49 2,drei@example.com',
+        'email': 'drei@example.com', 'givenname': 'User',
+        'surname': 'Drei', 'phone': '+49 2', 'mobile': '+49 1'}
+
+    # the former resolver keeps its consistent view of the file
+
+    assert not y.getUsername("12")
+
 # eof #
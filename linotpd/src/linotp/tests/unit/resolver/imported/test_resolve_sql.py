@@ -207,6 +207,26 @@ class TestSQLResolver(TestCase):
         assert not self.w.checkPass(self.w.getUserId('user_3'),
                                           'falsch')
 
+    def test_sql_getUserInfos(self):
+        '''
+        SQL: test getting the user info of several users at once
+        '''
+        user_infos = self.y.getUserInfos([1, 2, 5])
+        assert sorted(user_infos.keys()) == [1, 2]
+        assert user_infos[1].get("surname") == "Eins"
+        assert user_infos[2].get("surname") == "Zwo"
+        assert user_infos[1] == self.y.getUserInfo(1)
+
+        # the user ids might be given as strings
+
+        user_infos = self.y.getUserInfos(["1", "2"])
+        assert sorted(user_infos.keys()) == ["1", "2"]
+
+        # the where clause applies as well
+
+        user_infos = self.w.getUserInfos([1, 3, 4])
+        assert sorted(user_infos.keys()) == [3, 4]
+
     def test_sql_getUserList(self):
         '''
         SQL: testing the userlist
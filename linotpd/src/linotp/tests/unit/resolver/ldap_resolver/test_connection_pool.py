@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+#
+#   LinOTP - the open source solution for two factor authentication
+#   Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#   This file is part of LinOTP userid resolvers.
+#
+#   This program is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU Affero General Public
+#   License, version 3, as published by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the
+#              GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   E-mail: linotp@keyidentity.com
+#   Contact: www.linotp.org
+#   Support: www.keyidentity.com
+"""
+LDAP Resolver unit test - reuse of the pooled ldap connections
+"""
+
+import unittest
+
+import pytest
+
+from ldap import INVALID_CREDENTIALS
+from ldap import LDAPError
+
+from linotp.lib.resources import DictResourceRegistry
+from linotp.lib.resources import ResourceScheduler
+
+from linotp.lib import connection_pool as connection_pool_module
+
+from linotp.useridresolver import LDAPIdResolver as ldap_resolver_module
+from linotp.useridresolver.LDAPIdResolver import IdResolver as LDAPResolver
+
+
+class MockedLdapObject:
+    """
+    Mocked LDAP Object - which counts the binds and unbinds
+    """
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.binds = 0
+        self.unbound = False
+
+    def simple_bind_s(self, user, passw, *args, **kwargs):
+        """  emulate a simple_bind  """
+
+        if 'fail' in self.uri:
+            raise LDAPError('failed to connect')
+
+        if passw != 'geheim1':
+            raise INVALID_CREDENTIALS('not geheim1!')
+
+        self.binds += 1
+        return True
+
+    def whoami_s(self):
+        return 'dn:cn=admin'
+
+    def unbind_s(self):
+        self.unbound = True
+
+
+class MockedBindPW(str):
+    """ simple helper  to emulate the crypted data / password """
+
+    def get_unencrypted(self):
+        """ mock the return of crypted data """
+        return str(self)
+
+
+class MockedResourceRegistry(DictResourceRegistry):
+    """ mock the registry, so we can access the registry data localy """
+    registry = {}
+
+
+class MockedResourceScheduler(ResourceScheduler):
+    """ mock the resource scheduler, so we can establish our local registry """
+
+    def __init__(self, uri_list=None, tries=1):
+        super(MockedResourceScheduler, self).__init__(
+                uri_list=uri_list, tries=tries,
+                resource_registry_class=MockedResourceRegistry)
+
+
+class TestLDAPConnectionPool(unittest.TestCase):
+    """
+    tests that the ldap connections are reused across the requests
+    """
+
+    connected = []
+
+    @pytest.fixture(autouse=True)
+    def mocked_ldap(self, monkeypatch):
+
+        TestLDAPConnectionPool.connected = []
+        MockedResourceRegistry.registry = {}
+
+        def m_connect(uri, *args, **kwargs):
+            l_obj = MockedLdapObject(uri=uri)
+            TestLDAPConnectionPool.connected.append(l_obj)
+            return l_obj
+
+        monkeypatch.setattr(LDAPResolver, 'connect', m_connect)
+
+        monkeypatch.setattr(ldap_resolver_module, 'ResourceScheduler',
+                            MockedResourceScheduler)
+
+    def resolver(self, ldapuri, pool_size=10, user_bind_pool=False,
+                 bindpw='geheim1'):
+        """ setup a resolver as it would be loaded in a request """
+
+        myldap = LDAPResolver()
+        myldap.conf = 'pool_resolver'
+        myldap.ldapuri = ldapuri
+        myldap.binddn = 'cn=admin'
+        myldap.bindpw = MockedBindPW(bindpw)
+        myldap.pool_size = pool_size
+        myldap.user_bind_pool = user_bind_pool
+
+        return myldap
+
+    def test_bind_reuses_connection(self):
+        """
+        the service connection is returned into the pool at request end
+        """
+
+        uri = 'ldap://pool_bind1.psw.de'
+
+        # first request
+
+        myldap = self.resolver(uri)
+        l_obj = myldap.bind()
+        myldap.close()
+
+        assert not l_obj.unbound
+
+        # second request - reuses the bound connection
+
+        myldap = self.resolver(uri)
+        assert myldap.bind() is l_obj
+        myldap.close()
+
+        assert len(self.connected) == 1
+        assert l_obj.binds == 1
+
+    def test_bind_without_pool(self):
+        """
+        with a pool size of 0 the connection is closed at request end
+        """
+
+        uri = 'ldap://no_pool_bind1.psw.de'
+
+        myldap = self.resolver(uri, pool_size=0)
+        l_obj = myldap.bind()
+        myldap.close()
+
+        assert l_obj.unbound
+
+        myldap = self.resolver(uri, pool_size=0)
+        assert myldap.bind() is not l_obj
+        myldap.close()
+
+        assert len(self.connected) == 2
+
+    def test_dropped_connection(self):
+        """
+        a connection, which caused an ldap error, is not returned to the pool
+        """
+
+        uri = 'ldap://drop_bind1.psw.de'
+
+        myldap = self.resolver(uri)
+        l_obj = myldap.bind()
+        myldap._drop_connection()
+        myldap.close()
+
+        assert l_obj.unbound
+
+        myldap = self.resolver(uri)
+        assert myldap.bind() is not l_obj
+        myldap.close()
+
+    def test_user_bind_pool(self):
+        """
+        the user bind connections are reused if the user bind pool is enabled
+        """
+
+        uri = 'ldap://user_bind1.psw.de'
+
+        myldap = self.resolver(uri, user_bind_pool=True)
+
+        assert myldap.checkPass('cn=user', 'geheim1')
+        assert not myldap.checkPass('cn=user', 'not geheim1')
+        assert myldap.checkPass('cn=user', 'geheim1')
+
+        assert len(self.connected) == 1
+        assert self.connected[0].binds == 2
+
+    def test_pool_of_resolver(self):
+        """
+        the pool is identified by the resolver name and not by the password
+        """
+
+        uri = 'ldap://resolver_pool1.psw.de'
+
+        myldap = self.resolver(uri)
+        pool = myldap._get_connection_pool()
+
+        assert ('ldap', 'pool_resolver', False) in (
+            connection_pool_module._connection_pools)
+
+        for pool_id in connection_pool_module._connection_pools:
+            assert 'geheim1' not in repr(pool_id)
+
+        # a changed password replaces the pool of the resolver
+
+        l_obj = myldap.bind()
+        myldap.close()
+
+        myldap = self.resolver(uri, bindpw='geheim2')
+        assert myldap._get_connection_pool() is not pool
+
+        assert l_obj.unbound
+
+    def test_drop_cache(self):
+        """
+        the pooled connections are closed, when the resolver is deleted
+        """
+
+        uri = 'ldap://drop_cache1.psw.de'
+
+        myldap = self.resolver(uri)
+        l_obj = myldap.bind()
+        myldap.close()
+
+        # a connection in use is closed on its release
+
+        myldap = self.resolver(uri)
+        l_obj_in_use = myldap.bind()
+        assert l_obj_in_use is l_obj
+
+        other = self.resolver(uri)
+        other_l_obj = other.bind()
+        other.close()
+
+        assert not other_l_obj.unbound
+
+        LDAPResolver.drop_cache('pool_resolver')
+
+        assert other_l_obj.unbound
+        assert not l_obj.unbound
+
+        myldap.close()
+        assert l_obj.unbound
+
+        myldap = self.resolver(uri)
+        assert myldap.bind() is not l_obj
+        myldap.close()
+
+# eof #
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+#
+#   LinOTP - the open source solution for two factor authentication
+#   Copyright (C) 2010 - 2019 KeyIdentity GmbH
+#
+#   This file is part of LinOTP userid resolvers.
+#
+#   This program is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU Affero General Public
+#   License, version 3, as published by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the
+#              GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   E-mail: linotp@keyidentity.com
+#   Contact: www.linotp.org
+#   Support: www.keyidentity.com
+
+"""
+SQL Resolver unit test - process wide engine and reflected table cache
+"""
+
+import sqlite3
+
+import pytest
+
+from mock import patch
+
+from linotp.useridresolver.SQLIdResolver import IdResolver
+from linotp.useridresolver.SQLIdResolver import dbObject
+from linotp.useridresolver.SQLIdResolver import drop_engine
+from linotp.useridresolver.SQLIdResolver import flush_table_cache
+
+
+@pytest.fixture
+def sql_connect(tmp_path):
+    """ create a sqlite user database and return its connect string """
+
+    db_file = str(tmp_path / 'users.sqlite')
+
+    connection = sqlite3.connect(db_file)
+    connection.execute(
+        'CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)')
+    connection.execute("INSERT INTO users VALUES (1, 'hugo')")
+    connection.commit()
+    connection.close()
+
+    return 'sqlite:///' + db_file
+
+
+class TestSQLResolverEngineCache(object):
+
+    def test_engine_and_table_are_shared(self, sql_connect):
+        """ the engine and the reflected table are shared by the requests """
+
+        db_1 = dbObject()
+        db_1.connect(sql_connect, resolver_id='shared')
+        table_1 = db_1.getTable('users')
+        db_1.close()
+
+        db_2 = dbObject()
+        db_2.connect(sql_connect, resolver_id='shared')
+        table_2 = db_2.getTable('users')
+
+        assert db_1.engine is db_2.engine
+        assert table_1 is table_2
+
+        rows = list(db_2.query(table_2.select()))
+        assert rows[0]['username'] == 'hugo'
+
+        db_2.close()
+
+    def test_flush_table_cache(self, sql_connect):
+        """ after a flush the changed table definition is reflected """
+
+        db_obj = dbObject()
+        db_obj.connect(sql_connect, resolver_id='flush')
+        table = db_obj.getTable('users')
+        db_obj.close()
+
+        assert 'email' not in table.c
+
+        connection = sqlite3.connect(sql_connect[len('sqlite:///'):])
+        connection.execute('ALTER TABLE users ADD COLUMN email TEXT')
+        connection.commit()
+        connection.close()
+
+        flush_table_cache('flush', 'users')
+
+        db_obj = dbObject()
+        db_obj.connect(sql_connect, resolver_id='flush')
+        table = db_obj.getTable('users')
+        db_obj.close()
+
+        assert 'email' in table.c
+
+    def test_uncached_engine(self, sql_connect):
+        """ an uncached connection uses its own engine """
+
+        db_obj = dbObject()
+        db_obj.connect(sql_connect)
+        table = db_obj.getTable('users')
+
+        cached_db_obj = dbObject()
+        cached_db_obj.connect(sql_connect, resolver_id='uncached')
+
+        assert db_obj.engine is not cached_db_obj.engine
+        assert table is not cached_db_obj.getTable('users')
+
+        db_obj.close()
+        cached_db_obj.close()
+
+    def test_replaced_engine_is_disposed(self, sql_connect, tmp_path):
+        """ the engine of a changed or deleted resolver is disposed """
+
+        db_obj = dbObject()
+        db_obj.connect(sql_connect, resolver_id='replace')
+        old_engine = db_obj.engine
+        db_obj.close()
+
+        other_connect = 'sqlite:///' + str(tmp_path / 'other.sqlite')
+
+        with patch.object(old_engine, 'dispose') as mock_dispose:
+
+            db_obj = dbObject()
+            db_obj.connect(other_connect, resolver_id='replace')
+            db_obj.close()
+
+            assert db_obj.engine is not old_engine
+            assert mock_dispose.call_count == 1
+
+        new_engine = db_obj.engine
+
+        with patch.object(new_engine, 'dispose') as mock_dispose:
+
+            IdResolver.drop_cache('replace')
+
+            assert mock_dispose.call_count == 1
+
+        drop_engine('replace')
+
+# eof #
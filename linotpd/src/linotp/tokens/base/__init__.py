@@ -53,6 +53,7 @@ from linotp.lib.crypto.utils import compare
 
 from linotp.lib.error import ParameterError
 from linotp.lib.error import TokenAdminError
+from linotp.lib.token_owner import get_owner_login
 from linotp.lib.user import getUserResolverId
 from linotp.lib.util import generate_otpkey
 
@@ -1000,6 +1001,7 @@ class TokenClass(TokenInfoMixin, TokenValidityMixin):
         self.token.LinOtpIdResolver = uidResolver
         self.token.LinOtpIdResClass = uidResolverClass
         self.token.LinOtpUserid = uuserid
+        self.token.LinOtpOwnerLogin = get_owner_login(uuserid, user.login)
 
     def getUser(self):
         """
@@ -1019,13 +1021,17 @@ class TokenClass(TokenInfoMixin, TokenValidityMixin):
         uuserid = self.token.LinOtpUserid or ''
         return (uuserid, uidResolver, uidResolverClass)
 
-    def setUid(self, uid, uidResolver, uidResClass):
+    def setUid(self, uid, uidResolver, uidResClass, login=None):
         '''
         sets the UID values in the database
+
+        :param login: the login of the user - if not given, the login of
+                      the owner is looked up later by the owner refresh
         '''
         self.token.LinOtpIdResolver = uidResolver
         self.token.LinOtpIdResClass = uidResClass
         self.token.LinOtpUserid = uid
+        self.token.LinOtpOwnerLogin = get_owner_login(uid, login)
         return
 
     def reset(self):
@@ -26,58 +26,206 @@
 
 
 """
+token info access of the token classes
+
+the token info is stored as json blob in the token db object. It is parsed
+only once and held by the token db object, so that it is shared by all
+token class objects of the token. The changes are tracked and the token
+info is serialized only once, when the token is flushed.
+
+as the changes of the shared token info have to be tracked, the token info
+and its nested values are only handed out and taken over as copies.
 """
 
+import copy
 import json
 import logging
 
+import sqlalchemy as sa
+
+from sqlalchemy import orm
+from sqlalchemy.orm.attributes import flag_modified
+
 log = logging.getLogger(__name__)
 
 
-class TokenInfoMixin(object):
+class TokenInfoCache(object):
+    """
+    the parsed token info of a token db object
+    """
 
-    def getTokenInfo(self):
-        info = {}
+    def __init__(self):
+        self.raw = None
+        self.info = None
+        self.dirty = False
+
+    def get(self, token):
+        """
+        get the parsed token info - the token info is only parsed again, if
+        it was changed in the token db object
+
+        :param token: the token db object
+        :return: the token info dict
+        """
+
+        if self.dirty:
+            return self.info
+
+        tokeninfo = token.getInfo()
+
+        if self.info is None or tokeninfo != self.raw:
+
+            info = {}
+
+            if tokeninfo is not None and len(tokeninfo.strip()) > 0:
+                try:
+                    info = json.loads(tokeninfo)
+                except Exception as exx:
+                    log.exception('JSON loading error in token info: %r', exx)
+
+            self.raw = tokeninfo
+            self.info = info
+
+        return self.info
+
+    def mark_dirty(self, token):
+        """
+        mark the token info as changed - the token info is serialized with
+        the next flush of the session. A token, which is not part of a
+        session, gets the token info serialized immediately.
+
+        :param token: the token db object
+        """
+
+        if self.dirty:
+            return
+
+        self.dirty = True
+
+        state = sa.inspect(token, raiseerr=False)
+
+        if (state is None or state.session is None or
+                'LinOtpTokenInfo' not in state.dict):
+            self.flush(token)
+            return
+
+        state.session.info.setdefault('dirty_token_infos', set()).add(token)
+
+        # a token, which is only changed in its token info, must be part
+        # of the next flush as well
+
+        flag_modified(token, 'LinOtpTokenInfo')
+
+    def flush(self, token):
+        """
+        serialize the changed token info into the token db object
+
+        :param token: the token db object
+        """
+
+        if not self.dirty:
+            return
+
+        self.dirty = False
+
+        info = self.info
+        tokeninfo = '' + json.dumps(info, indent=0)
+        token.setInfo(tokeninfo)
 
-        tokeninfo = self.token.getInfo()
-        if tokeninfo is not None and len(tokeninfo.strip()) > 0:
-            try:
-                info = json.loads(tokeninfo)
-            except Exception as e:
-                log.exception('JSON loading error in token info: %r' % (e))
+        self.raw = tokeninfo
+        self.info = info
 
-        return info
+    def reset(self):
+        """
+        drop the parsed token info including the not serialized changes
+        """
+
+        self.raw = None
+        self.info = None
+        self.dirty = False
+
+
+def _get_info_cache(token):
+    """
+    get the token info cache of the token db object
+    """
+
+    info_cache = getattr(token, 'info_cache', None)
+
+    if info_cache is None:
+        info_cache = TokenInfoCache()
+        token.info_cache = info_cache
+
+    return info_cache
+
+
+def _flush_token_infos(session, _flush_context, _instances):
+    """
+    serialize the changed token infos before the tokens are flushed
+    """
+
+    for token in session.info.pop('dirty_token_infos', ()):
+        token.info_cache.flush(token)
+
+
+def _reset_token_infos(session, _previous_transaction):
+    """
+    drop the not serialized token info changes on rollback
+    """
+
+    for token in session.info.pop('dirty_token_infos', ()):
+        token.info_cache.reset()
+
+
+sa.event.listen(orm.Session, 'before_flush', _flush_token_infos)
+sa.event.listen(orm.Session, 'after_soft_rollback', _reset_token_infos)
+
+
+def _copy_value(value):
+    """
+    copy a mutable token info value, so that it could not be changed
+    without the change being tracked
+    """
+
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+
+    return value
+
+
+class TokenInfoMixin(object):
+
+    def getTokenInfo(self):
+        return copy.deepcopy(_get_info_cache(self.token).get(self.token))
 
     def setTokenInfo(self, info):
 
         if info is not None:
-            tokeninfo = '' + json.dumps(info, indent=0)
-            self.token.setInfo(tokeninfo)
+            info_cache = _get_info_cache(self.token)
 
-    def addToTokenInfo(self, key, value):
-        info = {}
-        tokeninfo = self.token.getInfo()
+            token_info = info_cache.get(self.token)
+            if info is not token_info:
+                token_info.clear()
+                token_info.update(copy.deepcopy(info))
 
-        if tokeninfo:
-            info = json.loads(tokeninfo)
+            info_cache.mark_dirty(self.token)
 
-        info[key] = value
+    def addToTokenInfo(self, key, value):
+        info_cache = _get_info_cache(self.token)
 
-        self.setTokenInfo(info)
+        info_cache.get(self.token)[key] = _copy_value(value)
+        info_cache.mark_dirty(self.token)
 
     def getFromTokenInfo(self, key, default=None):
-        ret = default
-
-        info = self.getTokenInfo()
-
-        if key in info:
-            ret = info.get(key, default)
-        return ret
+        return _copy_value(
+            _get_info_cache(self.token).get(self.token).get(key, default))
 
     def removeFromTokenInfo(self, key):
-        info = self.getTokenInfo()
+        info_cache = _get_info_cache(self.token)
+
+        info = info_cache.get(self.token)
         if key in info:
             del info[key]
-            self.setTokenInfo(info)
+            info_cache.mark_dirty(self.token)
 
 # eof #
@@ -422,6 +422,26 @@ class HmacTokenClass(TokenClass):
             msg = "otp counter %r was found" % otp
         return res
 
+    def get_otp_window(self, window):
+        '''
+        calculate the next otp values of the token, starting with the
+        current counter - used for the otp lookahead index
+
+        :param window: the number of otp values
+        :return: list of (counter, otp value) tuples
+        '''
+
+        otplen = int(self.token.LinOtpOtpLen)
+        counter = int(self.token.LinOtpCount)
+
+        self.hashlibStr = self.getFromTokenInfo("hashlib", "sha1")
+
+        secObj = self._get_secret_object()
+        hmac2Otp = HmacOtp(secObj, counter, otplen,
+                           self.getHashlib(self.hashlibStr))
+
+        return hmac2Otp.generate_window(counter, window)
+
     def autosync(self, hmac2Otp, anOtpVal):
         '''
         auto - sync the token based on two otp values
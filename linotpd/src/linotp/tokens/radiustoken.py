@@ -40,9 +40,8 @@ from linotp.lib.error import ParameterError
 
 # we need this for the radius token
 import pyrad.packet
-from pyrad.client import Client
-from pyrad.dictionary import Dictionary
 from linotp.flap import config as env
+from linotp.lib.radius import RadiusClient
 
 
 log = logging.getLogger(__name__)
@@ -231,41 +230,26 @@ class RadiusTokenClass(RemoteTokenClass):
                   "  user: %s" % (len(anOtpVal), radiusServer, radiusUser))
 
         try:
-            # pyrad does not allow to set timeout and retries.
-            # it defaults to retries=3, timeout=5
-
-            # TODO: At the moment we support only one radius server.
-            # No round robin.
-            server = radiusServer.split(':')
-            r_server = server[0]
-            r_authport = 1812
+            # the radius server could be a comma separated list of servers,
+            # which are tried in turn
 
             nas_identifier = current_app.config['RADIUS_NAS_IDENTIFIER']
-            r_dict = current_app.getRadiusDictionaryPath()
 
-            if len(server) >= 2:
-                r_authport = int(server[1])
             log.debug("[do_request] [RadiusToken] NAS Identifier: %r, "
-                      "Dictionary: %r" % (nas_identifier, r_dict))
-
-            log.debug("[do_request] [RadiusToken] constructing client object "
-                      "with server: %r, port: %r, secret: %r" %
-                      (r_server, r_authport, radiusSecret))
+                      "servers: %r" % (nas_identifier, radiusServer))
 
-            srv = Client(server=r_server,
-                         authport=r_authport,
-                         secret=radiusSecret,
-                         dict=Dictionary(r_dict))
+            srv = RadiusClient(radiusServer, secret=radiusSecret)
 
-            req = srv.CreateAuthPacket(code=pyrad.packet.AccessRequest,
-                                       User_Name=radiusUser.encode('ascii'),
-                                       NAS_Identifier=nas_identifier.encode('ascii'))
+            req = srv.create_auth_packet(
+                code=pyrad.packet.AccessRequest,
+                User_Name=radiusUser.encode('ascii'),
+                NAS_Identifier=nas_identifier.encode('ascii'))
 
             req["User-Password"] = req.PwCrypt(anOtpVal)
             if transactionid is not None:
                 req["State"] = str(transactionid)
 
-            response = srv.SendPacket(req)
+            response = srv.send_packet(req)
 
             if response.code == pyrad.packet.AccessChallenge:
                 opt = {}
@@ -286,13 +270,13 @@ class RadiusTokenClass(RemoteTokenClass):
 
             elif response.code == pyrad.packet.AccessAccept:
                 log.info("[do_request] [RadiusToken] Radiusserver %s granted "
-                         "access to user %s." % (r_server, radiusUser))
+                         "access to user %s." % (radiusServer, radiusUser))
                 otp_count = 0
                 res = True
             else:
                 log.warning("[do_request] [RadiusToken] Radiusserver %s"
                             "rejected access to user %s." %
-                            (r_server, radiusUser))
+                            (radiusServer, radiusUser))
                 res = False
 
         except Exception as ex:
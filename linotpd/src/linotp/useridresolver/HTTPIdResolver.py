@@ -36,6 +36,10 @@ Dependencies: UserIdResolver
 from . import resolver_registry
 from linotp.useridresolver.UserIdResolver import UserIdResolver
 
+from linotp.lib.http_pool import DEFAULT_POOL_SIZE
+from linotp.lib.http_pool import get_http_session
+from linotp.lib.http_pool import http_request
+
 import json
 
 import logging
@@ -44,82 +48,50 @@ log = logging.getLogger(__name__)
 DEFAULT_ENCODING = "utf-8"
 
 
-import urllib.request, urllib.error, urllib.parse
-import urllib.request, urllib.parse, urllib.error
-import base64
-
-
-def urllib_encoded_dict(in_dict):
+def get_uri_list(uri):
     """
-    urllib requires the parameters to be in UTF-8
+    get the list of uris from the comma separated uri config entry
 
-    :param in_dict: the incomming dictionary
-    :return: return a UTF-8 encoded dictionary
+    :param uri: the uri config entry
+    :return: list of uris
     """
 
-    out_dict = {}
-    for k, v in in_dict.items():
-        if isinstance(v, str):
-            v = v.encode('utf8')
-        out_dict[k] = v
-    return out_dict
+    return [entry.strip() for entry in uri.split(',') if entry.strip()]
 
 
-def urllib_request(url, parameter,
-                   username=None, password=None, method='POST',
-                   config=None, timeout=10.0):
+def pooled_request(uri, path, parameter, username=None, password=None,
+                   method='POST', timeout=10.0, pool_size=DEFAULT_POOL_SIZE):
     """
-    build the urllib request and check the response for success or fail
+    send the request by the shared http session of the uri and user and
+    check the response for success or fail
 
-    :param url: target url
+    :param uri: the comma separated list of target urls
+    :param path: the request path, which is appended to the url
     :param parameter: additonal parameter to append to the url request
     :param username: basic authentication with username (optional)
     :param password: basic authentication with password (optional)
     :param method: run an GET or POST request
-    :param config: in case of Proxy support, the proxy settings are taken from
     :param timeout: timeout for waiting on connect/reply
+    :param pool_size: the number of kept connections per host
 
     :return: the response of the request
     """
     try:
 
-        handlers = []
-        if config and 'PROXY' in config and config['PROXY']:
-            # for simplicity we set both protocols
-            proxy_handler = urllib.request.ProxyHandler({"http": config['PROXY'],
-                                                  "https": config['PROXY']})
-            handlers.append(proxy_handler)
-            print("using Proxy: %r" % config['PROXY'])
+        uris = get_uri_list(uri)
 
+        session = get_http_session(
+            ('httpresolver', tuple(uris), username), pool_size=pool_size)
+
+        auth = None
         if username and password is not None:
-            password_mgr = urllib.request.HTTPPasswordMgrWithDefaultRealm()
-            password_mgr.add_password(None, url, username, password)
-            auth_handler = urllib.request.HTTPBasicAuthHandler(password_mgr)
-            handlers.append(auth_handler)
-
-        opener = urllib.request.build_opener(*handlers)
-        urllib.request.install_opener(opener)
-
-        full_url = str(url)
-        encoded_params = None
-        if parameter is not None and len(parameter) > 0:
-            encoded_params = urllib.parse.urlencode(urllib_encoded_dict(parameter))
-
-        if method == 'GET':
-            c_data = None
-            if encoded_params:
-                full_url = str("%s?%s" % (url, encoded_params))
-        else:
-            c_data = encoded_params
-
-        requ = urllib.request.Request(full_url, data=c_data, headers={})
-        if username and password is not None:
-            base64string = base64.encodestring('%s:%s' %
-                                    (username, password)).replace('\n', '')
-            requ.add_header("Authorization", "Basic %s" % base64string)
+            auth = (username, password)
+
+        response = http_request(
+            session, uris, path, params=parameter or None, method=method,
+            auth=auth, timeout=float(timeout))
 
-        response = urllib.request.urlopen(requ, timeout=float(timeout))
-        reply = response.read()
+        reply = response.content
 
         log.debug(">>%s...%s<<", reply[:20], reply[-20:])
 
@@ -236,7 +208,8 @@ class IdResolver (UserIdResolver):
     @staticmethod
     def _do_request(uri, timeout, credentials,
                     request_path, request_mapping, request_params,
-                    result_path, result_mapping):
+                    result_path, result_mapping,
+                    pool_size=DEFAULT_POOL_SIZE):
 
             query_params = json.loads(request_mapping)
             for key, value in list(query_params.items()):
@@ -245,11 +218,11 @@ class IdResolver (UserIdResolver):
                         value = value.replace(repl, repl_val)
                 query_params[key] = value
 
-            url = "%s/%s" % (uri.strip('/'), request_path.lstrip('/'))
-            response = urllib_request(url, query_params,
+            response = pooled_request(uri, request_path, query_params,
                                       credentials.get('user'),
                                       credentials.get('password'),
-                                      timeout=timeout)
+                                      timeout=timeout,
+                                      pool_size=pool_size)
 
             result_data = json.loads(response)
 
@@ -300,6 +273,7 @@ class IdResolver (UserIdResolver):
         self.base_url = None
         self.conf = None
         self.config = None
+        self.pool_size = DEFAULT_POOL_SIZE
 
     def close(self):
         return
@@ -404,6 +378,9 @@ class IdResolver (UserIdResolver):
         self.conf = conf
         self.config = self._get_my_config(config, conf)
 
+        # the number of kept connections per host of the shared http session
+        self.pool_size = int(self.config.get('poolsize', DEFAULT_POOL_SIZE))
+
         log.debug("[loadConfig] done")
         return self
 
@@ -454,7 +431,8 @@ class IdResolver (UserIdResolver):
 
             results = IdResolver._do_request(uri, timeout, credentials,
                             request_path, request_mapping, request_params,
-                            result_path, result_mapping)
+                            result_path, result_mapping,
+                            pool_size=self.pool_size)
 
             result = results[0]
             userId = result.get('userid')
@@ -515,7 +493,8 @@ class IdResolver (UserIdResolver):
 
             result = IdResolver._do_request(uri, timeout, credentials,
                             request_path, request_mapping, request_params,
-                            result_path, result_mapping)
+                            result_path, result_mapping,
+                            pool_size=self.pool_size)
 
             log.debug('[getUsername] done')
             return result[0]
@@ -527,6 +506,61 @@ class IdResolver (UserIdResolver):
         finally:
             log.debug('[getUserInfo] done')
 
+    def getUserInfos(self, userIds):
+        '''
+            return the user related information of several users
+
+            as the http user service provides only the lookup of one user
+            per request, the request is prepared once and sent for every
+            user id
+
+            @param userIds: list of user ids
+            @type userIds:  list
+            @return: dictionary with the user info per user id - users
+                     which could not be found are not contained
+            @rtype:  dict
+
+        '''
+        log.debug("[getUserInfos] %d user ids" % len(userIds))
+
+        uri = self.config['uri']
+        timeout = self.config['timeout']
+
+        credentials = {'user': self.config['authuser'],
+                       'password': self.config['password'],
+                       'certificate': self.config['certificate']}
+
+        request_path = self.config['username_request_path']
+        request_mapping = self.config['username_request_mapping']
+        result_path = self.config['username_result_path']
+        result_mapping = self.config['username_result_mapping']
+
+        userInfos = {}
+
+        for userId in userIds:
+
+            request_params = {'{USERID}': userId,
+                              '{PAGE}': '0',
+                              '{PAGESIZE}': '10'
+                              }
+
+            try:
+                result = IdResolver._do_request(uri, timeout, credentials,
+                                request_path, request_mapping, request_params,
+                                result_path, result_mapping,
+                                pool_size=self.pool_size)
+
+            except Exception as exx:
+                log.error('[getUserInfos] failed to get user %r: %r',
+                          userId, exx)
+                continue
+
+            if result:
+                userInfos[userId] = result[0]
+
+        log.debug('[getUserInfos] done')
+        return userInfos
+
     def getSearchFields(self):
         '''
         return all fields on which a search could be made
@@ -582,7 +616,8 @@ class IdResolver (UserIdResolver):
 
             result = IdResolver._do_request(uri, timeout, credentials,
                             request_path, request_mapping, request_params,
-                            result_path, result_mapping)
+                            result_path, result_mapping,
+                            pool_size=self.pool_size)
             return result
 
         except Exception as exx:
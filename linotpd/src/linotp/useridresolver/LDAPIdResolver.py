@@ -32,6 +32,7 @@
 """
 
 
+import hashlib
 import logging
 from typing import Any, Callable, Dict, Tuple, Union
 
@@ -58,6 +59,13 @@ from linotp.lib.type_utils import boolean
 from linotp.lib.resources import ResourceScheduler
 from linotp.lib.resources import string_to_list
 
+from linotp.lib.connection_pool import DEFAULT_MAX_IDLE
+from linotp.lib.connection_pool import DEFAULT_MAX_LIFETIME
+from linotp.lib.connection_pool import DEFAULT_POOL_SIZE
+from linotp.lib.connection_pool import PooledConnection
+from linotp.lib.connection_pool import drop_connection_pool
+from linotp.lib.connection_pool import get_connection_pool
+
 from linotp.useridresolver.UserIdResolver import ResolverLoadConfigError
 from linotp.useridresolver.UserIdResolver import UserIdResolver
 from linotp.useridresolver.UserIdResolver import ResolverNotAvailable
@@ -73,6 +81,7 @@ log.info('using the %r cursoring api.', ldap_api_version)
 DEFAULT_UID_TYPE = "DN"  # can be entryUUID, GUID, objectGUID or DN
 ENCODING = 'utf-8'
 DEFAULT_SIZELIMIT = 500
+LDAP_BATCH_SIZE = 100
 DEFAULT_EnforceTLS = False
 BIND_NOT_POSSIBLE_TIMEOUT = 30
 TIMEOUT_NO_LIMIT = -1
@@ -165,6 +174,11 @@ class IdResolver(UserIdResolver):
         "TIMEOUT": (False, TIMEOUT_NO_LIMIT, text),
         "SIZELIMIT": (False, DEFAULT_SIZELIMIT, int),
 
+        "POOLSIZE": (False, DEFAULT_POOL_SIZE, int),
+        "POOLMAXIDLE": (False, DEFAULT_MAX_IDLE, int),
+        "POOLMAXLIFETIME": (False, DEFAULT_MAX_LIFETIME, int),
+        "USERBINDPOOL": (False, False, boolean),
+
     }
 
     resolver_parameters.update(UserIdResolver.resolver_parameters)
@@ -469,16 +483,26 @@ class IdResolver(UserIdResolver):
         self.proxy = False
         self.uidType = DEFAULT_UID_TYPE
         self.l_obj = None
+        self.pooled = None
+        self.pool = None
+        self.pool_size = DEFAULT_POOL_SIZE
+        self.pool_max_idle = DEFAULT_MAX_IDLE
+        self.pool_max_lifetime = DEFAULT_MAX_LIFETIME
+        self.user_bind_pool = False
         self.only_trusted_certs = False
 
     def close(self):
         """
         closes method is called, when the request ends
-        - here we close the ldap connection by unbind
+        - here we return the ldap connection into the connection pool or
+          close the ldap connection by unbind
         """
 
         try:
-            if self.l_obj is not None:
+            if self.pooled is not None:
+                self.pool.release(self.pooled)
+
+            elif self.l_obj is not None:
                 self.l_obj.unbind_s()
 
         except ldap.LDAPError as error:
@@ -486,15 +510,120 @@ class IdResolver(UserIdResolver):
 
         finally:
             self.l_obj = None
+            self.pooled = None
+            self.pool = None
+
+    def _drop_connection(self):
+        """
+        drop the current ldap connection after an ldap error - the possibly
+        broken connection is neither returned into the connection pool nor
+        used for the next ldap operation of the request
+        """
+
+        l_obj = self.l_obj
+
+        self.l_obj = None
+        self.pooled = None
+        self.pool = None
+
+        if l_obj is not None:
+            try:
+                l_obj.unbind_s()
+            except ldap.LDAPError as error:
+                log.debug("[unbind] LDAP error: %r", error)
+
+    @staticmethod
+    def _unbind_connection(l_obj):
+        """
+        helper - to close a pooled ldap connection
+
+        :param l_obj: the ldap connection object
+        """
+        l_obj.unbind_s()
+
+    @staticmethod
+    def _check_connection(l_obj):
+        """
+        helper - health check of a pooled ldap connection by a whoami
+
+        :param l_obj: the ldap connection object
+        """
+        l_obj.whoami_s()
+
+    def _get_connection_pool(self, user_bind=False):
+        """
+        get the process wide pool of the ldap connections of this resolver
+
+        the pool is identified by the resolver name and replaced, if the
+        connection related parameters have been changed, e.g. by another
+        process, so that a changed resolver definition will not use the
+        connections of the former definition
+
+        :param user_bind: get the pool of the connections, which are used
+                          for the user password verification
+        :return: ConnectionPool
+        """
+
+        params = hashlib.sha256(repr((
+            self.ldapuri, self.binddn, str(self.bindpw),
+            self.network_timeout, self.response_timeout, self.enforce_tls,
+            self.only_trusted_certs, self.noreferrals)).encode('utf-8')
+        ).hexdigest()
+
+        return get_connection_pool(
+            self._pool_id(self.conf, user_bind),
+            close=self._unbind_connection,
+            check=self._check_connection,
+            params=params,
+            size=self.pool_size,
+            max_idle=self.pool_max_idle,
+            max_lifetime=self.pool_max_lifetime)
+
+    @staticmethod
+    def _pool_id(resolver_name, user_bind=False):
+        """
+        helper - the id of the connection pool of a resolver
+
+        :param resolver_name: the name of the resolver
+        :param user_bind: the pool of the user password verification
+        :return: tuple
+        """
+
+        return ('ldap', resolver_name, user_bind)
+
+    def flush_cache(self):
+        """
+        close the pooled connections of the former resolver definition
+        """
+
+        self.drop_cache(self.conf)
+
+    @classmethod
+    def drop_cache(cls, resolver_name):
+        """
+        close the pooled connections of a deleted resolver definition
+
+        :param resolver_name: the name of the deleted resolver
+        """
+
+        for user_bind in (False, True):
+            drop_connection_pool(cls._pool_id(resolver_name, user_bind))
 
     def bind(self):
         """
         bind() - this function starts an ldap conncetion
+
+        if the connection pool is enabled (POOLSIZE > 0) an idle bound
+        connection of the pool is used, before a new connection is made
         """
 
         if self.l_obj is not None:
             return self.l_obj
 
+        pool = None
+        if self.pool_size > 0:
+            pool = self._get_connection_pool()
+
         # iterate through the ldap uris
 
         urilist = string_to_list(self.ldapuri)
@@ -503,12 +632,28 @@ class IdResolver(UserIdResolver):
         resource_scheduler = ResourceScheduler(tries=2, uri_list=urilist)
 
         for uri in next(resource_scheduler):
+
+            # only not blocked uris are provided by the resource scheduler
+            # so we will only use the pooled connections of these
+
+            if pool is not None:
+                pooled = pool.acquire(uri)
+                if pooled is not None:
+                    self.pool = pool
+                    self.pooled = pooled
+                    self.l_obj = pooled.connection
+                    return self.l_obj
+
             try:
                 l_obj = IdResolver.connect(uri, caller=self)
 
                 l_obj.simple_bind_s(
                     self.binddn, self.bindpw.get_unencrypted())
 
+                if pool is not None:
+                    self.pool = pool
+                    self.pooled = PooledConnection(uri, l_obj)
+
                 self.l_obj = l_obj
                 return l_obj
 
@@ -516,6 +661,9 @@ class IdResolver(UserIdResolver):
                 resource_scheduler.block(uri, delay=30)
                 log.exception("[bind] LDAP error")
 
+                if pool is not None:
+                    pool.discard(uri)
+
         # if we reach this point, we were not able to do a successful bind! :-(
 
         log.error('Failed to bind to any resource %r', urilist)
@@ -582,6 +730,7 @@ class IdResolver(UserIdResolver):
         except ldap.LDAPError as exc:
             log.exception("[getUserId] LDAP error: %r", exc)
             resultList = None
+            self._drop_connection()
 
         finally:
             self.unbind(l_obj)
@@ -710,6 +859,7 @@ class IdResolver(UserIdResolver):
 
         except ldap.LDAPError as _error:
             log.exception("[getUserLDAPInfo] LDAP error")
+            self._drop_connection()
             return {}
 
         except Exception as exx:
@@ -727,9 +877,18 @@ class IdResolver(UserIdResolver):
 
         # process result and put it in the userinfo dict
 
-        userinfo = {}
+        return self._get_ldap_userinfo(result_data[0])
+
+    @staticmethod
+    def _get_ldap_userinfo(result):
+        """
+        convert an ldap search result entry into the user info dict
 
-        result = result_data[0]
+        :param result: tuple of the dn and the dict of attribute values
+        :return: user info dict with the list of values per attribute
+        """
+
+        userinfo = {}
 
         # add the dn which is the first entry
         userinfo['dn'] = [result[0]]
@@ -756,6 +915,134 @@ class IdResolver(UserIdResolver):
 
         return userinfo
 
+    def getUserLDAPInfos(self, userids, attrlist=None):
+        """
+        get the user information of several users with one ldap search,
+        which combines the user ids in an OR filter
+
+        if the users are identified by their DN or objectGUID, there is no
+        attribute to search for and the users are looked up one by one
+
+        :param userids: list of user identifiers
+        :param attrlist: the list of attributes, which should be returned
+        :return: dict with the user info dict per user id
+        """
+
+        log.debug("[getUserLDAPInfos]")
+
+        userinfos = {}
+
+        uid_type = self.uidType.lower()
+
+        if uid_type == 'dn' or (uid_type == 'objectguid' and not self.proxy):
+
+            for userid in userids:
+                userinfo = self.getUserLDAPInfo(userid, attrlist=attrlist)
+                if userinfo:
+                    userinfos[userid] = userinfo
+
+            return userinfos
+
+        if attrlist:
+            attrlist.append(self.uidType)
+
+        uid_attribute = self.uidType
+        if uid_type == 'objectguid':
+            uid_attribute = 'objectGUID'
+
+        for start in range(0, len(userids), LDAP_BATCH_SIZE):
+
+            batch = userids[start:start + LDAP_BATCH_SIZE]
+
+            if uid_type == 'objectguid':
+                uid_filters = ["(objectGuid=%s)" % escape_hex_for_search(uid)
+                               for uid in batch]
+            else:
+                uid_filters = [
+                    "(%s=%s)" % (self.uidType,
+                                 ldap.filter.escape_filter_chars(uid))
+                    for uid in batch]
+
+            s_filter = "(|%s)" % ''.join(uid_filters)
+
+            l_obj = None
+
+            try:
+
+                l_obj = self.bind()
+
+                if not l_obj:
+                    return userinfos
+
+                l_id = l_obj.search_ext(
+                    self.base, ldap.SCOPE_SUBTREE, filterstr=s_filter,
+                    attrlist=attrlist, sizelimit=len(batch),
+                    timeout=self.response_timeout)
+
+                result_data = l_obj.result(l_id, all=1)[1]
+
+            except ldap.LDAPError as _error:
+                log.exception("[getUserLDAPInfos] LDAP error")
+                self._drop_connection()
+                return userinfos
+
+            finally:
+                if l_obj is not None:
+                    self.unbind(l_obj)
+
+            # the attribute names in the result might differ in their case
+
+            batch_uids = dict((uid.lower(), uid) for uid in batch)
+
+            for result in result_data or []:
+
+                if not result[0]:
+                    # skip the search references
+                    continue
+
+                userinfo = self._get_ldap_userinfo(result)
+
+                for key, values in userinfo.items():
+                    if key.lower() == uid_attribute.lower() and values:
+                        userid = batch_uids.get(values[0].lower())
+                        if userid:
+                            userinfos[userid] = userinfo
+                        break
+
+        return userinfos
+
+    def _get_userinfo_fields(self, userid, user):
+        """
+        map the ldap attributes of a user to the user info fields
+
+        :param userid: the user id
+        :param user: the ldap user info dict
+        :return: dict of the user info fields
+        """
+
+        ret = {}
+
+        ret['userid'] = userid
+
+        # we will add all userinfo fields!
+
+        for f in self.userinfo:
+
+            val = ''
+            if self.userinfo[f] in user:
+
+                val = user[self.userinfo[f]][0]
+
+                if isinstance(val, bytes):
+                    try:
+                        val = val.decode()
+                    except:
+                        log.info('unable to decode bytes %r', val)
+
+            ret[f] = val
+
+        return ret
+
     def getUserInfo(self, userid):
         """
         return all user related information
@@ -788,28 +1075,24 @@ class IdResolver(UserIdResolver):
         if not user:
             return {}
 
-        ret = {}
-
-        ret['userid'] = userid
-
-        # we will add all userinfo fields!
-
-        for f in self.userinfo:
+        return self._get_userinfo_fields(userid, user)
 
-            val = ''
-            if self.userinfo[f] in user:
-
-                val = user[self.userinfo[f]][0]
+    def getUserInfos(self, userids):
+        """
+        return the user related information of several users, which are
+        looked up by one ldap search
 
-                if isinstance(val, bytes):
-                    try:
-                        val = val.decode()
-                    except:
-                        log.info('unable to decode bytes %r', val)
+        :param userids: list of user ids
+        :return: dict with the user info per user id - users which could
+                 not be found are not contained
+        """
+        log.debug("[getUserInfos]")
 
-            ret[f] = val
+        users = self.getUserLDAPInfos(
+            list(userids), attrlist=list(self.userinfo.values()))
 
-        return ret
+        return dict((userid, self._get_userinfo_fields(userid, user))
+                    for userid, user in users.items())
 
     def getResolverId(self):
         '''
@@ -1005,6 +1288,13 @@ class IdResolver(UserIdResolver):
         self.noreferrals = l_config["NOREFERRALS"]
         self.proxy = l_config["PROXY"]
 
+        # connection pool related parameters
+
+        self.pool_size = l_config["POOLSIZE"]
+        self.pool_max_idle = l_config["POOLMAXIDLE"]
+        self.pool_max_lifetime = l_config["POOLMAXLIFETIME"]
+        self.user_bind_pool = l_config["USERBINDPOOL"]
+
         return self
 
     def getSearchFields(self, searchDict=None):
@@ -1064,12 +1354,29 @@ class IdResolver(UserIdResolver):
         last_error = None
         resource_scheduler = ResourceScheduler(tries=1, uri_list=urilist)
 
+        # the connections of the user bind pool are only used to verify the
+        # user password by a bind and never for searching
+
+        pool = None
+        if self.user_bind_pool and self.pool_size > 0:
+            pool = self._get_connection_pool(user_bind=True)
+
         for uri in next(resource_scheduler):
             l_obj = None
+            pooled = None
             try:
                 log.info("[checkPass] check password for user %r "
                          "on LDAP server %r", DN, uri)
-                l_obj = IdResolver.connect(uri, caller=self)
+
+                if pool is not None:
+                    pooled = pool.acquire(uri)
+
+                if pooled is not None:
+                    l_obj = pooled.connection
+                else:
+                    l_obj = IdResolver.connect(uri, caller=self)
+                    if pool is not None:
+                        pooled = PooledConnection(uri, l_obj)
 
                 l_obj.simple_bind_s(DN, password)
                 log.info("[checkPass] ldap bind for %r successful", DN)
@@ -1084,8 +1391,17 @@ class IdResolver(UserIdResolver):
                 resource_scheduler.block(uri, delay=30)
                 last_error = error
 
+                # the connection might be broken, so we don't reuse it
+                # and drop the idle connections to the blocked server
+
+                if pooled is not None:
+                    pool.discard(uri)
+                    pooled = None
+
             finally:
-                if l_obj is not None:
+                if pooled is not None:
+                    pool.release(pooled)
+                elif l_obj is not None:
                     l_obj.unbind_s()
 
         log.error("[checkPass] failed to connect to any resource %r", urilist)
@@ -1248,6 +1564,7 @@ class IdResolver(UserIdResolver):
 
         except ldap.LDAPError as _exce:
             log.exception("[getUserList] LDAP error")
+            self._drop_connection()
 
         except Exception as _exce:
             log.exception("[getUserList] error during LDAP access")
@@ -1442,6 +1759,7 @@ class IdResolver(UserIdResolver):
 
         except ldap.LDAPError as exce:
             log.exception("LDAP error: %r", exce)
+            self._drop_connection()
             raise exce
 
         except Exception as exce:
@@ -37,6 +37,7 @@ Remarks:
 import os
 import re
 import logging
+import threading
 from typing import Any, Callable, Dict, Tuple, Union
 
 from passlib.hash import (
@@ -80,6 +81,138 @@ def str2unicode(input_str):
     return output_str
 
 
+# the parsed passwd files, which are shared read only by all resolver
+# objects of the process and are rebuilt, when the file changes
+
+_passwd_indexes = {}
+_passwd_index_lock = threading.Lock()
+
+# very basic e-mail regex
+
+EMAIL_PATTERN = re.compile(r'.+@.+\..+')
+
+# the positions in the user entry of the passwd index
+
+FIELDS = 0
+GIVENNAME = 1
+SURNAME = 2
+OFFICE_PHONE = 3
+HOME_PHONE = 4
+EMAIL = 5
+
+
+class PasswdIndex(object):
+    """
+    the parsed passwd file:
+
+    * uids: the user id per login name
+    * users: one tuple per user id of the line fields, the given name, the
+             surname, the office phone, the home phone and the e-mail
+    """
+
+    __slots__ = ('key', 'uids', 'users')
+
+    def __init__(self, key=None):
+        self.key = key
+        self.uids = {}
+        self.users = {}
+
+
+def _get_file_key(file_name):
+    """
+    get the key, which identifies the version of a file
+
+    :param file_name: the name of the file
+    :return: tuple of the file name, modification time, size and inode
+    """
+
+    stat = os.stat(file_name)
+
+    return (file_name, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def parse_passwd_file(file_name, key=None):
+    """
+    parse a passwd style file into a passwd index
+
+    :param file_name: the name of the file
+    :param key: the key of the file version
+    :return: the PasswdIndex
+    """
+
+    log.info('[loadFile] loading users from file %s' % (file_name))
+
+    index = PasswdIndex(key)
+    uids = index.uids
+    users = index.users
+
+    ID = IdResolver.sF["userid"]
+    NAME = IdResolver.sF["username"]
+    DESCRIPTION = IdResolver.sF["description"]
+
+    with open(file_name, "r") as fileHandle:
+
+        for line in fileHandle:
+
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+
+            line = str2unicode(line)
+            fields = tuple(line.split(":", 7))
+
+            uid = fields[ID]
+            uids[fields[NAME]] = uid
+
+            # surname, givenname and phones are taken from the description
+
+            descriptions = fields[DESCRIPTION].split(",")
+            names = descriptions[0].split(' ', 1)
+
+            surname = names[1] if len(names) >= 2 else ""
+
+            office_phone = home_phone = ""
+            if len(descriptions) >= 4:
+                office_phone = descriptions[2]
+                home_phone = descriptions[3]
+
+            email = ""
+            for field in descriptions[4:]:
+                email_match = EMAIL_PATTERN.search(field)
+                if email_match:
+                    email = email_match.group(0)
+
+            users[uid] = (fields, names[0], surname,
+                          office_phone, home_phone, email)
+
+    return index
+
+
+def get_passwd_index(file_name):
+    """
+    get the shared passwd index of a file - the file is parsed only, if it
+    has changed since it was parsed the last time
+
+    :param file_name: the name of the file
+    :return: the PasswdIndex
+    """
+
+    key = _get_file_key(file_name)
+
+    index = _passwd_indexes.get(file_name)
+    if index is not None and index.key == key:
+        return index
+
+    with _passwd_index_lock:
+
+        index = _passwd_indexes.get(file_name)
+        if index is None or index.key != key:
+            index = parse_passwd_file(file_name, key)
+            _passwd_indexes[file_name] = index
+
+    return index
+
+
 def tokenise(r):
     def _(s):
         ret = None
@@ -148,15 +281,7 @@ class IdResolver (UserIdResolver):
         self.fileName = ""
 
         self.name = "P"
-        self.nameDict = {}
-        self.descDict = {}
-        self.reversDict = {}
-        self.passDict = {}
-        self.officePhoneDict = {}
-        self.homePhoneDict = {}
-        self.surnameDict = {}
-        self.givennameDict = {}
-        self.emailDict = {}
+        self.index = PasswdIndex()
 
     def close(self):
         """
@@ -169,64 +294,15 @@ class IdResolver (UserIdResolver):
           init loads the /etc/passwd
             user and uid as a dict for /
             user loginname lookup
+
+          the parsed file is shared by all resolver objects and is only
+          parsed again, if the file has changed
         """
 
         if (self.fileName == ""):
             self.fileName = "/etc/passwd"
 
-        log.info('[loadFile] loading users from file %s' % (self.fileName))
-
-        fileHandle = open(self.fileName, "r")
-
-        line = fileHandle.readline()
-
-        ID = self.sF["userid"]
-        NAME = self.sF["username"]
-        PASS = self.sF["cryptpass"]
-        DESCRIPTION = self.sF["description"]
-
-        while line:
-            line = line.strip()
-            if len(line) == 0 or line.startswith('#'):
-                line = fileHandle.readline()
-                continue
-
-            line = str2unicode(line)
-            fields = line.split(":", 7)
-            self.nameDict["%s" % fields[NAME]] = fields[ID]
-
-            # for speed reason - build a revers lookup
-            self.reversDict[fields[ID]] = "%s" % fields[NAME]
-
-            # for full info store the line
-            self.descDict[fields[ID]] = fields
-
-            # store the crypted password
-            self.passDict[fields[ID]] = fields[PASS]
-
-            # store surname, givenname and phones
-            descriptions = fields[DESCRIPTION].split(",")
-            name = descriptions[0]
-            names = name.split(' ', 1)
-            self.givennameDict[fields[ID]] = names[0]
-            self.surnameDict[fields[ID]] = ""
-            self.officePhoneDict[fields[ID]] = ""
-            self.homePhoneDict[fields[ID]] = ""
-            self.emailDict[fields[ID]] = ""
-            if len(names) >= 2:
-                self.surnameDict[fields[ID]] = names[1]
-            if len(descriptions) >= 4:
-                self.officePhoneDict[fields[ID]] = descriptions[2]
-                self.homePhoneDict[fields[ID]] = descriptions[3]
-            if len(descriptions) >= 5:
-                for field in descriptions[4:]:
-                    # very basic e-mail regex
-                    email_match = re.search('.+@.+\..+', field)
-                    if email_match:
-                        self.emailDict[fields[ID]] = email_match.group(0)
-
-            """ print ">>" + key[0] + "<< " + key[2] """
-            line = fileHandle.readline()
+        self.index = get_passwd_index(self.fileName)
 
     def checkPass(self, uid, password):
         """
@@ -243,7 +319,7 @@ class IdResolver (UserIdResolver):
                        crypt.crypt() function.")
             password = password.encode('utf-8')
         log.info("[checkPass] checking password for user uid %s" % uid)
-        cryptedpasswd = self.passDict[uid]
+        cryptedpasswd = self.index.users[uid][FIELDS][self.sF["cryptpass"]]
         log.debug("[checkPass] We found the crypted pass %s for uid %s"
                   % (cryptedpasswd, uid))
         if not cryptedpasswd:
@@ -304,8 +380,10 @@ class IdResolver (UserIdResolver):
         """
         ret = {}
 
-        if userId in self.reversDict:
-            fields = self.descDict.get(userId)
+        user = self.index.users.get(userId)
+
+        if user is not None:
+            fields = user[FIELDS]
 
             for key in self.sF:
                 if no_passwd and key == "cryptpass":
@@ -313,14 +391,26 @@ class IdResolver (UserIdResolver):
                 index = self.sF[key]
                 ret[key] = fields[index]
 
-            ret['givenname'] = self.givennameDict.get(userId)
-            ret['surname'] = self.surnameDict.get(userId)
-            ret['phone'] = self.homePhoneDict.get(userId)
-            ret['mobile'] = self.officePhoneDict.get(userId)
-            ret['email'] = self.emailDict.get(userId)
+            ret['givenname'] = user[GIVENNAME]
+            ret['surname'] = user[SURNAME]
+            ret['phone'] = user[HOME_PHONE]
+            ret['mobile'] = user[OFFICE_PHONE]
+            ret['email'] = user[EMAIL]
 
         return ret
 
+    def getUserInfos(self, userIds, no_passwd=False):
+        """
+        get the info of several users at once from the parsed file
+
+        :param userIds: list of the to be searched users
+        :param no_passwd: return no password
+        :return: dict with the user info per user id
+        """
+
+        return dict((userId, self.getUserInfo(userId, no_passwd=no_passwd))
+                    for userId in userIds if userId in self.index.users)
+
     def getUsername(self, userId):
         '''
         ## TODO: why does this return bool
@@ -328,7 +418,7 @@ class IdResolver (UserIdResolver):
         :param userId: the user to be searched
         :return: true, if a user id exists
         '''
-        return userId in self.reversDict
+        return userId in self.index.users
 
     def getUserId(self, LoginName):
         """
@@ -339,7 +429,7 @@ class IdResolver (UserIdResolver):
         :param LoginName: the login of the user
         :return: the userId
         """
-        return self.nameDict.get(LoginName, '') or ''
+        return self.index.uids.get(LoginName, '') or ''
 
     def getSearchFields(self, searchDict=None):
         """
@@ -368,8 +458,8 @@ class IdResolver (UserIdResolver):
         ret = []
 
         # first check if the searches are in the searchDict
-        for l in self.descDict:
-            line = self.descDict[l]
+        for user in self.index.users.values():
+            line = user[FIELDS]
             ok = True
 
             for search in searchDict:
@@ -37,10 +37,12 @@ from . import resolver_registry
 from .UserIdResolver import UserIdResolver
 from .UserIdResolver import getResolverClass
 
+from linotp.lib.http_pool import get_http_session
+from linotp.lib.http_pool import http_request
+
 try:
     from osiam import connector
     from requests.auth import HTTPBasicAuth
-    import requests
 except Exception as ex:
     log.warn("Missing modules for SCIMResolver: %r" % str(ex))
     raise ex
@@ -83,10 +85,18 @@ class IdResolver (UserIdResolver):
         self.scim = None
 
     def get_access_token(self, server=None, client=None, secret=None):
-        res = requests.post('%s/oauth/token' % self.auth_server,
+
+        # the token request is sent by the shared http session of the auth
+        # server, which keeps the connections alive - as before, the
+        # parameters are sent in the url and the status is not checked
+
+        session = get_http_session(('scimresolver', self.auth_server, client))
+
+        res = http_request(session, [self.auth_server], '/oauth/token',
                           auth=HTTPBasicAuth(client, secret),
-                          params={'grant_type': 'client_credentials',
-                                  'scope' : 'GET POST'},
+                          query={'grant_type': 'client_credentials',
+                                 'scope' : 'GET POST'},
+                          check_status=False,
                           verify=False)
         access_token = res.json().get('access_token')
         log.debug("Access Token: %r" % access_token)
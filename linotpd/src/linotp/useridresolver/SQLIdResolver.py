@@ -36,6 +36,7 @@ import base64
 import hashlib
 import urllib.request, urllib.parse, urllib.error
 import json
+import threading
 
 import logging
 
@@ -119,8 +120,21 @@ ArchaicCrypt = CryptContext(schemes=Archaic_crypt_schemes)
 
 DEFAULT_ENCODING = "utf-8"
 
+# the sql engine connection pool settings - the pooled connections are
+# recycled after POOL_RECYCLE seconds and verified by a ping on checkout
+
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+POOL_RECYCLE = 3600
+
 log = logging.getLogger(__name__)
 
+# process wide cache of the sql engines per resolver along with their
+# reflected tables
+
+_engines = {}
+_engine_lock = threading.Lock()
+
 
 def check_password(password, crypted_password, salt=None):
     """
@@ -298,6 +312,133 @@ def build_simple_connect(driver, user=None, pass_=None,
     return ''.join(connect)
 
 
+def _create_engine(sqlConnect, timeout=5):
+    """
+    create an sql engine with connection pooling
+
+    :param sqlConnect: sql url for the connection
+    :param timeout: the connect timeout
+    :return: the sql engine
+    """
+
+    args = {'echo': False, 'echo_pool': True}
+
+    if 'sqlite' not in sqlConnect:
+        args['pool_timeout'] = 30
+        args['pool_size'] = POOL_SIZE
+        args['max_overflow'] = POOL_MAX_OVERFLOW
+        args['pool_recycle'] = POOL_RECYCLE
+        args['pool_pre_ping'] = True
+        args['connect_args'] = { 'connect_timeout': timeout}
+
+    return create_engine(sqlConnect, **args)
+
+
+class CachedEngine(object):
+    """
+    sql engine with the metadata of its reflected tables
+    """
+
+    def __init__(self, engine, sqlConnect):
+        self.engine = engine
+        self.sqlConnect = sqlConnect
+        self.meta = MetaData()
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def getTable(self, tableName):
+        """
+        get the reflected table - the reflection is done only once
+
+        :param tableName: the name of the table
+        :return: the table
+        """
+
+        table = self.tables.get(tableName)
+        if table is not None:
+            return table
+
+        with self.lock:
+
+            if tableName not in self.tables:
+                self.tables[tableName] = Table(
+                    tableName, self.meta, autoload=True,
+                    autoload_with=self.engine)
+
+            return self.tables[tableName]
+
+    def flushTable(self, tableName):
+        """
+        drop the reflected table, so that it will be reflected again
+
+        :param tableName: the name of the table
+        """
+
+        with self.lock:
+
+            table = self.tables.pop(tableName, None)
+            if table is not None:
+                self.meta.remove(table)
+
+
+def get_engine(resolver_id, sqlConnect, timeout=5):
+    """
+    get the process wide sql engine of the resolver - if the connect string
+    of the resolver has changed, the engine is replaced and the connections
+    of the old engine are closed
+
+    :param resolver_id: the resolver, which owns the engine
+    :param sqlConnect: sql url for the connection
+    :param timeout: the connect timeout
+    :return: CachedEngine
+    """
+
+    with _engine_lock:
+
+        cached_engine = _engines.get(resolver_id)
+
+        if (cached_engine is not None and
+                cached_engine.sqlConnect == sqlConnect):
+            return cached_engine
+
+        _engines[resolver_id] = CachedEngine(
+            _create_engine(sqlConnect, timeout=timeout), sqlConnect)
+
+    if cached_engine is not None:
+        cached_engine.engine.dispose()
+
+    return _engines[resolver_id]
+
+
+def drop_engine(resolver_id):
+    """
+    remove the engine of a resolver and close its connections
+
+    :param resolver_id: the resolver, which owns the engine
+    """
+
+    with _engine_lock:
+        cached_engine = _engines.pop(resolver_id, None)
+
+    if cached_engine is not None:
+        cached_engine.engine.dispose()
+
+
+def flush_table_cache(resolver_id, tableName):
+    """
+    drop the reflected table from the table cache, so that the table
+    definition will be reflected again on the next access
+
+    :param resolver_id: the resolver, which owns the engine
+    :param tableName: the name of the table
+    """
+
+    cached_engine = _engines.get(resolver_id)
+
+    if cached_engine is not None:
+        cached_engine.flushTable(tableName)
+
+
 class dbObject():
 
     def __init__(self):
@@ -307,30 +448,33 @@ class dbObject():
         self.engine = None
         self.meta = None
         self.sess = None
+        self.cached_engine = None
 
         return None
 
-    def connect(self, sqlConnect, timeout=5, verify=True):
+    def connect(self, sqlConnect, timeout=5, verify=True, resolver_id=None):
         """
         create a db session with the sqlConnect string
 
         :param sqlConnect: sql url for the connection
+        :param resolver_id: use the process wide engine of the resolver with
+                            its pooled connections and reflected tables -
+                            otherwise a dedicated engine is created
         """
 
-        args = {'echo': False, 'echo_pool': True}
-
-        if 'sqlite' not in sqlConnect:
-            args['pool_timeout'] = 30
-            args['connect_args'] = { 'connect_timeout': timeout}
-
-        self.engine = create_engine(sqlConnect, **args)
+        if resolver_id is not None:
+            self.cached_engine = get_engine(
+                resolver_id, sqlConnect, timeout=timeout)
+            self.engine = self.cached_engine.engine
+            self.meta = self.cached_engine.meta
+        else:
+            self.engine = _create_engine(sqlConnect, timeout=timeout)
+            self.meta = MetaData()
 
         # the repr of engine is does not show the password
 
         log.debug('[dbObject::connect] %r' % self.engine)
 
-        self.meta = MetaData()
-
         Session = sessionmaker(bind=self.engine, autoflush=True,
                                autocommit=True, expire_on_commit=True)
         self.sess = Session()
@@ -344,7 +488,7 @@ class dbObject():
 
         try:
 
-            self.engine.connect()
+            self.engine.connect().close()
             return
 
         except Exception as exx:
@@ -361,6 +505,10 @@ class dbObject():
 
     def getTable(self, tableName):
         log.debug('[dbObject::getTable] %s' % tableName)
+
+        if self.cached_engine is not None:
+            return self.cached_engine.getTable(tableName)
+
         return Table(tableName, self.meta, autoload=True,
                      autoload_with=self.engine)
 
@@ -381,6 +529,9 @@ class dbObject():
         log.debug('[dbObject::close]')
         if self.sess is not None:
             self.sess.close()
+
+        if self.cached_engine is None and self.engine is not None:
+            self.engine.dispose()
         return
 
 
@@ -534,7 +685,7 @@ class IdResolver(UserIdResolver):
             sqlConnect = self.sqlConnect
 
         self.dbObj = dbObject()
-        self.dbObj.connect(sqlConnect)
+        self.dbObj.connect(sqlConnect, resolver_id=self.conf)
 
         return self.dbObj
 
@@ -547,6 +698,24 @@ class IdResolver(UserIdResolver):
             self.dbObj = None
         return
 
+    def flush_cache(self):
+        """
+        drop the reflected user table of the resolver definition, so that
+        a changed table definition will be reflected again
+        """
+
+        flush_table_cache(self.conf, self.sqlTable)
+
+    @classmethod
+    def drop_cache(cls, resolver_name):
+        """
+        close the connections of a deleted resolver definition
+
+        :param resolver_name: the name of the deleted resolver
+        """
+
+        drop_engine(resolver_name)
+
     def getResolverId(self):
         """
         getResolverId - provide the resolver identifier
@@ -847,6 +1016,49 @@ class IdResolver(UserIdResolver):
         log.debug('[getUserInfo] done')
         return userInfo
 
+    def getUserInfos(self, userIds, suppress_password=True):
+        '''
+            return the user related information of several users, which
+            are fetched by one query
+
+            @param userIds: list of user ids
+            @type userIds:  list
+            @return: dictionary with the user info per user id - users
+                     which could not be found are not contained
+            @rtype:  dict
+
+        '''
+        log.debug("[getUserInfos] %d user ids" % len(userIds))
+        userInfos = {}
+
+        # the user ids might be given as strings for numeric columns
+
+        user_ids = dict(("%s" % userId, userId) for userId in userIds)
+
+        dbObj = self.connect(self.sqlConnect)
+        try:
+
+            table = dbObj.getTable(self.sqlTable)
+            colName = self.sqlUserInfo.get("userid")
+
+            select = table.select(
+                self.__getUserNamesFilter(table, list(user_ids.values())))
+
+            for row in dbObj.query(select):
+                userId = user_ids.get("%s" % row[colName])
+                if userId is None:
+                    continue
+
+                userInfos[userId] = self.__getUserInfo(
+                                    dbObj, row,
+                                    suppress_password=suppress_password)
+
+        except Exception as e:
+            log.exception('[getUserInfos] Exception: %s' % (str(e)))
+
+        log.debug('[getUserInfos] done')
+        return userInfos
+
     def getSearchFields(self):
         '''
         return all fields on which a search could be made
@@ -1066,6 +1278,24 @@ class IdResolver(UserIdResolver):
         return self.__add_where_clause_to_filter(
                                             table.c[column_name] == loginId)
 
+    def __getUserNamesFilter(self, table, loginIds):
+        """
+        helper method to access the userdata of several users by their userid
+
+        :param table: the database table
+        :param loginIds: the list of ids of the users to be searched
+        :return: filter condition, which will be added to the db query
+        """
+
+        column_name = self.sqlUserInfo.get("userid")
+        if column_name == None:
+            err = "[__getUserNamesFilter] userid column definition required!"
+            log.error(err)
+            raise Exception(err)
+
+        return self.__add_where_clause_to_filter(
+                                        table.c[column_name].in_(loginIds))
+
     def __creatSearchString(self, dbObj, table, searchDict):
         """
         Create search string
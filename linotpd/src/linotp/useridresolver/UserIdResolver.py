@@ -115,6 +115,25 @@ class UserIdResolver(object):
 
         return False
 
+    def flush_cache(self):
+        """
+        hook to drop the process wide cached data of the resolver, like
+        reflected database schemas - called when the resolver is (re)defined
+        """
+
+        return
+
+    @classmethod
+    def drop_cache(cls, resolver_name):
+        """
+        hook to drop the process wide cached data of a resolver, like open
+        database connections - called when the resolver is deleted
+
+        :param resolver_name: the name of the deleted resolver
+        """
+
+        return
+
     @classmethod
     def merge_crypted_parameters(cls, new_params, previous_params):
 
@@ -216,6 +235,29 @@ class UserIdResolver(object):
         """
         return ""
 
+    def getUserInfos(self, userids):
+        """
+        This function returns the user information of several users,
+        identified by their UserIDs.
+
+        Resolvers, which support a lookup of several users at once, should
+        overwrite this method - by default the users are looked up one by
+        one.
+
+        :param userids: list of user ids
+        :return: dictionary with the user info per user id - users which
+                 could not be found are not contained
+        """
+
+        userinfos = {}
+
+        for userid in userids:
+            userinfo = self.getUserInfo(userid)
+            if userinfo:
+                userinfos[userid] = userinfo
+
+        return userinfos
+
     def getUserList(self, serachDict):
         """
         This function finds the user objects,